@@ -0,0 +1,723 @@
+import argparse
+import csv
+import json
+import random
+import shutil
+import time
+from itertools import accumulate
+from pathlib import Path
+
+# ================================================================
+# ARCHIVIO SINTETICO PER I TEST DI SCALA
+# ================================================================
+# Gli unici dati di prova sono gli export reali, quindi non si sa come si
+# comportano le fasi (regio_recita.py, i loader Cypher, 1_regio.py...) a 10x o
+# 100x. Questo script genera export con la stessa forma di quelli Pimcore
+# (stesse colonne, separatori, celle JSON o "quasi JSON", fullpath con ID tra
+# parentesi) a una scala a scelta, con le stesse irregolarità:
+#   - ripetizione realistica: titoli, cantanti, teatri seguono una distribuzione
+#     di Zipf, e le recite di una produzione condividono quasi tutto il cast
+#   - celle JSON sia vere sia in sintassi Python, ID con ".0", celle vuote
+#   - ID sovrapposti tra Regio e Fondazione (due istanze Pimcore, stessi numeri
+#     per oggetti diversi) e persone/opere presenti in entrambi con ID diversi
+# Solo libreria standard: righe scritte una alla volta, in memoria restano i
+# cataloghi (persone, opere, luoghi), non le recite. Stesso seme -> stessi file.
+#
+#   python normalization/archivio_sintetico.py --scale 10 --out /tmp/theatrenet_x10
+#   cd /tmp/theatrenet_x10 && python <repo>/run_pipeline.py
+#   python normalization/archivio_sintetico.py --out /tmp/theatrenet_x10 --publish
+#   THEATRENET_MIRROR_ROOT=/tmp/theatrenet_x10 python <repo>/semantic_graph/1_regio.py
+
+SCALE = 1.0
+SEED = 42
+OUTPUT_ROOT = "synthetic"
+
+# Numero di entità a scala 1 (ordine di grandezza degli export reali)
+BASE_COUNTS = {
+    "regio_persone": 17_500,
+    "regio_opere": 3_700,
+    "regio_stagioni": 230,
+    "regio_produzioni": 1_100,
+    "fondazione_persone": 24_000,
+    "fondazione_opere": 4_500,
+    "fondazione_stagioni": 145,
+    "fondazione_produzioni": 3_500,
+    "enti": 120,
+    "edifici": 150,
+}
+
+# Fan-out per produzione / recita: non dipende dalla scala
+RECITE_PER_PRODUZIONE = {"regio": (4, 14), "fondazione": (1, 7)}
+PERSONAGGI_PER_OPERA = (2, 8)
+CURATORI_PER_RECITA = (0, 2)
+ESECUTORI_PER_RECITA = (0, 3)
+CREDITI_ARTISTICI = (0, 8)
+CREDITI_TECNICI = (0, 4)
+
+# Probabilità delle irregolarità tipiche degli export
+QUOTE = {
+    "pythonish": 0.4,           # cella JSON scritta come dict Python
+    "id_float": 0.05,           # ID "2502.0" invece di "2502"
+    "cella_vuota": 0.08,        # colonna JSON vuota
+    "cambio_cast": 0.2,         # recita con un interprete diverso dal resto della produzione
+    "grafia_variante": 0.03,    # nome nella recita scritto diversamente dal master
+    "id_obsoleto": 0.05,        # ID della persona nella recita diverso da quello del master
+    "viaf_multipli": 0.25,      # persona Regio su più righe (un VIAF per riga)
+    "qid_persona": 0.6,
+    "qid_luogo": 0.9,
+    "persone_condivise": 0.15,  # persone Fondazione presenti anche nel Regio
+}
+
+ZIPF_S = 1.1
+
+# Primo ID di ogni istanza Pimcore: un solo contatore per fonte, come in Pimcore,
+# e intervalli che si sovrappongono tra le due fonti
+ID_START = {"regio": 2_500, "fondazione": 9_000}
+
+# File generati (relativi alla root): export grezzi letti dalla pipeline...
+FILES = {
+    "regio_recite": "dataset/regio/recite/20251111-Regio-Export-Recite-csv.csv",
+    "regio_persone": "dataset/regio/regio_persone.csv",
+    "regio_produzioni": "dataset/regio/produzioni/20251103_export_produzioni_regio.csv",
+    "regio_opere": "dataset/regio_opere.csv",
+    "regio_composizioni": "dataset/opere/regio-composizioni-clean-wiki-reconciled-xlsx-csv.csv",
+    "regio_luoghi": "dataset/regio/recite/recite-regio-luoghi-csv.csv",
+    "fondazione_recite": "dataset/fondazione/Recite/20251120_recite_collegate.csv",
+    "fondazione_persone": "dataset/fondazione/persone.csv",
+    "fondazione_produzioni": "dataset/fondazione/Produzioni/20251120_teatri-reggio-emilia-.csv",
+    "fondazione_stagioni": "dataset/fondazione/Stagioni/20251124-export-stagioni-teatri-reggioemilia.csv",
+    "fondazione_luoghi": "dataset/fondazione/Recite/recite-fondazione_luoghi_qid.csv",
+    # ...e tabelle senza una fase di normalizzazione, già nella struttura pubblicata su GitHub
+    "regio_stagioni": "regio/regio_stagioni.csv",
+    "fondazione_opere": "fondazione/fondazione-iteatri-opere-musicali-wiki-reconciled.csv",
+    "fondazione_produzioni_recite": "fondazione/20251125_fondazione-iteatri-export-produzione-recite.csv",
+}
+
+MANIFEST_FILE = "dataset/archivio_sintetico.json"
+
+# === VOCABOLARI ===
+
+FIRST_NAMES = [
+    "Maria", "Giuseppe", "Anna", "Giovanni", "Francesca", "Luigi", "Giulia", "Carlo", "Elena", "Antonio",
+    "Chiara", "Mario", "Renata", "Franco", "Mirella", "Luciano", "Katia", "Piero", "Raina", "Ruggero",
+    "Daniela", "Leo", "Fiorenza", "Nicola", "Cecilia", "Alfredo", "Mariella", "Sesto", "Lucia", "Gianni",
+    "Teresa", "Bruno", "Montserrat", "Plácido", "Agnes", "José", "Ileana", "Nicolai", "Edita", "Sherrill",
+    "Joan", "Jonas", "Anja", "Ferruccio", "Magda", "Rolando", "Patrizia", "Dmitri", "Barbara", "Juan Diego",
+]
+LAST_NAMES = [
+    "Rossi", "Bianchi", "Verdi", "Ferrari", "Romano", "Colombo", "Ricci", "Marino", "Greco", "Bruno",
+    "Gallo", "Conti", "De Luca", "Mancini", "Costa", "Giordano", "Rizzo", "Lombardi", "Moretti", "Barbieri",
+    "Fontana", "Santoro", "Mariani", "Rinaldi", "Caruso", "Ferrara", "Galli", "Martini", "Leone", "Longo",
+    "Gentile", "Martinelli", "Vitale", "Serra", "Coppola", "De Santis", "D'Angelo", "Marchetti", "Parisi", "Villa",
+    "Freni", "Tebaldi", "Pavarotti", "Raimondi", "Cappuccilli", "Scotto", "Kabaivanska", "Nucci", "Dessì", "Bruson",
+    "Müller", "Schäfer", "Dubois", "Lefèvre", "García", "Domingo", "Carreras", "Sutherland", "Horne", "Gruberová",
+    "Netrebko", "Kaufmann", "Harteros", "Furlanetto", "Villazón", "Flórez", "Hvorostovsky", "Frittoli", "Antonacci", "Bartoli",
+]
+
+# Titoli reali in testa alla distribuzione: (titolo, [(personaggio, voce), ...])
+OPERE_CELEBRI = [
+    ("Tosca", [("Floria Tosca", "soprano"), ("Mario Cavaradossi", "tenore"), ("Scarpia", "baritono"), ("Spoletta", "tenore")]),
+    ("La traviata", [("Violetta Valéry", "soprano"), ("Alfredo Germont", "tenore"), ("Giorgio Germont", "baritono"), ("Flora", "mezzosoprano")]),
+    ("Rigoletto", [("Rigoletto", "baritono"), ("Gilda", "soprano"), ("Il Duca di Mantova", "tenore"), ("Sparafucile", "basso")]),
+    ("La bohème", [("Mimì", "soprano"), ("Rodolfo", "tenore"), ("Marcello", "baritono"), ("Musetta", "soprano"), ("Colline", "basso")]),
+    ("Norma", [("Norma", "soprano"), ("Adalgisa", "mezzosoprano"), ("Pollione", "tenore"), ("Oroveso", "basso")]),
+    ("Don Pasquale", [("Don Pasquale", "basso"), ("Norina", "soprano"), ("Ernesto", "tenore"), ("Malatesta", "baritono")]),
+    ("Madama Butterfly", [("Cio-Cio-San", "soprano"), ("Pinkerton", "tenore"), ("Sharpless", "baritono"), ("Suzuki", "mezzosoprano")]),
+    ("Aida", [("Aida", "soprano"), ("Radamès", "tenore"), ("Amneris", "mezzosoprano"), ("Amonasro", "baritono")]),
+    ("Il barbiere di Siviglia", [("Figaro", "baritono"), ("Rosina", "mezzosoprano"), ("Il Conte d'Almaviva", "tenore"), ("Bartolo", "basso")]),
+    ("Carmen", [("Carmen", "mezzosoprano"), ("Don José", "tenore"), ("Escamillo", "baritono"), ("Micaëla", "soprano")]),
+    ("Turandot", [("Turandot", "soprano"), ("Calaf", "tenore"), ("Liù", "soprano"), ("Timur", "basso")]),
+    ("Don Giovanni", [("Don Giovanni", "baritono"), ("Leporello", "basso"), ("Donna Anna", "soprano"), ("Zerlina", "soprano")]),
+    ("Le nozze di Figaro", [("Figaro", "baritono"), ("Susanna", "soprano"), ("La Contessa", "soprano"), ("Cherubino", "mezzosoprano")]),
+    ("Manon Lescaut", [("Manon Lescaut", "soprano"), ("Des Grieux", "tenore"), ("Lescaut", "baritono")]),
+    ("Werther", [("Werther", "tenore"), ("Charlotte", "mezzosoprano"), ("Albert", "baritono")]),
+    ("Lucia di Lammermoor", [("Lucia", "soprano"), ("Edgardo", "tenore"), ("Enrico", "baritono"), ("Raimondo", "basso")]),
+    ("Il trovatore", [("Manrico", "tenore"), ("Leonora", "soprano"), ("Azucena", "mezzosoprano"), ("Il Conte di Luna", "baritono")]),
+    ("Capuleti e i Montecchi, I", [("Giulietta", "soprano"), ("Romeo", "mezzosoprano"), ("Tebaldo", "tenore")]),
+    ("Vespri siciliani, I", [("Elena", "soprano"), ("Arrigo", "tenore"), ("Monforte", "baritono"), ("Procida", "basso")]),
+    ("Contes d’Hofmann, Les", [("Hoffmann", "tenore"), ("Olympia", "soprano"), ("Lindorf", "basso")]),
+]
+TITOLO_NOMI = ["vedova", "principe", "gazza", "notte", "isola", "regina", "pescatore", "vascello", "giardino", "maschera",
+               "fanciulla", "cavaliere", "corsaro", "sogno", "lupo", "sposa", "duca", "serva", "contessa", "villaggio"]
+TITOLO_AGGETTIVI = ["allegra", "ladra", "incantata", "fantasma", "perduta", "d'oro", "di ghiaccio", "padrona", "del West",
+                    "rapita", "dei sogni", "nera", "errante", "di fuoco", "segreta", "d'Oriente", "ritrovata", "in fiore"]
+PERSONAGGI = ["Il Conte", "La Marchesa", "Il Servo", "La Regina", "Un Pastore", "Il Dottore", "La Nutrice", "Un Soldato",
+              "Il Re", "La Principessa", "Il Capitano", "Una Voce", "Il Notaio", "La Zingara", "Il Mercante"]
+VOCI = ["soprano", "mezzosoprano", "contralto", "tenore", "baritono", "basso"]
+
+# Luoghi: (città, edifici). I primi della lista sono le sedi principali delle due fonti
+CITTA = [
+    ("Torino", ["Teatro Regio", "Teatro Carignano", "Auditorium RAI"]),
+    ("Reggio Emilia", ["Teatro Municipale Valli", "Teatro Ariosto", "Teatro Cavallerizza"]),
+    ("Milano", ["Teatro alla Scala", "Teatro Lirico"]), ("Parma", ["Teatro Regio"]),
+    ("Modena", ["Teatro Comunale Pavarotti-Freni"]), ("Bologna", ["Teatro Comunale"]),
+    ("Venezia", ["Teatro La Fenice"]), ("Firenze", ["Teatro del Maggio Musicale Fiorentino"]),
+    ("Roma", ["Teatro dell'Opera", "Teatro Argentina"]), ("Napoli", ["Teatro di San Carlo"]),
+    ("Genova", ["Teatro Carlo Felice"]), ("Trieste", ["Teatro Verdi"]), ("Palermo", ["Teatro Massimo"]),
+    ("Paris", ["Opéra Garnier", "Théâtre du Châtelet"]), ("Wien", ["Staatsoper"]), ("München", ["Nationaltheater"]),
+    ("London", ["Royal Opera House"]), ("Zürich", ["Opernhaus"]), ("Barcelona", ["Gran Teatre del Liceu"]),
+]
+TIPI_EDIFICIO = ["Teatro", "Auditorium", "Sala", "Teatro Comunale", "Chiesa di San", "Palazzo"]
+
+ENTI_BASE = ["Orchestra del Teatro Regio", "Coro del Teatro Regio", "Orchestra dell'Emilia-Romagna Arturo Toscanini",
+             "Coro del Teatro Municipale di Piacenza", "I Teatri di Reggio Emilia", "Teatro Regio di Torino",
+             "Orchestra Sinfonica Nazionale della RAI", "Corpo di ballo del Teatro Regio", "Coro \"Voci bianche\""]
+RUOLI_ENTE = ["Orchestra", "Coro", "Corpo di ballo", "produzione", "coproduzione"]
+RUOLI_CURATORE = ["Direttore", "Maestro del coro", "Direttore", "Direttore"]
+RUOLI_ARTISTICI = ["Regista", "Scenografo", "Costumista", "Coreografo", "Regia", "Scene", "Costumi"]
+RUOLI_TECNICI = ["Luci", "Direttore dell'allestimento", "Assistente alla regia", "Maestro collaboratore"]
+RELAZIONI_FONDAZIONE = ["direttore", "regia", "scene", "costumi", "luci", "maestro del coro"]
+OCCUPAZIONI = ["cantante lirico|opera singer", "soprano", "tenore|tenor", "baritono|baritone", "direttore d'orchestra|conductor",
+               "regista|director", "scenografo|scenographer", "compositore|composer", "librettista|librettist"]
+TIPI_STAGIONE = ["Lirica", "Lirica", "Concerti", "Danza", "Operetta"]
+
+
+# === STRUMENTI ===
+
+class Zipf:
+    """Scelta pesata 1/rango^s: pochi elementi molto frequenti e una coda lunga."""
+
+    def __init__(self, items, rng, s=ZIPF_S):
+        self.items = items
+        self.rng = rng
+        self.cum = list(accumulate(1 / (r ** s) for r in range(1, len(items) + 1)))
+
+    def pick(self):
+        return self.rng.choices(self.items, cum_weights=self.cum)[0]
+
+    def sample(self, k):
+        """k elementi distinti (k piccolo rispetto alla popolazione)."""
+        scelti = {}
+        for _ in range(k * 4):
+            x = self.pick()
+            scelti[id(x)] = x
+            if len(scelti) == k:
+                break
+        return list(scelti.values())
+
+
+class IdAllocator:
+    """Contatore unico per istanza Pimcore: ogni oggetto, di qualunque tipo, prende il prossimo ID."""
+
+    def __init__(self, start):
+        self.next = start
+
+    def block(self, n):
+        start = self.next
+        self.next += n
+        return range(start, start + n)
+
+
+def scaled(key, scale, minimum=1):
+    return max(minimum, round(BASE_COUNTS[key] * scale))
+
+
+def person_names(n, rng, offset=0):
+    """
+    n nomi (Nome, Cognome) in gran parte distinti: nome x cognome, poi secondo nome,
+    poi doppio cognome. Mescolati, così la frequenza non dipende dall'ordine alfabetico.
+    offset: fonti diverse partono da punti diversi e non generano omonimi per caso.
+    """
+    F, L = len(FIRST_NAMES), len(LAST_NAMES)
+    nomi = []
+    for i in range(offset, offset + n):
+        first, last = FIRST_NAMES[i % F], LAST_NAMES[(i // F) % L]
+        giro = i // (F * L)
+        if giro:
+            first = f"{first} {FIRST_NAMES[(giro - 1) % F]}"
+        if giro > F:
+            last = f"{last}-{LAST_NAMES[(giro // F) % L]}"
+        nomi.append((first, last))
+    rng.shuffle(nomi)
+    return nomi
+
+
+def opera_titles(n):
+    """Titoli celebri in testa, poi titoli composti ("La vedova allegra", "... n. 2")."""
+    titoli = [t for t, _ in OPERE_CELEBRI]
+    combinazioni = [f"{'La' if nome.endswith('a') else 'Il'} {nome} {agg}"
+                    for agg in TITOLO_AGGETTIVI for nome in TITOLO_NOMI]
+    i = 0
+    while len(titoli) < n:
+        giro, k = divmod(i, len(combinazioni))
+        titoli.append(combinazioni[k] if giro == 0 else f"{combinazioni[k]} n. {giro + 1}")
+        i += 1
+    return titoli[:n]
+
+
+def authority_path(persona):
+    return f"/Voci di autorità/Persone/{persona['nome']} ({persona['id']})"
+
+
+def qid(rng):
+    return f"Q{rng.randint(1_000, 120_000_000)}"
+
+
+def wikidata_uri(q):
+    return f"https://www.wikidata.org/wiki/{q}" if q else ""
+
+
+def date_it(d):
+    """AAAA-MM-GG -> GG-MM-AAAA (datetext Pimcore)."""
+    return f"{d[8:10]}-{d[5:7]}-{d[:4]}"
+
+
+def day(anno, giorno):
+    """Data ISO del giorno-esimo giorno dell'anno (mesi di 28 giorni: basta per dei test)."""
+    giorno = max(0, min(giorno, 12 * 28 - 1))
+    return f"{anno}-{giorno // 28 + 1:02d}-{giorno % 28 + 1:02d}"
+
+
+class Noise:
+    """Le irregolarità degli export, tutte guidate dallo stesso generatore casuale."""
+
+    def __init__(self, rng):
+        self.rng = rng
+
+    def chance(self, key):
+        return self.rng.random() < QUOTE[key]
+
+    def pid(self, value):
+        """ID come compare nel JSON: intero, stringa o float con ".0"."""
+        if self.chance("id_float"):
+            return float(value) if self.rng.random() < 0.5 else f"{value}.0"
+        return value if self.rng.random() < 0.5 else str(value)
+
+    def person_id(self, value):
+        """ID di una persona citata in una recita: a volte uno vecchio, da riconciliare col master."""
+        return self.pid(value + 1_000_000 if self.chance("id_obsoleto") else value)
+
+    def cell(self, obj, indent=None):
+        """Cella JSON vera oppure dict/list Python (apici singoli)."""
+        if self.chance("pythonish"):
+            return repr(obj)
+        return json.dumps(obj, ensure_ascii=False, indent=indent)
+
+    def name(self, nome):
+        """Variante di grafia (lettera mancante) per una parte dei nomi nelle recite."""
+        if len(nome) > 6 and self.chance("grafia_variante"):
+            k = self.rng.randrange(1, len(nome) - 1)
+            return nome[:k] + nome[k + 1:]
+        return nome
+
+
+class Writer:
+    """CSV scritto riga per riga, con il conteggio per il riepilogo."""
+
+    def __init__(self, root, key, header, sep=",", quoting=csv.QUOTE_MINIMAL):
+        self.rel = FILES[key]
+        self.path = Path(root) / self.rel
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.file, delimiter=sep, quoting=quoting, lineterminator="\n")
+        self.writer.writerow(header)
+        self.rows = 0
+
+    def row(self, values):
+        self.writer.writerow(values)
+        self.rows += 1
+
+    def close(self):
+        self.file.close()
+        return {"file": self.rel, "righe": self.rows, "mb": round(self.path.stat().st_size / 1e6, 2)}
+
+
+# === CATALOGHI CONDIVISI ===
+
+def build_places(rng, scale):
+    """
+    Città ed edifici: le sedi reali, poi edifici generati (crescono con la radice della
+    scala: i teatri non aumentano come le recite). Ogni fonte ha i propri ID dei luoghi.
+    """
+    edifici = [(citta, nome) for citta, nomi in CITTA for nome in nomi]
+    target = max(len(edifici), round(BASE_COUNTS["edifici"] * scale ** 0.5))
+    i = 0
+    while len(edifici) < target:
+        citta = CITTA[i % len(CITTA)][0]
+        edifici.append((citta, f"{TIPI_EDIFICIO[i % len(TIPI_EDIFICIO)]} {LAST_NAMES[(i // len(CITTA)) % len(LAST_NAMES)]}"))
+        i += 1
+    luoghi = []
+    for citta, nome in edifici:
+        q = qid(rng) if rng.random() < QUOTE["qid_luogo"] else ""
+        luoghi.append({"citta": citta, "edificio": nome, "entity": q})
+    return luoghi
+
+
+def build_works(rng, n):
+    """Opere: titolo, personaggi con voce, QID (condivisi tra le fonti sui titoli celebri)."""
+    celebri = dict(OPERE_CELEBRI)
+    opere = []
+    for titolo in opera_titles(n):
+        personaggi = celebri.get(titolo)
+        if personaggi is None:
+            k = rng.randint(*PERSONAGGI_PER_OPERA)
+            personaggi = [(p, rng.choice(VOCI)) for p in rng.sample(PERSONAGGI, min(k, len(PERSONAGGI)))]
+        opere.append({"titolo": titolo, "personaggi": personaggi, "entity": qid(rng), "anno": rng.randint(1700, 1990)})
+    return opere
+
+
+# === REGIO ===
+
+def generate_regio(root, rng, noise, scale, luoghi, opere_comuni):
+    ids = IdAllocator(ID_START["regio"])
+    riepilogo = []
+
+    # --- Persone (master, con righe ripetute per i VIAF multipli) ---
+    nomi = person_names(scaled("regio_persone", scale), rng)
+    persone = []
+    w = Writer(root, "regio_persone", ["Column", "person_id", "regio_fullpath", "full_name", "wikidata_id", "wikidata_uri",
+                                       "original_name", "birth_date", "birth_place", "death_date", "death_place",
+                                       "occupation", "viaf"])
+    for pid, (first, last) in zip(ids.block(len(nomi)), nomi):
+        nome = f"{first} {last}"
+        q = qid(rng) if noise.chance("qid_persona") else ""
+        persone.append({"id": pid, "nome": nome, "first": first, "last": last, "entity": q})
+        nascita = rng.randint(1780, 1990)
+        righe = rng.randint(2, 3) if noise.chance("viaf_multipli") else 1
+        for _ in range(righe):
+            w.row([0, pid, f"/Voci di autorità/Persone/{nome} ({pid})", nome, q, wikidata_uri(q), nome,
+                   f"{nascita}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T00:00:00Z" if q else "",
+                   qid(rng) if q else "", f"{nascita + rng.randint(30, 90)}-01-01T00:00:00Z" if q and nascita < 1940 else "",
+                   rng.choice(CITTA)[0] if q else "", rng.choice(OCCUPAZIONI) if q else "",
+                   rng.randint(10_000, 999_999_999) if q else ""])
+    riepilogo.append(w.close())
+
+    # Ruoli: compositori e librettisti in testa, poi direttori, tecnici, cantanti
+    n = len(persone)
+    autori = Zipf(persone[:max(20, n // 60)], rng)
+    direttori = Zipf(persone[n // 60:n // 20], rng)
+    tecnici = Zipf(persone[n // 20:n // 8], rng)
+    cantanti = Zipf(persone[n // 8:], rng)
+
+    # --- Enti ed edifici ---
+    enti = [{"id": i, "nome": nome} for i, nome in zip(ids.block(scaled("enti", scale)), enti_names(scaled("enti", scale)))]
+    zipf_enti = Zipf(enti, rng)
+    luoghi_regio = [dict(l) for l in luoghi]
+    citta_id = {c: i for c, i in zip(sorted({l["citta"] for l in luoghi}), ids.block(len(CITTA)))}
+    for l, i in zip(luoghi_regio, ids.block(len(luoghi_regio))):
+        l["citta_id"], l["id"] = citta_id[l["citta"]], i
+    zipf_luoghi = Zipf(luoghi_regio, rng, s=1.6)  # il Teatro Regio domina
+
+    w = Writer(root, "regio_luoghi", ["edificio_nome", "luogo_nome", "entity", "uri"])
+    for l in luoghi_regio:
+        w.row([l["edificio"], l["citta"], l["entity"], wikidata_uri(l["entity"])])
+    riepilogo.append(w.close())
+
+    # --- Opere (una riga per personaggio, come l'export riconciliato) ---
+    opere = [dict(o, id=i) for o, i in zip(opere_comuni[:scaled("regio_opere", scale)], ids.block(scaled("regio_opere", scale)))]
+    header_opere = ["id", "fullpath", "compositions_id", "dcTitle", "composizione_entity_identifiers", "composizione_uri",
+                    "durata", "from", "to", "datetext", "source_id", "autore_testo", "autore_musica", "autore_compositore",
+                    "autore_opera_letteraria", "autore_testi_secondari", "adattamento_musicale", "autore_musica_clean",
+                    "autore_testo_clean", "autore_opera_letteraria.1", "literary_author_name", "literary_author_id",
+                    "wikidata_entity_id", "operaLabel", "character_wikidata_id", "character_name", "voice_type",
+                    "character_gender"]
+    w_opere = Writer(root, "regio_opere", header_opere)
+    w_comp = Writer(root, "regio_composizioni", header_opere)
+    for k, o in enumerate(opere):
+        musica, testo, letterario = autori.pick(), autori.pick(), autori.pick()
+        datetext = f"01-01-{o['anno']} - 31-12-{o['anno']}" if rng.random() > 0.1 else rng.choice(["", str(o["anno"]), f"{o['anno']}/4"])
+        base = [f"teatro_regio_{o['id']}", f"/Composizioni (52556)/{o['titolo']} ({o['id']})", o["id"], o["titolo"],
+                o["entity"], wikidata_uri(o["entity"]), "", f"{o['anno']}-01-01", f"{o['anno']}-12-31", datetext,
+                f"object_id_{k}", authority_path(testo), authority_path(musica), "",
+                authority_path(letterario) if rng.random() < 0.5 else "", "", "",
+                musica["nome"], testo["nome"], letterario["nome"], letterario["nome"], letterario["id"], o["entity"],
+                o["titolo"]]
+        # Come nell'export reale, molte opere non hanno personaggi riconciliati: una riga sola
+        personaggi = o["personaggi"] if rng.random() < 0.25 else [("", "")]
+        for personaggio, voce in personaggi:
+            genere = "femmina" if voce in ("soprano", "mezzosoprano", "contralto") else "maschio" if voce else ""
+            riga = base + [qid(rng) if personaggio else "", personaggio, voce, genere]
+            w_opere.row(riga)
+            w_comp.row(riga)
+    riepilogo += [w_opere.close(), w_comp.close()]
+    zipf_opere = Zipf(opere, rng)
+
+    # --- Stagioni, produzioni e recite (le recite non restano in memoria) ---
+    n_stagioni = scaled("regio_stagioni", scale)
+    n_produzioni = scaled("regio_produzioni", scale)
+    # Oltre i 52 anni di cartellone le stagioni si ripetono con un numero d'ordine
+    stagioni = [{"id": i, "anno": 1973 + k % 52,
+                 "titolo": f"Stagione lirica {1973 + k % 52}" + (f" - {k // 52 + 1}" if k >= 52 else ""), "produzioni": []}
+                for k, i in enumerate(ids.block(n_stagioni))]
+
+    w_prod = Writer(root, "regio_produzioni", ["id", "Crediti artistici", "Crediti tecnici", "fullpath", "composizioni_collegate",
+                                               "from", "to", "datetext", "source_id", "luogo_prima_rappresentazione",
+                                               "edificio_prima_rappresentazione"], sep=";")
+    w_rec = Writer(root, "regio_recite", ["id", "fullpath", "from", "to", "datetext", "luogo_rappresentazione",
+                                          "edificio_rappresentazione", "composizioni_collegate", "altre_recite",
+                                          "Personaggi e interpreti - json", "Curatori Esecuzione Musicale - json",
+                                          "Esecutori - json"])
+    for k, prod_id in enumerate(ids.block(n_produzioni)):
+        stagione = stagioni[k % n_stagioni]
+        ordine = len(stagione["produzioni"]) + 1
+        opera = zipf_opere.pick()
+        luogo = zipf_luoghi.pick()
+        prod_path = f"/Cronologia (52555)/{stagione['titolo']} ({stagione['id']})/{ordine} {opera['titolo']} ({prod_id})"
+        stagione["produzioni"].append((prod_path, prod_id))
+        citta_path = f"/Voci di autorità/Luoghi/{luogo['citta']} ({luogo['citta_id']})"
+        edificio_path = f"{citta_path}/{luogo['edificio']} ({luogo['id']})"
+        opera_path = f"/Composizioni (52556)/{opera['titolo']} ({opera['id']})"
+
+        n_recite = rng.randint(*RECITE_PER_PRODUZIONE["regio"])
+        inizio = rng.randint(0, 300)
+        dal, al = day(stagione["anno"], inizio), day(stagione["anno"], inizio + 2 * n_recite)
+
+        artistici = [{"Identificativo": noise.pid(p["id"]), "Nome": p["nome"], "Ruolo": rng.choice(RUOLI_ARTISTICI)}
+                     for p in tecnici.sample(rng.randint(*CREDITI_ARTISTICI))]
+        tecnici_cr = [{"identificativo": p["id"], "Nome": p["nome"], "Ruolo": rng.choice(RUOLI_TECNICI)}
+                      for p in tecnici.sample(rng.randint(*CREDITI_TECNICI))]
+        w_prod.row([prod_id, noise.cell(artistici) if artistici else "", noise.cell(tecnici_cr) if tecnici_cr else "",
+                    prod_path, opera_path if rng.random() > 0.05 else "", dal if rng.random() > 0.05 else "", al,
+                    f"{date_it(dal)} - {date_it(al)}", f"object_id_{prod_id}", citta_path, edificio_path])
+
+        # Cast della produzione, ripetuto (quasi) identico su tutte le recite
+        cast = [(personaggio, voce, cantanti.pick()) for personaggio, voce in opera["personaggi"]]
+        curatori = [(direttori.pick(), rng.choice(RUOLI_CURATORE)) for _ in range(rng.randint(*CURATORI_PER_RECITA))]
+        esecutori = [(zipf_enti.pick(), rng.choice(RUOLI_ENTE[:3])) for _ in range(rng.randint(*ESECUTORI_PER_RECITA))]
+        recite_ids = list(ids.block(n_recite))
+        recite_paths = [f"{prod_path}/{date_it(day(stagione['anno'], inizio + 2 * j))} {opera['titolo']} ({rid})"
+                        for j, rid in enumerate(recite_ids)]
+        for j, rid in enumerate(recite_ids):
+            if noise.chance("cambio_cast") and cast:
+                h = rng.randrange(len(cast))
+                cast = cast[:h] + [(cast[h][0], cast[h][1], cantanti.pick())] + cast[h + 1:]
+            interpreti = [{"Identificativo": noise.person_id(p["id"]), "Nome": f"{personaggio} ({voce}) - {noise.name(p['nome'])}",
+                           "Ruolo": "Interprete"} for personaggio, voce, p in cast]
+            cur = {"curatori_esecuzione_musicale:each": [{"Identificativo": str(noise.person_id(p["id"])), "Nome": noise.name(p["nome"]),
+                                                          "Ruolo": ruolo} for p, ruolo in curatori]}
+            ese = {"esecutori": [{"Identificativo": str(e["id"]), "Nome": e["nome"], "Ruolo": ruolo} for e, ruolo in esecutori]}
+            data = day(stagione["anno"], inizio + 2 * j)
+            w_rec.row([rid, recite_paths[j], data, data, date_it(data), citta_path, edificio_path, opera_path,
+                       ",".join(p for h, p in enumerate(recite_paths) if h != j),
+                       "" if noise.chance("cella_vuota") else noise.cell(interpreti),
+                       noise.cell(cur) if curatori else "", noise.cell(ese) if esecutori else ""])
+    riepilogo += [w_prod.close(), w_rec.close()]
+
+    # --- Stagioni (tabella pubblicata, senza fase di normalizzazione) ---
+    ente = next(e for e in enti if e["nome"] == "Teatro Regio di Torino")
+    w = Writer(root, "regio_stagioni", ["season_id", "season_title", "season_start_date", "season_end_date", "datetext",
+                                        "season_type", "ente_produttore", "organizer_name", "organizer_id",
+                                        "linked_production", "linked_production_ids", "fullpath", "published",
+                                        "creationDate", "modificationDate"])
+    for s in stagioni:
+        dal, al = f"{s['anno']}-01-10", f"{s['anno']}-12-20"
+        w.row([s["id"], s["titolo"], dal, al, f"{date_it(dal)} - {date_it(al)}", "opera e balletto",
+               f"/Voci di autorità/Enti/{ente['nome']} ({ente['id']})", ente["nome"], ente["id"],
+               ",".join(p for p, _ in s["produzioni"]), ",".join(str(i) for _, i in s["produzioni"]),
+               f"/Cronologia (52555)/{s['titolo']} ({s['id']})", 1, 1720184750, 1749115840])
+    riepilogo.append(w.close())
+    return riepilogo, persone
+
+
+def enti_names(n):
+    nomi = list(ENTI_BASE)
+    i = 0
+    while len(nomi) < n:
+        tipo = ["Orchestra Sinfonica di", "Coro Lirico di", "Compagnia di Danza di", "Fondazione Teatro di"][i % 4]
+        citta = CITTA[(i // 4) % len(CITTA)][0]
+        giro = i // (4 * len(CITTA))
+        nomi.append(f"{tipo} {citta}" + (f" {giro + 1}" if giro else ""))
+        i += 1
+    return nomi[:n]
+
+
+# === FONDAZIONE ===
+
+def generate_fondazione(root, rng, noise, scale, luoghi, opere_comuni, persone_regio):
+    ids = IdAllocator(ID_START["fondazione"])
+    riepilogo = []
+
+    # --- Persone: una parte sono le stesse del Regio (stesso nome e QID, ID diverso) ---
+    n_persone = scaled("fondazione_persone", scale)
+    condivise = rng.sample(persone_regio, min(len(persone_regio), round(n_persone * QUOTE["persone_condivise"])))
+    nuove = person_names(n_persone - len(condivise), rng, offset=len(persone_regio))
+    persone = []
+    w = Writer(root, "fondazione_persone", ["id", "fullpath", "dcTitle", "entity", "uri"])
+    sorgenti = [(p["first"], p["last"], p["entity"]) for p in condivise]
+    sorgenti += [(f, l, qid(rng) if noise.chance("qid_persona") else "") for f, l in nuove]
+    rng.shuffle(sorgenti)
+    for pid, (first, last, q) in zip(ids.block(len(sorgenti)), sorgenti):
+        persone.append({"id": pid, "nome": f"{first} {last}", "pimcore": f"{last}, {first}"})
+        w.row([pid, f"/Persone/{last}, {first} ({pid})", f"{first} {last}", q, wikidata_uri(q)])
+    riepilogo.append(w.close())
+
+    n = len(persone)
+    autori = Zipf(persone[:max(20, n // 60)], rng)
+    direttori = Zipf(persone[n // 60:n // 20], rng)
+    tecnici = Zipf(persone[n // 20:n // 8], rng)
+    cantanti = Zipf(persone[n // 8:], rng)
+
+    enti = [{"id": i, "nome": nome} for i, nome in zip(ids.block(scaled("enti", scale)), enti_names(scaled("enti", scale)))]
+    zipf_enti = Zipf(enti[3:] + enti[:3], rng)
+
+    # Stessi luoghi, ID propri; sede principale (Teatro Municipale Valli) in testa
+    luoghi_f = [dict(l) for l in luoghi]
+    luoghi_f.sort(key=lambda l: l["citta"] != "Reggio Emilia")
+    citta_id = {c: i for c, i in zip(sorted({l["citta"] for l in luoghi}), ids.block(len(CITTA)))}
+    for l, i in zip(luoghi_f, ids.block(len(luoghi_f))):
+        l["citta_id"], l["id"] = citta_id[l["citta"]], i
+    zipf_luoghi = Zipf(luoghi_f, rng, s=1.6)
+
+    w = Writer(root, "fondazione_luoghi", ["edificio_nome", "luogo_nome", "entity", "uri"])
+    for l in luoghi_f:
+        w.row([l["edificio"], l["citta"], l["entity"], wikidata_uri(l["entity"])])
+    riepilogo.append(w.close())
+
+    # --- Opere musicali (stessi titoli celebri e QID del Regio) ---
+    n_opere = scaled("fondazione_opere", scale)
+    opere = [dict(o, id=i) for o, i in zip(opere_comuni[:n_opere], ids.block(n_opere))]
+    w = Writer(root, "fondazione_opere", ["id", "dcTitle", "entity_id", "composizione_uri", "persone_collegate", "fullpath",
+                                          "published", "creationDate", "modificationDate"])
+    for o in opere:
+        autori_opera = autori.sample(rng.randint(1, 3))
+        w.row([o["id"], o["titolo"], o["entity"], wikidata_uri(o["entity"]),
+               ",".join(f"/Persone/{p['pimcore']} ({p['id']})" for p in autori_opera),
+               f"/Opere Musicali/{o['anno']} {o['titolo']} ({o['id']})", 1, 1745330871, 1750866137])
+    riepilogo.append(w.close())
+    zipf_opere = Zipf(opere, rng)
+
+    # --- Stagioni (ID assegnati prima, righe scritte alla fine con i collegamenti) ---
+    n_stagioni = scaled("fondazione_stagioni", scale)
+    stagioni = [{"id": i, "anno": 1980 + k % 45, "tipo": TIPI_STAGIONE[k % len(TIPI_STAGIONE)], "produzioni": [], "recite": [],
+                 "opere": set()} for k, i in enumerate(ids.block(n_stagioni))]
+
+    w_prod = Writer(root, "fondazione_produzioni", ["id", "fullpath", "published", "dcTitle", "dcDescription", "from", "to",
+                                                    "datetext", "Luogo rappresentazione", "Enti collegati",
+                                                    "Persone collegate", "Recite collegate", "Opere musicali collegate"],
+                    sep=";")
+    w_rec = Writer(root, "fondazione_recite", ["id", "dcTitle", "fullpath", "from", "to", "datetext", "Luoghi", "Persone",
+                                               "Enti", "operemusicali_collegate"], sep=";")
+    w_link = Writer(root, "fondazione_produzioni_recite", ["id", "recite_collegate", "fullpath", "published"],
+                    sep=";", quoting=csv.QUOTE_ALL)
+
+    for k, prod_id in enumerate(ids.block(scaled("fondazione_produzioni", scale))):
+        stagione = stagioni[k % n_stagioni]
+        opera = zipf_opere.pick()
+        luogo = zipf_luoghi.pick()
+        n_recite = rng.randint(*RECITE_PER_PRODUZIONE["fondazione"])
+        inizio = rng.randint(0, 300)
+        dal, al = day(stagione["anno"], inizio), day(stagione["anno"], inizio + n_recite)
+        prod_path = f"/Produzioni/{stagione['anno']} {opera['titolo']} ({prod_id})"
+        opera_path = f"/Opere Musicali/{opera['anno']} {opera['titolo']} ({opera['id']})"
+
+        cast = [(personaggio, voce, cantanti.pick()) for personaggio, voce in opera["personaggi"]]
+        staff = [(direttori.pick() if rel == "direttore" else tecnici.pick(), rel)
+                 for rel in rng.sample(RELAZIONI_FONDAZIONE, rng.randint(1, 4))]
+        esecutori = [(zipf_enti.pick(), rng.choice(RUOLI_ENTE[:3])) for _ in range(rng.randint(*ESECUTORI_PER_RECITA))]
+        luoghi_json = [{"nome": luogo["citta"], "Id": noise.pid(luogo["citta_id"]), "relazione": "Luogo della rappresentazione"},
+                       {"nome": luogo["edificio"], "Id": noise.pid(luogo["id"]), "relazione": "Edificio della rappresentazione"}]
+
+        recite = []
+        for j, rid in enumerate(ids.block(n_recite)):
+            data = day(stagione["anno"], inizio + j)
+            titolo = opera["titolo"]
+            recite.append((rid, f"{date_it(data)} {titolo}"))
+            if noise.chance("cambio_cast") and cast:
+                h = rng.randrange(len(cast))
+                cast = cast[:h] + [(cast[h][0], cast[h][1], cantanti.pick())] + cast[h + 1:]
+            persone_json = [{"Identificativo": noise.person_id(p["id"]), "Nome": noise.name(p["pimcore"]), "Ruolo": voce,
+                             "Relazione": "interprete", "Personaggio": personaggio} for personaggio, voce, p in cast]
+            persone_json += [{"Identificativo": str(noise.person_id(p["id"])), "Nome": p["pimcore"], "Ruolo": "", "Relazione": rel,
+                              "Personaggio": ""} for p, rel in staff]
+            enti_json = [{"Identificativo": str(e["id"]), "Nome": e["nome"], "Ruolo": ruolo} for e, ruolo in esecutori]
+            w_rec.row([rid, titolo, f"/Recite/{date_it(data)} {titolo} ({rid})" if rng.random() > 0.1 else "",
+                       data, data, date_it(data), noise.cell(luoghi_json),
+                       "" if noise.chance("cella_vuota") else noise.cell(persone_json),
+                       noise.cell(enti_json) if enti_json else "", opera_path])
+
+        # Produzione: celle JSON su più righe (indentate), come nell'export Pimcore
+        luogo_prod = [{"Id": luogo["citta_id"], "nome": luogo["citta"], "relazione": "luogo della prima rappresentazione/esecuzione"},
+                      {"Id": luogo["id"], "nome": luogo["edificio"], "relazione": "edificio della prima rappresentazione/esecuzione"}]
+        enti_prod = [{"Identificativo": e["id"], "Nome": e["nome"], "Ruolo": "produzione"} for e in zipf_enti.sample(rng.randint(0, 2))]
+        persone_prod = [{"Identificativo": p["id"], "Nome": p["pimcore"], "Ruolo": ""} for p, _ in staff]
+        recite_prod = [{"Identificativo": rid, "Nome": nome, "Ruolo": ""} for rid, nome in recite]
+        opere_prod = [{"Identificativo": opera["id"], "Nome": opera["titolo"], "Ruolo": ""}]
+        w_prod.row([prod_id, prod_path, 1.0, opera["titolo"], "", dal, al, stagione["anno"],
+                    noise.cell(luogo_prod, indent=4), noise.cell(enti_prod, indent=4) if enti_prod else "[]",
+                    noise.cell(persone_prod, indent=4), noise.cell(recite_prod, indent=4),
+                    noise.cell(opere_prod, indent=4)])
+        w_link.row([prod_id, ",".join(f"/Recite/{nome} ({rid})" for rid, nome in recite), prod_path, 1])
+
+        stagione["produzioni"].append(prod_path)
+        stagione["recite"] += [f"/Recite/{nome} ({rid})" for rid, nome in recite]
+        stagione["opere"].add(opera_path)
+    riepilogo += [w_prod.close(), w_rec.close(), w_link.close()]
+
+    w = Writer(root, "fondazione_stagioni", ["id", "dcType", "dcTitle", "dcDescription", "to", "from", "datetext", "fullpath",
+                                             "luoghi_collegati", "enti_collegati", "persone_collegate",
+                                             "produzioni_collegate", "manifestazioni_recite_concerti_collegati",
+                                             "operemusicali_collegate"], sep=";")
+    for s in stagioni:
+        titolo = f"{s['tipo']} {s['anno']}"
+        w.row([s["id"], s["tipo"], titolo, "", f"{s['anno']}-12-31", f"{s['anno']}-01-01", s["anno"],
+               f"/Stagioni/{s['anno']} {titolo} ({s['id']})", "", "", "", ",".join(s["produzioni"]),
+               ",".join(s["recite"]), ",".join(sorted(s["opere"])) if rng.random() < 0.3 else ""])
+    riepilogo.append(w.close())
+    return riepilogo
+
+
+# === PUBBLICAZIONE ===
+
+def publish(root):
+    """
+    Copia gli output della pipeline nella struttura pubblicata (regio/, fondazione/),
+    con i gemelli parquet se ci sono: con THEATRENET_MIRROR_ROOT=<root> semantic_graph
+    e il loader locale leggono l'archivio sintetico invece del repo.
+    """
+    # Import qui: la generazione resta solo libreria standard, la pubblicazione
+    # segue comunque una pipeline che ha già pandas
+    from common_io import PUBLISHED
+
+    root = Path(root)
+    for dest, src in PUBLISHED.items():
+        for suffix in (".csv", ".parquet"):
+            s, d = (root / src).with_suffix(suffix), (root / dest).with_suffix(suffix)
+            if s.exists():
+                d.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(s, d)
+        stato = "✔️" if (root / src).exists() else "⚠️  mancante (la fase non è ancora stata eseguita?)"
+        print(f"{stato} {src} -> {dest}")
+    print(f"\nOra: THEATRENET_MIRROR_ROOT={root.resolve()} python semantic_graph/1_regio.py")
+
+
+# === ESECUZIONE ===
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un archivio sintetico in formato Pimcore per i test di scala.")
+    parser.add_argument("--scale", type=float, default=SCALE, help="Moltiplicatore rispetto agli export reali (es. 10, 100, 0.1)")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--out", default=OUTPUT_ROOT, help="Cartella radice (la pipeline va lanciata da qui)")
+    parser.add_argument("--publish", action="store_true",
+                        help="Non genera: copia gli output della pipeline nella struttura pubblicata")
+    args = parser.parse_args()
+
+    if args.publish:
+        publish(args.out)
+        return
+
+    t0 = time.perf_counter()
+    rng = random.Random(args.seed)
+    noise = Noise(rng)
+    print(f"Generazione archivio sintetico: scala {args.scale}, seme {args.seed} -> {args.out}")
+
+    luoghi = build_places(rng, args.scale)
+    opere = build_works(rng, max(scaled("regio_opere", args.scale), scaled("fondazione_opere", args.scale)))
+    riepilogo, persone_regio = generate_regio(args.out, rng, noise, args.scale, luoghi, opere)
+    print(f"✔️ Regio generato ({time.perf_counter() - t0:.1f}s)")
+    riepilogo += generate_fondazione(args.out, rng, noise, args.scale, luoghi, opere, persone_regio)
+    durata = time.perf_counter() - t0
+    print(f"✔️ Fondazione generata ({durata:.1f}s)\n")
+
+    for r in riepilogo:
+        print(f"  {r['righe']:>10} righe  {r['mb']:>9.2f} MB  {r['file']}")
+
+    # Dimensioni note: chi misura le fasi le legge da qui
+    manifest = {"scale": args.scale, "seed": args.seed, "durata_s": round(durata, 1), "file": riepilogo}
+    path = Path(args.out) / MANIFEST_FILE
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    print(f"\nRiepilogo salvato in: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+# ================================================================
+# CACHE INCREMENTALE DELLE FASI DI NORMALIZZAZIONE
+# ================================================================
+# Ogni script rielaborava tutto l'export a ogni esecuzione, anche se era
+# cambiato solo l'altro archivio (Regio / Fondazione). Qui ogni fase calcola
+# un'impronta SHA-256 di: file di input, codice (lo script + i common_*.py),
+# configurazione, variabili THEATRENET_* e versioni di Python/pandas. Se l'impronta coincide con quella
+# dell'ultima esecuzione riuscita e gli output sono ancora quelli scritti allora,
+# la fase viene saltata. Con --force si rielabora comunque.
+#
+# Uso tipico (dopo la configurazione dello script):
+#   stage = StageCache(__file__, inputs=[INPUT], outputs=[OUTPUT], config={...})
+#   if stage.fresh():
+#       sys.exit(0)
+#   ... elaborazione ...
+#   stage.save()
+
+# Cartella dei manifest (relativa alla root del repo, da dove si lanciano gli script)
+CACHE_DIR = Path(".cache")
+# I moduli condivisi fanno parte del "codice" di ogni fase
+CODE_DIR = Path(__file__).resolve().parent
+CODE_GLOB = "common_*.py"
+
+BLOCK_SIZE = 1 << 20
+# Tolleranza sulla granularità dell'mtime del filesystem
+MTIME_SLACK_NS = 2_000_000_000
+
+
+def force_requested(argv=None):
+    """True se tra gli argomenti c'è --force (gli altri argomenti restano allo script)."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--force", action="store_true")
+    args, _ = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+    return args.force
+
+
+def stage_argv(argv=None):
+    """Argomenti dello script senza --force: a parità di codice possono cambiare input e output."""
+    argv = sys.argv[1:] if argv is None else argv
+    return [a for a in argv if a != "--force"]
+
+
+def theatrenet_env():
+    """Impostazioni da ambiente che cambiano gli output (es. THEATRENET_TABLE_FORMAT)."""
+    return {k: v for k, v in os.environ.items() if k.startswith("THEATRENET_")}
+
+
+def file_sha256(path):
+    """SHA-256 del contenuto del file, letto a blocchi."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_stat(path):
+    """(dimensione, mtime in ns) oppure None se il file non esiste."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def library_versions():
+    """Versioni che possono cambiare l'output a parità di codice (es. dtype di pandas)."""
+    versions = {"python": sys.version.split()[0]}
+    try:
+        from importlib.metadata import version
+        versions["pandas"] = version("pandas")
+    except Exception:
+        versions["pandas"] = ""
+    return versions
+
+
+class StageCache:
+    """Manifest di una fase: impronta degli input e stato degli output all'ultima esecuzione."""
+
+    def __init__(self, script, inputs, outputs, config=None, force=None, name=None):
+        self.script = Path(script).resolve()
+        self.name = name or self.script.stem
+        self.inputs = [str(p) for p in inputs]
+        self.outputs = [str(p) for p in outputs]
+        self.config = config or {}
+        self.force = force_requested() if force is None else force
+        self.manifest_path = CACHE_DIR / f"{self.name}.json"
+        self.previous = self._load()
+        self.started = None
+        self.key = None
+        self.hashes = {}
+
+    def _load(self):
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _hash(self, path):
+        """
+        Hash di un file, riusando quello del manifest se dimensione e mtime non sono cambiati
+        (come fa git con l'indice): un rerun a vuoto non rilegge i CSV da centinaia di MB.
+        """
+        stat = file_stat(path)
+        if stat is None:
+            return None
+        prev = self.previous.get("files", {}).get(path)
+        if prev and prev[:2] == stat:
+            digest = prev[2]
+        else:
+            digest = file_sha256(path)
+        self.hashes[path] = stat + [digest]
+        return digest
+
+    def fingerprint(self):
+        """Impronta di input + codice + configurazione + versioni delle librerie."""
+        code = [str(self.script)] + sorted(str(p) for p in CODE_DIR.glob(CODE_GLOB))
+        parts = {
+            "inputs": {p: self._hash(p) for p in self.inputs},
+            "code": {Path(p).name: self._hash(p) for p in code},
+            "config": self.config,
+            "versions": library_versions(),
+            "env": theatrenet_env(),
+        }
+        blob = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(blob).hexdigest()
+
+    def fresh(self):
+        """
+        True se la fase può essere saltata: stessa impronta dell'ultima esecuzione
+        riuscita e output presenti e non modificati da allora.
+        """
+        self.started = time.time_ns()
+        self.key = self.fingerprint()
+        if self.force:
+            print(f"♻️  {self.name}: --force, rielaborazione completa.")
+            return False
+        if self.previous.get("key") != self.key:
+            return False
+
+        outputs = self.previous.get("outputs", {})
+        for path in self.outputs:
+            if path not in outputs or file_stat(path) != outputs[path]:
+                return False
+
+        print(f"⏭️  {self.name}: input, codice e configurazione invariati, riuso l'output in cache:")
+        for path in self.outputs:
+            print(f"   - {path}")
+        # Aggiorna dimensioni/mtime (es. file toccati ma identici) e i campi di manifest_fresh,
+        # così il prossimo rerun a vuoto si ferma già in run_pipeline.py
+        self._write({**self.previous, **self._quick_fields()})
+        return True
+
+    def _quick_fields(self):
+        return {
+            "files": self.hashes,
+            "inputs": self.inputs,
+            "argv": stage_argv(),
+            "env": theatrenet_env(),
+            "versions": library_versions(),
+        }
+
+    def _write(self, manifest):
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True, default=str)
+        os.replace(tmp, self.manifest_path)
+
+    def save(self):
+        """
+        Registra l'esecuzione riuscita. Se un output manca o non è stato riscritto
+        in questa esecuzione (es. errore gestito dallo script) il manifest non viene aggiornato.
+        """
+        if self.key is None:
+            self.key = self.fingerprint()
+        outputs = {}
+        for path in self.outputs:
+            stat = file_stat(path)
+            if stat is None or (self.started is not None and stat[1] < self.started - MTIME_SLACK_NS):
+                print(f"⚠️  {self.name}: output non riscritto ({path}), cache non aggiornata.")
+                return False
+            outputs[path] = stat
+
+        self._write({
+            "stage": self.name,
+            "key": self.key,
+            "outputs": outputs,
+            "config": self.config,
+            "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            # files, input, argomenti, ambiente e versioni: servono a manifest_fresh
+            **self._quick_fields(),
+        })
+        return True
+
+
+def manifest_fresh(name, argv=()):
+    """
+    Controllo rapido dall'esterno (run_pipeline.py), senza avviare lo script: pandas
+    e gli altri import pesanti costano secondi anche quando la fase poi si salta.
+    True solo se input, codice e output hanno ancora dimensione e mtime del manifest
+    e argomenti, ambiente e versioni coincidono; altrimenti decide lo script con
+    StageCache.fresh() (ad es. un file toccato ma identico si riconosce solo dall'hash).
+    """
+    try:
+        with open(CACHE_DIR / f"{name}.json", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return False
+    if "argv" not in manifest or manifest["argv"] != list(argv):
+        return False
+    if manifest.get("env") != theatrenet_env() or manifest.get("versions") != library_versions():
+        return False
+
+    files = manifest.get("files", {})
+    # Un common_*.py nuovo cambia il codice di tutte le fasi
+    if any(str(p) not in files for p in CODE_DIR.glob(CODE_GLOB)):
+        return False
+    # Input assenti all'ultima esecuzione non hanno hash: devono essere ancora assenti
+    for path in manifest.get("inputs", []):
+        if file_stat(path) != (files[path][:2] if path in files else None):
+            return False
+    if any(file_stat(path) != rec[:2] for path, rec in files.items()):
+        return False
+    outputs = manifest.get("outputs", {})
+    return bool(outputs) and all(file_stat(path) == stat for path, stat in outputs.items())
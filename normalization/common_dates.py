@@ -0,0 +1,109 @@
+import math
+import re
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# ================================================================
+# NORMALIZZAZIONE DATE CONDIVISA
+# ================================================================
+# Le date venivano lette in tre modi diversi: clean_year_from_datetext in
+# regio_opere.py, pd.to_datetime(errors='coerce') in regio_produzioni.py e
+# safe_date_literal (più regex a ogni chiamata) nei due script RDF. Sempre riga
+# per riga, anche se nelle viste esplose la stessa stringa compare centinaia di
+# volte. Qui ogni valore distinto viene interpretato una volta sola e il
+# risultato viene rimappato sulla colonna con i codici di factorize.
+#
+#   anno da datetext  -> years_from_datetext   ("01-01-1830 - 31-12-1830" -> "1830")
+#   data ISO          -> iso_dates / iso_date  ("1971/4" -> None, "1971" -> "1971-01-01"):
+#                        la stringa è già pronta per un Literal xsd:date
+#   datetime pandas   -> to_datetimes e year_series (anno come Int64)
+
+RE_YEAR_END = re.compile(r"(\d{4})$")
+RE_YEAR = re.compile(r"^\d{4}$")
+RE_YEAR_MONTH = re.compile(r"^\d{4}-\d{1,2}$")
+RE_ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+ISO_CACHE_MAX = 100_000
+
+
+def _missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value)) or value is pd.NA
+
+
+def map_unique(series, func, missing=None):
+    """
+    Applica func una volta per valore distinto della colonna e rimappa il risultato.
+    I mancanti (codice -1 di factorize) ricevono missing.
+    """
+    codes, uniques = pd.factorize(series)
+    valori = np.empty(len(uniques) + 1, dtype=object)
+    valori[:-1] = [func(v) for v in uniques]
+    valori[-1] = missing
+    return pd.Series(valori[codes], index=series.index, dtype=object)
+
+
+# === ANNO DA DATETEXT ===
+
+def year_from_datetext(value):
+    """
+    Anno finale di un datetext: "01-01-1830 - 31-12-1830" -> "1830".
+    Serve almeno un trattino; altrimenti (o senza anno finale) None.
+    """
+    if _missing(value):
+        return None
+    s = str(value).strip()
+    if len(s.split("-")) < 2:
+        return None
+    match = RE_YEAR_END.search(s.split(" - ")[-1].strip())
+    return match.group(1) if match else None
+
+
+def years_from_datetext(series):
+    """Versione per colonna di year_from_datetext (una volta per valore distinto)."""
+    return map_unique(series, year_from_datetext)
+
+
+# === DATA ISO (PRONTA PER xsd:date) ===
+
+@lru_cache(maxsize=ISO_CACHE_MAX)
+def _iso_from_text(s):
+    val = s.strip().split(" ")[0].split("T")[0]
+    val = val.replace(".", "-").replace("/", "-")
+    if RE_YEAR.match(val):
+        val = f"{val}-01-01"
+    elif RE_YEAR_MONTH.match(val):
+        val = f"{val}-01"
+    return val if RE_ISO_DATE.match(val) else None
+
+
+def iso_date(value):
+    """
+    "AAAA-MM-GG" da date, timestamp, "AAAA" o "AAAA-MM" (separatori . e / ammessi);
+    None se il valore non è riconducibile a una data. Memoizzata sul testo.
+    """
+    if _missing(value):
+        return None
+    return _iso_from_text(str(value))
+
+
+def iso_dates(series):
+    """Colonna di date ISO (None dove non interpretabili)."""
+    return map_unique(series, iso_date)
+
+
+# === DATETIME PANDAS ===
+
+def to_datetimes(series):
+    """
+    pd.to_datetime(errors="coerce") sui soli valori distinti. L'ordine dei distinti
+    è quello di prima comparsa, quindi il formato dedotto è lo stesso della colonna intera.
+    """
+    codes, uniques = pd.factorize(series)
+    parsed = pd.to_datetime(pd.Series(uniques), errors="coerce")
+    return pd.Series(parsed.array.take(codes, allow_fill=True), index=series.index, name=series.name)
+
+
+def year_series(dates):
+    """Anno di una colonna datetime come intero nullable (vuoto nei CSV se manca)."""
+    return dates.dt.year.astype("Int64")
@@ -0,0 +1,197 @@
+import argparse
+import numpy as np
+import pandas as pd
+
+# ================================================================
+# FORMATO LUNGO (EDGE LIST) PER LE RECITE
+# ================================================================
+# Il merge curatori × esecutori × interpreti moltiplica le righe per recita
+# (3 direttori, 2 complessi e 20 cantanti = 120 righe). Il formato lungo
+# tiene una riga per (recita, relazione, entità) e la vista "wide" viene
+# ricostruita solo per chi ne ha ancora bisogno.
+#
+# La catena delle recite lavora sul formato lungo: la riconciliazione degli ID
+# legge l'edge list, l'assegnazione dei QID la tabella delle recite, e solo
+# l'ultima fase (regio_qid_luoghi.py / fondazione_qid_luoghi_fondazione.py)
+# scrive la vista wide per i builder RDF che la leggono ancora.
+
+EDGE_COLUMNS = [
+    "id_recita", "relazione", "entita_id", "entita_nome", "ruolo",
+    "personaggio", "personaggio_voce"
+]
+
+# Colonne della recita presenti nel file finale "wide" (uguali per Regio e Fondazione)
+WIDE_BASE_COLUMNS = [
+    "id", "titolo_breve", "production_id", "from", "to", "datetext",
+    "luogo_nome", "luogo_id", "edificio_nome", "edificio_id",
+    "composizione_nome", "composizione_id", "fullpath"
+]
+
+# relazione -> (colonne della tabella figlia, colonne corrispondenti dell'edge list)
+RELAZIONI = {
+    "curatore": (
+        ["id_recita", "curatore_nome", "curatore_id", "curatore_ruolo"],
+        ["id_recita", "entita_nome", "entita_id", "ruolo"],
+    ),
+    "esecutore": (
+        ["id_recita", "esecutore_nome", "esecutore_id", "esecutore_ruolo"],
+        ["id_recita", "entita_nome", "entita_id", "ruolo"],
+    ),
+    "interprete": (
+        ["id_recita", "personaggio", "personaggio_voce", "interprete", "interprete_id", "ruolo"],
+        ["id_recita", "personaggio", "personaggio_voce", "entita_nome", "entita_id", "ruolo"],
+    ),
+}
+
+
+def build_edges(df_curatori, df_esecutori, df_interpreti, ordine_recite=None):
+    """
+    Unisce le tre tabelle figlie in un'unica edge list:
+    una riga per (recita, relazione, entità), senza prodotto cartesiano.
+
+    Se viene passato ordine_recite (gli id nell'ordine del file recite), gli archi
+    vengono ordinati per recita: è la condizione che permette a write_wide_view
+    di ricostruire la vista wide leggendo i file a blocchi.
+    """
+    parti = []
+    for relazione, df in [("curatore", df_curatori), ("esecutore", df_esecutori), ("interprete", df_interpreti)]:
+        cols_figlia, cols_edge = RELAZIONI[relazione]
+        if df is None or df.empty:
+            continue
+        parte = df.reindex(columns=cols_figlia)
+        parte.columns = cols_edge
+        parte.insert(1, "relazione", relazione)
+        parti.append(parte)
+
+    if not parti:
+        return pd.DataFrame(columns=EDGE_COLUMNS)
+    edges = pd.concat(parti, ignore_index=True).reindex(columns=EDGE_COLUMNS)
+
+    if ordine_recite is not None:
+        posizione = pd.Series(range(len(ordine_recite)), index=pd.Index(ordine_recite)).groupby(level=0).first()
+        chiave = edges["id_recita"].map(posizione)
+        # mergesort è stabile: dentro la recita resta l'ordine curatore, esecutore, interprete
+        edges = edges.iloc[chiave.argsort(kind="mergesort")].reset_index(drop=True)
+    return edges
+
+
+def split_edges(df_edges):
+    """Ricostruisce (curatori, esecutori, interpreti) con i nomi di colonna originali."""
+    figlie = []
+    for relazione in ["curatore", "esecutore", "interprete"]:
+        cols_figlia, cols_edge = RELAZIONI[relazione]
+        parte = df_edges.loc[df_edges["relazione"] == relazione, cols_edge]
+        parte.columns = cols_figlia
+        figlie.append(parte.reset_index(drop=True))
+    return tuple(figlie)
+
+
+def long_from_wide(df_wide):
+    """
+    Inverso di wide_view: (recite, edge list) dal file wide pubblicato, senza le
+    ripetizioni del prodotto cartesiano. La recita si prende sempre da "id": nel
+    file Regio id_recita viene dai curatori ed è vuoto per le recite senza direttore.
+    """
+    figlie_cols = {c for cols_figlia, _ in RELAZIONI.values() for c in cols_figlia}
+    figlie_cols |= {"id_recita_esecutore", "id_recita_interprete"}
+    df_main = df_wide.drop(columns=[c for c in figlie_cols if c in df_wide.columns])
+    df_main = df_main.drop_duplicates(subset="id").reset_index(drop=True)
+
+    figlie = []
+    for relazione in ["curatore", "esecutore", "interprete"]:
+        valori = [c for c in RELAZIONI[relazione][0] if c != "id_recita"]
+        parte = df_wide.reindex(columns=["id"] + valori).rename(columns={"id": "id_recita"})
+        piena = parte[valori].fillna("").astype(str).apply(lambda s: s.str.strip() != "").any(axis=1)
+        # keep="last": tra righe ripetute vince l'ultima, come il SET riga per riga di LOAD CSV
+        figlie.append(parte[piena].drop_duplicates(keep="last"))
+    return df_main, build_edges(*figlie, ordine_recite=df_main["id"])
+
+
+def wide_view(df_main, df_edges, keep_recita_ids=True, extra_columns=()):
+    """
+    Vista di compatibilità: ricostruisce il file "wide" (prodotto cartesiano
+    curatori × esecutori × interprete per recita) a partire dal formato lungo.
+    Colonne e ordine delle righe coincidono con il merge storico.
+    extra_columns: colonne della recita aggiunte in fondo (es. entity/uri dei QID).
+    """
+    df_curatori, df_esecutori, df_interpreti = split_edges(df_edges)
+    extra = [c for c in extra_columns if c in df_main.columns]
+    base_cols = [c for c in WIDE_BASE_COLUMNS if c in df_main.columns] + extra
+
+    final = (
+        df_main[base_cols]
+        .merge(df_curatori, left_on="id", right_on="id_recita", how="left")
+        .merge(df_esecutori, left_on="id", right_on="id_recita", how="left", suffixes=("", "_esecutore"))
+        .merge(df_interpreti, left_on="id", right_on="id_recita", how="left", suffixes=("", "_interprete"))
+    )
+    if not keep_recita_ids:
+        final = final.drop(columns=["id_recita", "id_recita_esecutore", "id_recita_interprete"], errors="ignore")
+    if extra:
+        final = final[[c for c in final.columns if c not in extra] + extra]
+    return final
+
+
+def write_wide_view(main_path, edges_path, output_path, keep_recita_ids=True, chunksize=5000, extra_columns=()):
+    """
+    Scrive la vista wide leggendo i due file a blocchi.
+    Sfrutta il fatto che l'edge list è scritta nello stesso ordine delle recite,
+    quindi la memoria resta limitata a un blocco di recite e ai suoi archi.
+    Gli archi di recite assenti dal file recite (orfani) vengono scartati, come
+    nel merge left storico; quelli arrivati dopo il blocco della loro recita
+    (fuori ordine) non possono più essere scritti e vengono segnalati.
+    """
+    # Blocco di ogni recita: dice fin dove leggere l'edge list per il blocco corrente
+    ids = pd.read_csv(main_path, dtype=str, keep_default_na=False, usecols=["id"])["id"]
+    blocco_di = pd.Series(np.arange(len(ids)) // chunksize, index=ids.to_numpy())
+    blocco_di = blocco_di[~blocco_di.index.duplicated()]
+
+    edges_iter = pd.read_csv(edges_path, dtype=str, keep_default_na=False, chunksize=chunksize)
+    pending = pd.DataFrame(columns=EDGE_COLUMNS)
+    blocchi = pd.Series(dtype=float)
+    edges_finiti = False
+    righe = orfani = fuori_ordine = 0
+
+    for n_chunk, main in enumerate(pd.read_csv(main_path, dtype=str, keep_default_na=False, chunksize=chunksize)):
+        # Legge archi finché l'ultimo letto è di questo blocco (o di nessuno): quelli
+        # del blocco corrente sono allora tutti in memoria
+        while not edges_finiti and (pending.empty or not blocchi.iloc[-1] > n_chunk):
+            try:
+                nuovi = next(edges_iter)
+            except StopIteration:
+                edges_finiti = True
+                break
+            pending = pd.concat([pending, nuovi], ignore_index=True)
+            blocchi = pending["id_recita"].map(blocco_di)
+
+        orfani += int(blocchi.isna().sum())
+        fuori_ordine += int((blocchi < n_chunk).sum())
+        nel_blocco = (blocchi == n_chunk).to_numpy()
+        final = wide_view(main, pending[nel_blocco], keep_recita_ids=keep_recita_ids, extra_columns=extra_columns)
+        successivi = (blocchi > n_chunk).to_numpy()
+        pending, blocchi = pending[successivi].reset_index(drop=True), blocchi[successivi].reset_index(drop=True)
+
+        final = final.fillna("")
+        final.to_csv(output_path, mode="w" if n_chunk == 0 else "a", header=n_chunk == 0, index=False)
+        righe += len(final)
+
+    if orfani:
+        print(f"⚠️  {orfani} archi di recite assenti da {main_path}: scartati")
+    if fuori_ordine:
+        print(f"⚠️  {fuori_ordine} archi non nell'ordine delle recite: mancano nella vista wide")
+    return righe
+
+
+# === ESECUZIONE ===
+# Materializza il file wide per i consumatori che non leggono ancora l'edge list:
+#   python normalization/common_edges.py recite_clean.csv recite_edges.csv recite_final.csv
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ricostruisce il file recite wide dal formato lungo.")
+    parser.add_argument("main", help="CSV delle recite (una riga per recita)")
+    parser.add_argument("edges", help="CSV dell'edge list (una riga per recita/relazione/entità)")
+    parser.add_argument("output", help="CSV wide da scrivere")
+    parser.add_argument("--senza-id-recita", action="store_true",
+                        help="Rimuove le colonne id_recita* (formato Fondazione)")
+    args = parser.parse_args()
+
+    n = write_wide_view(args.main, args.edges, args.output, keep_recita_ids=not args.senza_id_recita)
+    print(f"✅ Vista wide scritta: {args.output} ({n} righe)")
@@ -0,0 +1,123 @@
+import re
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+# ================================================================
+# MATCHING APPROSSIMATO DEI NOMI (INDICE A TRIGRAMMI)
+# ================================================================
+# Confrontare ogni nome non riconciliato con tutte le ~40k persone del master
+# è O(n·m). L'indice invertito sui trigrammi delle chiavi (vedi name_key_series)
+# propone solo i pochi candidati che condividono trigrammi con il nome cercato;
+# il punteggio vero viene calcolato solo su quelli.
+#
+# Il punteggio è parola per parola (token_score), non sull'intera stringa: con
+# un ratio globale "giovanna rossi" e "giovanni rossi" fanno 0.93, cioè due
+# persone diverse fuse in una. Nei nomi italiani l'ultima lettera porta genere
+# e numero (Carla/Carlo, Rosso/Rossi), quindi una parola che differisce solo lì
+# fa scartare il candidato.
+
+# Punteggio minimo (0-1) che ogni parola del nome deve raggiungere
+FUZZY_THRESHOLD = 0.85
+# Distacco minimo dal miglior candidato con ID diverso: sotto, il match è ambiguo e viene scartato
+FUZZY_MARGIN = 0.03
+# Candidati valutati per nome (i più ricchi di trigrammi in comune)
+TOP_CANDIDATI = 10
+# Trigrammi presenti in troppe chiavi (" ma", "ni ") non aiutano a distinguere: esclusi dal blocking
+MAX_POSTING = 800
+
+
+def digits(key):
+    """Cifre della chiave: "Cantante 14" e "Cantante 1" non devono mai combaciare."""
+    return re.sub(r"\D", "", key)
+
+
+def trigrams(key):
+    """Trigrammi della chiave, con spazi di bordo per pesare inizio e fine parola."""
+    s = f"  {key} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+def token_score(key, other):
+    """
+    Somiglianza tra due chiavi come minimo dei SequenceMatcher.ratio parola per parola.
+    0 se il numero di parole è diverso, se nessuna parola è identica o se una coppia
+    di parole differisce solo per l'ultima lettera (giovanna/giovanni, rosso/rossi).
+    """
+    a, b = key.split(), other.split()
+    if len(a) != len(b) or not a:
+        return 0.0
+    if len(a) > 1 and not any(x == y for x, y in zip(a, b)):
+        return 0.0
+    punteggi = []
+    for x, y in zip(a, b):
+        if x == y:
+            punteggi.append(1.0)
+            continue
+        if len(x) == len(y) and x[:-1] == y[:-1]:
+            return 0.0
+        punteggi.append(SequenceMatcher(None, x, y).ratio())
+    return min(punteggi)
+
+
+class TrigramIndex:
+    """Indice invertito trigramma -> chiavi del master, costruito una volta sola."""
+
+    def __init__(self, id_map, max_posting=MAX_POSTING):
+        self.id_map = id_map
+        self.keys = list(id_map)
+        self.grams = [trigrams(k) for k in self.keys]
+
+        postings = defaultdict(list)
+        for pos, grams in enumerate(self.grams):
+            for g in grams:
+                postings[g].append(pos)
+        self.postings = {g: p for g, p in postings.items() if len(p) <= max_posting}
+
+    def candidates(self, key, top=TOP_CANDIDATI):
+        """Posizioni delle chiavi del master con più trigrammi in comune (blocking)."""
+        hits = Counter()
+        for g in trigrams(key):
+            hits.update(self.postings.get(g, ()))
+        return [pos for pos, _ in hits.most_common(top)]
+
+    def match(self, key, threshold=FUZZY_THRESHOLD, margin=FUZZY_MARGIN):
+        """
+        Miglior chiave del master per key: (id, punteggio, chiave trovata) oppure None
+        se sotto soglia o se un candidato con ID diverso è troppo vicino.
+        """
+        scored = []
+        cifre = digits(key)
+        for pos in self.candidates(key):
+            other = self.keys[pos]
+            if digits(other) != cifre:
+                continue
+            score = token_score(key, other)
+            scored.append((score, other))
+        if not scored:
+            return None
+        # A parità di punteggio decide la chiave, così il risultato non dipende dall'ordine dei candidati
+        scored.sort(key=lambda t: (-t[0], t[1]))
+
+        best_score, best_key = scored[0]
+        if best_score < threshold:
+            return None
+        best_id = self.id_map[best_key]
+        for score, other in scored[1:]:
+            if self.id_map[other] != best_id and best_score - score < margin:
+                return None
+        return best_id, round(best_score, 3), best_key
+
+
+def fuzzy_lookup(keys, index, threshold=FUZZY_THRESHOLD):
+    """
+    Match approssimati per un insieme di chiavi distinte non trovate esattamente.
+    Restituisce {chiave: (id, punteggio, chiave del master)} solo per quelle accettate.
+    """
+    risultati = {}
+    for key in keys:
+        if not key:
+            continue
+        trovato = index.match(key, threshold)
+        if trovato:
+            risultati[key] = trovato
+    return risultati
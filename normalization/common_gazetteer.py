@@ -0,0 +1,137 @@
+import os
+import numpy as np
+import pandas as pd
+from common_io import read_table, write_table
+
+# ================================================================
+# GAZETTEER CONDIVISO DEI LUOGHI (EDIFICIO + CITTÀ -> QID / URI)
+# ================================================================
+# Prima ogni script (Regio e Fondazione) faceva strip delle stringhe e un merge
+# sulla coppia (edificio_nome, luogo_nome) contro il proprio CSV di mapping, poi
+# riscorreva tutto il frame per le diagnostiche. Qui i due mapping diventano un
+# unico gazetteer persistente con una chiave normalizzata per coppia, e le
+# recite vengono unite per codici (factorize): il confronto avviene una volta
+# per coppia distinta, non per riga. I luoghi senza QID finiscono in un report.
+
+GAZETTEER_FILE = "dataset/luoghi_gazetteer.csv"
+
+# Mapping di origine: fonte -> CSV con edificio_nome, luogo_nome, entity, uri
+MAPPINGS = {
+    "regio": "dataset/regio/recite/recite-regio-luoghi-csv.csv",
+    "fondazione": "dataset/fondazione/Recite/recite-fondazione_luoghi_qid.csv",
+}
+
+GAZETTEER_COLUMNS = ["chiave", "edificio_nome", "luogo_nome", "entity", "uri", "fonte"]
+# Colonne del gazetteer riportate sulle recite
+VALUE_COLUMNS = ["entity", "uri"]
+UNMATCHED_COLUMNS = ["edificio_nome", "luogo_nome", "chiave", "recite"]
+
+SEP = "|"
+
+
+def text_key_series(series):
+    """
+    Forma canonica di un nome di luogo: niente accenti, minuscole, apostrofi
+    uniformi, spazi compressi. Calcolata solo sui valori distinti.
+    """
+    codes, uniques = pd.factorize(series)
+    s = pd.Series(pd.Index(uniques).astype(str), dtype=object)
+    s = s.str.normalize("NFKD").str.replace("[\u0300-\u036f]", "", regex=True)
+    s = s.str.casefold().str.replace("’", "'", regex=False)
+    s = s.str.replace(r"\s+", " ", regex=True).str.strip()
+    chiavi = np.append(s.to_numpy(dtype=object), "")
+    return pd.Series(chiavi[codes], index=series.index, dtype=object)
+
+
+def place_key(edifici, luoghi):
+    """Chiave "edificio|città" normalizzata; "" se mancano entrambi."""
+    e = text_key_series(edifici)  # mancanti -> "" (codice -1 di factorize)
+    l = text_key_series(luoghi)
+    chiave = e + SEP + l
+    return chiave.where((e != "") | (l != ""), "")
+
+
+def build_gazetteer(mappings=None):
+    """
+    Unisce i mapping delle due fonti in un'unica tabella, una riga per (chiave, fonte).
+    Dentro ogni fonte vince la prima riga, come il vecchio drop_duplicates.
+    """
+    parti = []
+    for fonte, path in (mappings or MAPPINGS).items():
+        if not os.path.exists(path):
+            print(f"ℹ️  Mapping luoghi {fonte} non trovato: {path}")
+            continue
+        df = read_table(path)
+        df = df.reindex(columns=["edificio_nome", "luogo_nome"] + VALUE_COLUMNS, fill_value="")
+        df["edificio_nome"] = df["edificio_nome"].str.strip()
+        df["luogo_nome"] = df["luogo_nome"].str.strip()
+        df["chiave"] = place_key(df["edificio_nome"], df["luogo_nome"])
+        df["fonte"] = fonte
+        parti.append(df[df["chiave"] != ""].drop_duplicates("chiave"))
+
+    if not parti:
+        return pd.DataFrame(columns=GAZETTEER_COLUMNS)
+    return pd.concat(parti, ignore_index=True)[GAZETTEER_COLUMNS]
+
+
+def load_gazetteer(path=GAZETTEER_FILE, mappings=None):
+    """
+    Gazetteer persistente: ricostruito solo se manca o se un mapping è più recente,
+    altrimenti riletto così com'è (condiviso tra Regio e Fondazione).
+    """
+    mappings = mappings or MAPPINGS
+    sorgenti = [p for p in mappings.values() if os.path.exists(p)]
+    if os.path.exists(path) and all(os.path.getmtime(p) <= os.path.getmtime(path) for p in sorgenti):
+        return read_table(path)
+
+    gaz = build_gazetteer(mappings)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    write_table(gaz, path)
+    print(f"📍 Gazetteer luoghi aggiornato: {path} ({len(gaz)} chiavi)")
+    return gaz
+
+
+def assign_places(df, gaz, fonte):
+    """
+    Aggiunge entity/uri alle recite tramite codici: factorize delle chiavi
+    distinte, lookup una volta sola nel gazetteer, poi take per riga.
+    A parità di chiave vince la riga con QID, prima della fonte stessa, poi dell'altra.
+    Restituisce (df arricchito, report dei luoghi senza QID).
+    """
+    chiavi = place_key(df["edificio_nome"], df["luogo_nome"])
+    codes, uniques = pd.factorize(chiavi)
+
+    # Ordine di preferenza: righe con QID/URI, poi la fonte stessa, poi l'altra
+    con_qid = (gaz["entity"] != "") | (gaz["uri"] != "")
+    preferito = gaz.assign(_senza=~con_qid, _altra=gaz["fonte"] != fonte)
+    preferito = preferito.sort_values(["_senza", "_altra"], kind="stable").drop_duplicates("chiave")
+    pos = pd.Index(preferito["chiave"]).get_indexer(uniques)  # -1 = chiave non nel gazetteer
+    pos[np.asarray(uniques, dtype=object) == ""] = -1
+    riga = pos[codes]
+
+    out = df.copy()
+    for col in VALUE_COLUMNS:
+        valori = np.append(preferito[col].to_numpy(dtype=object), "")
+        nome = col if col not in out.columns else f"{col}_mapping"
+        out[nome] = valori[riga]
+
+    # Report: una riga per luogo distinto senza QID, con il numero di recite
+    uniques = np.asarray(uniques, dtype=object)
+    conteggi = np.bincount(codes, minlength=len(uniques))
+    _, primo = np.unique(codes, return_index=True)  # prima riga di ogni chiave distinta
+    trovato_qid = np.append(~preferito["_senza"].to_numpy(dtype=bool), False)[pos]
+    mancanti = np.flatnonzero(~trovato_qid & (uniques != ""))
+    report = pd.DataFrame({
+        "edificio_nome": df["edificio_nome"].to_numpy(dtype=object)[primo[mancanti]],
+        "luogo_nome": df["luogo_nome"].to_numpy(dtype=object)[primo[mancanti]],
+        "chiave": uniques[mancanti],
+        "recite": conteggi[mancanti],
+    }, columns=UNMATCHED_COLUMNS).sort_values("recite", ascending=False, kind="stable")
+    return out, report
+
+
+def print_place_stats(df, report):
+    """Diagnostica dai soli conteggi: niente riscansione del frame."""
+    abbinate = int((df["entity"] != "").sum()) if "entity" in df.columns else 0
+    print(f"Luoghi distinti senza QID: {len(report)} ({int(report['recite'].sum())} recite)")
+    print(f"✅ Recite con QID: {abbinate} su {len(df)}")
@@ -0,0 +1,119 @@
+import re
+import time
+import numpy as np
+import pandas as pd
+
+# ================================================================
+# PULIZIA ID CONDIVISA
+# ================================================================
+# Sostituisce i vari clean_id locali e la "pulizia finale killer (.0)" che
+# ripassava una regex su TUTTE le colonne. Qui si legge tutto come testo
+# (niente float, quindi niente .0 nuovi) e si puliscono solo le colonne ID.
+
+# Colonne che contengono identificativi Pimcore / chiavi di join
+ID_COLUMNS = {
+    "id", "id_recita", "id_recita_esecutore", "id_recita_interprete",
+    "production_id", "luogo_id", "edificio_id", "composizione_id",
+    "curatore_id", "esecutore_id", "interprete_id", "entita_id",
+    "person_id", "organizer_id", "season_id", "compositions_id",
+    "related_work_id", "literary_author_id",
+    "luogo_rappresentazione_id", "edificio_rappresentazione_id",
+}
+
+# Valori testuali che equivalgono a "vuoto"
+NULL_TOKENS = {"", "nan", "none", "null", "n/a"}
+
+# Uno o più ".0"/".00" finali lasciati dalla conversione in float
+_FLOAT_SUFFIX = re.compile(r"(?:\.0+)+$")
+
+
+def clean_id(value):
+    """
+    Trasforma un ID in stringa pulita: toglie spazi e il .0 finale.
+    Restituisce "" per valori vuoti o nulli (NaN, "nan", "None", ...).
+    """
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if pd.isna(value):
+            return ""
+        if value.is_integer():
+            return str(int(value))
+    s = str(value).strip()
+    if s.lower() in NULL_TOKENS:
+        return ""
+    return _FLOAT_SUFFIX.sub("", s)
+
+
+def clean_id_series(series):
+    """
+    Versione vettoriale di clean_id per un'intera colonna.
+    Gli ID si ripetono molto (righe esplose per interprete), quindi la pulizia
+    lavora sui soli valori distinti e poi li rimappa con i codici di factorize.
+    """
+    codes, uniques = pd.factorize(series)
+    puliti = pd.Index(uniques).astype(str).str.strip().str.replace(_FLOAT_SUFFIX, "", regex=True)
+    puliti = puliti.where(~puliti.str.lower().isin(NULL_TOKENS), "")
+    # Codice -1 = NaN: finisce sull'ultimo elemento aggiunto, la stringa vuota
+    valori = np.append(puliti.to_numpy(dtype=object), "")
+    return pd.Series(valori[codes], index=series.index, dtype=object)
+
+
+def clean_id_columns(df, columns=None):
+    """
+    Pulisce solo le colonne ID presenti nel DataFrame (di default quelle in ID_COLUMNS).
+    Le altre colonne restano intatte: i NaN vengono scritti vuoti da to_csv.
+    """
+    columns = ID_COLUMNS if columns is None else columns
+    for col in df.columns:
+        if col in columns:
+            df[col] = clean_id_series(df[col])
+    return df
+
+
+def read_csv_str(path, **kwargs):
+    """
+    Legge un CSV con tutte le colonne come stringa (dtype=str) e senza
+    convertire le celle vuote in NaN: nessun ID diventa float in lettura.
+    """
+    kwargs.setdefault("dtype", str)
+    kwargs.setdefault("keep_default_na", False)
+    return pd.read_csv(path, **kwargs)
+
+
+# === BENCHMARK ===
+# Confronta la vecchia pulizia su tutte le colonne con quella vettoriale sulle sole colonne ID:
+#   python normalization/common_ids.py [righe]
+if __name__ == "__main__":
+    import sys
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    df = pd.DataFrame({
+        "id": [f"{70000 + i}.0" if i % 3 else str(70000 + i) for i in range(n)],
+        "titolo_breve": ["Tosca"] * n,
+        "production_id": [float(32000 + i // 10) for i in range(n)],
+        "luogo_nome": ["Torino"] * n,
+        "edificio_nome": ["Teatro Regio"] * n,
+        "curatore_nome": ["Gianandrea Noseda"] * n,
+        "curatore_id": [float("nan") if i % 7 == 0 else "2644.0" for i in range(n)],
+        "interprete": ["Maria Callas"] * n,
+        "interprete_id": ["2657"] * n,
+        "personaggio": ["Floria Tosca"] * n,
+    })
+
+    old = df.copy()
+    t0 = time.perf_counter()
+    for col in old.columns:
+        old[col] = old[col].astype(str).replace(r'\.0$', '', regex=True).replace('nan', '')
+    t_old = time.perf_counter() - t0
+
+    new = df.copy()
+    t0 = time.perf_counter()
+    new = clean_id_columns(new)
+    t_new = time.perf_counter() - t0
+
+    same = all((old[c].fillna("") == new[c]).all() for c in ID_COLUMNS if c in df.columns)
+    print(f"Righe: {n} | colonne: {len(df.columns)} (ID: {len(ID_COLUMNS & set(df.columns))})")
+    print(f"Loop su tutte le colonne: {t_old:.3f}s")
+    print(f"Colonne ID vettoriali:    {t_new:.3f}s ({t_old / t_new:.1f}x)")
+    print(f"Risultato ID identico: {same}")
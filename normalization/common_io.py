@@ -0,0 +1,303 @@
+import os
+import time
+from collections import defaultdict
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# ================================================================
+# TABELLE INTERMEDIE: CSV + PARQUET TIPIZZATO
+# ================================================================
+# Ogni fase scrive CSV e la successiva lo rilegge con dtype=str, riconvertendo
+# tutto da testo: è da lì che rientrano i ".0" dei float. Qui accanto a ogni CSV
+# si può scrivere un gemello .parquet con colonne tipizzate (ID e testi come
+# stringhe, anni come interi): chi legge con read_table usa il parquet se è
+# aggiornato e ricade sul CSV altrimenti. Il CSV resta sempre, perché è quello
+# pubblicato su GitHub e letto da LOAD CSV.
+#
+# Il parquet richiede pyarrow (opzionale): senza, si scrive e si legge solo CSV.
+
+# "csv" = solo CSV, "both" = CSV + parquet. Sovrascrivibile da ambiente (es. dalla pipeline).
+TABLE_FORMAT = os.environ.get("THEATRENET_TABLE_FORMAT", "both")
+
+# Colonne con un tipo diverso da stringa; tutte le altre sono "string"
+COLUMN_TYPES = {
+    "year": "Int64",
+    "Anno": "Int64",
+}
+
+# Colonne con pochi valori distinti ripetuti su moltissime righe (soprattutto nelle
+# viste esplose): con categories=True restano codificate a dizionario, in memoria
+# come category e nel parquet come colonne dictionary.
+CATEGORY_COLUMNS = [
+    "luogo_nome", "edificio_nome", "titolo_breve", "relazione", "ruolo",
+    "curatore_ruolo", "esecutore_ruolo", "personaggio_voce", "personaggio",
+    # Attributi della recita copiati su ogni riga del prodotto cartesiano
+    "fullpath", "composizione_nome", "datetext",
+]
+
+# Root del repo: i CSV pubblicati su GitHub hanno la stessa struttura di cartelle.
+# THEATRENET_MIRROR_ROOT la sposta altrove (es. un archivio sintetico, vedi archivio_sintetico.py)
+REPO_ROOT = Path(os.environ.get("THEATRENET_MIRROR_ROOT") or Path(__file__).resolve().parent.parent)
+
+# CSV pubblicato (percorso sotto la root) -> output della pipeline da cui è copiato.
+# I gemelli parquet nascono solo sotto dataset/: read_source li usa anche per il
+# percorso pubblicato, se il CSV pubblicato è la copia di quell'output.
+PUBLISHED = {
+    "regio/regio_opere_pulito_con_anno.csv": "dataset/regio_opere_pulito_con_anno.csv",
+    "regio/regio_persone.csv": "dataset/regio/regio_persone.csv",
+    "regio/regio_persone_dedup.csv": "dataset/regio/regio_persone_dedup.csv",
+    "regio/regio_produzioni.csv": "dataset/regio/_regio_produzioni.csv",
+    "regio/recite-regio-luoghi-qid2.csv": "dataset/regio/recite-regio-luoghi-qid2.csv",
+    "fondazione/persone.csv": "dataset/fondazione/persone.csv",
+    "fondazione/stagioni.csv": "dataset/fondazione/stagioni.csv",
+    "fondazione/stagioni_links.csv": "dataset/fondazione/stagioni_links.csv",
+    "fondazione/produzioni_clean.csv": "dataset/fondazione/produzioni_clean.csv",
+    "fondazione/produzioni_links.csv": "dataset/fondazione/produzioni_links.csv",
+    "fondazione/recite_fondazione_con_qid.csv": "dataset/fondazione/recite_fondazione_con_qid.csv",
+}
+
+CSV_CHUNK_ROWS = 200_000
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+_avvisato = False
+
+
+def parquet_available():
+    global _avvisato
+    if pq is None and TABLE_FORMAT == "both" and not _avvisato:
+        print("ℹ️  pyarrow non installato: tabelle intermedie solo in CSV.")
+        _avvisato = True
+    return pq is not None
+
+
+def parquet_path(path):
+    """Gemello parquet di un CSV: stesso nome, estensione .parquet."""
+    return Path(path).with_suffix(".parquet")
+
+
+def categorize(df, columns=None):
+    """Converte in category le colonne ripetitive presenti (quelle già category restano come sono)."""
+    for col in columns or CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
+
+
+def fill_blank(df, value=""):
+    """
+    fillna che funziona anche sulle colonne category: il valore di riempimento
+    viene aggiunto alle categorie solo se serve davvero.
+    """
+    for col in df.columns:
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype) and s.isna().any() and value not in s.cat.categories:
+            df[col] = s.cat.add_categories([value])
+    return df.fillna(value)
+
+
+def strip_text(s):
+    """str.strip che su una category lavora sulle sole categorie e resta category."""
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        return s.str.strip()
+    # Categorie che diventano uguali dopo lo strip vengono fuse
+    nuove, categorie = pd.factorize(s.cat.categories.str.strip())
+    codes = s.cat.codes.to_numpy()
+    codes = np.where(codes >= 0, nuove[codes], -1)
+    return pd.Series(pd.Categorical.from_codes(codes, categorie), index=s.index, name=s.name)
+
+
+def typed_frame(df):
+    """
+    Applica i tipi della pipeline: stringhe (celle vuote = mancanti) e interi nullable
+    per le colonne in COLUMN_TYPES. Gli ID restano testo, quindi niente ".0".
+    Le CATEGORY_COLUMNS diventano category (dictionary nel parquet).
+    """
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if COLUMN_TYPES.get(col) == "Int64":
+            out[col] = pd.to_numeric(s.where(s != ""), errors="coerce").round().astype("Int64")
+        elif col in CATEGORY_COLUMNS:
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                s = s.cat.rename_categories(s.cat.categories.astype(str))
+                out[col] = s.cat.remove_categories([""]) if "" in s.cat.categories else s
+            else:
+                s = s.astype("string")
+                out[col] = s.mask(s == "").astype("category")
+        else:
+            s = s.astype("string")
+            out[col] = s.mask(s == "")
+    return pd.DataFrame(out, index=df.index)
+
+
+def _parquet_fresh(path):
+    """True se il parquet esiste e non è più vecchio del CSV (o il CSV non c'è)."""
+    pq_path = parquet_path(path)
+    if pq is None or not pq_path.exists():
+        return False
+    return not Path(path).exists() or pq_path.stat().st_mtime_ns >= Path(path).stat().st_mtime_ns
+
+
+def write_table(df, path, sep=",", fmt=None, **csv_kw):
+    """Scrive il CSV e, se TABLE_FORMAT lo prevede, il gemello parquet tipizzato."""
+    fmt = fmt or TABLE_FORMAT
+    df.to_csv(path, index=False, sep=sep, **csv_kw)
+    if fmt == "both" and parquet_available():
+        typed_frame(df).to_parquet(parquet_path(path), index=False)
+
+
+def csv_to_parquet(path, sep=",", fmt=None, chunksize=CSV_CHUNK_ROWS):
+    """
+    Gemello parquet di un CSV già scritto (es. a blocchi, con mode="a"),
+    convertito a blocchi con un ParquetWriter: la memoria resta limitata.
+    """
+    fmt = fmt or TABLE_FORMAT
+    if fmt != "both" or not parquet_available():
+        return
+    writer = None
+    try:
+        for chunk in pd.read_csv(path, sep=sep, dtype=str, keep_default_na=False, chunksize=chunksize):
+            table = pa.Table.from_pandas(typed_frame(chunk), preserve_index=False)
+            if writer is None:
+                # Indici dei dizionari a 32 bit: un blocco successivo può avere più categorie
+                schema = pa.schema([
+                    f.with_type(pa.dictionary(pa.int32(), f.type.value_type)) if pa.types.is_dictionary(f.type) else f
+                    for f in table.schema
+                ], metadata=table.schema.metadata)
+                writer = pq.ParquetWriter(parquet_path(path), schema)
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _as_text(df, na, categories=False):
+    """
+    Riporta un frame tipizzato alla forma che si aspetta chi legge CSV come testo:
+    stesso dtype di read_csv(dtype=str), mancanti "" oppure NaN.
+    Con categories=True le colonne category restano codificate.
+    """
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if categories and isinstance(s.dtype, pd.CategoricalDtype):
+            s = s.cat.rename_categories(s.cat.categories.astype(str))
+            out[col] = s if na else fill_blank(s.to_frame())[col]
+            continue
+        if not pd.api.types.is_string_dtype(s.dtype):
+            s = s.astype("string")
+        if na:
+            out[col] = s.astype(object).where(s.notna(), np.nan)
+        else:
+            out[col] = s.fillna("").astype(str)
+    return pd.DataFrame(out, index=df.index)
+
+
+def read_table(path, sep=",", na=False, typed=False, columns=None, categories=False):
+    """
+    Legge una tabella della pipeline: il parquet gemello se aggiornato, altrimenti il CSV.
+    - typed=True: tipi del parquet (string/Int64/category, mancanti = <NA>).
+    - altrimenti testo come read_csv_str: celle vuote "" (na=False) oppure NaN (na=True,
+      come pd.read_csv con dtype=str, per chi controlla pd.isna).
+    - categories=True: le CATEGORY_COLUMNS arrivano già come category, senza passare
+      da una colonna di stringhe Python per riga.
+    """
+    if _parquet_fresh(path):
+        df = pd.read_parquet(parquet_path(path), columns=columns)
+        return df if typed else _as_text(df, na, categories)
+
+    dtype = defaultdict(lambda: str, {c: "category" for c in CATEGORY_COLUMNS}) if categories else str
+    df = pd.read_csv(path, sep=sep, dtype=dtype, keep_default_na=na, usecols=columns)
+    return typed_frame(fill_blank(df)) if typed else df
+
+
+def local_mirror(url):
+    """Percorso locale del CSV pubblicato su GitHub (…/main/regio/x.csv -> <repo>/regio/x.csv)."""
+    if "/main/" not in url:
+        return None
+    return REPO_ROOT / url.split("/main/", 1)[1]
+
+
+def is_lfs_pointer(path):
+    """I CSV grandi sono in Git LFS: senza git lfs pull in locale c'è solo il puntatore."""
+    with open(path, "rb") as f:
+        return f.read(40).startswith(b"version https://git-lfs")
+
+
+def pipeline_output(local):
+    """
+    Output in dataset/ da cui è copiato il CSV pubblicato `local`, se si può leggere
+    al suo posto: il parquet è aggiornato rispetto al suo CSV e il CSV pubblicato
+    manca, è un puntatore LFS o ha la stessa dimensione (è la stessa copia).
+    """
+    try:
+        rel = Path(local).relative_to(REPO_ROOT).as_posix()
+    except ValueError:
+        return None
+    if rel not in PUBLISHED:
+        return None
+    origine = REPO_ROOT / PUBLISHED[rel]
+    if not origine.exists() or not _parquet_fresh(origine):
+        return None
+    if local.exists() and not is_lfs_pointer(local) and local.stat().st_size != origine.stat().st_size:
+        return None
+    return origine
+
+
+def read_source(url, sep=",", na=True, typed=False, categories=False):
+    """
+    Per i consumatori finali (semantic_graph, loader locale): usa la copia locale
+    (parquet o CSV) se c'è, altrimenti scarica il CSV pubblicato. Sempre dtype=str
+    (con categories=True le colonne ripetitive come category).
+    """
+    local = local_mirror(url)
+    if local is not None and not _parquet_fresh(local):
+        # Il gemello parquet di solito è solo accanto all'output in dataset/
+        origine = pipeline_output(local)
+        if origine is not None:
+            return read_table(origine, sep=sep, na=na, typed=typed, categories=categories)
+    if local is not None and (_parquet_fresh(local) or (local.exists() and not is_lfs_pointer(local))):
+        return read_table(local, sep=sep, na=na, typed=typed, categories=categories)
+    df = pd.read_csv(url, sep=sep, dtype=str, keep_default_na=na, engine="python" if sep != "," else "c")
+    if categories:
+        df = categorize(df)
+    return typed_frame(fill_blank(df)) if typed else df
+
+
+# === CONVERSIONE E BENCHMARK ===
+# Crea il gemello parquet di CSV esistenti (es. persone) e confronta i tempi di rilettura:
+#   python normalization/common_io.py dataset/regio/recite/recite_regio_final.csv [--sep ';']
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Converte CSV della pipeline in parquet tipizzato.")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--sep", default=",")
+    args = parser.parse_args()
+
+    if pq is None:
+        raise SystemExit("pyarrow non installato: pip install pyarrow")
+
+    for f in args.files:
+        csv_to_parquet(f, sep=args.sep, fmt="both")
+
+        t0 = time.perf_counter()
+        a = pd.read_csv(f, sep=args.sep, dtype=str, keep_default_na=False)
+        t_csv = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        b = read_table(f, sep=args.sep)
+        t_pq = time.perf_counter() - t0
+
+        mb_csv = Path(f).stat().st_size / 1e6
+        mb_pq = parquet_path(f).stat().st_size / 1e6
+        print(f"{f}: {len(a)} righe")
+        print(f"  CSV     {mb_csv:8.2f} MB  lettura {t_csv:.3f}s")
+        print(f"  parquet {mb_pq:8.2f} MB  lettura {t_pq:.3f}s ({t_csv / t_pq:.1f}x)")
+        print(f"  Contenuto identico: {a.astype(object).equals(b.astype(object))}")
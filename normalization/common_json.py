@@ -0,0 +1,178 @@
+import json
+import re
+import time
+from ast import literal_eval
+from collections import defaultdict
+
+# ================================================================
+# PARSER DELLE CELLE JSON / "QUASI JSON" DEGLI EXPORT PIMCORE
+# ================================================================
+# Gli export contengono sia JSON vero sia dizionari Python ('apici singoli',
+# True/None). Prima si provava json.loads e poi ast.literal_eval, che è molto
+# lento. Qui la sintassi Python viene riscritta in JSON con un'unica scansione
+# regex e literal_eval resta solo come ultima spiaggia.
+
+# Percorsi possibili per una cella
+PATHS = ("json", "repaired", "literal", "failed")
+
+# Celle identiche (stesse liste di interpreti su più recite) vengono parsate una volta sola.
+# ATTENZIONE: il risultato in cache è condiviso, chi lo usa non deve modificarlo.
+CACHE_MAX = 100_000
+
+_cache = {}
+_stats = defaultdict(lambda: dict.fromkeys(PATHS + ("cache",), 0))
+
+# Un token per volta: stringa tra apici singoli, stringa tra doppi apici, letterali Python
+_TOKEN = re.compile(r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|\b(?:True|False|None)\b""", re.S)
+_INNER = re.compile(r"""\\(.)|\"""", re.S)
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def _inner_to_json(match):
+    escaped = match.group(1)
+    if escaped is None:
+        return '\\"'            # doppio apice "nudo" dentro una stringa a apici singoli
+    if escaped == "'":
+        return "'"              # \' non è un escape JSON valido
+    return match.group(0)
+
+
+def _token_to_json(match):
+    tok = match.group(0)
+    if tok[0] == "'":
+        inner = tok[1:-1]
+        if "\\" in inner or '"' in inner:
+            inner = _INNER.sub(_inner_to_json, inner)
+        return f'"{inner}"'
+    if tok[0] == '"':
+        return tok
+    return _LITERALS[tok]
+
+
+def pythonish_to_json(s):
+    """Riscrive una stringa in sintassi Python (apici singoli, True/False/None) in JSON."""
+    return _TOKEN.sub(_token_to_json, s)
+
+
+def parse_cell(value, column=None, default=None):
+    """
+    Converte una cella JSON-like in oggetto Python.
+    Ordine: json.loads -> riscrittura Python->JSON -> literal_eval.
+    Restituisce default per celle vuote o non interpretabili.
+    Il percorso seguito viene contato per colonna (vedi print_parse_report).
+    """
+    if not isinstance(value, str):
+        return default
+    s = value.strip()
+    if not s or s.lower() in ("nan", "none", "null"):
+        return default
+
+    stats = _stats[column]
+    hit = _cache.get(s)
+    if hit is not None:
+        path, result = hit
+        stats["cache"] += 1
+        stats[path] += 1
+        return default if path == "failed" else result
+
+    try:
+        path, result = "json", json.loads(s)
+    except ValueError:
+        try:
+            path, result = "repaired", json.loads(pythonish_to_json(s))
+        except ValueError:
+            try:
+                path, result = "literal", literal_eval(s)
+            except Exception:
+                path, result = "failed", None
+
+    if len(_cache) >= CACHE_MAX:
+        _cache.clear()
+    _cache[s] = (path, result)
+    stats[path] += 1
+    return default if path == "failed" else result
+
+
+def parse_stats():
+    """Conteggi per colonna: {colonna: {json, repaired, literal, failed, cache}}."""
+    return {col: dict(c) for col, c in _stats.items()}
+
+
+def take_parse_stats():
+    """Restituisce i conteggi accumulati e li azzera (la cache resta)."""
+    stats = parse_stats()
+    _stats.clear()
+    return stats
+
+
+def merge_parse_stats(stats):
+    """Somma conteggi raccolti altrove (es. nei processi di un pool)."""
+    for col, c in stats.items():
+        for path, n in c.items():
+            _stats[col][path] += n
+
+
+def print_parse_report():
+    """Stampa quante celle per colonna sono passate da ciascun percorso."""
+    if not _stats:
+        return
+    print("Parsing celle JSON (json / riparate / literal_eval / fallite | da cache):")
+    for col, c in _stats.items():
+        print(f"  - {col}: {c['json']} / {c['repaired']} / {c['literal']} / {c['failed']} | {c['cache']}")
+
+
+def reset_parse_cache():
+    _cache.clear()
+    _stats.clear()
+
+
+# === BENCHMARK ===
+# Confronta json.loads + literal_eval con parse_cell su celle in stile Pimcore:
+#   python normalization/common_json.py [celle]
+if __name__ == "__main__":
+    import sys
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    celle = []
+    for i in range(n):
+        k = i % 500  # poche combinazioni distinte, come negli export reali
+        if i % 4 == 0:
+            celle.append(json.dumps([{"Identificativo": str(2500 + k), "Nome": f"Tosca (soprano) - Cantante {k}", "Ruolo": "Interprete"}]))
+        else:
+            celle.append(str([
+                {"Identificativo": 2500 + k, "Nome": f"Cavaradossi (tenore) - Cantante {k}", "Ruolo": "Interprete"},
+                {"Identificativo": float(2600 + k), "Nome": "Scarpia (baritono) - D'Arco", "Ruolo": None, "Principale": True},
+            ]))
+
+    def old_parse(value):
+        try:
+            return json.loads(value)
+        except Exception:
+            try:
+                return literal_eval(value)
+            except Exception:
+                return None
+
+    t0 = time.perf_counter()
+    old = [old_parse(c) for c in celle]
+    t_old = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    new = [parse_cell(c, "benchmark") for c in celle]
+    t_new = time.perf_counter() - t0
+
+    reset_parse_cache()
+    t0 = time.perf_counter()
+    for c in celle:
+        s = c.strip()
+        try:
+            json.loads(s)
+        except ValueError:
+            json.loads(pythonish_to_json(s))
+    t_nocache = time.perf_counter() - t0
+
+    print(f"Celle: {n}")
+    print(f"json.loads + literal_eval:  {t_old:.3f}s")
+    print(f"Riscrittura senza cache:    {t_nocache:.3f}s ({t_old / t_nocache:.1f}x)")
+    print(f"parse_cell (con cache):     {t_new:.3f}s ({t_old / t_new:.1f}x)")
+    print(f"Risultato identico: {old == new}")
@@ -0,0 +1,166 @@
+import re
+import time
+import pandas as pd
+
+# ================================================================
+# PARSING VETTORIALE DEI FULLPATH PIMCORE
+# ================================================================
+# I percorsi Pimcore hanno la forma "/Cronologia (52555)/Stagione 1973 (30)/1 Tosca (32000)/...".
+# Invece di applicare re.match riga per riga (spesso dentro lambda x: pd.Series(...)),
+# qui ogni funzione lavora sull'intera colonna con str.extract / str.findall e regex
+# compilate una volta sola. Il risultato è identico alle vecchie funzioni per riga.
+
+# "/Etichetta (123)" alla fine del percorso
+RE_PATH_LABEL = re.compile(r"/([^/]+)\s*\(\d+\)$")
+# Prefisso data delle recite Fondazione: "01-04-1973 Tosca"
+RE_DATE_PREFIX = re.compile(r"^\d{2}-\d{2}-\d{4}\s+(.*)$")
+# ID della produzione: penultimo segmento non vuoto che termina con "(123)"
+RE_PRODUCTION_ID = re.compile(r"\((\d+)\)\n?/(?:\s*/)*\s*[^\s/][^/]*(?:/\s*)*$")
+# Ultimo segmento del percorso
+RE_LAST_SEGMENT = re.compile(r"([^/]*)$")
+# "Etichetta (123)" -> etichetta, id
+RE_LABEL_ID = re.compile(r"^(.*)\s*\((\d+)\)\s*$")
+# Come sopra, ignorando un numero d'ordine iniziale ("4 Tosca (123)")
+RE_CLEAN_INFO = re.compile(r"^(?:\d+\s+)?(.*?)\s*\((\d+)\)\s*$")
+RE_LEADING_NUMBER = re.compile(r"^\d+\s+")
+# Tutti gli ID tra parentesi
+RE_IDS = re.compile(r"\((\d+)\)")
+
+
+def _solo_stringhe(series):
+    """Tiene solo le celle di tipo stringa: il resto (NaN, numeri) diventa ""."""
+    return series.where(series.map(type).eq(str), "")
+
+
+def path_label(series):
+    """
+    Regio: etichetta dell'ultimo segmento "/Etichetta (123)".
+    Se il percorso non termina con un ID la cella resta com'è.
+    """
+    label = series.str.extract(RE_PATH_LABEL, expand=False).str.strip()
+    return label.fillna(series)
+
+
+def path_label_fondazione(series, titles):
+    """
+    Fondazione: come path_label, ma toglie il prefisso data ("01-04-1973 ")
+    e ricade sul titolo (dcTitle) quando il percorso non contiene un'etichetta.
+    """
+    label = series.str.strip().str.extract(RE_PATH_LABEL, expand=False).str.strip()
+    senza_data = label.str.extract(RE_DATE_PREFIX, expand=False).str.strip()
+    return senza_data.fillna(label).fillna(titles)
+
+
+def production_id(series):
+    """ID tra parentesi del penultimo segmento non vuoto del fullpath (NaN se assente)."""
+    return series.str.extract(RE_PRODUCTION_ID, expand=False)
+
+
+def last_label_id(series):
+    """
+    Ultimo segmento "Etichetta (123)" -> DataFrame [label, id].
+    Senza ID finale: label = segmento intero, id = NaN. Celle vuote: entrambi NaN.
+    """
+    last = series.str.strip().str.extract(RE_LAST_SEGMENT, expand=False)
+    parts = last.str.extract(RE_LABEL_ID)
+    return pd.DataFrame({
+        "label": parts[0].str.strip().fillna(last.str.strip()),
+        "id": parts[1],
+    }, index=series.index)
+
+
+def clean_info(series):
+    """
+    Regio produzioni: primo percorso (se separati da virgola), ultimo segmento,
+    senza numero d'ordine iniziale -> DataFrame [label, id]. Celle non testuali: "".
+    """
+    s = _solo_stringhe(series)
+    first = s.str.split(",", n=1).str[0].str.strip()
+    last = first.str.rsplit("/", n=1).str[-1].str.strip()
+    parts = last.str.extract(RE_CLEAN_INFO)
+    fallback = last.str.replace(RE_LEADING_NUMBER, "", regex=True)
+    return pd.DataFrame({
+        "label": parts[0].str.strip().fillna(fallback).fillna(""),
+        "id": parts[1].str.strip().fillna(""),
+    }, index=series.index)
+
+
+def joined_ids(series, sep=", "):
+    """Tutti gli ID "(123)" della cella, uniti da sep ("" se nessuno)."""
+    return series.str.findall(RE_IDS).str.join(sep).fillna("")
+
+
+def exploded_ids(series):
+    """
+    Formato lungo: una riga per ogni ID "(123)" trovato nella cella.
+    L'indice del risultato è quello della riga di origine (colonna "id").
+    Celle non testuali (NaN, numeri) non producono righe.
+    """
+    ids = _solo_stringhe(series).str.extractall(RE_IDS)[0].rename("id")
+    return ids.reset_index(level="match", drop=True)
+
+
+# === BENCHMARK ===
+# Confronta le vecchie funzioni per riga con quelle vettoriali:
+#   python normalization/common_paths.py [righe]
+if __name__ == "__main__":
+    import sys
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    df = pd.DataFrame({
+        "fullpath": [f"/Cronologia (52555)/Stagione 1973 (30)/{i % 9} Tosca ({32000 + i // 4})/01-04-1973 Tosca ({70000 + i})" for i in range(n)],
+        "luogo": ["/Voci di autorità/Luoghi/Torino (123)" if i % 5 else "" for i in range(n)],
+        "altre": ["/x/R (700011),/x/R (700012)" if i % 3 else "" for i in range(n)],
+    })
+
+    # Vecchie implementazioni (regio_recita.py)
+    def old_path_label(value):
+        if pd.isna(value):
+            return None
+        match = re.search(r"/([^/]+)\s*\(\d+\)$", str(value))
+        return match.group(1).strip() if match else value
+
+    def old_production_id(fullpath):
+        if pd.isna(fullpath): return None
+        parts = [p for p in fullpath.split('/') if p.strip()]
+        if len(parts) >= 2:
+            match = re.search(r'\((\d+)\)$', parts[-2])
+            if match:
+                return match.group(1)
+        return None
+
+    def old_last_label_id(value):
+        if pd.isna(value):
+            return None, None
+        last_seg = str(value).strip().rsplit('/', 1)[-1]
+        m = re.match(r"^(.*)\s*\((\d+)\)\s*$", last_seg)
+        if m:
+            return m.group(1).strip(), m.group(2)
+        return last_seg.strip(), None
+
+    def old_altre(value):
+        return ", ".join(re.findall(r"\((\d+)\)", str(value)))
+
+    t0 = time.perf_counter()
+    old = pd.DataFrame({
+        "titolo": df["fullpath"].apply(old_path_label),
+        "production_id": df["fullpath"].apply(old_production_id),
+        "altre": df["altre"].apply(old_altre),
+    })
+    old[["luogo_nome", "luogo_id"]] = df["luogo"].apply(lambda x: pd.Series(old_last_label_id(x)))
+    t_old = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    new = pd.DataFrame({
+        "titolo": path_label(df["fullpath"]),
+        "production_id": production_id(df["fullpath"]),
+        "altre": joined_ids(df["altre"]),
+    })
+    new[["luogo_nome", "luogo_id"]] = last_label_id(df["luogo"]).to_numpy()
+    t_new = time.perf_counter() - t0
+
+    same = old.fillna("").astype(str).equals(new.fillna("").astype(str))
+    print(f"Righe: {n}")
+    print(f"apply per riga: {t_old:.3f}s")
+    print(f"str.extract:    {t_new:.3f}s ({t_old / t_new:.1f}x)")
+    print(f"Risultato identico: {same}")
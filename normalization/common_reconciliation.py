@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+from common_fuzzy import fuzzy_lookup
+from common_ids import clean_id_series
+
+# ================================================================
+# RICONCILIAZIONE ID PERSONE (CHIAVI NORMALIZZATE)
+# ================================================================
+# Prima: id_map costruito con iterrows, poi df.apply(update_row, axis=1) con
+# contatori globali e, per Fondazione, un secondo tentativo con flip_name.
+# Qui ogni nome diventa una chiave canonica (accenti, maiuscole, spazi,
+# "Cognome, Nome" -> "nome cognome") calcolata una volta per nome distinto,
+# e le colonne intere vengono rimappate con un join su dizionario.
+# I nomi rimasti senza match possono passare da un indice a trigrammi (common_fuzzy.py).
+
+# Uso del match approssimato: ID effettivamente riempiti (sopra soglia, default),
+# oppure solo proposte nell'audit da rivedere a mano
+FUZZY_AUDIT = "audit"
+FUZZY_APPLY = "apply"
+
+AUDIT_COLUMNS = [
+    "campo", "nome", "chiave", "chiave_master", "id_vecchio", "id_nuovo", "metodo", "punteggio", "righe"
+]
+
+
+def name_key_series(series):
+    """
+    Chiave canonica di confronto per una colonna di nomi:
+    'Madau Diaz, Antonello' e 'Antonello  Madau-Diaz' -> 'antonello madau diaz'.
+    Calcolata sui soli valori distinti (i nomi si ripetono su migliaia di recite).
+    """
+    codes, uniques = pd.factorize(series)
+    s = pd.Series(pd.Index(uniques).astype(str), dtype=object)
+
+    s = s.str.normalize("NFKD").str.replace("[\u0300-\u036f]", "", regex=True)  # via gli accenti
+    s = s.str.casefold()
+    s = s.str.replace("’", "'", regex=False).str.replace("-", " ", regex=False)
+
+    # "Cognome, Nome" -> "Nome Cognome" (solo la prima virgola, come flip_name)
+    parti = s.str.split(",", n=1, expand=True)
+    if parti.shape[1] == 2:
+        s = parti[1].str.strip().str.cat(parti[0].str.strip(), sep=" ").where(parti[1].notna(), s)
+
+    s = s.str.replace(r"\s+", " ", regex=True).str.strip()
+    s = s.where(~s.isin(["nan", "none", "null"]), "")
+
+    chiavi = np.append(s.to_numpy(dtype=object), "")
+    return pd.Series(chiavi[codes], index=series.index, dtype=object)
+
+
+def build_id_map(names, ids):
+    """
+    Dizionario {chiave nome: ID ufficiale} dal file master delle persone.
+    A parità di chiave vince l'ultima riga, come nel vecchio ciclo iterrows.
+    Restituisce anche il numero di chiavi ambigue (stessa chiave, ID diversi).
+    """
+    master = pd.DataFrame({"chiave": name_key_series(names), "id": clean_id_series(ids)})
+    master = master[(master["chiave"] != "") & (master["id"] != "")]
+    ambigue = int((master.groupby("chiave")["id"].nunique() > 1).sum())
+    master = master.drop_duplicates("chiave", keep="last")
+    return dict(zip(master["chiave"], master["id"])), ambigue
+
+
+def reconcile_column(df, name_col, id_col, id_map, fuzzy_index=None, fuzzy_threshold=None, fuzzy_mode=FUZZY_APPLY):
+    """
+    Sostituisce gli ID di id_col con quelli del master quando il nome è noto;
+    altrimenti lascia l'ID originale (pulito dal .0).
+    Con fuzzy_index (vedi common_fuzzy.py) i nomi senza match esatto vengono
+    cercati anche in modo approssimato, una volta per chiave distinta, ma solo
+    sulle righe con ID vuoto o assente dal master: un ID valido non viene mai
+    sostituito da un match approssimato. Con FUZZY_APPLY (default) i match sopra
+    soglia vengono usati e registrati nell'audit come "fuzzy"; con FUZZY_AUDIT
+    finiscono solo nell'audit (metodo "fuzzy_proposto").
+    Restituisce un DataFrame con: vecchio, nuovo, proposto, chiave, chiave_master, metodo, punteggio, cambiato.
+    """
+    vuota = pd.Series("", index=df.index, dtype=object)
+    vecchi = clean_id_series(df[id_col]) if id_col in df.columns else vuota
+    chiavi = name_key_series(df[name_col]) if name_col in df.columns else vuota
+
+    trovati = chiavi.map(id_map)
+    metodo = pd.Series(np.where(trovati.notna(), "exact", ""), index=df.index, dtype=object)
+    punteggio = trovati.notna().astype(float)
+    chiave_master = chiavi.where(trovati.notna(), "")
+    proposti = trovati.copy()
+
+    if fuzzy_index is not None and fuzzy_mode in (FUZZY_AUDIT, FUZZY_APPLY):
+        senza_id = (vecchi == "") | ~vecchi.isin(set(id_map.values()))
+        candidati = trovati.isna() & senza_id & (chiavi != "")
+        soglia = {} if fuzzy_threshold is None else {"threshold": fuzzy_threshold}
+        proposte = fuzzy_lookup(chiavi[candidati].unique(), fuzzy_index, **soglia)
+        if proposte:
+            da_fuzzy = candidati & chiavi.isin(proposte.keys())
+            risultati = chiavi[da_fuzzy].map(proposte)
+            proposti = proposti.where(~da_fuzzy, risultati.str[0])
+            punteggio = punteggio.where(~da_fuzzy, risultati.str[1])
+            chiave_master = chiave_master.where(~da_fuzzy, risultati.str[2])
+            if fuzzy_mode == FUZZY_APPLY:
+                trovati = proposti
+                metodo = metodo.where(~da_fuzzy, "fuzzy")
+            else:
+                metodo = metodo.where(~da_fuzzy, "fuzzy_proposto")
+
+    nuovi = trovati.fillna(vecchi).astype(object)
+    return pd.DataFrame({
+        "vecchio": vecchi,
+        "nuovo": nuovi,
+        "proposto": proposti.fillna(vecchi).astype(object),
+        "chiave": chiavi,
+        "chiave_master": chiave_master,
+        "metodo": metodo,
+        "punteggio": punteggio,
+        "cambiato": trovati.notna() & (trovati != vecchi),
+    }, index=df.index)
+
+
+def audit_rows(df, campo, name_col, esito):
+    """
+    Righe di audit aggregate: una per (nome, id vecchio, id nuovo, metodo) con il numero di righe.
+    Comprende gli ID cambiati e le proposte approssimate non applicate.
+    """
+    cambiati = esito["cambiato"] | (esito["metodo"] == "fuzzy_proposto")
+    if not cambiati.any():
+        return pd.DataFrame(columns=AUDIT_COLUMNS)
+    nomi = df[name_col] if name_col in df.columns else pd.Series("", index=df.index)
+    audit = pd.DataFrame({
+        "campo": campo,
+        "nome": nomi[cambiati],
+        "chiave": esito.loc[cambiati, "chiave"],
+        "chiave_master": esito.loc[cambiati, "chiave_master"],
+        "id_vecchio": esito.loc[cambiati, "vecchio"],
+        "id_nuovo": esito.loc[cambiati, "proposto"],
+        "metodo": esito.loc[cambiati, "metodo"],
+        "punteggio": esito.loc[cambiati, "punteggio"],
+    })
+    gruppi = AUDIT_COLUMNS[:-1]
+    return audit.groupby(gruppi, sort=False, observed=True).size().reset_index(name="righe")[AUDIT_COLUMNS]
+
+
+def reconcile(df, id_map, fields, fuzzy_index=None, fuzzy_threshold=None, fuzzy_mode=FUZZY_APPLY):
+    """
+    Riconcilia più coppie (colonna nome, colonna ID) in un colpo solo.
+    fields: {campo: (colonna nome, colonna ID)}, es. {"interprete": ("interprete", "interprete_id")}.
+    Restituisce (df aggiornato, tabella di audit, {campo: {metodo: n}} righe aggiornate o proposte).
+    """
+    audit_parts = []
+    conteggi = {}
+    for campo, (name_col, id_col) in fields.items():
+        if name_col not in df.columns and id_col not in df.columns:
+            continue
+        esito = reconcile_column(df, name_col, id_col, id_map, fuzzy_index, fuzzy_threshold, fuzzy_mode)
+        df[id_col] = esito["nuovo"]
+        conteggi[campo] = {m: int((esito.loc[esito["cambiato"], "metodo"] == m).sum()) for m in ("exact", "fuzzy")}
+        conteggi[campo]["fuzzy_proposto"] = int((esito["metodo"] == "fuzzy_proposto").sum())
+        audit_parts.append(audit_rows(df, campo, name_col, esito))
+
+    audit = pd.concat(audit_parts, ignore_index=True) if audit_parts else pd.DataFrame(columns=AUDIT_COLUMNS)
+    return df, audit, conteggi
+
+
+def reconcile_edges(edges, id_map, relazioni, fuzzy_index=None, fuzzy_threshold=None, fuzzy_mode=FUZZY_APPLY):
+    """
+    Come reconcile, ma sull'edge list delle recite (vedi common_edges.py): per ogni
+    relazione indicata (es. "interprete", "curatore") riconcilia entita_nome/entita_id
+    delle sole righe di quella relazione. Ogni persona compare una volta per recita,
+    non una volta per ogni combinazione con gli altri figli.
+    """
+    edges["entita_id"] = edges["entita_id"].astype(object)
+    audit_parts = []
+    conteggi = {}
+    for relazione in relazioni:
+        righe = edges["relazione"] == relazione
+        parte = edges.loc[righe, ["entita_nome", "entita_id"]].copy()
+        parte, audit, c = reconcile(parte, id_map, {relazione: ("entita_nome", "entita_id")},
+                                    fuzzy_index, fuzzy_threshold, fuzzy_mode)
+        edges.loc[righe, "entita_id"] = parte["entita_id"]
+        conteggi.update(c)
+        audit_parts.append(audit)
+
+    audit = pd.concat(audit_parts, ignore_index=True) if audit_parts else pd.DataFrame(columns=AUDIT_COLUMNS)
+    return edges, audit, conteggi
+
+
+def write_audit(audit, path):
+    """Scrive la tabella degli ID cambiati (vuota ma con intestazione se non cambia nulla)."""
+    audit.to_csv(path, index=False)
+    print(f"📝 Audit ID cambiati: {path} ({len(audit)} coppie nome/ID, {int(audit['righe'].sum()) if len(audit) else 0} righe)")
@@ -1,16 +1,22 @@
-import pandas as pd
+from common_cache import StageCache
+from common_io import read_table
 
 # === CONFIGURAZIONE ===
 # Inserisci qui il nome del tuo file di input
-INPUT_FILE = 'dataset/fondazione/Recite/recite_fixed_ids.csv' # Assicurati che il nome sia corretto
+INPUT_FILE = 'dataset/fondazione/Recite/recite_clean.csv' # Tabella delle recite (formato lungo, vedi fondazione_recite.py)
 OUTPUT_FILE = 'dataset/fondazione/Recite/recite_luoghi.csv'
 
 def main():
+    # Lista edifici già aggiornata se le recite non sono cambiate (vedi common_cache.py)
+    stage = StageCache(__file__, inputs=[INPUT_FILE], outputs=[OUTPUT_FILE])
+    if stage.fresh():
+        return
+
     print(f"Lettura del file: {INPUT_FILE}...")
     
     try:
         # 1. Carica il CSV (separatore virgola)
-        df = pd.read_csv(INPUT_FILE, sep=',')
+        df = read_table(INPUT_FILE, na=True, categories=True)  # edificio/luogo come category
         
         # Verifica che le colonne esistano
         required_cols = ['edificio_nome', 'luogo_nome']
@@ -26,13 +32,15 @@ def main():
         edifici = edifici.dropna(subset=['edificio_nome'])
         
         # 4. Rimuove i duplicati per avere solo la lista unica
-        edifici_unici = edifici.drop_duplicates()
+        # Dopo il dedup bastano stringhe normali (l'ordinamento è alfabetico)
+        edifici_unici = edifici.drop_duplicates().astype(object)
         
         # 5. Ordina per Città e poi per Edificio (per comodità di lettura)
         edifici_unici = edifici_unici.sort_values(by=['luogo_nome', 'edificio_nome'])
 
         # 6. Salva il nuovo file
         edifici_unici.to_csv(OUTPUT_FILE, index=False)
+        stage.save()
         
         print(f"\n✅ Fatto! Estratti {len(edifici_unici)} edifici unici.")
         print(f"📂 File salvato come: {OUTPUT_FILE}")
@@ -1,21 +1,32 @@
 import pandas as pd
-import json
-import ast
+import sys
+from common_cache import StageCache
+from common_ids import clean_id
+from common_io import write_table
+from common_json import parse_cell, print_parse_report
+from common_paths import exploded_ids
 
 INPUT = "dataset/fondazione/Produzioni/20251120_teatri-reggio-emilia-.csv"
 OUTPUT = "dataset/fondazione/produzioni.csv"
+# Formato lungo: una riga per (produzione, relazione, entità collegata)
+OUTPUT_LINKS = "dataset/fondazione/produzioni_links.csv"
+# Export produzione -> recite ("/Recite/... (123)"): ha più recite del JSON "Recite collegate"
+INPUT_RECITE = "fondazione/20251125_fondazione-iteatri-export-produzione-recite.csv"
 
-def safe_parse_json(value):
-    """Converte una stringa JSON-like in una lista Python."""
-    if not isinstance(value, str) or value.strip() == "":
-        return []
-    try:
-        return json.loads(value)
-    except:
-        try:
-            return ast.literal_eval(value)
-        except:
-            return []
+LINK_COLUMNS = ["production_id", "relazione", "entita_id", "entita_nome", "ruolo"]
+
+def safe_parse_json(value, column=None):
+    """Converte una stringa JSON-like in una lista Python (vedi common_json.py)."""
+    return parse_cell(value, column, default=[])
+
+
+def flip_name(raw):
+    """'Cognome, Nome' -> 'Nome Cognome'."""
+    raw = raw.strip()
+    if "," in raw:
+        cognome, nome = [x.strip() for x in raw.split(",", 1)]
+        return f"{nome} {cognome}"
+    return raw
 
 
 def extract_location_info(lista):
@@ -59,16 +70,8 @@ def extract_people(lista):
     ruoli = []
 
     for entry in lista:
-        raw = entry.get("Nome", "").strip()
-
         # Se è nel formato "Cognome, Nome"
-        if "," in raw:
-            cognome, nome = [x.strip() for x in raw.split(",", 1)]
-            nome_completo = f"{nome} {cognome}"
-        else:
-            nome_completo = raw
-
-        nomi.append(nome_completo)
+        nomi.append(flip_name(entry.get("Nome", "")))
         ids.append(str(entry.get("Identificativo", "")))
         ruoli.append(entry.get("Ruolo", ""))
 
@@ -89,73 +92,109 @@ def extract_linked(lista):
     return ", ".join(nomi), ", ".join(ids)
 
 
-df = pd.read_csv(INPUT, sep=";", engine="python")
-
-# Crea nuove colonne vuote
-df["luogo_rappresentazione"] = ""
-df["luogo_rappresentazione_id"] = ""
-df["edificio_rappresentazione"] = ""
-df["edificio_rappresentazione_id"] = ""
-
-df["enti_collegati_clean"] = ""
-df["enti_collegati_id"] = ""
-df["enti_collegati_ruolo"] = ""
+def extract_links(production_id, relazione, lista, nome_persona=False):
+    """Righe della tabella link: una per entità collegata, con ID già pulito."""
+    righe = []
+    for entry in lista:
+        nome = entry.get("Nome", "")
+        righe.append((
+            production_id,
+            relazione,
+            clean_id(entry.get("Identificativo", "")),
+            flip_name(nome) if nome_persona else nome,
+            entry.get("Ruolo", "") if relazione in ("ente", "persona") else "",
+        ))
+    return righe
 
-df["persone_collegate_clean"] = ""
-df["persone_collegate_id"] = ""
-df["persone_collegate_ruolo"] = ""
 
-df["recite_collegate_clean"] = ""
-df["recite_collegate_id"] = ""
+def assign_columns(df, columns, values):
+    """Assegna colonne intere da una lista di tuple (una tupla per riga)."""
+    colonne = list(zip(*values)) if values else [()] * len(columns)
+    for col, vals in zip(columns, colonne):
+        df[col] = list(vals)
 
-df["opere_collegate_clean"] = ""
-df["opere_collegate_id"] = ""
 
+def parsed_column(df, col):
+    """Lista dei valori JSON parsati della colonna ([] se la colonna manca)."""
+    valori = df[col] if col in df.columns else [""] * len(df)
+    return [safe_parse_json(v, col) for v in valori]
 
-for idx, row in df.iterrows():
 
-    # --- LUOGHI COLLEGATI ---
-    loc_list = safe_parse_json(row.get("Luogo rappresentazione", ""))
-    luogo, luogo_id, edificio, edificio_id = extract_location_info(loc_list)
+# Export e codice invariati -> produzioni e link già aggiornati (vedi common_cache.py, --force per rifare)
+stage = StageCache(__file__, inputs=[INPUT, INPUT_RECITE], outputs=[OUTPUT, OUTPUT_LINKS])
+if stage.fresh():
+    sys.exit(0)
 
-    df.at[idx, "luogo_rappresentazione"] = luogo
-    df.at[idx, "luogo_rappresentazione_id"] = luogo_id
-    df.at[idx, "edificio_rappresentazione"] = edificio
-    df.at[idx, "edificio_rappresentazione_id"] = edificio_id
+df = pd.read_csv(INPUT, sep=";", engine="python")
 
-    # --- ENTI COLLEGATI ---
-    enti_list = safe_parse_json(row.get("Enti collegati", ""))
-    enti, enti_ids, enti_roles = extract_entities(enti_list)
+# ================================
+# PARSING (una lista per colonna, nessuna scrittura cella per cella)
+# ================================
 
-    df.at[idx, "enti_collegati"] = enti
-    df.at[idx, "enti_collegati_id"] = enti_ids
-    df.at[idx, "enti_collegati_ruolo"] = enti_roles
+luoghi = parsed_column(df, "Luogo rappresentazione")
+enti = parsed_column(df, "Enti collegati")
+persone = parsed_column(df, "Persone collegate")
+recite = parsed_column(df, "Recite collegate")
+opere = parsed_column(df, "Opere musicali collegate")
 
-    # --- PERSONE COLLEGATE ---
-    pers_list = safe_parse_json(row.get("Persone collegate", ""))
-    pers, pers_ids, pers_roles = extract_people(pers_list)
+# --- LUOGHI COLLEGATI ---
+assign_columns(df, ["luogo_rappresentazione", "luogo_rappresentazione_id",
+                    "edificio_rappresentazione", "edificio_rappresentazione_id"],
+               [extract_location_info(l) for l in luoghi])
 
-    df.at[idx, "persone_collegate"] = pers
-    df.at[idx, "persone_collegate_id"] = pers_ids
-    df.at[idx, "persone_collegate_ruolo"] = pers_roles
+# --- ENTI COLLEGATI ---
+assign_columns(df, ["enti_collegati_clean", "enti_collegati_id", "enti_collegati_ruolo"],
+               [extract_entities(l) for l in enti])
 
-    # --- RECITE COLLEGATE ---
-    rec_list = safe_parse_json(row.get("Recite collegate", ""))
-    rec, rec_ids = extract_linked(rec_list)
+# --- PERSONE COLLEGATE ---
+assign_columns(df, ["persone_collegate_clean", "persone_collegate_id", "persone_collegate_ruolo"],
+               [extract_people(l) for l in persone])
 
-    df.at[idx, "recite_collegate"] = rec
-    df.at[idx, "recite_collegate_id"] = rec_ids
+# --- RECITE COLLEGATE ---
+assign_columns(df, ["recite_collegate_clean", "recite_collegate_id"],
+               [extract_linked(l) for l in recite])
 
-    # --- OPERE COLLEGATE ---
-    op_list = safe_parse_json(row.get("Opere musicali collegate", ""))
-    op, op_ids = extract_linked(op_list)
+# --- OPERE COLLEGATE ---
+assign_columns(df, ["opere_collegate_clean", "opere_collegate_id"],
+               [extract_linked(l) for l in opere])
 
-    df.at[idx, "opere_collegate"] = op
-    df.at[idx, "opere_collegate_id"] = op_ids
+# ================================
+# TABELLA LINK (FORMATO LUNGO)
+# ================================
+# Gli ID collegati restano anche nelle colonne "a, b, c", ma gli import
+# (2_cypher_fondazione.py, bulk_import.py) leggono questa tabella invece di
+# fare SPLIT in Cypher.
+
+link_rows = []
+for prod_id, e, p, r, o in zip(df["id"].map(clean_id), enti, persone, recite, opere):
+    link_rows += extract_links(prod_id, "ente", e)
+    link_rows += extract_links(prod_id, "persona", p, nome_persona=True)
+    link_rows += extract_links(prod_id, "recita", r)
+    link_rows += extract_links(prod_id, "opera", o)
+df_links = pd.DataFrame(link_rows, columns=LINK_COLUMNS)
+
+# Recite dall'export dedicato (prima lette con SPLIT nello step 4.5): quelle già
+# presenti nel JSON restano una volta sola, con il nome
+export = pd.read_csv(INPUT_RECITE, sep=";", dtype=str, keep_default_na=False)
+recite_export = exploded_ids(export["recite_collegate"])
+df_links = pd.concat([df_links, pd.DataFrame({
+    "production_id": export["id"].map(clean_id).loc[recite_export.index].to_numpy(),
+    "relazione": "recita",
+    "entita_id": recite_export.to_numpy(),
+    "entita_nome": "",
+    "ruolo": "",
+}, columns=LINK_COLUMNS)], ignore_index=True)
+df_links = df_links[(df_links["production_id"] != "") & (df_links["entita_id"] != "")]
+df_links = df_links.drop_duplicates(["production_id", "relazione", "entita_id", "ruolo"], ignore_index=True)
 
 # ================================
 # SALVATAGGIO
 # ================================
 
-df.to_csv(OUTPUT, index=False, encoding="utf-8", sep=";")
+write_table(df, OUTPUT, sep=";", encoding="utf-8")
 print(f"✔️ File pulito salvato in: {OUTPUT}")
+write_table(df_links, OUTPUT_LINKS, sep=";", encoding="utf-8")
+print(f"✔️ Tabella link salvata in: {OUTPUT_LINKS} ({len(df_links)} righe)")
+print(df_links["relazione"].value_counts().to_string())
+print_parse_report()
+stage.save()
@@ -1,35 +1,261 @@
-import urllib.request
+import argparse
+import csv
+import io
+import re
 import sys
+import urllib.request
+from common_cache import StageCache
+
+# ================================================================
+# RIPARAZIONE IN STREAMING DELLE VIRGOLETTE NEGLI EXPORT PIMCORE
+# ================================================================
+# Prima lo script scaricava tutto il CSV in memoria e faceva
+# content.replace('""', "'"): così si rompevano anche gli escape corretti
+# ("" dentro un campo tra virgolette) e i campi vuoti ;""; diventavano ;';.
+# Qui il file viene letto riga per riga da un automa a stati che sa se si
+# trova dentro o fuori da un campo tra virgolette, e ripara solo ciò che è
+# davvero rotto:
+#   - virgolette in un campo non quotato  (;[{"Id": 1}];)       -> campo riquotato
+#   - virgolette non raddoppiate in un campo quotato ("[{"Id": 1}]") -> escape
+# Ogni record riparato viene riscritto con csv.writer (quoting minimo, escape ""),
+# quindi un file già corretto esce identico. In memoria c'è al massimo un record
+# (limitato da MAX_RECORD_CHARS): i record che non si riescono a ricostruire
+# (numero di campi sbagliato, virgolette mai chiuse) finiscono in quarantena
+# con le righe originali, e la lettura riprende dalla riga successiva.
+#
+#   python normalization/fondazione_pulizia_produzioni_virgolette.py
+#   python normalization/fondazione_pulizia_produzioni_virgolette.py export.csv pulito.csv --sep ';'
+
+INPUT_FILE = "dataset/fondazione/produzioni.csv"
+OUTPUT_FILE = "dataset/fondazione/produzioni_clean.csv"
+QUARANTINE_FILE = "dataset/fondazione/produzioni_quarantena.csv"
+
+SEP = ";"
+QUOTE = '"'
+# Un record oltre questa lunghezza è quasi certamente una virgoletta mai chiusa
+MAX_RECORD_CHARS = 1_000_000
+# Negli export Pimcore ogni record comincia con l'id numerico: se una riga così
+# arriva mentre un campo è ancora aperto, il record precedente era rotto
+RECORD_START = r"\d+{sep}"
+
+QUARANTINE_COLUMNS = ["riga_inizio", "riga_fine", "motivo", "testo"]
+
+# Stati dell'automa
+INIZIO_CAMPO, NON_QUOTATO, QUOTATO, VIRGOLETTA = range(4)
+
+
+class QuoteRepair:
+    """
+    Automa a stati sulle righe fisiche del file. feed(riga) restituisce la lista dei
+    campi quando il record è completo, None se il record continua sulla riga successiva.
+    """
+
+    def __init__(self, sep=SEP, quote=QUOTE):
+        self.sep = sep
+        self.quote = quote
+        # Fuori dalle virgolette interessano solo separatore, virgolette e fine riga
+        self.re_non_quotato = re.compile("[" + re.escape(sep + quote) + "\r\n]")
+        self.reset()
+
+    def reset(self):
+        self.fields = []
+        self.field = []
+        self.state = INIZIO_CAMPO
+        self.repairs = 0
+        self.size = 0
+
+    @property
+    def open(self):
+        """True se il record in corso è a metà (campo o riga non ancora chiusi)."""
+        return self.state != INIZIO_CAMPO or bool(self.fields) or bool(self.field)
+
+    def _end_field(self):
+        self.fields.append("".join(self.field))
+        self.field = []
+        self.state = INIZIO_CAMPO
+
+    def feed(self, line):
+        sep, quote = self.sep, self.quote
+        self.size += len(line)
+        i, n = 0, len(line)
+        while i < n:
+            c = line[i]
+            if self.state == QUOTATO:
+                # Salta in blocco fino alla prossima virgoletta (newline compresi)
+                j = line.find(quote, i)
+                if j < 0:
+                    self.field.append(line[i:])
+                    return None
+                self.field.append(line[i:j])
+                self.state = VIRGOLETTA
+                i = j + 1
+            elif self.state == VIRGOLETTA:
+                # Dopo una virgoletta in un campo quotato: escape, chiusura o errore
+                if c == quote:
+                    self.field.append(quote)
+                    self.state = QUOTATO
+                    i += 1
+                elif c == sep:
+                    self._end_field()
+                    i += 1
+                elif c in "\r\n":
+                    self._end_field()
+                    return self._end_record()
+                else:
+                    # Virgoletta non raddoppiata dentro il campo: è testo
+                    self.field.append(quote)
+                    self.state = QUOTATO
+                    self.repairs += 1
+            elif self.state == INIZIO_CAMPO and c == quote:
+                self.state = QUOTATO
+                i += 1
+            else:
+                # Campo non quotato (o appena iniziato): avanza fino al prossimo carattere utile
+                m = self.re_non_quotato.search(line, i)
+                j = m.start() if m else n
+                self.field.append(line[i:j])
+                self.state = NON_QUOTATO
+                i = j
+                if not m:
+                    break
+                c = line[j]
+                if c == sep:
+                    self._end_field()
+                    i += 1
+                elif c == quote:
+                    # Virgoletta in un campo non quotato: la si tiene, csv.writer riquota il campo
+                    self.field.append(quote)
+                    self.repairs += 1
+                    i += 1
+                else:
+                    self._end_field()
+                    return self._end_record()
+        if self.state == QUOTATO:
+            return None
+        # Riga senza terminatore (ultima del file)
+        if self.open:
+            self._end_field()
+            return self._end_record()
+        return None
+
+    def _end_record(self):
+        fields = self.fields
+        self.fields = []
+        self.field = []
+        self.state = INIZIO_CAMPO
+        self.size = 0
+        return fields
+
+
+def open_text(path):
+    """File locale oppure URL, letto come testo riga per riga (newline intatti)."""
+    if re.match(r"https?://", path):
+        return io.TextIOWrapper(urllib.request.urlopen(path), encoding="utf-8-sig", newline="")
+    return open(path, encoding="utf-8-sig", newline="")
+
+
+def repair_file(input_path, output_path, quarantine_path, sep=SEP, max_record_chars=MAX_RECORD_CHARS,
+                record_start=RECORD_START):
+    """
+    Ripara il CSV in streaming. Il numero di campi atteso è quello dell'intestazione.
+    Restituisce le statistiche (record scritti, riparati, in quarantena).
+    """
+    automa = QuoteRepair(sep=sep)
+    re_start = re.compile(record_start.format(sep=re.escape(sep))) if record_start else None
+    stats = {"righe": 0, "record": 0, "riparati": 0, "quarantena": 0}
+
+    with open_text(input_path) as src, \
+            open(output_path, "w", encoding="utf-8", newline="") as out, \
+            open(quarantine_path, "w", encoding="utf-8", newline="") as qfile:
+        writer = csv.writer(out, delimiter=sep, quotechar=QUOTE, lineterminator="\n")
+        quarantena = csv.writer(qfile, lineterminator="\n")
+        quarantena.writerow(QUARANTINE_COLUMNS)
+
+        n_campi = None
+        grezze = []  # righe originali del record in corso
+        inizio = 1
+
+        def scarta(fine, motivo):
+            quarantena.writerow([inizio, fine, motivo, "".join(grezze)])
+            stats["quarantena"] += 1
+
+        for numero, line in enumerate(src, 1):
+            stats["righe"] = numero
+
+            # Campo ancora aperto ma qui comincia chiaramente un nuovo record
+            if automa.open and re_start is not None and n_campi is not None and re_start.match(line):
+                scarta(numero - 1, "virgolette non chiuse")
+                automa.reset()
+                grezze = []
+            if not automa.open:
+                inizio = numero
+                grezze = []
+
+            grezze.append(line)
+            campi = automa.feed(line)
+
+            if campi is None:
+                if automa.size > max_record_chars:
+                    scarta(numero, f"record oltre {max_record_chars} caratteri")
+                    automa.reset()
+                    grezze = []
+                continue
+
+            if n_campi is None:
+                # Intestazione: fissa il numero di campi di ogni record
+                n_campi = len(campi)
+                writer.writerow(campi)
+            elif campi == [""]:
+                pass  # riga vuota
+            elif len(campi) != n_campi:
+                scarta(numero, f"{len(campi)} campi invece di {n_campi}")
+            else:
+                writer.writerow(campi)
+                stats["record"] += 1
+                stats["riparati"] += automa.repairs > 0
+            automa.repairs = 0
+            grezze = []
+
+        if automa.open:
+            scarta(stats["righe"], "virgolette non chiuse a fine file")
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ripara le virgolette di un export Pimcore in streaming.")
+    parser.add_argument("input", nargs="?", default=INPUT_FILE, help="CSV locale o URL")
+    parser.add_argument("output", nargs="?", default=OUTPUT_FILE)
+    parser.add_argument("--quarantine", default=QUARANTINE_FILE, help="Record non riparabili")
+    parser.add_argument("--sep", default=SEP)
+    parser.add_argument("--max-record-chars", type=int, default=MAX_RECORD_CHARS)
+    parser.add_argument("--record-start", default=RECORD_START,
+                        help="Regex dell'inizio di un record ({sep} = separatore); '' per disattivarla")
+    parser.add_argument("--force", action="store_true", help="Ignora la cache (common_cache.py)")
+    args = parser.parse_args()
+
+    # Cache solo per i file locali: di un URL non si può calcolare l'impronta
+    stage = None
+    if not re.match(r"https?://", args.input):
+        config = {"sep": args.sep, "max_record_chars": args.max_record_chars, "record_start": args.record_start}
+        stage = StageCache(__file__, inputs=[args.input], outputs=[args.output, args.quarantine],
+                           config=config, force=args.force)
+        if stage.fresh():
+            sys.exit(0)
+
+    print(f"Riparazione virgolette: {args.input}")
+    stats = repair_file(args.input, args.output, args.quarantine, sep=args.sep,
+                        max_record_chars=args.max_record_chars, record_start=args.record_start)
+
+    print(f"Righe lette: {stats['righe']}")
+    print(f"✅ Record scritti: {stats['record']} (di cui riparati: {stats['riparati']})")
+    if stats["quarantena"]:
+        print(f"⚠️  Record in quarantena: {stats['quarantena']} -> {args.quarantine}")
+    print(f"✔️ File pulito salvato in: {args.output}")
+
+    if stage is not None:
+        stage.save()
+
 
-# URL del file corrotto
-url = 'https://raw.githubusercontent.com/elena2notti/rpom/refs/heads/main/fondazione/produzioni.csv'
-output_file = 'produzioni_clean.csv'
-
-print(f"Scaricamento da {url}...")
-
-try:
-    # Usa urllib che è standard in Python (niente pip install)
-    with urllib.request.urlopen(url) as response:
-        # Leggi il contenuto come testo
-        content = response.read().decode('utf-8')
-        
-    print("File scaricato. Inizio pulizia...")
-    
-    # LA CORREZIONE:
-    # Il problema sono le virgolette doppie "" usate dentro un campo JSON ma non gestite bene.
-    # Le sostituiamo con un apice singolo ' per non rompere il CSV.
-    # Sostituiamo anche eventuali virgolette "escaped" male.
-    
-    # 1. Sostituisci le doppie virgolette interne con apice singolo
-    clean_content = content.replace('""', "'")
-    
-    # Salviamo il file pulito
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(clean_content)
-        
-    print(f"SUCCESSO! File salvato come: {output_file}")
-    print("ORA: Carica questo file su GitHub e copia il nuovo link nello script Neo4j,")
-    print("oppure, se usi Neo4j Desktop, metti questo file nella cartella 'import' del database.")
-
-except Exception as e:
-    print(f"Errore: {e}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -1,85 +1,75 @@
-import pandas as pd
 import os
+from common_cache import StageCache
+from common_edges import write_wide_view
+from common_gazetteer import GAZETTEER_FILE, MAPPINGS, VALUE_COLUMNS, assign_places, load_gazetteer, print_place_stats
+from common_ids import clean_id_columns
+from common_io import csv_to_parquet, read_table, strip_text, write_table
 
 # === CONFIGURAZIONE FONDAZIONE ===
-FILE_PRINCIPALE = "dataset/fondazione/Recite/recite_fixed_ids.csv"
-FILE_MAPPING = "dataset/fondazione/Recite/recite-fondazione_luoghi_qid.csv"
-OUTPUT_FILE = "dataset/fondazione/recite_fondazione_con_qid.csv"
+FILE_PRINCIPALE = "dataset/fondazione/Recite/recite_clean.csv"  # Una riga per recita
+FILE_EDGES = "dataset/fondazione/Recite/recite_edges_fixed_ids.csv"
+FILE_MAPPING = MAPPINGS["fondazione"]
+OUTPUT_FILE = "dataset/fondazione/recite_fondazione_qid.csv"
+# Formato wide senza colonne id_recita*, per semantic_graph/2_fondazione.py
+OUTPUT_WIDE = "dataset/fondazione/recite_fondazione_con_qid.csv"
+UNMATCHED_FILE = "dataset/fondazione/Recite/luoghi_senza_qid.csv"  # Luoghi senza QID, da completare nel mapping
 
 def main():
+    # === CACHE INCREMENTALE ===
+    # Il merge si rifà solo se cambiano recite, mapping o codice (vedi common_cache.py)
+    # Gazetteer condiviso: anche il mapping Regio può risolvere luoghi della Fondazione
+    stage = StageCache(__file__, inputs=[FILE_PRINCIPALE, FILE_EDGES, *MAPPINGS.values()],
+                       outputs=[OUTPUT_FILE, OUTPUT_WIDE, UNMATCHED_FILE])
+    if stage.fresh():
+        return
+
     print("--- 1. Caricamento file (Forzando Stringhe) ---")
     
     # 1. Carica file principale come stringa pura
     try:
-        df_main = pd.read_csv(FILE_PRINCIPALE, sep=',', dtype=str)
-        df_main = df_main.fillna("") # Rimuove subito i NaN
+        df_main = read_table(FILE_PRINCIPALE, categories=True)  # Parquet se aggiornato, altrimenti CSV; celle vuote già come ""
         print(f"File principale caricato: {len(df_main)} righe.")
     except FileNotFoundError:
         print(f"❌ Errore: Non trovo {FILE_PRINCIPALE}")
         return
 
-    # 2. Carica mapping come stringa pura
-    try:
-        df_map = pd.read_csv(FILE_MAPPING, sep=',', dtype=str)
-        df_map = df_map.fillna("") # Rimuove subito i NaN
-        print(f"File mapping caricato: {len(df_map)} luoghi unici.")
-    except FileNotFoundError:
-        print(f"❌ Errore: Non trovo {FILE_MAPPING}")
-        return
+    # 2. Gazetteer dei luoghi (mapping Regio + Fondazione, ricostruito solo se cambiato)
+    gaz = load_gazetteer()
+    if not os.path.exists(FILE_MAPPING):
+        print(f"⚠️  Non trovo {FILE_MAPPING}: uso solo il resto del gazetteer.")
+    print(f"Gazetteer caricato: {len(gaz)} luoghi ({GAZETTEER_FILE}).")
 
     # === PULIZIA CHIAVI DI JOIN (Trim spazi) ===
-    # Fondamentale per far funzionare il merge
-    df_main['edificio_nome'] = df_main['edificio_nome'].str.strip()
-    df_main['luogo_nome'] = df_main['luogo_nome'].str.strip()
-    
-    df_map['edificio_nome'] = df_map['edificio_nome'].str.strip()
-    df_map['luogo_nome'] = df_map['luogo_nome'].str.strip()
+    # Le colonne in uscita restano quelle originali (solo senza spazi ai bordi);
+    # il confronto avviene sulla chiave normalizzata del gazetteer
+    df_main['edificio_nome'] = strip_text(df_main['edificio_nome'])
+    df_main['luogo_nome'] = strip_text(df_main['luogo_nome'])
 
-    # === DIAGNOSTICA VELOCE ===
-    print("\n--- DIAGNOSTICA ---")
-    match_edifici = set(df_main['edificio_nome']).intersection(set(df_map['edificio_nome']))
-    print(f"Edifici in comune: {len(match_edifici)}")
-    
-    # === 2. PREPARAZIONE MAPPING ===
-    # Rimuovi duplicati nel mapping
-    df_map_clean = df_map.drop_duplicates(subset=['edificio_nome', 'luogo_nome'])
-    
-    # Seleziona colonne (assumiamo che nel mapping ci siano 'entity' e 'uri' per i QID)
-    cols_to_use = ['edificio_nome', 'luogo_nome', 'entity', 'uri']
-    # Filtriamo solo quelle che esistono davvero nel file
-    cols_actual = [c for c in cols_to_use if c in df_map_clean.columns]
-    df_map_clean = df_map_clean[cols_actual]
-
-    # === 3. UNIONE (Merge) ===
-    print("\n--- 3. Unione (Merge) ---")
-    
-    df_final = pd.merge(
-        df_main, 
-        df_map_clean, 
-        on=['edificio_nome', 'luogo_nome'], 
-        how='left',
-        suffixes=('', '_mapping') # Se ci sono collisioni
-    )
-
-    matches = df_final['entity'].notna().sum() if 'entity' in df_final.columns else 0
-    # Nota: se entity è stringa vuota invece di NaN, dobbiamo contare diversamente
-    if 'entity' in df_final.columns:
-         matches = df_final[df_final['entity'] != ""].shape[0]
+    # === 3. ASSEGNAZIONE QID (join per codici sulle coppie distinte) ===
+    print("\n--- 3. Assegnazione QID dal gazetteer ---")
+    df_final, report = assign_places(df_main, gaz, "fondazione")
+    print_place_stats(df_final, report)
 
-    print(f"✅ Recite arricchite con QID: {matches}")
+    write_table(report, UNMATCHED_FILE)
+    print(f"Report luoghi senza QID: {UNMATCHED_FILE}")
 
     # === 4. PULIZIA FINALE KILLER (.0) E SALVATAGGIO ===
     print("\n--- 4. Pulizia Float e Salvataggio ---")
     
-    # Questo ciclo rimuove .0 da TUTTE le colonne, sia vecchie che nuove
-    for col in df_final.columns:
-        df_final[col] = df_final[col].astype(str).replace('nan', '').replace(r'\.0$', '', regex=True)
+    # Rimuove .0 solo dalle colonne ID, in modo vettoriale (vedi common_ids.py)
+    df_final = clean_id_columns(df_final)
 
     # Crea cartella
     os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
     
-    df_final.to_csv(OUTPUT_FILE, index=False)
+    write_table(df_final, OUTPUT_FILE)
     print(f"Finito! File salvato: {OUTPUT_FILE}")
 
+    # === 5. VISTA WIDE PER L'RDF ===
+    righe = write_wide_view(OUTPUT_FILE, FILE_EDGES, OUTPUT_WIDE, keep_recita_ids=False, extra_columns=VALUE_COLUMNS)
+    csv_to_parquet(OUTPUT_WIDE)
+    print(f"Vista wide: {OUTPUT_WIDE} ({righe} righe)")
+    stage.save()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
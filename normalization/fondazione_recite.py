@@ -1,8 +1,13 @@
+import argparse
 import pandas as pd
-import json
-import re
-from ast import literal_eval
 import numpy as np 
+from concurrent.futures import ProcessPoolExecutor
+from common_cache import StageCache
+from common_edges import build_edges, wide_view, WIDE_BASE_COLUMNS
+from common_ids import clean_id, clean_id_columns, clean_id_series, read_csv_str
+from common_io import categorize, write_table
+from common_json import merge_parse_stats, parse_cell, print_parse_report, take_parse_stats
+from common_paths import last_label_id, path_label_fondazione
 
 # === CONFIG ===
 # Adatta questi percorsi al tuo ambiente
@@ -12,6 +17,15 @@ OUTPUT_INTERPRETI = "dataset/fondazione/Recite/recite_interpreti.csv"
 OUTPUT_CURATORI = "dataset/fondazione/Recite/recite_curatori.csv"
 OUTPUT_ESECUTORI = "dataset/fondazione/Recite/recite_esecutori.csv"
 OUTPUT_FINAL = "dataset/fondazione/recite.csv"
+OUTPUT_EDGES = "dataset/fondazione/Recite/recite_edges.csv"
+
+# Formato di uscita:
+#   "long" -> recite (OUTPUT_MAIN) + edge list (OUTPUT_EDGES), una riga per (recita, relazione, entità)
+#   "wide" -> solo il file finale storico con il prodotto cartesiano (OUTPUT_FINAL)
+#   "both" -> entrambi
+# Riconciliazione, QID e import leggono il formato lungo; la vista wide con QID per
+# il builder RDF la scrive fondazione_qid_luoghi_fondazione.py (vedi common_edges.py)
+OUTPUT_FORMAT = "long"
 
 # Nomi delle nuove colonne nel CSV adattato
 COL_FULLPATH = "fullpath"
@@ -21,74 +35,37 @@ COL_PERSONE = "Persone"
 COL_ENTI = "Enti"
 COL_OPERE_MUSICALI = "operemusicali_collegate"
 
+# Esecuzione parallela: le recite vengono divise in blocchi di CHUNK_ROWS righe e
+# ogni blocco attraversa tutta la pipeline in un processo separato (--workers N)
+WORKERS = 1
+CHUNK_ROWS = 2000
+
+COLS_INTERPRETI = ["id_recita", "personaggio", "personaggio_voce", "interprete", "interprete_id", "ruolo"]
+COLS_CURATORI = ["id_recita", "curatore_nome", "curatore_id", "curatore_ruolo"]
+COLS_ESECUTORI = ["id_recita", "esecutore_nome", "esecutore_id", "esecutore_ruolo"]
+MAIN_COLS = [
+    "id", "titolo_breve", "production_id", COL_DC_TITLE, "from", "to", "datetext",
+    "luogo_nome", "luogo_id", "edificio_nome", "edificio_id",
+    "composizione_nome", "composizione_id", COL_FULLPATH
+]
+
 
 # === FUNZIONI ===
 
-def clean_id(value):
-    """
-    Rimuove .0 e pulisce gli ID
-    """
-    if pd.isna(value) or value == "" or str(value).lower() == "nan":
-        return ""
-    s = str(value).strip()
-    if s.endswith(".0"):
-        return s[:-2]
-    return s
-
-def fix_name_format(name):
+def fix_name_format(names):
     """
-    NUOVA FUNZIONE: Converte 'Cognome, Nome' in 'Nome Cognome'.
+    Converte 'Cognome, Nome' in 'Nome Cognome' su una colonna intera.
     Es: 'Brown, Antonia' -> 'Antonia Brown'
     Es: 'Neschling, John' -> 'John Neschling'
     """
-    if pd.isna(name) or not isinstance(name, str):
-        return name
-    
-    # Se c'è una virgola, provo a splittare
-    if ',' in name:
-        parts = name.split(',', 1)
-        # Se ho esattamente due parti (Cognome e Nome)
-        if len(parts) == 2:
-            cognome = parts[0].strip()
-            nome = parts[1].strip()
-            return f"{nome} {cognome}"
-            
-    return name
-
-def try_parse_json(value):
-    if pd.isna(value) or not isinstance(value, str) or not value.strip():
-        return None
-    try:
-        return json.loads(value)
-    except json.JSONDecodeError:
-        try:
-            return literal_eval(value)
-        except Exception:
-            return None
-
-def extract_path_label(value, col_title):
-    if pd.isna(value):
-        return col_title if not pd.isna(col_title) else None
-    s = str(value).strip()
-    match = re.search(r"/([^/]+)\s*\(\d+\)$", s)
-    if match:
-        label = match.group(1).strip()
-        date_match = re.match(r"^\d{2}-\d{2}-\d{4}\s+(.*)$", label)
-        return date_match.group(1).strip() if date_match else label
-    return col_title if not pd.isna(col_title) else None
-
-def extract_production_id(fullpath):
-    return None
-
-def extract_composizione(value):
-    if pd.isna(value):
-        return None, None
-    s = str(value).strip()
-    last_seg = s.rsplit('/', 1)[-1]
-    m = re.match(r"^(.*)\s*\((\d+)\)\s*$", last_seg)
-    if m:
-        return m.group(1).strip(), clean_id(m.group(2))
-    return last_seg.strip(), None
+    # Come prima: si spezza solo alla prima virgola, i valori senza virgola restano
+    virgola = names.str.contains(",", regex=False, na=False)
+    if not virgola.any():
+        return names
+    parti = names[virgola].str.split(",", n=1, expand=True)
+    out = names.copy()
+    out[virgola] = parti[1].str.strip() + " " + parti[0].str.strip()
+    return out
 
 def parse_luoghi(json_data):
     luogo_nome, luogo_id = None, None
@@ -147,134 +124,173 @@ def parse_enti(json_data):
     return esecutori
 
 
-print("Lettura file originale...")
-try:
-    df = pd.read_csv(INPUT, encoding='utf-8', sep=';', dtype=str)
-except UnicodeDecodeError:
+def read_input():
     try:
-        df = pd.read_csv(INPUT, encoding='latin1', sep=';', dtype=str)
-    except Exception as e:
-        print(f"ERRORE GRAVE: {e}")
+        df = read_csv_str(INPUT, encoding='utf-8', sep=';')
+    except UnicodeDecodeError:
+        try:
+            df = read_csv_str(INPUT, encoding='latin1', sep=';')
+        except Exception as e:
+            print(f"ERRORE GRAVE: {e}")
+            exit()
+    except FileNotFoundError:
+        print(f"ERRORE: File non trovato: {INPUT}")
         exit()
-except FileNotFoundError:
-    print(f"ERRORE: File non trovato: {INPUT}")
-    exit()
-
-df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
-df.columns = df.columns.str.strip()
-
-
-print("Conversione colonne JSON...")
-df[COL_LUOGHI] = df[COL_LUOGHI].apply(try_parse_json)
-df[COL_PERSONE] = df[COL_PERSONE].apply(try_parse_json)
-df[COL_ENTI] = df[COL_ENTI].apply(try_parse_json)
-
-
-print("Estrazione metadati...")
-df["titolo_breve"] = df.apply(lambda row: extract_path_label(row[COL_FULLPATH], row[COL_DC_TITLE]), axis=1)
-df["production_id"] = df[COL_FULLPATH].apply(extract_production_id)
-
-luoghi_data = df[COL_LUOGHI].apply(lambda x: pd.Series(parse_luoghi(x), index=["luogo_nome", "luogo_id", "edificio_nome", "edificio_id"]))
-df = pd.concat([df, luoghi_data], axis=1)
-
-composizione_data = df[COL_OPERE_MUSICALI].apply(lambda x: pd.Series(extract_composizione(x), index=["composizione_nome", "composizione_id"]))
-df = pd.concat([df, composizione_data], axis=1)
 
+    df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
+    df.columns = df.columns.str.strip()
+    return df
 
-print("Parsing Persone...")
-interpreti_rows = []
-curatori_rows = []
 
-for _, row in df.iterrows():
-    interpreti_list, curatori_list = parse_persone(row[COL_PERSONE])
-    id_recita = clean_id(row["id"])
-    
-    for p_nome, p_voce, interp, pid, rel in interpreti_list:
-        interpreti_rows.append({
-            "id_recita": id_recita,
-            "personaggio": p_nome,
-            "personaggio_voce": p_voce, 
-            "interprete": interp,
-            "interprete_id": pid,
-            "ruolo": rel
-        })
-
-    for nome, pid, ruolo in curatori_list:
-        curatori_rows.append({
-            "id_recita": id_recita,
-            "curatore_nome": nome,
-            "curatore_id": pid,
-            "curatore_ruolo": ruolo
-        })
-        
-df_interpreti = pd.DataFrame(interpreti_rows)
-df_curatori = pd.DataFrame(curatori_rows)
-
-# === FIX FORMATO NOMI (Cognome, Nome -> Nome Cognome) ===
-print("Correzione formato nomi (Cognome, Nome -> Nome Cognome)...")
-if not df_interpreti.empty and 'interprete' in df_interpreti.columns:
-    df_interpreti['interprete'] = df_interpreti['interprete'].apply(fix_name_format)
-
-if not df_curatori.empty and 'curatore_nome' in df_curatori.columns:
-    df_curatori['curatore_nome'] = df_curatori['curatore_nome'].apply(fix_name_format)
-
-
-print("Parsing Enti...")
-esecutori_rows = []
-for _, row in df.iterrows():
-    id_recita = clean_id(row["id"])
-    esecutori_list = parse_enti(row[COL_ENTI])
-    for nome, pid, ruolo in esecutori_list:
-        esecutori_rows.append({
-            "id_recita": id_recita,
-            "esecutore_nome": nome,
-            "esecutore_id": pid,
-            "esecutore_ruolo": ruolo 
-        })
-df_esecutori = pd.DataFrame(esecutori_rows)
-
-
-print("Salvataggio file intermedi...")
-main_cols = [
-    "id", "titolo_breve", "production_id", COL_DC_TITLE, "from", "to", "datetext",
-    "luogo_nome", "luogo_id", "edificio_nome", "edificio_id",
-    "composizione_nome", "composizione_id", COL_FULLPATH
-]
-df_main_out = df[main_cols].copy()
-
-for col in df_main_out.columns:
-    df_main_out[col] = df_main_out[col].astype(str).replace(r'\.0$', '', regex=True).replace('nan', '')
-
-df_main_out.to_csv(OUTPUT_MAIN, index=False)
-df_interpreti.to_csv(OUTPUT_INTERPRETI, index=False)
-df_curatori.to_csv(OUTPUT_CURATORI, index=False)
-df_esecutori.to_csv(OUTPUT_ESECUTORI, index=False)
-
-
-# === MERGE FINALE ===
-print("Creazione file finale unificato...")
-df_base = df[[
-    "id", "titolo_breve", "production_id", "from", "to", "datetext",   
-    "luogo_nome", "luogo_id", "edificio_nome", "edificio_id",
-    "composizione_nome", "composizione_id", COL_FULLPATH
-]].copy()
-
-final = (
-    df_base
-    .merge(df_curatori, left_on="id", right_on="id_recita", how="left")
-    .merge(df_esecutori, left_on="id", right_on="id_recita", how="left", suffixes=("", "_esecutore"))
-    .merge(df_interpreti, left_on="id", right_on="id_recita", how="left", suffixes=("_curatore", "_interprete"))
-)
-
-final = final.drop(columns=['id_recita_curatore', 'id_recita_esecutore', 'id_recita_interprete'], errors='ignore')
-
-# === FIX FINALE PER RIMUOVERE FLOAT (.0) ===
-print("Pulizia finale di tutti i campi...")
-for col in final.columns:
-    final[col] = final[col].astype(str).replace('nan', '').replace(r'\.0$', '', regex=True)
-
-# === SALVATAGGIO ===
-final.to_csv(OUTPUT_FINAL, index=False)
-
-print("Processo completato.")
-print(f" - File finale: {OUTPUT_FINAL}")
\ No newline at end of file
+def parse_figli(df):
+    """
+    Un solo passaggio sulle colonne Persone ed Enti (già parsate), come parse_figli
+    in regio_recita.py: niente iterrows e niente Series per riga.
+    """
+    interpreti_rows, curatori_rows, esecutori_rows = [], [], []
+    for id_recita, persone, enti in zip(df["id"], df[COL_PERSONE], df[COL_ENTI]):
+        interpreti_list, curatori_list = parse_persone(persone)
+        for p_nome, p_voce, interp, pid, rel in interpreti_list:
+            interpreti_rows.append((id_recita, p_nome, p_voce, interp, pid, rel))
+        for nome, pid, ruolo in curatori_list:
+            curatori_rows.append((id_recita, nome, pid, ruolo))
+        for nome, pid, ruolo in parse_enti(enti):
+            esecutori_rows.append((id_recita, nome, pid, ruolo))
+
+    # Colonne esplicite: anche senza righe i frame restano "mergiabili"
+    return (
+        pd.DataFrame(interpreti_rows, columns=COLS_INTERPRETI),
+        pd.DataFrame(curatori_rows, columns=COLS_CURATORI),
+        pd.DataFrame(esecutori_rows, columns=COLS_ESECUTORI),
+    )
+
+
+def process_chunk(df):
+    """
+    Pipeline completa su un blocco di recite: JSON, metadati, persone ed enti.
+    Le righe sono indipendenti, quindi ogni blocco può girare in un processo separato.
+    Restituisce (recite, interpreti, curatori, esecutori, statistiche di parsing).
+    """
+    df = df.copy()
+    # ID della recita pulito una volta sola: è la chiave di edge list e vista wide
+    df["id"] = clean_id_series(df["id"])
+
+    # Celle identiche vengono parsate una volta sola (gli oggetti sono condivisi: solo lettura)
+    for col in [COL_LUOGHI, COL_PERSONE, COL_ENTI]:
+        df[col] = df[col].map(lambda v, col=col: parse_cell(v, col))
+
+    # --- Metadati ---
+    df["titolo_breve"] = path_label_fondazione(df[COL_FULLPATH], df[COL_DC_TITLE])
+    # Il fullpath Fondazione non contiene la produzione
+    df["production_id"] = None
+
+    cols_luoghi = ["luogo_nome", "luogo_id", "edificio_nome", "edificio_id"]
+    luoghi_data = pd.DataFrame([parse_luoghi(x) for x in df[COL_LUOGHI]], columns=cols_luoghi, index=df.index)
+    df = pd.concat([df, luoghi_data], axis=1)
+
+    composizione_data = last_label_id(df[COL_OPERE_MUSICALI])
+    df["composizione_nome"] = composizione_data["label"]
+    df["composizione_id"] = composizione_data["id"]
+
+    # --- Persone ed enti ---
+    df_interpreti, df_curatori, df_esecutori = parse_figli(df)
+
+    # === FIX FORMATO NOMI (Cognome, Nome -> Nome Cognome) ===
+    df_interpreti["interprete"] = fix_name_format(df_interpreti["interprete"])
+    df_curatori["curatore_nome"] = fix_name_format(df_curatori["curatore_nome"])
+
+    # Solo le colonne che servono dopo: meno dati da rimandare al processo principale
+    return df[MAIN_COLS], df_interpreti, df_curatori, df_esecutori, take_parse_stats()
+
+
+def split_rows(df, size):
+    """Blocchi consecutivi di al massimo size righe, nell'ordine del file."""
+    return [df.iloc[i:i + size] for i in range(0, len(df), size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalizzazione recite Fondazione I Teatri.")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="Processi paralleli (1 = tutto nel processo principale)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_ROWS,
+                        help="Righe per blocco di lavoro")
+    parser.add_argument("--force", action="store_true",
+                        help="Rielabora anche se input, codice e configurazione non sono cambiati")
+    args = parser.parse_args()
+
+    # === CACHE INCREMENTALE ===
+    # Processi e dimensione dei blocchi non cambiano il risultato: non entrano nell'impronta
+    outputs = [OUTPUT_MAIN, OUTPUT_INTERPRETI, OUTPUT_CURATORI, OUTPUT_ESECUTORI]
+    if OUTPUT_FORMAT in ("long", "both"):
+        outputs.append(OUTPUT_EDGES)
+    if OUTPUT_FORMAT in ("wide", "both"):
+        outputs.append(OUTPUT_FINAL)
+    stage = StageCache(__file__, inputs=[INPUT], outputs=outputs,
+                       config={"OUTPUT_FORMAT": OUTPUT_FORMAT}, force=args.force)
+    if stage.fresh():
+        return
+
+    print("Lettura file originale...")
+    df = read_input()
+
+    chunks = split_rows(df, max(1, args.chunk_size))
+    print(f"Elaborazione di {len(df)} recite in {len(chunks)} blocchi con {args.workers} processi...")
+
+    # map restituisce i risultati nell'ordine dei blocchi: l'output non dipende dai processi
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(process_chunk, chunks))
+    else:
+        results = [process_chunk(c) for c in chunks]
+
+    parti_main, parti_int, parti_cur, parti_ese, stats = zip(*results) if results else ([], [], [], [], [])
+    df_main = pd.concat(parti_main, ignore_index=True) if parti_main else pd.DataFrame(columns=MAIN_COLS)
+    df_interpreti = pd.concat(parti_int, ignore_index=True) if parti_int else pd.DataFrame(columns=COLS_INTERPRETI)
+    df_curatori = pd.concat(parti_cur, ignore_index=True) if parti_cur else pd.DataFrame(columns=COLS_CURATORI)
+    df_esecutori = pd.concat(parti_ese, ignore_index=True) if parti_ese else pd.DataFrame(columns=COLS_ESECUTORI)
+    for s in stats:
+        merge_parse_stats(s)
+
+    # Ruoli, voci, luoghi e titoli codificati a dizionario dopo la concat (blocchi con
+    # categorie diverse tornerebbero object): restano category fino alla scrittura
+    for frame in (df_main, df_interpreti, df_curatori, df_esecutori):
+        categorize(frame)
+    print_parse_report()
+
+    print("Salvataggio file intermedi...")
+    df_main_out = clean_id_columns(df_main.copy())
+
+    # CSV + gemello parquet tipizzato (vedi common_io.py)
+    write_table(df_main_out, OUTPUT_MAIN)
+    write_table(df_interpreti, OUTPUT_INTERPRETI)
+    write_table(df_curatori, OUTPUT_CURATORI)
+    write_table(df_esecutori, OUTPUT_ESECUTORI)
+
+    # === EDGE LIST (FORMATO LUNGO) ===
+    df_edges = build_edges(df_curatori, df_esecutori, df_interpreti, ordine_recite=df_main["id"])
+
+    if OUTPUT_FORMAT in ("long", "both"):
+        print("Salvataggio edge list...")
+        edges_out = clean_id_columns(df_edges.copy())
+        write_table(edges_out, OUTPUT_EDGES)
+        print(f" - Edge list: {OUTPUT_EDGES} ({len(edges_out)} righe)")
+
+    if OUTPUT_FORMAT in ("wide", "both"):
+        # === VISTA WIDE (MERGE FINALE) ===
+        print("Creazione file finale unificato...")
+        final = wide_view(df_main[WIDE_BASE_COLUMNS], df_edges, keep_recita_ids=False)
+
+        # === PULIZIA ID (.0) ===
+        # Solo le colonne ID, in modo vettoriale (vedi common_ids.py)
+        final = clean_id_columns(final)
+
+        # === SALVATAGGIO ===
+        write_table(final, OUTPUT_FINAL)
+        print(f" - File finale: {OUTPUT_FINAL}")
+
+    stage.save()
+    print("Processo completato.")
+
+
+if __name__ == "__main__":
+    main()
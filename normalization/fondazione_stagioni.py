@@ -1,9 +1,15 @@
 import pandas as pd
-import re
+import sys
+from common_cache import StageCache
+from common_ids import clean_id_series
+from common_io import write_table
+from common_paths import exploded_ids
 
 
 INPUT_CSV = "dataset/fondazione/Stagioni/20251124-export-stagioni-teatri-reggioemilia.csv"
 OUTPUT_CSV = "dataset/fondazione/stagioni.csv"
+# Formato lungo: una riga per (stagione, relazione, entità collegata)
+OUTPUT_LINKS = "dataset/fondazione/stagioni_links.csv"
 
 COLONNE_DA_PULIRE = [
     "produzioni_collegate",
@@ -14,18 +20,25 @@ COLONNE_DA_PULIRE = [
     "luoghi_collegati"
 ]
 
-def estrai_id(cella):
-    """
-    Estrae tutti gli ID nel formato (12345)
-    e restituisce una stringa "12345, 67890".
-    """
-    if not isinstance(cella, str):
-        return ""
+# Colonna collegata -> valore di "relazione" nella tabella link
+RELAZIONI = {
+    "produzioni_collegate": "produzione",
+    "manifestazioni_recite_concerti_collegati": "recita",
+    "operemusicali_collegate": "opera",
+    "persone_collegate": "persona",
+    "enti_collegati": "ente",
+    "luoghi_collegati": "luogo",
+}
 
-    ids = re.findall(r'\((\d+)\)', cella)
-    return ", ".join(ids)
+LINK_COLUMNS = ["season_id", "relazione", "entita_id"]
 
 
+# Rielabora solo se l'export delle stagioni o l'elenco colonne cambiano (vedi common_cache.py)
+stage = StageCache(__file__, inputs=[INPUT_CSV], outputs=[OUTPUT_CSV, OUTPUT_LINKS],
+                   config={"COLONNE_DA_PULIRE": COLONNE_DA_PULIRE, "RELAZIONI": RELAZIONI})
+if stage.fresh():
+    sys.exit(0)
+
 df = pd.read_csv(
     INPUT_CSV,
     sep=";",          # separatore corretto
@@ -34,14 +47,33 @@ df = pd.read_csv(
     on_bad_lines="skip"  # evita crash se ci sono righe rotte
 )
 
-# Per ogni colonna target creo una versione pulita con solo ID
+season_ids = clean_id_series(df["id"])
+
+# Per ogni colonna target: tutti gli ID "(12345)" estratti in un colpo solo con
+# extractall (una riga per ID), da cui derivano sia la tabella link sia la
+# vecchia colonna "12345, 67890" che resta per compatibilità
+parti = []
 for col in COLONNE_DA_PULIRE:
     if col in df.columns:
+        ids = exploded_ids(df[col])
+        parti.append(pd.DataFrame({
+            "season_id": season_ids.loc[ids.index].to_numpy(),
+            "relazione": RELAZIONI[col],
+            "entita_id": ids.to_numpy(),
+        }, columns=LINK_COLUMNS))
+
         nuova_colonna = col + "_id"
-        df[nuova_colonna] = df[col].apply(estrai_id)
+        df[nuova_colonna] = ids.groupby(level=0).agg(", ".join).reindex(df.index, fill_value="")
         print(f"Creata colonna: {nuova_colonna}")
     else:
         print(f"Colonna non trovata nel dataset: {col}")
 
-df.to_csv(OUTPUT_CSV, index=False, encoding="utf-8")
+df_links = pd.concat(parti, ignore_index=True) if parti else pd.DataFrame(columns=LINK_COLUMNS)
+df_links = df_links[df_links["season_id"] != ""].drop_duplicates(ignore_index=True)
+
+write_table(df, OUTPUT_CSV)  # CSV + gemello parquet, come le altre fasi
 print(f"\nFile pulito salvato in: {OUTPUT_CSV}")
+write_table(df_links, OUTPUT_LINKS)
+print(f"Tabella link salvata in: {OUTPUT_LINKS} ({len(df_links)} righe)")
+print(df_links["relazione"].value_counts().to_string())
+stage.save()
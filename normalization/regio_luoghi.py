@@ -1,15 +1,22 @@
-import pandas as pd
+from common_cache import StageCache
+from common_io import read_table
 
 # === CONFIGURAZIONE ===
-INPUT_FILE = 'dataset/regio/recite_regio_final.csv'  # Sostituisci con il nome del tuo file
-OUTPUT_FILE = 'dataset/regio/Recite/recite_regio_luoghi.csv'
+INPUT_FILE = 'dataset/regio/recite/recite_regio_clean.csv'  # Una riga per recita: stessi luoghi del file wide, molte meno righe
+OUTPUT_FILE = 'dataset/regio/recite/recite_regio_luoghi.csv'
 
 def main():
+    # Niente da rifare se il file delle recite non è cambiato (vedi common_cache.py)
+    stage = StageCache(__file__, inputs=[INPUT_FILE], outputs=[OUTPUT_FILE])
+    if stage.fresh():
+        return
+
     print(f"Lettura del file: {INPUT_FILE}...")
     
     try:
-        # Legge il CSV (assume separatore virgola, cambia se necessario)
-        df = pd.read_csv(INPUT_FILE)
+        # Legge il CSV (assume separatore virgola, cambia se necessario);
+        # edificio e luogo arrivano come category: pochi valori su tutte le righe
+        df = read_table(INPUT_FILE, na=True, categories=True)
         
         # Verifica che le colonne esistano
         if 'edificio_nome' not in df.columns or 'luogo_nome' not in df.columns:
@@ -23,10 +30,12 @@ def main():
         teatri = teatri.dropna(subset=['edificio_nome'])
         
         # 3. Rimuove i duplicati per avere una lista unica
-        teatri_unici = teatri.drop_duplicates().sort_values(by=['luogo_nome', 'edificio_nome'])
+        # (di nuovo stringhe solo dopo il dedup: l'ordine è quello alfabetico, non delle categorie)
+        teatri_unici = teatri.drop_duplicates().astype(object).sort_values(by=['luogo_nome', 'edificio_nome'])
 
         # 4. Salva il risultato
         teatri_unici.to_csv(OUTPUT_FILE, index=False)
+        stage.save()
         
         print(f"Fatto! Estratti {len(teatri_unici)} teatri unici.")
         print(f"File salvato come: {OUTPUT_FILE}")
@@ -1,7 +1,8 @@
 import pandas as pd
-import re
 from pathlib import Path
-import math
+import sys
+from common_cache import StageCache
+from common_dates import years_from_datetext
 
 # ================================================================
 # 1. CONFIGURAZIONE
@@ -15,47 +16,14 @@ CSV_OUTPUT_PATH = Path("dataset/regio_opere_pulito_con_anno.csv")
 NOME_COLONNA_ANNO = 'Anno'
 
 # ================================================================
-# 2. FUNZIONI DI PULIZIA
+# 2. ESECUZIONE
 # ================================================================
 
-def clean_year_from_datetext(datetext_value):
-    """
-    Estrae l'anno finale dalla stringa 'datetext' e lo pulisce.
-    
-    Esempio: "01-01-1830 - 31-12-1830" -> estrae "31-12-1830" -> restituisce "1830"
-    """
-    if pd.isna(datetext_value) or datetext_value is None:
-        return None
-        
-    s = str(datetext_value).strip()
-    
-    # 1. Trova l'ultima data: il separatore è spesso un trattino ('-')
-    # La logica è prendere l'ultimo blocco dopo l'ultimo separatore (es. ' - ')
-    parts = s.split('-')
-    
-    # Se ci sono più di due parti, assumiamo che l'ultima parte contenga l'anno finale completo
-    # Esempio: "01-01-1830 - 31-12-1830"
-    if len(parts) >= 2:
-        
-        # Prendiamo l'ultima data completa (es. "31-12-1830")
-        # Questa data è generalmente l'ultima nell'intervallo
-        last_date_str = s.split(' - ')[-1].strip()
-        
-        # 2. Estrai l'anno (i quattro numeri alla fine della data)
-        match = re.search(r'(\d{4})$', last_date_str)
-        if match:
-            # L'anno pulito
-            year = match.group(1)
-            
-            # Pulisci ID numerici (come nella tua funzione clean_id)
-            if year.endswith(".0"): year = year[:-2]
-            return year
-
-    return None # Restituisce None se non trova un pattern valido
-
-# ================================================================
-# 3. ESECUZIONE
-# ================================================================
+# Se CSV e codice non sono cambiati il file con l'anno è già quello giusto (vedi common_cache.py)
+stage = StageCache(__file__, inputs=[CSV_INPUT_PATH], outputs=[CSV_OUTPUT_PATH],
+                   config={"NOME_COLONNA_ANNO": NOME_COLONNA_ANNO})
+if stage.fresh():
+    sys.exit(0)
 
 try:
     # Caricamento del dataset
@@ -79,8 +47,9 @@ except Exception as e:
 # --- APPLICAZIONE DELLA FUNZIONE DI PULIZIA ---
 print(f"Inizio pulizia e creazione colonna '{NOME_COLONNA_ANNO}'...")
 
-# Applica la funzione alla colonna 'datetext'
-df[NOME_COLONNA_ANNO] = df['datetext'].apply(clean_year_from_datetext)
+# Anno finale del 'datetext' ("01-01-1830 - 31-12-1830" -> "1830"), calcolato
+# una volta per valore distinto (vedi common_dates.py)
+df[NOME_COLONNA_ANNO] = years_from_datetext(df['datetext'])
 
 # Verifica dei primi valori per l'anno pulito
 print("\nAnteprima dei dati puliti:")
@@ -91,6 +60,7 @@ print(df[['datetext', NOME_COLONNA_ANNO]].head().to_markdown(index=False))
 # e la nuova colonna 'Anno' viene aggiunta in fondo.
 CSV_OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
 df.to_csv(CSV_OUTPUT_PATH, index=False, encoding='utf-8')
+stage.save()
 
 print("\n--- Risultato ---")
 print(f"✅ Pulizia completata. File salvato in: {CSV_OUTPUT_PATH}")
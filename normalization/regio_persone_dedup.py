@@ -0,0 +1,100 @@
+import pandas as pd
+import sys
+from common_cache import StageCache
+from common_io import read_table, write_table
+
+# ================================================================
+# PERSONE REGIO: UNA RIGA PER person_id
+# ================================================================
+# Il master delle persone ripete lo stesso person_id su più righe: una per
+# ogni VIAF (e l'arricchimento Wikidata moltiplica allo stesso modo). Ogni
+# consumatore (MERGE in 1_cypher_regio.py, iterrows in 1_regio.py, id_map
+# della riconciliazione) rielaborava tutti i duplicati. Qui ogni persona
+# diventa un solo record: i campi a più valori (VIAF, occupazioni) diventano
+# liste "a;b;c" delle celle distinte, gli altri tengono il primo valore non vuoto.
+# Il separatore è ";" e non "|": le celle delle occupazioni sono già elenchi
+# "composer|compositore|..." e con lo stesso separatore non si saprebbe più
+# dove finisce una cella e ne comincia un'altra.
+
+INPUT_FILE = "dataset/regio/regio_persone.csv"
+OUTPUT_FILE = "dataset/regio/regio_persone_dedup.csv"
+# Persone con valori diversi in un campo singolo (date e luoghi di nascita/morte...):
+# nell'output resta il primo non vuoto, qui ci sono tutti per la revisione
+CONFLICTS_FILE = "dataset/regio/regio_persone_dedup_conflitti.csv"
+
+KEY = "person_id"
+CONFLICT_COLUMNS = [KEY, "campo", "valore_tenuto", "valori", "righe"]
+# Campi a più valori, uniti (nell'ordine di prima comparsa) con SEP.
+# Nessuna cella del master contiene ";" (i VIAF sono numeri, le occupazioni usano "|")
+MULTI_COLUMNS = ["viaf", "occupation"]
+SEP = ";"
+# Indice residuo di un vecchio merge, non letto da nessuno
+DROP_COLUMNS = ["Column"]
+
+
+def distinct_values(df, col):
+    """
+    Celle distinte e non vuote per persona, unite con SEP. Le celle già "a|b"
+    (occupazioni inglese|italiano) restano intere: SEP separa solo le celle.
+    """
+    valori = df[[KEY, col]].assign(**{col: df[col].str.strip()})
+    valori = valori[valori[col].notna() & (valori[col] != "")].drop_duplicates()
+    return valori.groupby(KEY, sort=False)[col].agg(SEP.join)
+
+
+# Master invariato -> record unici già scritti (vedi common_cache.py, --force per rifare)
+stage = StageCache(__file__, inputs=[INPUT_FILE], outputs=[OUTPUT_FILE, CONFLICTS_FILE],
+                   config={"KEY": KEY, "MULTI_COLUMNS": MULTI_COLUMNS, "SEP": SEP, "DROP_COLUMNS": DROP_COLUMNS})
+if stage.fresh():
+    sys.exit(0)
+
+# Celle vuote come NaN: first() prende così il primo valore non vuoto del gruppo
+df = read_table(INPUT_FILE, na=True)
+df = df.drop(columns=[c for c in DROP_COLUMNS if c in df.columns])
+df[KEY] = df[KEY].str.strip()
+print(f"Righe lette: {len(df)} ({df[KEY].nunique()} person_id distinti)")
+
+# Righe senza ID: non si possono accorpare, restano come sono in fondo
+senza_id = df[df[KEY].isna() | (df[KEY] == "")]
+df = df.drop(senza_id.index)
+
+singoli = [c for c in df.columns if c != KEY and c not in MULTI_COLUMNS]
+gruppi = df.groupby(KEY, sort=False)
+unici = gruppi[singoli].first()
+
+# Campi "singoli" che in realtà hanno valori diversi per la stessa persona:
+# tutti i valori distinti (ordine di comparsa) finiscono nel file dei conflitti
+report = []
+for col in singoli:
+    valori = df[[KEY, col]].assign(**{col: df[col].str.strip()})
+    valori = valori[valori[col].notna() & (valori[col] != "")]
+    conta = valori.groupby(KEY, sort=False)[col].nunique()
+    in_conflitto = conta.index[conta > 1]
+    if not len(in_conflitto):
+        continue
+    valori = valori[valori[KEY].isin(in_conflitto)]
+    righe = valori.groupby(KEY, sort=False).size()
+    valori = valori.drop_duplicates().groupby(KEY, sort=False)[col].agg(SEP.join)
+    report.append(pd.DataFrame({
+        KEY: valori.index, "campo": col, "valore_tenuto": unici.loc[valori.index, col].to_numpy(),
+        "valori": valori.to_numpy(), "righe": righe.loc[valori.index].to_numpy(),
+    }))
+    print(f"⚠️  {col}: {len(in_conflitto)} persone con valori diversi, tenuto il primo (vedi {CONFLICTS_FILE})")
+conflitti = pd.concat(report, ignore_index=True) if report else pd.DataFrame(columns=CONFLICT_COLUMNS)
+
+for col in MULTI_COLUMNS:
+    if col in df.columns:
+        unici[col] = distinct_values(df, col)
+
+out = unici.reset_index()[[c for c in df.columns]]
+out = pd.concat([out, senza_id], ignore_index=True)
+
+write_table(out, OUTPUT_FILE)
+conflitti.to_csv(CONFLICTS_FILE, index=False)
+print(f"✅ Persone uniche: {len(out)} (da {len(df) + len(senza_id)} righe)")
+for col in MULTI_COLUMNS:
+    if col in out.columns:
+        print(f"   {col}: {int(out[col].str.contains(SEP, regex=False).sum())} persone con più valori")
+print(f"File salvato: {OUTPUT_FILE}")
+print(f"📝 Conflitti: {CONFLICTS_FILE} ({conflitti[KEY].nunique() if len(conflitti) else 0} persone, {len(conflitti)} campi)")
+stage.save()
@@ -1,5 +1,7 @@
 import pandas as pd
 import re
+import sys
+from common_cache import StageCache
 
 def pulisci_voci_autorita(value):
     """Rimuove path e ID, restituendo solo i nomi"""
@@ -31,8 +33,15 @@ def estrai_id_voci_autorita(value):
     return ", ".join(ids)
 
 input_file = "dataset/opere/regio-composizioni-clean-wiki-reconciled-xlsx-csv.csv"
-df = pd.read_csv(input_file)
+output_file = "dataset/opere/regio-composizioni-clean-pulito.csv"
 colonna = "autore_opera_letteraria"
+
+# Output già aggiornato se input e codice non sono cambiati (vedi common_cache.py, --force per rifare)
+stage = StageCache(__file__, inputs=[input_file], outputs=[output_file], config={"colonna": colonna})
+if stage.fresh():
+    sys.exit(0)
+
+df = pd.read_csv(input_file)
 if colonna not in df.columns:
     print(f"Colonna '{colonna}' non trovata nel dataset")
     print(f"Colonne disponibili: {list(df.columns)}")
@@ -41,8 +50,8 @@ else:
     df["autori_nome_pulito"] = df[colonna].apply(pulisci_voci_autorita)
     df["autori_id"] = df[colonna].apply(estrai_id_voci_autorita)
 
-    output_file = "dataset/opere/regio-composizioni-clean-pulito.csv"
     df.to_csv(output_file, index=False)
+    stage.save()
 
     print(f"File pulito salvato in: {output_file}")
     
\ No newline at end of file
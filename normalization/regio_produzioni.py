@@ -1,11 +1,85 @@
+import numpy as np
 import pandas as pd
-import json
-import ast
-import re
 import sys
-from datetime import datetime
-
-def flatten_regio_dataset(input_file, output_prefix):
+from common_cache import StageCache
+from common_dates import to_datetimes, year_series
+from common_io import categorize, write_table
+from common_json import parse_cell, print_parse_report
+from common_paths import clean_info
+
+# Formato di uscita (come per le recite):
+#   "long" -> produzioni (una riga per produzione) + crediti (una riga per credito, con production_id)
+#   "wide" -> solo il file storico, con gli attributi della produzione ripetuti su ogni credito
+#   "both" -> entrambi, finché 1_regio.py e 1_cypher_regio.py leggono il file wide
+OUTPUT_FORMAT = "both"
+
+# credit_type -> colonna JSON (nell'ordine in cui i crediti compaiono nel file wide)
+CREDIT_COLUMNS = {
+    'artistic': 'artistic_credits',
+    'technical': 'technical_credits',
+}
+
+CREDIT_COLS = ['production_id', 'credit_type', 'person_id', 'person_name', 'person_role']
+
+PROD_COLS = [
+    'production_id', 'work_title',
+    'performance_start_date', 'performance_end_date', 'year', 'date_text',
+    'first_location', 'first_venue',
+    'related_work_id', 'source_id'
+]
+
+
+def output_files(output_prefix, output_format=OUTPUT_FORMAT):
+    """File scritti per il formato scelto: {"produzioni", "crediti", "wide"}."""
+    files = {}
+    if output_format in ("long", "both"):
+        files["produzioni"] = f"{output_prefix}_regio_produzioni_base.csv"
+        files["crediti"] = f"{output_prefix}_regio_produzioni_crediti.csv"
+    if output_format in ("wide", "both"):
+        files["wide"] = f"{output_prefix}_regio_produzioni.csv"
+    return files
+
+
+def explode_credits(df):
+    """
+    Crediti in formato lungo senza iterrows: ogni colonna JSON viene parsata per intero
+    (celle identiche una volta sola, vedi common_json.py), le liste vengono esplose
+    e i campi estratti a colonne. Ordine: produzione per produzione, artistici poi tecnici.
+    """
+    parti = []
+    for c_type, col_name in CREDIT_COLUMNS.items():
+        if col_name not in df.columns:
+            continue
+        liste = df[col_name].map(lambda v, col=col_name: parse_cell(v, col, default=[]))
+        parti.append(pd.DataFrame({
+            '_pos': np.arange(len(df)),
+            'credit_type': c_type,
+            'credito': liste.to_numpy(),
+        }))
+    if not parti:
+        return pd.DataFrame(columns=CREDIT_COLS)
+
+    lunga = pd.concat(parti, ignore_index=True).explode('credito')
+    lunga = lunga[lunga['credito'].map(lambda c: isinstance(c, dict))]
+    lunga = lunga.sort_values('_pos', kind='stable')
+
+    # dtype=object: gli ID restano come nel JSON (niente float con ".0" se qualcuno manca)
+    campi = pd.DataFrame(lunga['credito'].tolist(), index=lunga.index, dtype=object)
+    campi = campi.reindex(columns=['Identificativo', 'identificativo', 'Nome', 'Ruolo'])
+    a, b = campi['Identificativo'], campi['identificativo']
+
+    crediti = pd.DataFrame({
+        'production_id': df['production_id'].to_numpy()[lunga['_pos'].to_numpy(dtype=int)],
+        'credit_type': lunga['credit_type'].to_numpy(),
+        # Stessa regola di prima: Identificativo, oppure identificativo se il primo è vuoto
+        'person_id': a.where(a.notna() & a.astype(bool), b).to_numpy(),
+        'person_name': campi['Nome'].to_numpy(),
+        'person_role': campi['Ruolo'].to_numpy(),
+    }, columns=CREDIT_COLS)
+    return categorize(crediti, ['credit_type', 'person_role'])
+
+
+def flatten_regio_dataset(input_file, output_prefix, output_format=OUTPUT_FORMAT):
     print("Avvio elaborazione: Estrazione TITOLO PRODUZIONE da Fullpath...\n")
 
     try:
@@ -29,112 +103,61 @@ def flatten_regio_dataset(input_file, output_prefix):
     }
     df = df.rename(columns=column_mapping)
 
-    def extract_clean_info(path):
-       
-        if pd.isna(path) or not isinstance(path, str) or path.strip() == '':
-            return '', ''
-        
-        # 1. Gestione percorsi multipli (prende il primo)
-        first_path = path.split(',')[0].strip()
-        
-        # 2. Prende l'ultimo segmento dopo lo slash
-        last_segment = first_path.split('/')[-1].strip()
-        
-        # 3. REGEX:
-        # ^(?:\d+\s+)?   -> Ignora numeri iniziali seguiti da spazio (es "4 ")
-        # (.*?)          -> CATTURA il Titolo (Gruppo 1)
-        # \s*\((\d+)\)\s*$ -> CATTURA l'ID finale (Gruppo 2)
-        match = re.search(r'^(?:\d+\s+)?(.*?)\s*\((\d+)\)\s*$', last_segment)
-        
-        if match:
-            return match.group(1).strip(), match.group(2).strip()
-        
-        # Fallback: se non c'è ID, pulisci almeno il numero iniziale
-        clean_fallback = re.sub(r'^\d+\s+', '', last_segment)
-        return clean_fallback, ''
-
     print("Estrazione Titoli e ID...")
-    
+
+    # Colonne intere con regex compilate (vedi common_paths.py): primo percorso,
+    # ultimo segmento, senza numero d'ordine iniziale -> titolo e ID
+
     # 1. Titolo Produzione (dal full_path)
+    df['work_title'] = clean_info(df['full_path'])['label']
 
-    df['work_title'], _ = zip(*df['full_path'].apply(extract_clean_info))
-    
     # 2. ID Opera collegata (da related_compositions) - Solo l'ID mi serve qui
-    def extract_work_id_only(path):
-        _, wid = extract_clean_info(path)
-        return wid
-    
-    df['related_work_id'] = df['related_compositions'].apply(extract_work_id_only)
+    df['related_work_id'] = clean_info(df['related_compositions'])['id']
 
     # 3. Luoghi ed Edifici (Stessa logica di pulizia)
-    df['first_location'], _ = zip(*df['first_location_path'].apply(extract_clean_info))
-    df['first_venue'], _ = zip(*df['first_venue_path'].apply(extract_clean_info))
+    df['first_location'] = clean_info(df['first_location_path'])['label']
+    df['first_venue'] = clean_info(df['first_venue_path'])['label']
 
     # --- GESTIONE DATE ---
+    # Ogni data distinta viene interpretata una volta sola (vedi common_dates.py)
     for col in ['performance_start_date', 'performance_end_date']:
-        df[col] = pd.to_datetime(df[col], errors='coerce')
-    
-    df['year'] = df['performance_start_date'].dt.year.fillna(0).astype(int)
-    df['year'] = df['year'].apply(lambda x: x if x != 0 else '')
-
-    # --- PARSING CREDITI ---
-    def parse_credits_safe(value):
-        if pd.isna(value) or value == '': return []
-        try: return json.loads(value)
-        except:
-            try: return ast.literal_eval(value)
-            except: return []
-
-    records = []
+        df[col] = to_datetimes(df[col])
+
+    # Anno intero, vuoto se la data di inizio manca o non è valida
+    df['year'] = year_series(df['performance_start_date'])
+
+    # --- CREDITI (FORMATO LUNGO) ---
     print("Espansione crediti...")
-    for _, row in df.iterrows():
-        prod_id = row['production_id']
-        for c_type, col_name in [('artistic', 'artistic_credits'), ('technical', 'technical_credits')]:
-            for c in parse_credits_safe(row.get(col_name)):
-                records.append({
-                    'production_id': prod_id,
-                    'credit_type': c_type,
-                    'person_id': c.get('Identificativo') or c.get('identificativo'),
-                    'person_name': c.get('Nome'),
-                    'person_role': c.get('Ruolo')
-                })
-
-    credits_df = pd.DataFrame(records)
-
-    # --- MERGE FINALE ---
-    prod_cols = [
-        'production_id', 'work_title', 
-        'performance_start_date', 'performance_end_date', 'year', 'date_text', 
-        'first_location', 'first_venue', 
-        'related_work_id', 'source_id'
-    ]
-    performances_df = df[prod_cols].copy()
-
-    if not credits_df.empty:
-        full_df = credits_df.merge(performances_df, on='production_id', how='left')
-    else:
-        full_df = performances_df
+    credits_df = explode_credits(df)
+    print_parse_report()
+
+    # Attributi della produzione: una riga per produzione, non ripetuti sui crediti
+    performances_df = df[PROD_COLS].copy()
 
     # --- SALVATAGGIO ---
+    files = output_files(output_prefix, output_format)
     try:
-        cols = [
-            'production_id', 'credit_type', 'person_id', 'person_name', 'person_role',
-            'work_title', 
-            'performance_start_date', 'performance_end_date', 'year',
-            'date_text', 'first_location', 'first_venue', 
-            'related_work_id', 'source_id'
-        ]
-        
-        final_cols = [c for c in cols if c in full_df.columns]
-        
-        output_file = f"{output_prefix}_regio_produzioni.csv"
-        full_df[final_cols].to_csv(output_file, index=False, encoding='utf-8')
-        print(f"\nSUCCESS: File creato: {output_file}")
-        
+        if "produzioni" in files:
+            write_table(performances_df, files["produzioni"], encoding='utf-8')
+            write_table(credits_df, files["crediti"], encoding='utf-8')
+            print(f"\nSUCCESS: Produzioni: {files['produzioni']} ({len(performances_df)} righe)")
+            print(f"SUCCESS: Crediti: {files['crediti']} ({len(credits_df)} righe)")
+
+        if "wide" in files:
+            # --- VISTA WIDE (compatibilità) ---
+            # Il merge si fa solo qui, per chi legge ancora il file con una riga per credito
+            if not credits_df.empty:
+                full_df = credits_df.merge(performances_df, on='production_id', how='left')
+            else:
+                full_df = performances_df
+            final_cols = [c for c in CREDIT_COLS + PROD_COLS[1:] if c in full_df.columns]
+            write_table(full_df[final_cols], files["wide"], encoding='utf-8')
+            print(f"\nSUCCESS: File creato: {files['wide']}")
+
         # Anteprima per verifica
         print("\nAnteprima estrazione:")
-        print(full_df[['production_id', 'work_title']].drop_duplicates().head(5))
-        
+        print(performances_df[['production_id', 'work_title']].drop_duplicates().head(5))
+
     except Exception as e:
         print(f"Errore salvataggio: {e}")
 
@@ -144,5 +167,12 @@ if __name__ == "__main__":
     # Sostituisci con il tuo percorso reale
     input_path = "dataset/regio/produzioni/20251103_export_produzioni_regio.csv"
     output_prefix = "dataset/regio/"
-    
-    flatten_regio_dataset(input_path, output_prefix)
\ No newline at end of file
+
+    # Salta l'elaborazione se export e codice non sono cambiati (vedi common_cache.py, --force per rifare)
+    stage = StageCache(__file__, inputs=[input_path], outputs=list(output_files(output_prefix).values()),
+                       config={"OUTPUT_FORMAT": OUTPUT_FORMAT})
+    if stage.fresh():
+        sys.exit(0)
+
+    flatten_regio_dataset(input_path, output_prefix)
+    stage.save()
\ No newline at end of file
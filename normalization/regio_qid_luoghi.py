@@ -1,88 +1,78 @@
-import pandas as pd
 import os
+from common_cache import StageCache
+from common_edges import write_wide_view
+from common_gazetteer import GAZETTEER_FILE, MAPPINGS, VALUE_COLUMNS, assign_places, load_gazetteer, print_place_stats
+from common_ids import clean_id_columns
+from common_io import csv_to_parquet, read_table, strip_text, write_table
 
 # === CONFIGURAZIONE REGIO ===
-FILE_PRINCIPALE = "dataset/regio/recite/recite_regio_final_fixed_ids.csv"
-FILE_MAPPING = "dataset/regio/recite/recite-regio-luoghi-csv.csv"
-OUTPUT_FILE = "dataset/regio/recite-regio-luoghi-qid2.csv"
+# I QID si assegnano alla tabella delle recite (una riga per recita), non al prodotto cartesiano
+FILE_PRINCIPALE = "dataset/regio/recite/recite_regio_clean.csv"
+FILE_EDGES = "dataset/regio/recite/recite_regio_edges_fixed_ids.csv"  # Edge list con gli ID riconciliati
+FILE_MAPPING = MAPPINGS["regio"]
+OUTPUT_FILE = "dataset/regio/recite_regio_qid.csv"
+# Vista wide storica (recite × curatori × esecutori × interpreti), ancora letta da semantic_graph/1_regio.py
+OUTPUT_WIDE = "dataset/regio/recite-regio-luoghi-qid2.csv"
+UNMATCHED_FILE = "dataset/regio/recite/luoghi_senza_qid.csv"  # Luoghi senza QID, da completare nel mapping
 
 def main():
+    # === CACHE INCREMENTALE ===
+    # Salta tutto se input, codice e configurazione non sono cambiati (vedi common_cache.py, --force per rielaborare)
+    # Il mapping Fondazione conta anche qui: i due archivi condividono il gazetteer dei luoghi
+    stage = StageCache(__file__, inputs=[FILE_PRINCIPALE, FILE_EDGES, *MAPPINGS.values()],
+                       outputs=[OUTPUT_FILE, OUTPUT_WIDE, UNMATCHED_FILE])
+    if stage.fresh():
+        return
+
     print("--- 1. Caricamento file (Forzando Stringhe) ---")
     
     # 1. Carica file principale come stringa pura
     try:
-        df_main = pd.read_csv(FILE_PRINCIPALE, sep=',', dtype=str)
-        df_main = df_main.fillna("") # Rimuove subito i NaN
+        df_main = read_table(FILE_PRINCIPALE, categories=True)  # Parquet se aggiornato, altrimenti CSV; celle vuote già come ""
         print(f"File principale caricato: {len(df_main)} righe.")
     except FileNotFoundError:
         print(f"❌ Errore: Non trovo {FILE_PRINCIPALE}")
         return
 
-    # 2. Carica mapping come stringa pura
-    try:
-        df_map = pd.read_csv(FILE_MAPPING, sep=',', dtype=str)
-        df_map = df_map.fillna("") # Rimuove subito i NaN
-        print(f"File mapping caricato: {len(df_map)} luoghi unici.")
-    except FileNotFoundError:
-        print(f"❌ Errore: Non trovo {FILE_MAPPING}")
-        return
+    # 2. Gazetteer dei luoghi (mapping Regio + Fondazione, ricostruito solo se cambiato)
+    gaz = load_gazetteer()
+    if not os.path.exists(FILE_MAPPING):
+        print(f"⚠️  Non trovo {FILE_MAPPING}: uso solo il resto del gazetteer.")
+    print(f"Gazetteer caricato: {len(gaz)} luoghi ({GAZETTEER_FILE}).")
 
     # === PULIZIA CHIAVI DI JOIN (Trim spazi) ===
-    # Questo passaggio è fondamentale per evitare mancati match per colpa di spazi invisibili
-    df_main['edificio_nome'] = df_main['edificio_nome'].str.strip()
-    df_main['luogo_nome'] = df_main['luogo_nome'].str.strip()
-    
-    df_map['edificio_nome'] = df_map['edificio_nome'].str.strip()
-    df_map['luogo_nome'] = df_map['luogo_nome'].str.strip()
+    # Le colonne in uscita restano quelle originali (solo senza spazi ai bordi);
+    # il confronto avviene sulla chiave normalizzata del gazetteer
+    df_main['edificio_nome'] = strip_text(df_main['edificio_nome'])
+    df_main['luogo_nome'] = strip_text(df_main['luogo_nome'])
 
-    # === DIAGNOSTICA ===
-    print("\n--- DIAGNOSTICA ---")
-    match_edifici = set(df_main['edificio_nome']).intersection(set(df_map['edificio_nome']))
-    print(f"Edifici in comune: {len(match_edifici)}")
-    match_luoghi = set(df_main['luogo_nome']).intersection(set(df_map['luogo_nome']))
-    print(f"Luoghi in comune: {len(match_luoghi)}")
+    # === 3. ASSEGNAZIONE QID (join per codici sulle coppie distinte) ===
+    print("\n--- 3. Assegnazione QID dal gazetteer ---")
+    df_final, report = assign_places(df_main, gaz, "regio")
+    print_place_stats(df_final, report)
+    matches = int((df_final['entity'] != "").sum()) if 'entity' in df_final.columns else 0
 
-    # === 2. PREPARAZIONE MAPPING ===
-    # Rimuovi duplicati nel mapping sulla chiave composta
-    df_map_clean = df_map.drop_duplicates(subset=['edificio_nome', 'luogo_nome'])
-    print(f"\nMapping dopo rimozione duplicati: {len(df_map_clean)} righe")
-
-    # Seleziona solo le colonne necessarie
-    cols_to_use = ['edificio_nome', 'luogo_nome', 'entity', 'uri']
-    cols_actual = [c for c in cols_to_use if c in df_map_clean.columns]
-    df_map_clean = df_map_clean[cols_actual]
-
-    # === 3. UNIONE (Merge) ===
-    print("\n--- 3. Unione (Merge) ---")
-    
-    # LEFT JOIN su edificio E luogo
-    df_final = pd.merge(
-        df_main, 
-        df_map_clean, 
-        on=['edificio_nome', 'luogo_nome'], 
-        how='left',
-        suffixes=('', '_mapping')
-    )
-
-    # Contiamo quanti QID sono stati assegnati
-    matches = 0
-    if 'entity' in df_final.columns:
-        matches = df_final[df_final['entity'] != ""].shape[0]
-        
-    print(f"✅ Assegnati {matches} QID su {len(df_final)} recite totali.")
+    write_table(report, UNMATCHED_FILE)
+    print(f"Report luoghi senza QID: {UNMATCHED_FILE}")
 
     # === 4. PULIZIA FINALE KILLER (.0) E SALVATAGGIO ===
     print("\n--- 4. Pulizia Float e Salvataggio ---")
     
-    # Rimuove .0 da TUTTE le colonne
-    for col in df_final.columns:
-        df_final[col] = df_final[col].astype(str).replace('nan', '').replace(r'\.0$', '', regex=True)
+    # Rimuove .0 solo dalle colonne ID, in modo vettoriale (vedi common_ids.py)
+    df_final = clean_id_columns(df_final)
 
     # Crea la directory se non esiste
     os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
     
-    df_final.to_csv(OUTPUT_FILE, index=False)
+    write_table(df_final, OUTPUT_FILE)
     print(f"Finito! File salvato come: {OUTPUT_FILE}")
+
+    # === 5. VISTA WIDE ===
+    # Ricostruita a blocchi da recite + edge list: stesse colonne e righe del vecchio file finale
+    righe = write_wide_view(OUTPUT_FILE, FILE_EDGES, OUTPUT_WIDE, keep_recita_ids=True, extra_columns=VALUE_COLUMNS)
+    csv_to_parquet(OUTPUT_WIDE)
+    print(f"Vista wide: {OUTPUT_WIDE} ({righe} righe)")
+    stage.save()
     
     # Statistiche finali veloci
     if 'entity' in df_final.columns and matches > 0:
@@ -1,7 +1,12 @@
 import pandas as pd
-import json
 import re
-from ast import literal_eval
+import sys
+from common_cache import StageCache
+from common_edges import build_edges, wide_view, WIDE_BASE_COLUMNS
+from common_ids import clean_id, clean_id_columns, read_csv_str
+from common_io import categorize, csv_to_parquet
+from common_json import parse_cell, print_parse_report
+from common_paths import joined_ids, last_label_id, path_label, production_id
 
 # === CONFIG ===
 INPUT = "dataset/regio/recite/20251111-Regio-Export-Recite-csv.csv"
@@ -10,64 +15,32 @@ OUTPUT_INTERPRETI = "dataset/regio/recite/recite_interpreti.csv"
 OUTPUT_CURATORI = "dataset/regio/recite/recite_curatori.csv"
 OUTPUT_ESECUTORI = "dataset/regio/recite/recite_esecutori.csv"
 OUTPUT_FINAL = "dataset/regio/recite/recite_regio_final.csv"
+OUTPUT_EDGES = "dataset/regio/recite/recite_regio_edges.csv"
 
+# Formato di uscita:
+#   "long" -> recite (OUTPUT_MAIN) + edge list (OUTPUT_EDGES), una riga per (recita, relazione, entità)
+#   "wide" -> solo il file finale storico con il prodotto cartesiano (OUTPUT_FINAL)
+#   "both" -> entrambi
+# Il resto della catena (riconciliazione, QID, import) legge il formato lungo; la vista
+# wide con QID per i builder RDF la scrive regio_qid_luoghi.py (vedi common_edges.py)
+OUTPUT_FORMAT = "long"
 
-# === FUNZIONI ===
-def try_parse_json(value):
-    if pd.isna(value) or not isinstance(value, str) or not value.strip():
-        return None
-    try:
-        return json.loads(value)
-    except Exception:
-        try:
-            return literal_eval(value)
-        except Exception:
-            return None
-
-def clean_id(value):
-    """
-    # FIX: Funzione helper per pulire qualsiasi ID
-    Trasforma in stringa, toglie spazi e rimuove il .0 finale
-    """
-    if pd.isna(value) or value == "":
-        return ""
-    s = str(value).strip()
-    if s.endswith(".0"):
-        return s[:-2]
-    return s
-
-def extract_last_label_id(value):
-    if pd.isna(value):
-        return None, None
-    s = str(value).strip()
-    last_seg = s.rsplit('/', 1)[-1]
-    m = re.match(r"^(.*)\s*\((\d+)\)\s*$", last_seg)
-    if m:
-        return m.group(1).strip(), m.group(2)
-    return last_seg.strip(), None
-
-def extract_path_label(value):
-    if pd.isna(value):
-        return None
-    match = re.search(r"/([^/]+)\s*\(\d+\)$", str(value))
-    return match.group(1).strip() if match else value
-
-def extract_production_id(fullpath):
-    if pd.isna(fullpath): return None
-    parts = [p for p in fullpath.split('/') if p.strip()]
-    if len(parts) >= 2:
-        production_part = parts[-2]
-        match = re.search(r'\((\d+)\)$', production_part)
-        if match:
-            return match.group(1)
-    return None
+# Righe lette per blocco: limita la memoria indipendentemente dalla dimensione dell'export
+CHUNK_SIZE = 5000
+
+COLS_INTERPRETI = ["id_recita", "personaggio", "personaggio_voce", "interprete", "interprete_id", "ruolo"]
+COLS_CURATORI = ["id_recita", "curatore_nome", "curatore_id", "curatore_ruolo"]
+COLS_ESECUTORI = ["id_recita", "esecutore_nome", "esecutore_id", "esecutore_ruolo"]
+COLS_BASE = WIDE_BASE_COLUMNS
 
-def extract_altre_recite_ids(value):
-    if pd.isna(value):
-        return ""
-    ids = re.findall(r"\((\d+)\)", str(value))
-    return ", ".join(ids)
 
+# Colonne JSON dell'export
+COL_INTERPRETI_JSON = "Personaggi e interpreti - json"
+COL_CURATORI_JSON = "Curatori Esecuzione Musicale - json"
+COL_ESECUTORI_JSON = "Esecutori - json"
+
+
+# === FUNZIONI ===
 def parse_personaggi(json_data):
     results = []
     if not json_data:
@@ -109,92 +82,131 @@ def parse_generic_dict(json_data, key):
         results.append((nome, pid, ruolo))
     return results
 
-# === LETTURA ===
-print("Lettura file originale...")
-# FIX: dtype=str forza Pandas a leggere tutto come testo, evitando conversioni automatiche in numeri
-df = pd.read_csv(INPUT, dtype=str)
-
-# === ESTRAZIONE ===
-print("Estrazione metadati base...")
-df["titolo_breve"] = df["fullpath"].apply(extract_path_label)
-df["production_id"] = df["fullpath"].apply(extract_production_id)
-
-df[["luogo_nome", "luogo_id"]] = df["luogo_rappresentazione"].apply(lambda x: pd.Series(extract_last_label_id(x)))
-df[["edificio_nome", "edificio_id"]] = df["edificio_rappresentazione"].apply(lambda x: pd.Series(extract_last_label_id(x)))
-df[["composizione_nome", "composizione_id"]] = df["composizioni_collegate"].apply(lambda x: pd.Series(extract_last_label_id(x)))
-df["altre_recite_ids"] = df["altre_recite"].apply(extract_altre_recite_ids)
-
-# === PARSING ===
-print("Parsing Interpreti...")
-interpreti_rows = []
-for _, row in df.iterrows():
-    json_data = try_parse_json(row.get("Personaggi e interpreti - json"))
-    if not json_data: continue
-    items = json_data if isinstance(json_data, list) else []
-    for p_nome, p_voce, interp, pid, ruolo in parse_personaggi(items):
-        interpreti_rows.append({
-            "id_recita": row["id"],
-            "personaggio": p_nome,
-            "personaggio_voce": p_voce,
-            "interprete": interp,
-            "interprete_id": pid,
-            "ruolo": ruolo
-        })
-df_interpreti = pd.DataFrame(interpreti_rows)
-
-print("Parsing Curatori...")
-curatori_rows = []
-for _, row in df.iterrows():
-    json_data = try_parse_json(row.get("Curatori Esecuzione Musicale - json"))
-    if not json_data: continue
-    for nome, pid, ruolo in parse_generic_dict(json_data, "curatori_esecuzione_musicale"):
-        curatori_rows.append({
-            "id_recita": row["id"],
-            "curatore_nome": nome,
-            "curatore_id": pid,
-            "curatore_ruolo": ruolo
-        })
-df_curatori = pd.DataFrame(curatori_rows)
-
-print("Parsing Esecutori...")
-esecutori_rows = []
-for _, row in df.iterrows():
-    json_data = try_parse_json(row.get("Esecutori - json"))
-    if not json_data: continue
-    for nome, pid, ruolo in parse_generic_dict(json_data, "esecutori"):
-        esecutori_rows.append({
-            "id_recita": row["id"],
-            "esecutore_nome": nome,
-            "esecutore_id": pid,
-            "esecutore_ruolo": ruolo
-        })
-df_esecutori = pd.DataFrame(esecutori_rows)
-
-# === MERGE FINALE ===
-print("Creazione file finale unificato...")
-final = (
-    df[[
-        "id", "titolo_breve", "production_id", "from", "to", "datetext",   
-        "luogo_nome", "luogo_id", "edificio_nome", "edificio_id",
-        "composizione_nome", "composizione_id", "fullpath"
-    ]]
-    .merge(df_curatori, left_on="id", right_on="id_recita", how="left")
-    .merge(df_esecutori, left_on="id", right_on="id_recita", how="left", suffixes=("", "_esecutore"))
-    .merge(df_interpreti, left_on="id", right_on="id_recita", how="left", suffixes=("", "_interprete"))
-)
-
-# === FIX FINALE PER SICUREZZA ===
-# Questo blocco passa su TUTTE le colonne e se trova una stringa che finisce con .0 la pulisce.
-# È la "rete di sicurezza" finale.
-print("Pulizia finale float (.0)...")
-for col in final.columns:
-    # Applichiamo la pulizia solo se la colonna è di tipo object (stringa) o numerico
-    final[col] = final[col].astype(str).replace(r'\.0$', '', regex=True)
-    # Rimpiazza i "nan" (stringa) con stringa vuota per pulizia visiva
-    final[col] = final[col].replace('nan', '')
-
-# === SALVATAGGIO ===
-final.to_csv(OUTPUT_FINAL, index=False)
+def parse_figli(chunk):
+    """
+    Un solo passaggio sulle righe del chunk: parsa insieme le tre colonne JSON
+    (interpreti, curatori, esecutori) invece di tre iterrows separati.
+    """
+    interpreti_rows, curatori_rows, esecutori_rows = [], [], []
+    colonne = zip(
+        chunk["id"],
+        chunk.get(COL_INTERPRETI_JSON, pd.Series(None, index=chunk.index)),
+        chunk.get(COL_CURATORI_JSON, pd.Series(None, index=chunk.index)),
+        chunk.get(COL_ESECUTORI_JSON, pd.Series(None, index=chunk.index)),
+    )
+    for id_recita, raw_int, raw_cur, raw_ese in colonne:
+        json_data = parse_cell(raw_int, COL_INTERPRETI_JSON)
+        if json_data and isinstance(json_data, list):
+            for p_nome, p_voce, interp, pid, ruolo in parse_personaggi(json_data):
+                interpreti_rows.append((id_recita, p_nome, p_voce, interp, pid, ruolo))
+
+        json_data = parse_cell(raw_cur, COL_CURATORI_JSON)
+        if json_data:
+            for nome, pid, ruolo in parse_generic_dict(json_data, "curatori_esecuzione_musicale"):
+                curatori_rows.append((id_recita, nome, pid, ruolo))
+
+        json_data = parse_cell(raw_ese, COL_ESECUTORI_JSON)
+        if json_data:
+            for nome, pid, ruolo in parse_generic_dict(json_data, "esecutori"):
+                esecutori_rows.append((id_recita, nome, pid, ruolo))
+
+    # Colonne esplicite: anche un chunk senza figli produce un frame "mergiabile"
+    return (
+        pd.DataFrame(interpreti_rows, columns=COLS_INTERPRETI),
+        pd.DataFrame(curatori_rows, columns=COLS_CURATORI),
+        pd.DataFrame(esecutori_rows, columns=COLS_ESECUTORI),
+    )
+
+def append_csv(df, path, first):
+    """Scrive il chunk in coda al file (header solo sul primo chunk)."""
+    df.to_csv(path, mode="w" if first else "a", header=first, index=False)
+
+# === CACHE INCREMENTALE ===
+# Se export, codice e configurazione non sono cambiati dall'ultima esecuzione
+# gli output esistenti vengono riusati (vedi common_cache.py; --force per rielaborare).
+# CHUNK_SIZE non entra nell'impronta: non cambia il risultato.
+outputs = [OUTPUT_MAIN, OUTPUT_INTERPRETI, OUTPUT_CURATORI, OUTPUT_ESECUTORI]
+if OUTPUT_FORMAT in ("long", "both"):
+    outputs.append(OUTPUT_EDGES)
+if OUTPUT_FORMAT in ("wide", "both"):
+    outputs.append(OUTPUT_FINAL)
+stage = StageCache(__file__, inputs=[INPUT], outputs=outputs, config={"OUTPUT_FORMAT": OUTPUT_FORMAT})
+if stage.fresh():
+    sys.exit(0)
+
+# === LETTURA IN STREAMING ===
+# FIX: read_csv_str legge tutto come testo (dtype=str, celle vuote = ""), evitando conversioni automatiche in numeri.
+# Il file viene letto a blocchi di CHUNK_SIZE righe: ogni riga è letta e parsata una sola volta
+# e le tabelle figlie vengono scritte man mano, quindi la memoria resta limitata al chunk.
+print(f"Lettura file originale a blocchi di {CHUNK_SIZE} righe...")
+reader = read_csv_str(INPUT, chunksize=CHUNK_SIZE)
+
+tot_recite = tot_interpreti = tot_curatori = tot_esecutori = tot_edges = tot_final = 0
+
+for n_chunk, df in enumerate(reader):
+    first = n_chunk == 0
+
+    # === ESTRAZIONE ===
+    # Colonne intere con regex compilate (vedi common_paths.py), niente apply per riga
+    df["titolo_breve"] = path_label(df["fullpath"])
+    df["production_id"] = production_id(df["fullpath"])
+
+    for src, prefisso in [("luogo_rappresentazione", "luogo"), ("edificio_rappresentazione", "edificio"),
+                          ("composizioni_collegate", "composizione")]:
+        parti = last_label_id(df[src])
+        df[f"{prefisso}_nome"] = parti["label"]
+        df[f"{prefisso}_id"] = parti["id"]
+    df["altre_recite_ids"] = joined_ids(df["altre_recite"])
+    # Titolo, luogo ed edificio si ripetono su tutte le righe della vista wide: category (vedi common_io.py)
+    categorize(df)
+
+    # === PARSING (interpreti, curatori, esecutori in un solo passaggio) ===
+    df_interpreti, df_curatori, df_esecutori = parse_figli(df)
+    for figlia in (df_interpreti, df_curatori, df_esecutori):
+        categorize(figlia)
+
+    df_edges = build_edges(df_curatori, df_esecutori, df_interpreti, ordine_recite=df["id"])
+
+    # === SALVATAGGIO INCREMENTALE ===
+    append_csv(clean_id_columns(df[COLS_BASE + ["altre_recite_ids"]].copy()), OUTPUT_MAIN, first)
+    append_csv(df_interpreti, OUTPUT_INTERPRETI, first)
+    append_csv(df_curatori, OUTPUT_CURATORI, first)
+    append_csv(df_esecutori, OUTPUT_ESECUTORI, first)
+
+    if OUTPUT_FORMAT in ("long", "both"):
+        edges_out = clean_id_columns(df_edges.copy())
+        append_csv(edges_out, OUTPUT_EDGES, first)
+        tot_edges += len(edges_out)
+
+    if OUTPUT_FORMAT in ("wide", "both"):
+        # === VISTA WIDE DEL CHUNK ===
+        # Ogni recita ha i suoi figli nello stesso chunk, quindi il merge per chunk
+        # produce esattamente le stesse righe del merge sull'intero file.
+        final = wide_view(df, df_edges)
+
+        # === PULIZIA ID ===
+        # Rete di sicurezza sul .0: solo le colonne ID, in modo vettoriale (vedi common_ids.py)
+        final = clean_id_columns(final)
+
+        append_csv(final, OUTPUT_FINAL, first)
+        tot_final += len(final)
+
+    tot_recite += len(df)
+    tot_interpreti += len(df_interpreti)
+    tot_curatori += len(df_curatori)
+    tot_esecutori += len(df_esecutori)
+    print(f"  chunk {n_chunk + 1}: {tot_recite} recite elaborate")
+
+# === GEMELLI PARQUET ===
+# Versione tipizzata dei CSV appena scritti, per le fasi successive (vedi common_io.py)
+for path in outputs:
+    csv_to_parquet(path)
 
 print("✅ Processo completato.")
-print(f" - File finale: {OUTPUT_FINAL}")
\ No newline at end of file
+print_parse_report()
+print(f" - Recite: {tot_recite} | Interpreti: {tot_interpreti} | Curatori: {tot_curatori} | Esecutori: {tot_esecutori}")
+if OUTPUT_FORMAT in ("long", "both"):
+    print(f" - Edge list: {OUTPUT_EDGES} ({tot_edges} righe)")
+if OUTPUT_FORMAT in ("wide", "both"):
+    print(f" - File finale: {OUTPUT_FINAL} ({tot_final} righe)")
+stage.save()
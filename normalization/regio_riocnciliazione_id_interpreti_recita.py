@@ -1,102 +1,80 @@
 import pandas as pd
+import sys
+from common_cache import StageCache
+from common_io import fill_blank, read_table, write_table
+from common_fuzzy import FUZZY_THRESHOLD, TrigramIndex
+from common_reconciliation import FUZZY_APPLY, build_id_map, reconcile_edges, write_audit
 
 # === CONFIGURAZIONE PERCORSI ===
-# 1. Il file delle recite che hai già generato (quello con gli ID "sbagliati" o misti)
-INPUT_RECITE = "dataset/regio/recite/recite_regio_final.csv"
-
-# 2. Il file "Master" delle persone che contiene gli ID corretti (es. 2502, 2644)
-INPUT_PERSONE = "dataset/regio/regio_persone.csv"
-
-# 3. Dove salvare il file corretto
-OUTPUT_FINAL = "dataset/regio/recite/recite_regio_final_fixed_ids.csv"
-
-
-# === FUNZIONI DI PULIZIA ===
-def clean_id(val):
-    """Rimuove .0 e converte in stringa pulita"""
-    if pd.isna(val): return ""
-    s = str(val).strip()
-    if s.endswith(".0"):
-        return s[:-2]
-    return s
-
-def clean_name(val):
-    """Rimuove spazi extra dai nomi per migliorare il confronto"""
-    if pd.isna(val): return ""
-    return str(val).strip()
+# 1. L'edge list delle recite (una riga per recita/relazione/persona, vedi regio_recita.py),
+#    con gli ID "sbagliati" o misti
+INPUT_RECITE = "dataset/regio/recite/recite_regio_edges.csv"
+
+# 2. Il file "Master" delle persone che contiene gli ID corretti (es. 2502, 2644),
+#    già con una riga per persona (vedi regio_persone_dedup.py)
+INPUT_PERSONE = "dataset/regio/regio_persone_dedup.csv"
+
+# 3. Dove salvare l'edge list corretta
+OUTPUT_FINAL = "dataset/regio/recite/recite_regio_edges_fixed_ids.csv"
+
+# 4. Tabella degli ID cambiati (nome, ID vecchio, ID nuovo, quante righe)
+OUTPUT_AUDIT = "dataset/regio/recite/recite_regio_riconciliazione_audit.csv"
+
+# Relazioni dell'edge list da riconciliare (entita_nome -> entita_id).
+# Anche i direttori d'orchestra sono persone, correggiamo anche loro se possibile
+RELAZIONI = ["interprete", "curatore"]
+
+# Match approssimato per i nomi senza corrispondenza esatta (varianti di grafia),
+# solo sulle righe senza un ID valido. FUZZY_APPLY: i match con punteggio
+# >= FUZZY_SOGLIA riempiono l'ID e finiscono comunque nell'audit (metodo "fuzzy");
+# FUZZY_AUDIT per avere solo le proposte ("fuzzy_proposto") senza toccare gli ID;
+# None per spegnerlo.
+FUZZY = FUZZY_APPLY
+FUZZY_SOGLIA = FUZZY_THRESHOLD
+
+# === 0. CACHE INCREMENTALE ===
+# Recite, master persone, codice e parametri di matching invariati -> output e audit già validi (--force per rifare)
+stage = StageCache(__file__, inputs=[INPUT_RECITE, INPUT_PERSONE], outputs=[OUTPUT_FINAL, OUTPUT_AUDIT],
+                   config={"RELAZIONI": RELAZIONI, "FUZZY": FUZZY, "FUZZY_SOGLIA": FUZZY_SOGLIA})
+if stage.fresh():
+    sys.exit(0)
 
 # === 1. CARICAMENTO MASTER (PERSONE) ===
 print("--- 1. Caricamento Mappa Persone (Master) ---")
-# Leggiamo tutto come stringa per evitare float indesiderati
-df_persone = pd.read_csv(INPUT_PERSONE, dtype=str)
+# Leggiamo tutto come stringa (e celle vuote come "") per evitare float indesiderati
+df_persone = read_table(INPUT_PERSONE)
 
-# Creiamo il dizionario di mappatura: { "Nome Pulito": "ID Ufficiale" }
-# Usiamo le colonne viste nel tuo snippet: 'full_name' e 'person_id'
-id_map = {}
+# Dizionario { "chiave nome normalizzata": "ID Ufficiale" } (vedi common_reconciliation.py)
+# Usiamo le colonne 'full_name' e 'person_id'
+id_map, ambigue = build_id_map(df_persone["full_name"], df_persone["person_id"])
 
-for _, row in df_persone.iterrows():
-    nome = clean_name(row.get('full_name', ''))
-    pid = clean_id(row.get('person_id', ''))
-    
-    if nome and pid:
-        id_map[nome] = pid
-
-print(f"✅ Mappatura creata su {len(id_map)} persone.")
-print(f"   Esempio: 'Georges Bizet' -> ID '{id_map.get('Georges Bizet', 'Non trovato')}'")
+print(f"✅ Mappatura creata su {len(id_map)} persone ({ambigue} nomi con più ID: vince l'ultimo).")
+print(f"   Esempio: 'Georges Bizet' -> ID '{id_map.get('georges bizet', 'Non trovato')}'")
 
 # === 2. ELABORAZIONE RECITE ===
 print("\n--- 2. Correzione File Recite ---")
-df_recite = pd.read_csv(INPUT_RECITE, dtype=str)
-
-# Contatori per statistiche
-updated_interpreti = 0
-updated_curatori = 0
-
-# Funzione per aggiornare una riga
-def update_row(row):
-    global updated_interpreti, updated_curatori
-    
-    # --- A. CORREZIONE INTERPRETI ---
-    nome_int = clean_name(row.get('interprete', ''))
-    old_id_int = clean_id(row.get('interprete_id', ''))
-    
-    # Se il nome è nel dizionario master, USIAMO L'ID MASTER
-    if nome_int in id_map:
-        new_id_int = id_map[nome_int]
-        if new_id_int != old_id_int:
-            row['interprete_id'] = new_id_int
-            updated_interpreti += 1
-    else:
-        # Se non c'è nel master, puliamo comunque l'ID vecchio (es. togliamo .0)
-        row['interprete_id'] = old_id_int
-
-    # --- B. CORREZIONE CURATORI (BONUS) ---
-    # Anche i direttori d'orchestra sono persone, correggiamo anche loro se possibile
-    nome_cur = clean_name(row.get('curatore_nome', ''))
-    old_id_cur = clean_id(row.get('curatore_id', ''))
-    
-    if nome_cur in id_map:
-        new_id_cur = id_map[nome_cur]
-        if new_id_cur != old_id_cur:
-            row['curatore_id'] = new_id_cur
-            updated_curatori += 1
-    else:
-        row['curatore_id'] = old_id_cur
-        
-    return row
+df_recite = read_table(INPUT_RECITE, categories=True)  # Colonne ripetitive (ruoli, voci...) come category
+print(f"Archi caricati: {len(df_recite)}")
 
-# Applichiamo la correzione riga per riga
-df_recite = df_recite.apply(update_row, axis=1)
+# Se il nome è nel master USIAMO L'ID MASTER, altrimenti resta l'ID vecchio (pulito dal .0)
+fuzzy_index = TrigramIndex(id_map) if FUZZY else None
+df_recite, audit, conteggi = reconcile_edges(df_recite, id_map, RELAZIONI, fuzzy_index, FUZZY_SOGLIA, FUZZY)
 
 print(f"✅ Correzione completata.")
-print(f"   -> Interpreti aggiornati all'ID ufficiale: {updated_interpreti}")
-print(f"   -> Curatori aggiornati all'ID ufficiale: {updated_curatori}")
+c = conteggi.get('interprete', {})
+print(f"   -> Interpreti aggiornati all'ID ufficiale: {c.get('exact', 0)} esatti + {c.get('fuzzy', 0)} approssimati "
+      f"({c.get('fuzzy_proposto', 0)} proposte da verificare nell'audit)")
+c = conteggi.get('curatore', {})
+print(f"   -> Curatori aggiornati all'ID ufficiale: {c.get('exact', 0)} esatti + {c.get('fuzzy', 0)} approssimati "
+      f"({c.get('fuzzy_proposto', 0)} proposte da verificare nell'audit)")
 
 # === 3. SALVATAGGIO ===
 print("\n--- 3. Salvataggio ---")
 # Rimuoviamo eventuali Nan residui prima di scrivere
-df_recite = df_recite.fillna('')
+df_recite = fill_blank(df_recite)
 
-df_recite.to_csv(OUTPUT_FINAL, index=False)
+write_table(df_recite, OUTPUT_FINAL)
 print(f"💾 File salvato: {OUTPUT_FINAL}")
-print("   Ora puoi usare questo file nello script Neo4j!")
\ No newline at end of file
+write_audit(audit, OUTPUT_AUDIT)
+stage.save()
+print("   Ora regio_qid_luoghi.py può aggiungere i QID e scrivere la vista larga.")
@@ -1,6 +1,8 @@
 from neo4j import GraphDatabase
 from dotenv import load_dotenv
 import os, sys, traceback
+from batch_import import Checkpoint, parse_args, run_import_step
+from schema import apply_schema
 
 dotenv_path = "/Users/elenabinotti/Documents/scuola/unibo/LM-43 DHDK/promemoria group/env.env"
 load_dotenv(dotenv_path=dotenv_path)
@@ -10,30 +12,13 @@ password = os.getenv("SECRET_KEY")
 uri_db = "bolt://archiuidev.promemoriagroup.com:7687"
 
 FILE_REGIO_OPERE = 'https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/regio/regio_opere_pulito_con_anno.csv'
-FILE_REGIO_PERSONE = 'https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/regio/regio_persone.csv' 
+FILE_REGIO_PERSONE = 'https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/regio/regio_persone_dedup.csv' 
 FILE_REGIO_STAGIONI = 'https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/regio/regio_stagioni.csv'
 FILE_REGIO_PRODUZIONI = 'https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/regio/regio_produzioni.csv'
+# File wide pubblicato (una riga per recita × curatore × esecutore × interprete):
+# finché le tabelle lunghe non sono su GitHub gli step 5-5.3 leggono questo
 FILE_REGIO_RECITE = 'https://media.githubusercontent.com/media/elena2notti/theatreNet/main/regio/recite-regio-luoghi-qid2.csv'
 
-def execute_cypher_script(tx, script):
-    result = tx.run(script)
-    try:
-        summary = result.single().value()
-    except AttributeError:
-        summary = "Nessun risultato restituito."
-    return summary
-
-def run_import_step(driver, command, step_name):
-    with driver.session() as session:
-        print(f"\n--- Inizio: {step_name} ---")
-        try:
-            result_summary = session.execute_write(execute_cypher_script, command)
-            print(f"SUCCESSO: {step_name} completato.")
-            print(f"Risultati: {result_summary}")
-        except Exception as e:
-            print(f"ERRORE CRITICO in {step_name}: {e}")
-            print(">>> Il processo continua con lo step successivo...")
-
 def clean_db(driver):
     print("\n--- 0. PULIZIA DATABASE (DETACH DELETE e rimozione vincoli) ---")
     with driver.session() as session:
@@ -53,28 +38,6 @@ def clean_db(driver):
         except Exception as e:
             print(f"Errore pulizia: {e}")
 
-def create_constraints(driver):
-    print("\n--- 0.1 CREAZIONE VINCOLI DI UNICITÀ REGIO ---")
-    with driver.session() as session:
-        constraints = [
-            "CREATE CONSTRAINT person_id_regio_unique IF NOT EXISTS FOR (p:Person) REQUIRE p.internal_id_regio IS UNIQUE",
-            "CREATE CONSTRAINT id_code_unique IF NOT EXISTS FOR (i:ID) REQUIRE i.code IS UNIQUE",   
-            "CREATE CONSTRAINT work_id_regio_unique IF NOT EXISTS FOR (o:Work) REQUIRE o.internal_id_regio IS UNIQUE",
-            "CREATE CONSTRAINT season_id_regio_unique IF NOT EXISTS FOR (s:Season) REQUIRE s.internal_id_regio IS UNIQUE",
-            "CREATE CONSTRAINT performance_id_regio_unique IF NOT EXISTS FOR (r:Performance) REQUIRE r.internal_id_regio IS UNIQUE",
-            "CREATE CONSTRAINT production_id_regio_unique IF NOT EXISTS FOR (p:Production) REQUIRE p.internal_id_regio IS UNIQUE",
-            "CREATE CONSTRAINT organizer_id_regio_unique IF NOT EXISTS FOR (o:Organizer) REQUIRE o.internal_id_regio IS UNIQUE",
-            "CREATE CONSTRAINT ensemble_id_regio_unique IF NOT EXISTS FOR (e:Ensemble) REQUIRE e.internal_id_regio IS UNIQUE"
-        ]
-        
-        for constraint in constraints:
-            try:
-                session.run(constraint).consume()
-            except Exception:
-                pass
-        print("Vincoli creati.")
-
-
 # 1. Importazione Persone
 cypher_import_persone = f"""
 LOAD CSV WITH HEADERS FROM '{FILE_REGIO_PERSONE}' AS row
@@ -91,8 +54,10 @@ ON CREATE SET
     p.birth_place = row.birth_place,
     p.death_date = row.death_date,
     p.death_place = row.death_place,
+    // Una riga per persona: le celle distinte sono unite con ";" (vedi regio_persone_dedup.py).
+    // occupation resta una stringa come per Fondazione e per il sito; i VIAF diventano una lista
     p.occupation = row.occupation,
-    p.viaf = row.viaf,
+    p.viaf = SPLIT(row.viaf, ';'),
     p.source = 'Regio'
 
 // CREAZIONE NODO ID
@@ -290,19 +255,21 @@ RETURN count(DISTINCT r) AS distinct_productions_processed;
 """
 
 # 5. Importazione Dettagli Performance
+# La recita si identifica da row.id: id_recita viene dai curatori ed è vuoto
+# per le recite senza direttore, che prima restavano fuori dal grafo
 cypher_import_dettagli_performance = f"""
 LOAD CSV WITH HEADERS FROM '{FILE_REGIO_RECITE}' AS row
 FIELDTERMINATOR ','
 WITH row
 WHERE row.production_id IS NOT NULL AND TRIM(row.production_id) <> ''
-  AND row.id_recita IS NOT NULL AND TRIM(row.id_recita) <> ''
+  AND row.id IS NOT NULL AND TRIM(row.id) <> ''
 
-WITH row, row.production_id + '_' + row.id_recita AS unique_perf_id
+WITH row, row.production_id + '_' + row.id AS unique_perf_id
 
 // --- 1. MATCH PRODUZIONE E CREA RECITA ---
 MERGE (rec:Performance {{internal_id_regio: unique_perf_id}})
 ON CREATE SET
-    rec.internal_id_dettaglio = row.id_recita,
+    rec.internal_id_dettaglio = row.id,
     rec.title = row.titolo_breve,
     rec.date = row.from,
     rec.venue = row.luogo_nome,
@@ -318,7 +285,7 @@ WITH rec, row
 MERGE (prod:Production {{internal_id_regio: row.production_id}})
 MERGE (prod)-[:HAS_PERFORMANCE]->(rec)
 
-// --- 1.5 (NUOVO) COLLEGA DIRETTAMENTE ALL'OPERA (WORK) ---
+// --- 1.5 COLLEGA DIRETTAMENTE ALL'OPERA (WORK) ---
 // Questo allinea il modello a quello della Fondazione
 WITH rec, row
 WHERE row.composizione_id IS NOT NULL AND TRIM(row.composizione_id) <> ''
@@ -326,10 +293,22 @@ MATCH (w:Work {{internal_id_regio: row.composizione_id}})
 MERGE (rec)-[:RELATED_TO_WORK]->(w)
 MERGE (w)-[:RELATES_TO]->(rec)
 
-// --- 2. COLLEGA DIRETTORI ---
-WITH rec, row
+RETURN count(rec) AS total_performances;
+"""
+
+# Gli step 5.1-5.3 rileggono il file wide, ognuno con le sole colonne della sua
+# relazione: un WHERE fallito (es. nessun direttore) non salta più interpreti ed
+# esecutori della stessa riga. Le righe ripetute dal prodotto cartesiano finiscono
+# nello stesso MERGE.
+
+# 5.1 Direttori
+cypher_import_direttori_recite = f"""
+LOAD CSV WITH HEADERS FROM '{FILE_REGIO_RECITE}' AS row
+FIELDTERMINATOR ','
+WITH row
 WHERE row.curatore_id IS NOT NULL AND TRIM(row.curatore_id) <> ''
   AND row.curatore_ruolo IS NOT NULL
+MATCH (rec:Performance {{internal_id_regio: row.production_id + '_' + row.id}})
 MERGE (cur:Person {{internal_id_regio: row.curatore_id}})
 ON CREATE SET cur.name = row.curatore_nome, cur.source = 'Regio'
 WITH rec, row, cur
@@ -337,10 +316,17 @@ FOREACH (i IN CASE WHEN row.curatore_ruolo CONTAINS 'Direttore' THEN [1] ELSE []
     MERGE (cur)-[:CONDUCTED]->(rec)
 )
 
-// --- 3. GESTIONE INTERPRETI E PERSONAGGI ---
-WITH rec, row
+RETURN count(cur) AS total_curatori;
+"""
+
+# 5.2 Interpreti e personaggi
+cypher_import_interpreti_recite = f"""
+LOAD CSV WITH HEADERS FROM '{FILE_REGIO_RECITE}' AS row
+FIELDTERMINATOR ','
+WITH row
 WHERE row.interprete_id IS NOT NULL AND TRIM(row.interprete_id) <> ''
   AND row.personaggio IS NOT NULL AND TRIM(row.personaggio) <> ''
+MATCH (rec:Performance {{internal_id_regio: row.production_id + '_' + row.id}})
 MERGE (int:Person {{internal_id_regio: row.interprete_id}})
 ON CREATE SET int.name = row.interprete, int.source = 'Regio'
 
@@ -357,9 +343,16 @@ FOREACH (_ IN CASE WHEN row.ruolo IS NOT NULL AND TRIM(row.ruolo) <> '' THEN [1]
     SET r.role = row.ruolo
 )
 
-// --- 4. GESTIONE ESECUTORI DI GRUPPO ---
-WITH rec, row
+RETURN count(int) AS total_interpreti;
+"""
+
+# 5.3 Esecutori di gruppo
+cypher_import_esecutori_recite = f"""
+LOAD CSV WITH HEADERS FROM '{FILE_REGIO_RECITE}' AS row
+FIELDTERMINATOR ','
+WITH row
 WHERE row.esecutore_id IS NOT NULL AND TRIM(row.esecutore_id) <> ''
+MATCH (rec:Performance {{internal_id_regio: row.production_id + '_' + row.id}})
 MERGE (e:Ensemble {{internal_id_regio: row.esecutore_id}})
 ON CREATE SET
     e.name = row.esecutore_nome,
@@ -367,33 +360,50 @@ ON CREATE SET
     e.source = 'Regio'
 MERGE (e)-[:PARTICIPATED_IN]->(rec)
 
-RETURN count(rec) AS total_performances;
+RETURN count(e) AS total_esecutori;
 """
 
+# Ogni step fa commit a blocchi di --batch-rows righe (vedi batch_import.py)
+args = parse_args("Importazione Regio nel property graph.")
+checkpoint = Checkpoint("1_cypher_regio", resume=args.resume)
+
 driver = None 
 try:
     driver = GraphDatabase.driver(uri_db, auth=(user, password))
     driver.verify_connectivity()
     print(f"Connessione a Neo4j stabilita all'URI: {uri_db}")
     
-    print("\n[STEP 0/5] Esecuzione pulizia database e creazione vincoli...")
-    clean_db(driver) 
-    create_constraints(driver) 
+    # Con --resume il database contiene già i blocchi committati: niente pulizia
+    if args.resume:
+        print("\n[STEP 0/5] Ripresa dal checkpoint: vincoli e indici...")
+    else:
+        print("\n[STEP 0/5] Esecuzione pulizia database, vincoli e indici...")
+        clean_db(driver) 
+    apply_schema(driver) 
     
     print("\n[STEP 1/5] Importazione Persone...")
-    run_import_step(driver, cypher_import_persone, "1. Importazione Nodi Person")
+    run_import_step(driver, cypher_import_persone, "1. Importazione Nodi Person", args.batch_rows, checkpoint)
 
     print("\n[STEP 2/5] Importazione Opere...")
-    run_import_step(driver, cypher_import_opere_complete, "2. Importazione Works")
+    run_import_step(driver, cypher_import_opere_complete, "2. Importazione Works", args.batch_rows, checkpoint)
 
     print("\n[STEP 3/5] Importazione Stagioni...")
-    run_import_step(driver, cypher_import_stagioni, "3. Importazione Seasons")
+    run_import_step(driver, cypher_import_stagioni, "3. Importazione Seasons", args.batch_rows, checkpoint)
 
     print("\n[STEP 4/5] Importazione Produzioni...")
-    run_import_step(driver, cypher_import_produzioni_recite, "4. Importazione Productions")
+    run_import_step(driver, cypher_import_produzioni_recite, "4. Importazione Productions", args.batch_rows, checkpoint)
 
     print("\n[STEP 5/5] Importazione Performances...")
-    run_import_step(driver, cypher_import_dettagli_performance, "5. Importazione Performances")
+    run_import_step(driver, cypher_import_dettagli_performance, "5. Importazione Performances", args.batch_rows, checkpoint)
+
+    print("\n[STEP 5.1/5] Collegamento Direttori alle Performances...")
+    run_import_step(driver, cypher_import_direttori_recite, "5.1 Direttori Performances", args.batch_rows, checkpoint)
+
+    print("\n[STEP 5.2/5] Collegamento Interpreti e Personaggi...")
+    run_import_step(driver, cypher_import_interpreti_recite, "5.2 Interpreti Performances", args.batch_rows, checkpoint)
+
+    print("\n[STEP 5.3/5] Collegamento Esecutori di gruppo...")
+    run_import_step(driver, cypher_import_esecutori_recite, "5.3 Esecutori Performances", args.batch_rows, checkpoint)
 
     # NOTA: Step 6 rimosso. 
     # Per unire i nodi, lanciare il comando apoc.refactor.mergeNodes DOPO aver caricato anche la Fondazione.
@@ -1,6 +1,8 @@
 from neo4j import GraphDatabase
 from dotenv import load_dotenv
 import os, sys, traceback
+from batch_import import Checkpoint, parse_args, run_import_step
+from schema import apply_schema
 
 dotenv_path = "/Users/elenabinotti/Documents/scuola/unibo/LM-43 DHDK/promemoria group/env.env"
 load_dotenv(dotenv_path=dotenv_path)
@@ -12,48 +14,10 @@ uri_db = "bolt://archiuidev.promemoriagroup.com:7687"
 FILE_FONDAZIONE_OPERE = 'https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/fondazione/fondazione-iteatri-opere-musicali-wiki-reconciled.csv'
 FILE_FONDAZIONE_PERSONE = 'https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/fondazione/persone.csv' 
 FILE_FONDAZIONE_STAGIONI = 'https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/fondazione/stagioni.csv'
+FILE_FONDAZIONE_STAGIONI_LINKS = 'https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/fondazione/stagioni_links.csv'
 FILE_FONDAZIONE_PRODUZIONI = 'https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/fondazione/produzioni_clean.csv'
+FILE_FONDAZIONE_PRODUZIONI_LINKS = 'https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/fondazione/produzioni_links.csv'
 FILE_FONDAZIONE_RECITE = 'https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/fondazione/recite_fondazione_con_qid.csv'
-FILE_FONDAZIONE_LINKS = 'https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/fondazione/20251125_fondazione-iteatri-export-produzione-recite.csv'
-
-def execute_cypher_script(tx, script):
-    result = tx.run(script)
-    try:
-        summary = result.single().value()
-    except AttributeError:
-        summary = "Nessun risultato restituito."
-    return summary
-
-def run_import_step(driver, command, step_name):
-    with driver.session() as session:
-        print(f"\n--- Inizio: {step_name} ---")
-        try:
-            result_summary = session.execute_write(execute_cypher_script, command)
-            print(f"SUCCESSO: {step_name} completato.")
-            print(f"Risultati: {result_summary}")
-        except Exception as e:
-            print(f"ERRORE CRITICO in {step_name}: {e}")
-            print(">>> Il processo continua con lo step successivo...")
-
-def create_constraints_fondazione(driver):
-    print("\n--- 0.1 CREAZIONE VINCOLI (ENGLISH) ---")
-    with driver.session() as session:
-        constraints = [
-            "CREATE CONSTRAINT person_internal_id_fond_unique IF NOT EXISTS FOR (p:Person) REQUIRE p.internal_id_fondazione IS UNIQUE",
-            "CREATE CONSTRAINT work_internal_id_fondazione_unique IF NOT EXISTS FOR (o:Work) REQUIRE o.internal_id_fondazione IS UNIQUE",
-            "CREATE CONSTRAINT id_code_unique IF NOT EXISTS FOR (i:ID) REQUIRE i.code IS UNIQUE",
-            "CREATE CONSTRAINT season_internal_id_fondazione_unique IF NOT EXISTS FOR (s:Season) REQUIRE s.internal_id_fondazione IS UNIQUE",
-            "CREATE CONSTRAINT production_internal_id_fondazione_unique IF NOT EXISTS FOR (p:Production) REQUIRE p.internal_id_fondazione IS UNIQUE",
-            "CREATE CONSTRAINT performance_internal_id_fondazione_unique IF NOT EXISTS FOR (r:Performance) REQUIRE r.internal_id_fondazione IS UNIQUE",
-            "CREATE CONSTRAINT ensemble_internal_id_fondazione_unique IF NOT EXISTS FOR (e:Ensemble) REQUIRE e.internal_id_fondazione IS UNIQUE",
-            "CREATE CONSTRAINT building_id_fondazione_unique IF NOT EXISTS FOR (b:Building) REQUIRE b.internal_id_fondazione IS UNIQUE"
-        ]
-        for c in constraints:
-            try:
-                session.run(c).consume()
-            except Exception:
-                pass
-        print("Vincoli verificati.")
 
 # 1. Importazione Persone
 cypher_import_persone = f"""
@@ -129,33 +93,33 @@ SET
     p.city = row.luogo_rappresentazione,
     p.venue = row.edificio_rappresentazione
 
-// --- 2. COLLEGAMENTO OPERE ---
-WITH p, row
-UNWIND SPLIT(COALESCE(row.opere_collegate_id, ''), ',') AS work_id_raw
-WITH p, row, TRIM(work_id_raw) AS work_id
-WHERE work_id <> ''
+RETURN count(distinct p) as total_productions
+"""
 
-MERGE (w:Work {{internal_id_fondazione: work_id}})
+# 3.1 / 3.2 Produzioni -> Opere / Persone
+# Dalla tabella link di fondazione_produzioni.py (una riga per produzione/entità,
+# ID e ruolo già appaiati): niente SPLIT di "id1, id2" e "ruolo1, ruolo2" per posizione
+cypher_link_produzioni_opere = f"""
+LOAD CSV WITH HEADERS FROM '{FILE_FONDAZIONE_PRODUZIONI_LINKS}' AS row FIELDTERMINATOR ';'
+WITH row WHERE row.relazione = 'opera'
+MATCH (p:Production {{internal_id_fondazione: row.production_id}})
+MERGE (w:Work {{internal_id_fondazione: row.entita_id}})
 ON CREATE SET w.source = 'Fondazione'
 MERGE (p)-[:RELATED_TO_WORK]->(w)
 MERGE (w)-[:RELATES_TO]->(p)
+RETURN count(*) as links_created
+"""
 
-// --- 3. COLLEGAMENTO PERSONE ---
-WITH p, row
-WHERE row.persone_collegate_id IS NOT NULL AND TRIM(row.persone_collegate_id) <> ''
-
-WITH p, 
-     SPLIT(row.persone_collegate_id, ',') AS ids, 
-     SPLIT(COALESCE(row.persone_collegate_ruolo, ''), ',') AS roles
-
-UNWIND range(0, size(ids)-1) AS i
-WITH p, TRIM(ids[i]) AS pid, TRIM(roles[i]) AS role_text
-WHERE pid IS NOT NULL AND pid <> ''
+cypher_link_produzioni_persone = f"""
+LOAD CSV WITH HEADERS FROM '{FILE_FONDAZIONE_PRODUZIONI_LINKS}' AS row FIELDTERMINATOR ';'
+WITH row WHERE row.relazione = 'persona'
+MATCH (p:Production {{internal_id_fondazione: row.production_id}})
 
-MERGE (per:Person {{internal_id_fondazione: pid}})
+MERGE (per:Person {{internal_id_fondazione: row.entita_id}})
 ON CREATE SET per.source = 'Fondazione'
 
 // Logica Ruoli
+WITH p, per, COALESCE(row.ruolo, '') AS role_text
 WITH p, per, role_text,
      CASE
         WHEN role_text CONTAINS 'Regista' OR role_text CONTAINS 'regia' THEN 'DIRECTED'
@@ -175,7 +139,7 @@ FOREACH(ignore IN CASE WHEN relation_type = 'HAD_ROLE_IN' THEN [1] ELSE [] END |
     SET r.role = role_text
 )
 
-RETURN count(distinct p) as total_productions
+RETURN count(*) as links_created
 """
 
 # 4. Recite
@@ -218,25 +182,40 @@ MERGE (o:Work {{internal_id_fondazione: row.composizione_id}})
 MERGE (r)-[:RELATED_TO_WORK]->(o)
 MERGE (o)-[:RELATES_TO]->(r)
 
-// 5. Direttore (Conductor)
-// Qui usiamo WITH r, row -> La variabile 'o' viene persa qui, ma va bene così
-WITH r, row
-WHERE row.curatore_id IS NOT NULL AND TRIM(row.curatore_id) <> ''
+RETURN count(r) AS total_performances
+"""
+
+# 4.1-4.3 rileggono lo stesso file, uno step per relazione: con un'unica catena di
+# WITH ... WHERE una recita senza direttore perdeva anche esecutori e interpreti.
+
+# 4.1 Direttori (Conductor)
+cypher_import_direttori_recite = f"""
+LOAD CSV WITH HEADERS FROM '{FILE_FONDAZIONE_RECITE}' AS row FIELDTERMINATOR ','
+WITH row WHERE row.curatore_id IS NOT NULL AND TRIM(row.curatore_id) <> ''
+MATCH (r:Performance {{internal_id_fondazione: row.id}})
 MERGE (cur:Person {{internal_id_fondazione: row.curatore_id}})
 ON CREATE SET cur.name = row.curatore_nome, cur.source = 'Fondazione'
 MERGE (cur)-[:CONDUCTED]->(r)
+RETURN count(*) AS links_created
+"""
 
-// 6. Esecutore (Ensemble)
-WITH r, row
-WHERE row.esecutore_id IS NOT NULL AND TRIM(row.esecutore_id) <> ''
+# 4.2 Esecutori (Ensemble)
+cypher_import_esecutori_recite = f"""
+LOAD CSV WITH HEADERS FROM '{FILE_FONDAZIONE_RECITE}' AS row FIELDTERMINATOR ','
+WITH row WHERE row.esecutore_id IS NOT NULL AND TRIM(row.esecutore_id) <> ''
+MATCH (r:Performance {{internal_id_fondazione: row.id}})
 MERGE (esec:Ensemble {{internal_id_fondazione: row.esecutore_id}})
 ON CREATE SET esec.name = row.esecutore_nome, esec.source = 'Fondazione'
 MERGE (esec)-[rel:PARTICIPATED_IN]->(r)
 SET rel.role = row.esecutore_ruolo
+RETURN count(*) AS links_created
+"""
 
-// 7. Interprete (Person)
-WITH r, row
-WHERE row.interprete_id IS NOT NULL AND TRIM(row.interprete_id) <> ''
+# 4.3 Interpreti e personaggi
+cypher_import_interpreti_recite = f"""
+LOAD CSV WITH HEADERS FROM '{FILE_FONDAZIONE_RECITE}' AS row FIELDTERMINATOR ','
+WITH row WHERE row.interprete_id IS NOT NULL AND TRIM(row.interprete_id) <> ''
+MATCH (r:Performance {{internal_id_fondazione: row.id}})
 MERGE (int:Person {{internal_id_fondazione: row.interprete_id}})
 ON CREATE SET int.name = row.interprete, int.source = 'Fondazione'
 
@@ -245,8 +224,7 @@ FOREACH (_ IN CASE WHEN row.ruolo IS NOT NULL AND TRIM(row.ruolo) <> '' THEN [1]
     SET rel_int.role = row.ruolo
 )
 
-// 8. GESTIONE PERSONAGGI (Character)
-// Fix: Non chiediamo 'o' nel WITH, la recuperiamo sotto
+// GESTIONE PERSONAGGI (Character)
 WITH r, row, int
 WHERE row.personaggio IS NOT NULL AND TRIM(row.personaggio) <> ''
 
@@ -270,24 +248,13 @@ RETURN count(distinct char)
 """
 
 # 4.5 Collegamento Produzione -> Recite (HAS_PERFORMANCE)
+# Le recite della tabella link comprendono quelle dell'export produzione->recite
 cypher_link_produzioni_recite = f"""
-LOAD CSV WITH HEADERS FROM '{FILE_FONDAZIONE_LINKS}' AS row
-FIELDTERMINATOR ';'
-WITH row
-WHERE row.id IS NOT NULL AND row.recite_collegate IS NOT NULL AND TRIM(row.recite_collegate) <> ''
-
-// Trova Produzione
-MATCH (p:Production {{internal_id_fondazione: row.id}})
-
-// Trova e collega le Recite
-UNWIND SPLIT(row.recite_collegate, ',') AS path_raw
-WITH p, path_raw, SPLIT(path_raw, '(') AS parts
-WITH p, SPLIT(parts[-1], ')')[0] AS recita_id
-WHERE recita_id IS NOT NULL AND TRIM(recita_id) <> ''
-
-MATCH (r:Performance {{internal_id_fondazione: TRIM(recita_id)}})
+LOAD CSV WITH HEADERS FROM '{FILE_FONDAZIONE_PRODUZIONI_LINKS}' AS row FIELDTERMINATOR ';'
+WITH row WHERE row.relazione = 'recita'
+MATCH (p:Production {{internal_id_fondazione: row.production_id}})
+MATCH (r:Performance {{internal_id_fondazione: row.entita_id}})
 MERGE (p)-[:HAS_PERFORMANCE]->(r)
-
 RETURN count(*) as links_created
 """
 
@@ -309,41 +276,55 @@ MERGE (id_node:ID {{code: 'fondazione_' + row.id}})
 ON CREATE SET id_node.source = 'Fondazione'
 MERGE (id_node)-[:IS_ID_OF]->(s)
 
-// Collega Produzioni (INCLUDES_PRODUCTION)
-WITH s, row
-UNWIND SPLIT(row.produzioni_collegate_id, ',') AS pid
-OPTIONAL MATCH (p:Production {{internal_id_fondazione: TRIM(pid)}})
-FOREACH (_ IN CASE WHEN p IS NOT NULL THEN [1] ELSE [] END |
-    MERGE (s)-[:INCLUDES_PRODUCTION]->(p)
-    MERGE (p)-[:IS_PART_OF]->(s)
-)
+RETURN count(distinct s)
+"""
 
-// Collega Recite (INCLUDES_PERFORMANCE) - Piano B sempre utile
-WITH s, row
-UNWIND SPLIT(row.manifestazioni_recite_concerti_collegati_id, ',') AS rid
-OPTIONAL MATCH (r:Performance {{internal_id_fondazione: TRIM(rid)}})
-FOREACH (_ IN CASE WHEN r IS NOT NULL THEN [1] ELSE [] END |
-    MERGE (s)-[:INCLUDES_PERFORMANCE]->(r)
-)
+# 5.1 / 5.2 Stagioni -> Produzioni / Recite
+# Dalla tabella link di fondazione_stagioni.py (una riga per stagione/entità, ID già
+# puliti): niente SPLIT/TRIM sulle stringhe "123, 456" di stagioni.csv
+cypher_link_stagioni_produzioni = f"""
+LOAD CSV WITH HEADERS FROM '{FILE_FONDAZIONE_STAGIONI_LINKS}' AS row FIELDTERMINATOR ','
+WITH row WHERE row.relazione = 'produzione'
+MATCH (s:Season {{internal_id_fondazione: row.season_id}})
+MATCH (p:Production {{internal_id_fondazione: row.entita_id}})
+MERGE (s)-[:INCLUDES_PRODUCTION]->(p)
+MERGE (p)-[:IS_PART_OF]->(s)
+RETURN count(*) as links_created
+"""
 
-RETURN count(distinct s)
+cypher_link_stagioni_recite = f"""
+LOAD CSV WITH HEADERS FROM '{FILE_FONDAZIONE_STAGIONI_LINKS}' AS row FIELDTERMINATOR ','
+WITH row WHERE row.relazione = 'recita'
+MATCH (s:Season {{internal_id_fondazione: row.season_id}})
+MATCH (r:Performance {{internal_id_fondazione: row.entita_id}})
+MERGE (s)-[:INCLUDES_PERFORMANCE]->(r)
+RETURN count(*) as links_created
 """
 
 if __name__ == "__main__":
+    args = parse_args("Importazione Fondazione nel property graph.")
+    checkpoint = Checkpoint("2_cypher_fondazione", resume=args.resume)
     driver = None 
     try:
         driver = GraphDatabase.driver(uri_db, auth=(user, password))
         driver.verify_connectivity()
         print(f"Connesso a {uri_db}")
         
-        create_constraints_fondazione(driver)
+        apply_schema(driver)
         
-        run_import_step(driver, cypher_import_persone, "1. Persone (Arricchimento Wikidata)")
-        run_import_step(driver, cypher_import_opere, "2. Opere (Works)")
-        run_import_step(driver, cypher_import_produzioni, "3. Produzioni (Productions)")
-        run_import_step(driver, cypher_import_recite, "4. Recite (Performances)")
-        run_import_step(driver, cypher_link_produzioni_recite, "4.5 Link Produzioni->Recite")
-        run_import_step(driver, cypher_import_stagioni, "5. Stagioni (Seasons)")
+        run_import_step(driver, cypher_import_persone, "1. Persone (Arricchimento Wikidata)", args.batch_rows, checkpoint)
+        run_import_step(driver, cypher_import_opere, "2. Opere (Works)", args.batch_rows, checkpoint)
+        run_import_step(driver, cypher_import_produzioni, "3. Produzioni (Productions)", args.batch_rows, checkpoint)
+        run_import_step(driver, cypher_link_produzioni_opere, "3.1 Link Produzioni->Opere", args.batch_rows, checkpoint)
+        run_import_step(driver, cypher_link_produzioni_persone, "3.2 Link Produzioni->Persone", args.batch_rows, checkpoint)
+        run_import_step(driver, cypher_import_recite, "4. Recite (Performances)", args.batch_rows, checkpoint)
+        run_import_step(driver, cypher_import_direttori_recite, "4.1 Direttori Recite", args.batch_rows, checkpoint)
+        run_import_step(driver, cypher_import_esecutori_recite, "4.2 Esecutori Recite", args.batch_rows, checkpoint)
+        run_import_step(driver, cypher_import_interpreti_recite, "4.3 Interpreti e Personaggi Recite", args.batch_rows, checkpoint)
+        run_import_step(driver, cypher_link_produzioni_recite, "4.5 Link Produzioni->Recite", args.batch_rows, checkpoint)
+        run_import_step(driver, cypher_import_stagioni, "5. Stagioni (Seasons)", args.batch_rows, checkpoint)
+        run_import_step(driver, cypher_link_stagioni_produzioni, "5.1 Link Stagioni->Produzioni", args.batch_rows, checkpoint)
+        run_import_step(driver, cypher_link_stagioni_recite, "5.2 Link Stagioni->Recite", args.batch_rows, checkpoint)
         
         print("\n>>> IMPORTAZIONE FONDAZIONE COMPLETATA.")
         print("    ORA ESEGUI LO SCRIPT 'reconcile_final.py' PER UNIRE I NODI!")
@@ -0,0 +1,179 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+# ================================================================
+# IMPORT LOAD CSV A BLOCCHI, CON RIPRESA
+# ================================================================
+# run_import_step eseguiva ogni script LOAD CSV in un'unica execute_write:
+# tutti i MERGE del file restano nello heap del server fino al commit, e sul
+# CSV delle recite Regio (106 MB) la transazione fallisce senza aver scritto
+# nulla. Qui la stessa query viene riscritta come
+#
+#   LOAD CSV ... AS row
+#   WITH row, linenumber() AS riga WHERE riga > $da_riga
+#   CALL { WITH row  <corpo originale> } IN TRANSACTIONS OF N ROWS
+#     ON ERROR BREAK REPORT STATUS AS stato
+#
+# così il server fa commit ogni N righe, con memoria limitata. Lo stato di ogni
+# blocco torna al client man mano: si stampa l'avanzamento e si salva in
+# .cache/neo4j/<script>.json l'ultima riga del CSV già committata. Con --resume
+# uno step interrotto riparte da lì, e quelli già completati vengono saltati.
+#
+# Richiede Neo4j 5.7+ (ON ERROR / REPORT STATUS). Le query devono poter girare
+# in una transazione implicita: si usa session.run, non execute_write.
+#
+#   python property_graph/1_cypher_regio.py --batch-rows 5000
+#   python property_graph/1_cypher_regio.py --resume
+
+BATCH_ROWS = 1000
+
+CHECKPOINT_DIR = Path(".cache") / "neo4j"
+
+RE_LOAD_CSV = re.compile(
+    r"LOAD CSV WITH HEADERS FROM '(?P<url>[^']+)' AS row\s*(?:FIELDTERMINATOR '(?P<sep>[^']*)')?",
+    re.IGNORECASE,
+)
+# RETURN finale (di solito un count): dentro CALL IN TRANSACTIONS il corpo non restituisce nulla
+RE_RETURN_FINALE = re.compile(r"^\s*RETURN\b[^\n]*;?\s*\Z", re.IGNORECASE | re.MULTILINE)
+
+
+def parse_args(description):
+    """
+    Opzioni comuni degli script di import (1_cypher_regio.py, 2_cypher_fondazione.py).
+    Gli argomenti sconosciuti vengono ignorati: run_pipeline.py passa --force a tutte le fasi.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS, help="Righe del CSV per transazione")
+    parser.add_argument("--resume", action="store_true",
+                        help="Riprende dagli step e dalle righe già committati (senza ripulire il database)")
+    args, _ = parser.parse_known_args()
+    return args
+
+
+def to_batched(query, batch_rows=BATCH_ROWS):
+    """Query LOAD CSV -> stessa query eseguita a blocchi di batch_rows righe, con stato per riga."""
+    m = RE_LOAD_CSV.search(query)
+    if not m:
+        raise ValueError("Query senza LOAD CSV WITH HEADERS")
+    corpo = RE_RETURN_FINALE.sub("", query[m.end():]).rstrip()
+    return (
+        f"{query[:m.end()]}\n"
+        "WITH row, linenumber() AS riga\n"
+        "WHERE riga > $da_riga\n"
+        "CALL {\n"
+        "WITH row\n"
+        f"{corpo}\n"
+        f"}} IN TRANSACTIONS OF {int(batch_rows)} ROWS\n"
+        "ON ERROR BREAK\n"
+        "REPORT STATUS AS stato\n"
+        "RETURN riga, stato.transactionId AS tx, stato.committed AS committed, stato.errorMessage AS errore"
+    )
+
+
+class Checkpoint:
+    """
+    Ultima riga committata di ogni step, per script. Lo step è legato all'impronta
+    della query: se la query (o l'URL del CSV) cambia, si riparte da capo.
+    """
+
+    def __init__(self, name, resume=False):
+        self.path = CHECKPOINT_DIR / f"{name}.json"
+        self.steps = {}
+        if resume and self.path.exists():
+            self.steps = json.loads(self.path.read_text(encoding="utf-8"))
+
+    @staticmethod
+    def _hash(query):
+        return hashlib.sha256(query.encode("utf-8")).hexdigest()[:16]
+
+    def start(self, step, query):
+        """Riga da cui ripartire (0 = dall'inizio), None se lo step è già completato."""
+        stato = self.steps.get(step)
+        if not stato or stato["query"] != self._hash(query):
+            self.steps[step] = {"query": self._hash(query), "riga": 0, "completato": False}
+            self.save()
+            return 0
+        return None if stato["completato"] else stato["riga"]
+
+    def update(self, step, riga):
+        self.steps[step]["riga"] = riga
+        self.save()
+
+    def done(self, step):
+        self.steps[step]["completato"] = True
+        self.save()
+
+    def save(self):
+        CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.steps, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def run_import_step(driver, command, step_name, batch_rows=BATCH_ROWS, checkpoint=None):
+    """
+    Esegue uno step LOAD CSV a blocchi di batch_rows righe, stampando ogni blocco
+    committato. Un errore interrompe lo step (i blocchi precedenti restano nel
+    database e nel checkpoint); il processo continua con lo step successivo.
+    """
+    print(f"\n--- Inizio: {step_name} ---")
+    da_riga = checkpoint.start(step_name, command) if checkpoint else 0
+    if da_riga is None:
+        print(f"ℹ️  {step_name} già completato (checkpoint): saltato.")
+        return
+    if da_riga:
+        print(f"ℹ️  Ripresa dopo la riga {da_riga} del CSV.")
+
+    query = to_batched(command, batch_rows)
+    t0 = time.perf_counter()
+    righe = blocchi = 0
+    errore = None
+
+    def blocco_committato(tx_righe):
+        nonlocal blocchi, righe
+        blocchi += 1
+        righe += len(tx_righe)
+        durata = time.perf_counter() - t0
+        print(f"  blocco {blocchi}: righe {tx_righe[0]}-{tx_righe[-1]} ✔️ "
+              f"(totale {righe}, {righe / max(durata, 1e-9):.0f} righe/s)")
+        if checkpoint:
+            checkpoint.update(step_name, tx_righe[-1])
+
+    with driver.session() as session:
+        try:
+            result = session.run(query, da_riga=da_riga)
+            tx_corrente, tx_righe = None, []
+            for record in result:
+                if not record["committed"]:
+                    # ON ERROR BREAK: il blocco fallito e tutte le righe successive
+                    errore = errore or record["errore"]
+                    continue
+                if record["tx"] != tx_corrente and tx_righe:
+                    blocco_committato(tx_righe)
+                    tx_righe = []
+                tx_corrente = record["tx"]
+                tx_righe.append(record["riga"])
+            if tx_righe:
+                blocco_committato(tx_righe)
+            contatori = result.consume().counters
+        except Exception as e:
+            print(f"ERRORE CRITICO in {step_name}: {e}")
+            print(">>> Il processo continua con lo step successivo...")
+            return
+
+    if errore:
+        print(f"ERRORE CRITICO in {step_name} dopo {blocchi} blocchi: {errore}")
+        print(">>> Il processo continua con lo step successivo (--resume per riprendere da qui)...")
+        return
+
+    if checkpoint:
+        checkpoint.done(step_name)
+    durata = time.perf_counter() - t0
+    print(f"SUCCESSO: {step_name} completato in {durata:.1f}s ({righe} righe in {blocchi} blocchi).")
+    print(f"Risultati: {contatori.nodes_created} nodi e {contatori.relationships_created} relazioni creati, "
+          f"{contatori.properties_set} proprietà impostate")
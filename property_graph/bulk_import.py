@@ -0,0 +1,518 @@
+import argparse
+import ast
+import shlex
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+import pandas as pd
+
+# ================================================================
+# FILE PER neo4j-admin database import (RICOSTRUZIONE COMPLETA)
+# ================================================================
+# 1_cypher_regio.py parte da clean_db e ricostruisce tutto con un MERGE per
+# riga: per un database nuovo è il modo più lento possibile. Qui le stesse
+# tabelle lette dagli script Cypher (copie locali, vedi common_io.read_source)
+# diventano i CSV di nodi e relazioni con intestazioni tipizzate per
+#
+#   neo4j-admin database import full <database> --nodes=... --relationships=...
+#
+# che scrive il database offline, senza transazioni. Ogni "spazio di ID" è
+# un'etichetta per sorgente (Person_regio, Person_fondazione, ...): come nel
+# grafo Cypher i nodi delle due sorgenti restano distinti, li unisce poi
+# 5_node_merge.py. Ogni nodo prende, per ogni proprietà, il primo valore non
+# vuoto nell'ordine degli step; le relazioni si deduplicano come farebbe MERGE
+# (l'ultima riga vince per le proprietà, come SET).
+#
+# Differenze volute rispetto agli script Cypher:
+#   - le sezioni di una riga sono indipendenti: negli script un WHERE o un MATCH
+#     a vuoto (es. opera senza compositore) salta anche le sezioni successive;
+#   - gli stub creati da uno step precedente (es. produzioni dalle stagioni)
+#     ricevono comunque le proprietà dello step che li descrive.
+#
+# Vincoli e indici non fanno parte dell'import: li crea schema.py, a database avviato.
+#
+#   python property_graph/bulk_import.py
+#   python property_graph/bulk_import.py --out /tmp/neo4j_import --database theatrenet
+#   sh dataset/neo4j_import/import.sh
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "normalization"))
+from common_edges import long_from_wide
+from common_io import read_source
+
+HERE = Path(__file__).resolve().parent
+
+OUTPUT_DIR = "dataset/neo4j_import"
+DATABASE = "neo4j"
+IMPORT_SCRIPT = "import.sh"
+
+# Gli URL dei CSV restano quelli degli script Cypher (una sola fonte di verità)
+SCRIPT_REGIO = "1_cypher_regio.py"
+SCRIPT_FONDAZIONE = "2_cypher_fondazione.py"
+
+# Separatore degli array nei CSV (--array-delimiter): lo stesso di regio_persone_dedup.py
+ARRAY_DELIMITER = ";"
+
+# Proprietà non stringa, con il tipo dell'intestazione neo4j-admin.
+# occupation resta una stringa (le celle "composer|compositore" non vanno spezzate)
+PROPERTY_TYPES = {
+    "year": "int",
+    "viaf": "string[]",
+}
+
+# Proprietà che identifica il nodo per spazio di ID (None = ID solo per l'import)
+ID_PROPERTIES = {
+    "ID": "code",
+    "Character": None,
+}
+
+
+def script_files(script):
+    """Costanti FILE_* di uno script Cypher, lette dal sorgente senza eseguirlo."""
+    tree = ast.parse((HERE / script).read_text(encoding="utf-8"))
+    out = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            if node.targets[0].id.startswith("FILE_"):
+                out[node.targets[0].id] = ast.literal_eval(node.value)
+    return out
+
+
+def load(url, sep=","):
+    """Tabella come la vede LOAD CSV: testo, celle vuote (o di soli spazi) mancanti."""
+    df = read_source(url, sep=sep, na=True)
+    df.columns = df.columns.str.strip()
+    return df
+
+
+def text(df, col):
+    """
+    Colonna ripulita dagli spazi, con "" -> mancante; tutta mancante se la colonna non c'è.
+    Stringhe Python (object): concatenazioni e isin su centinaia di migliaia di ID
+    sono molto più veloci che sulle colonne string di pandas.
+    """
+    if col not in df.columns:
+        return pd.Series(None, index=df.index, dtype=object)
+    s = df[col].str.strip()
+    return s.where(s.notna() & (s != "")).astype(object).where(lambda x: x.notna(), None)
+
+
+def trailing_id(s):
+    """ID tra parentesi in fondo a un percorso Pimcore: '/Persone/Georges Bizet (2502)' -> '2502'."""
+    return s.str.extract(r"\(([^()]*)\)\s*$", expand=False).str.strip()
+
+
+def explode_list(df, col, sep=","):
+    """Una riga per elemento della lista "a, b, c" (elementi ripuliti, vuoti scartati)."""
+    s = text(df, col).str.split(sep).explode().str.strip()
+    return s[s.notna() & (s != "")]
+
+
+def columns(**cols):
+    """
+    Frame dalle colonne già allineate (stesso indice, anche con duplicati dopo un
+    explode): si passa per gli array, senza riallineare sugli indici.
+    """
+    serie = [v for v in cols.values() if isinstance(v, pd.Series)]
+    n = len(serie[0])
+    assert all(len(v) == n for v in serie), "colonne di lunghezza diversa"
+    # dtype=object: altrimenti pandas riconverte le stringhe in colonne string
+    return pd.DataFrame({k: v.to_numpy() if isinstance(v, pd.Series) else v for k, v in cols.items()},
+                        index=pd.RangeIndex(n), dtype=object)
+
+
+class BulkGraph:
+    """
+    Raccoglie nodi e relazioni per spazio di ID e li scrive nel formato di neo4j-admin.
+    I nodi si aggiungono anche più volte (stub): in scrittura si accorpano per ID.
+    """
+
+    def __init__(self):
+        self.labels = {}
+        self.id_props = {}
+        self.nodes = defaultdict(list)
+        self.rels = defaultdict(list)
+        self.aliases = {}
+
+    def node(self, label, space, ids, id_prop=None, **props):
+        self.labels[space] = label
+        self.id_props.setdefault(space, ID_PROPERTIES.get(space, id_prop))
+        frame = columns(id=ids, **props)
+        self.nodes[space].append(frame[frame["id"].notna()])
+
+    def rel(self, rel_type, start_space, start, end_space, end, **props):
+        frame = columns(start=start, end=end, **props)
+        self.rels[rel_type, start_space, end_space].append(frame[frame["start"].notna() & frame["end"].notna()])
+
+    def id_node(self, prefix, ids, source, space, entity_ids):
+        """Nodo ID ('regio_2502') collegato all'entità con IS_ID_OF, come negli script Cypher."""
+        codes = prefix + ids
+        self.node("ID", "ID", codes, source=source)
+        self.rel("IS_ID_OF", "ID", codes, space, entity_ids)
+
+    def alias(self, space, mapping):
+        """ID da rimappare prima dell'accorpamento (es. personaggio per nome -> per QID)."""
+        self.aliases[space] = mapping
+
+    def _remap(self, space, s):
+        mapping = self.aliases.get(space)
+        return s.map(mapping).fillna(s) if mapping else s
+
+    def node_table(self, space):
+        df = pd.concat(self.nodes[space], ignore_index=True)
+        df["id"] = self._remap(space, df["id"])
+        # Primo valore non vuoto per proprietà, nell'ordine di inserimento
+        return df.groupby("id", sort=False).first().reset_index()
+
+    def tables(self):
+        """
+        Nodi e relazioni distinti, uno per entità / coppia (start, end) per tipo:
+        ("node", space, df) per ogni spazio, poi ("rel", (tipo, start, end), df).
+        Le colonne int di PROPERTY_TYPES sono già Int64.
+        """
+        esistenti = {}
+        for space in self.nodes:
+            df = self.node_table(space)
+            esistenti[space] = pd.Index(df["id"])
+            for c, tipo in PROPERTY_TYPES.items():
+                if c in df.columns and tipo == "int":
+                    df[c] = pd.to_numeric(df[c], errors="coerce").round().astype("Int64")
+            yield "node", space, df
+
+        vuoto = pd.Index([])
+        for (rel_type, start_space, end_space), frames in self.rels.items():
+            df = pd.concat(frames, ignore_index=True)
+            df["start"] = self._remap(start_space, df["start"])
+            df["end"] = self._remap(end_space, df["end"])
+            # Come MATCH: niente relazioni verso nodi che nessuno step ha creato
+            df = df[df["start"].isin(esistenti.get(start_space, vuoto)) & df["end"].isin(esistenti.get(end_space, vuoto))]
+            df = df.drop_duplicates(["start", "end"], keep="last")
+            df = df.dropna(axis=1, how="all")
+            if not df.empty:
+                yield "rel", (rel_type, start_space, end_space), df
+
+    def raw_rows(self, kind, key):
+        """Righe raccolte prima dell'accorpamento (per confrontarle con quelle distinte)."""
+        frames = self.nodes[key] if kind == "node" else self.rels[key]
+        return sum(len(f) for f in frames)
+
+    def write(self, out_dir):
+        """Scrive nodes/*.csv e relationships/*.csv; restituisce le opzioni --nodes/--relationships."""
+        out_dir = Path(out_dir)
+        (out_dir / "nodes").mkdir(parents=True, exist_ok=True)
+        (out_dir / "relationships").mkdir(parents=True, exist_ok=True)
+        opzioni = []
+
+        for kind, key, df in self.tables():
+            if kind == "node":
+                id_prop = self.id_props.get(key)
+                header = [f"{id_prop or ''}:ID({key})"] + [
+                    f"{c}:{PROPERTY_TYPES[c]}" if c in PROPERTY_TYPES else c for c in df.columns[1:]
+                ]
+                path = out_dir / "nodes" / f"{key}.csv"
+                df.to_csv(path, index=False, header=header)
+                opzioni.append(("--nodes", self.labels[key], path, len(df)))
+            else:
+                rel_type, start_space, end_space = key
+                header = [f":START_ID({start_space})", f":END_ID({end_space})"] + list(df.columns[2:])
+                path = out_dir / "relationships" / f"{rel_type}__{start_space}__{end_space}.csv"
+                df.to_csv(path, index=False, header=header)
+                opzioni.append(("--relationships", rel_type, path, len(df)))
+
+        return opzioni
+
+
+# === REGIO ===
+
+def build_regio(g, files):
+    src = "Regio"
+
+    # 1. Persone
+    df = load(files["FILE_REGIO_PERSONE"])
+    pid = text(df, "person_id")
+    g.node("Person", "Person_regio", pid, "internal_id_regio",
+           name=text(df, "full_name"), full_name=text(df, "full_name"),
+           wikidata_qid=text(df, "wikidata_id"), wikidata_uri=text(df, "wikidata_uri"),
+           birth_date=text(df, "birth_date"), birth_place=text(df, "birth_place"),
+           death_date=text(df, "death_date"), death_place=text(df, "death_place"),
+           occupation=text(df, "occupation"), viaf=text(df, "viaf"), source=src)
+    g.id_node("regio_", pid, src, "Person_regio", pid)
+
+    # 2. Opere, autori e personaggi
+    df = load(files["FILE_REGIO_OPERE"])
+    wid = text(df, "compositions_id")
+    g.node("Work", "Work_regio", wid, "internal_id_regio",
+           title=text(df, "dcTitle"), year=text(df, "Anno"),
+           wikidata_qid=text(df, "wikidata_entity_id"), wikidata_uri=text(df, "composizione_uri"),
+           from_date=text(df, "from"), to_date=text(df, "to"), source=src)
+    g.id_node("regio_", wid, src, "Work_regio", wid)
+    for col, verso, inverso in [("autore_musica", "HAS_COMPOSER", "IS_COMPOSER"),
+                                ("autore_testo", "HAS_LIBRETTIST", "IS_LIBRETTIST")]:
+        persona = trailing_id(text(df, col))
+        g.rel(verso, "Work_regio", wid, "Person_regio", persona)
+        g.rel(inverso, "Person_regio", persona, "Work_regio", wid)
+    lit = text(df, "literary_author_id")
+    g.rel("HAS_LITERARY_AUTHOR", "Work_regio", wid, "Person_regio", lit)
+    g.rel("IS_LITERARY_AUTHOR", "Person_regio", lit, "Work_regio", wid)
+    qid = text(df, "character_wikidata_id")
+    g.node("Character", "Character", qid, wikidata_qid=qid, name=text(df, "character_name"),
+           voice_type=text(df, "voice_type"), gender=text(df, "character_gender"), source=src)
+    g.rel("HAS_CHARACTER", "Work_regio", wid, "Character", qid)
+
+    # 3. Stagioni, organizzatori, produzioni collegate
+    df = load(files["FILE_REGIO_STAGIONI"])
+    sid = text(df, "season_id")
+    g.node("Season", "Season_regio", sid, "internal_id_regio",
+           title=text(df, "season_title"), type=text(df, "season_type"),
+           start_date=text(df, "season_start_date"), end_date=text(df, "season_end_date"), source=src)
+    g.id_node("regio_", sid, src, "Season_regio", sid)
+    org = text(df, "organizer_id")
+    g.node("Organizer", "Organizer_regio", org, "internal_id_regio", name=text(df, "organizer_name"), source=src)
+    g.rel("ORGANIZED_BY", "Season_regio", sid, "Organizer_regio", org)
+    prod = explode_list(df, "linked_production_ids")
+    g.node("Production", "Production_regio", prod, "internal_id_regio", source=src)
+    g.rel("INCLUDES_PRODUCTION", "Season_regio", sid[prod.index], "Production_regio", prod)
+    g.rel("IS_PART_OF", "Production_regio", prod, "Season_regio", sid[prod.index])
+
+    # 4. Produzioni e crediti
+    df = load(files["FILE_REGIO_PRODUZIONI"])
+    prod = text(df, "production_id")
+    g.node("Production", "Production_regio", prod, "internal_id_regio",
+           title=text(df, "work_title"), start_date=text(df, "performance_start_date"),
+           end_date=text(df, "performance_end_date"), year=text(df, "year"),
+           first_location=text(df, "first_location"), first_venue=text(df, "first_venue"), source=src)
+    g.id_node("regio_", prod, src, "Production_regio", prod)
+    work = text(df, "related_work_id")
+    g.rel("RELATED_TO_WORK", "Production_regio", prod, "Work_regio", work)
+    g.rel("RELATES_TO", "Work_regio", work, "Production_regio", prod)
+    persona, ruolo = text(df, "person_id"), text(df, "person_role").fillna("")
+    tipi = pd.Series("HAD_ROLE_IN", index=df.index)
+    tipi[ruolo == "Regista"] = "DIRECTED"
+    tipi[ruolo == "Scenografo"] = "DESIGNED_SET"
+    tipi[ruolo == "Coreografo"] = "CHOREOGRAPHED"
+    tipi[ruolo.str.contains("Costumista", regex=False)] = "DESIGNED_COSTUMES"
+    for tipo, idx in tipi.groupby(tipi).groups.items():
+        extra = {"role": ruolo[idx].mask(ruolo[idx] == "")} if tipo == "HAD_ROLE_IN" else {}
+        g.rel(tipo, "Person_regio", persona[idx], "Production_regio", prod[idx], **extra)
+
+    # 5. Recite: il file wide pubblicato torna una riga per recita + edge list
+    df, archi = long_from_wide(load(files["FILE_REGIO_RECITE"]))
+    prod, recita = text(df, "production_id"), text(df, "id")
+    perf = (prod + "_" + recita).where(prod.notna() & recita.notna())
+    g.node("Performance", "Performance_regio", perf, "internal_id_regio",
+           internal_id_dettaglio=recita, title=text(df, "titolo_breve"), date=text(df, "from"),
+           venue=text(df, "luogo_nome"), building=text(df, "edificio_nome"), source=src)
+    g.id_node("regio_", perf, src, "Performance_regio", perf)
+    g.node("Production", "Production_regio", prod.where(perf.notna()), "internal_id_regio")
+    g.rel("HAS_PERFORMANCE", "Production_regio", prod, "Performance_regio", perf)
+    work = text(df, "composizione_id")
+    g.rel("RELATED_TO_WORK", "Performance_regio", perf, "Work_regio", work)
+    g.rel("RELATES_TO", "Work_regio", work, "Performance_regio", perf)
+
+    # 5.1-5.3 Direttori, interpreti ed esecutori dall'edge list; la chiave della
+    # recita (production_id + id) si ricava dalla tabella delle recite
+    chiavi = pd.Series(perf.to_numpy(), index=recita.to_numpy()).dropna()
+    chiavi = chiavi[~chiavi.index.duplicated()]
+    arco_perf = text(archi, "id_recita").map(chiavi)
+    relazione, entita, nome, ruolo = (text(archi, c) for c in ["relazione", "entita_id", "entita_nome", "ruolo"])
+
+    cur = entita.where((relazione == "curatore") & ruolo.notna() & arco_perf.notna())
+    g.node("Person", "Person_regio", cur, "internal_id_regio", name=nome, source=src)
+    direttore = ruolo.str.contains("Direttore", regex=False).fillna(False)
+    g.rel("CONDUCTED", "Person_regio", cur.where(direttore), "Performance_regio", arco_perf)
+
+    personaggio = text(archi, "personaggio")
+    interprete = entita.where((relazione == "interprete") & personaggio.notna() & arco_perf.notna())
+    personaggio = personaggio.where(interprete.notna())
+    g.node("Person", "Person_regio", interprete, "internal_id_regio", name=nome, source=src)
+    character_by_name(g, archi, personaggio, src)
+    g.rel("INTERPRETED", "Person_regio", interprete, "Character", "nome:" + personaggio)
+    g.rel("APPEARED_IN", "Character", "nome:" + personaggio, "Performance_regio", arco_perf)
+    g.rel("PERFORMED_IN", "Person_regio", interprete, "Performance_regio", arco_perf, role=ruolo)
+
+    ens = entita.where((relazione == "esecutore") & arco_perf.notna())
+    g.node("Ensemble", "Ensemble_regio", ens, "internal_id_regio", name=nome, type=ruolo, source=src)
+    g.rel("PARTICIPATED_IN", "Ensemble_regio", ens, "Performance_regio", arco_perf)
+
+
+def character_by_name(g, df, personaggio, source):
+    """Personaggi delle recite, identificati dal nome (MERGE (:Character {name}) negli script)."""
+    g.node("Character", "Character", "nome:" + personaggio, name=personaggio,
+           voice_type=text(df, "personaggio_voce"), source=source)
+
+
+# === FONDAZIONE ===
+
+def build_fondazione(g, files):
+    src = "Fondazione"
+
+    # 1. Persone
+    df = load(files["FILE_FONDAZIONE_PERSONE"])
+    pid = text(df, "id")
+    g.node("Person", "Person_fondazione", pid, "internal_id_fondazione",
+           name=text(df, "dcTitle"), wikidata_qid=text(df, "entity"), wikidata_uri=text(df, "uri"), source=src)
+    g.id_node("fondazione_", pid, src, "Person_fondazione", pid)
+
+    # 2. Opere e persone collegate
+    df = load(files["FILE_FONDAZIONE_OPERE"])
+    wid = text(df, "id")
+    g.node("Work", "Work_fondazione", wid, "internal_id_fondazione",
+           title=text(df, "dcTitle"), wikidata_qid=text(df, "entity_id"), source=src)
+    g.id_node("fondazione_", wid, src, "Work_fondazione", wid)
+    persona = trailing_id(explode_list(df, "persone_collegate"))
+    g.node("Person", "Person_fondazione", persona, "internal_id_fondazione", source=src)
+    g.rel("HAD_ROLE_IN", "Person_fondazione", persona, "Work_fondazione", wid[persona.index], source=src)
+
+    # 3. Produzioni; 3.1 / 3.2 opere e persone dalla tabella link (ID e ruolo sulla stessa riga)
+    df = load(files["FILE_FONDAZIONE_PRODUZIONI"], sep=";")
+    prod = text(df, "id")
+    g.node("Production", "Production_fondazione", prod, "internal_id_fondazione",
+           title=text(df, "dcTitle"), start_date=text(df, "from"), end_date=text(df, "to"),
+           source=src, city=text(df, "luogo_rappresentazione"), venue=text(df, "edificio_rappresentazione"))
+    g.id_node("fondazione_", prod, src, "Production_fondazione", prod)
+
+    links = load(files["FILE_FONDAZIONE_PRODUZIONI_LINKS"], sep=";")
+    relazione, link_prod, entita = text(links, "relazione"), text(links, "production_id"), text(links, "entita_id")
+    opera = relazione == "opera"
+    work = entita[opera]
+    g.node("Work", "Work_fondazione", work, "internal_id_fondazione", source=src)
+    g.rel("RELATED_TO_WORK", "Production_fondazione", link_prod[opera], "Work_fondazione", work)
+    g.rel("RELATES_TO", "Work_fondazione", work, "Production_fondazione", link_prod[opera])
+
+    crediti = relazione == "persona"
+    persona = entita[crediti]
+    g.node("Person", "Person_fondazione", persona, "internal_id_fondazione", source=src)
+    ruolo = text(links, "ruolo")[crediti].fillna("")
+    prod_credito = link_prod[crediti]
+    tipi = pd.Series("HAD_ROLE_IN", index=persona.index)
+    for tipo, parole in [("DESIGNED_COSTUMES", ("Costumista", "costumi")),
+                         ("CHOREOGRAPHED", ("Coreografo", "coreografia")),
+                         ("DESIGNED_SET", ("Scenografo", "scene")),
+                         ("DIRECTED", ("Regista", "regia"))]:
+        # In ordine inverso di priorità: vince il primo WHEN del CASE negli script
+        tipi[ruolo.str.contains(parole[0], regex=False) | ruolo.str.contains(parole[1], regex=False)] = tipo
+    for tipo, idx in tipi.groupby(tipi).groups.items():
+        extra = {"role": ruolo[idx].mask(ruolo[idx] == "")} if tipo == "HAD_ROLE_IN" else {}
+        g.rel(tipo, "Person_fondazione", persona[idx], "Production_fondazione", prod_credito[idx], **extra)
+
+    # 4. Recite con edifici e opere (una riga per recita, ricavata dal file wide)
+    df, archi = long_from_wide(load(files["FILE_FONDAZIONE_RECITE"]))
+    perf = text(df, "id")
+    g.node("Performance", "Performance_fondazione", perf, "internal_id_fondazione",
+           title=text(df, "titolo_breve"), date=text(df, "from"), venue=text(df, "luogo_nome"),
+           building_text=text(df, "edificio_nome"), source=src)
+    g.id_node("fondazione_", perf, src, "Performance_fondazione", perf)
+
+    edificio = text(df, "edificio_id").where(perf.notna())
+    g.node("Building", "Building_fondazione", edificio, "internal_id_fondazione",
+           name=text(df, "edificio_nome"), city=text(df, "luogo_nome"),
+           wikidata_qid=text(df, "entity"), wikidata_uri=text(df, "uri"), source=src)
+    g.rel("HELD_IN", "Performance_fondazione", perf, "Building_fondazione", edificio)
+
+    work = text(df, "composizione_id").where(perf.notna())
+    g.node("Work", "Work_fondazione", work, "internal_id_fondazione")
+    g.rel("RELATED_TO_WORK", "Performance_fondazione", perf, "Work_fondazione", work)
+    g.rel("RELATES_TO", "Work_fondazione", work, "Performance_fondazione", perf)
+
+    # 4.1-4.3 Direttori, esecutori e interpreti dall'edge list (una riga per recita e persona)
+    arco_perf = text(archi, "id_recita")
+    arco_perf = arco_perf.where(arco_perf.isin(perf.dropna()))
+    relazione, entita, nome, ruolo = (text(archi, c) for c in ["relazione", "entita_id", "entita_nome", "ruolo"])
+
+    cur = entita.where((relazione == "curatore") & arco_perf.notna())
+    g.node("Person", "Person_fondazione", cur, "internal_id_fondazione", name=nome, source=src)
+    g.rel("CONDUCTED", "Person_fondazione", cur, "Performance_fondazione", arco_perf)
+
+    ens = entita.where((relazione == "esecutore") & arco_perf.notna())
+    g.node("Ensemble", "Ensemble_fondazione", ens, "internal_id_fondazione", name=nome, source=src)
+    g.rel("PARTICIPATED_IN", "Ensemble_fondazione", ens, "Performance_fondazione", arco_perf, role=ruolo)
+
+    interprete = entita.where((relazione == "interprete") & arco_perf.notna())
+    g.node("Person", "Person_fondazione", interprete, "internal_id_fondazione", name=nome, source=src)
+    g.rel("PERFORMED_IN", "Person_fondazione", interprete, "Performance_fondazione", arco_perf, role=ruolo)
+
+    # Il personaggio appartiene all'opera della recita
+    opera_recita = pd.Series(work.to_numpy(), index=perf.to_numpy()).dropna()
+    opera_recita = opera_recita[~opera_recita.index.duplicated()]
+    personaggio = text(archi, "personaggio").where(interprete.notna())
+    character_by_name(g, archi, personaggio, src)
+    g.rel("INTERPRETED", "Person_fondazione", interprete, "Character", "nome:" + personaggio)
+    g.rel("APPEARED_IN", "Character", "nome:" + personaggio, "Performance_fondazione", arco_perf)
+    g.rel("HAS_CHARACTER", "Work_fondazione", arco_perf.map(opera_recita), "Character", "nome:" + personaggio)
+
+    # 4.5 Produzioni -> recite (solo tra nodi esistenti, come MATCH)
+    recita = text(links, "relazione") == "recita"
+    g.rel("HAS_PERFORMANCE", "Production_fondazione", link_prod[recita],
+          "Performance_fondazione", text(links, "entita_id")[recita])
+
+    # 5. Stagioni e link a produzioni / recite
+    df = load(files["FILE_FONDAZIONE_STAGIONI"])
+    sid = text(df, "id")
+    g.node("Season", "Season_fondazione", sid, "internal_id_fondazione",
+           title=text(df, "dcTitle"), type=text(df, "dcType"),
+           start_date=text(df, "from"), end_date=text(df, "to"), source=src)
+    g.id_node("fondazione_", sid, src, "Season_fondazione", sid)
+
+    df = load(files["FILE_FONDAZIONE_STAGIONI_LINKS"])
+    relazione, stagione, entita = text(df, "relazione"), text(df, "season_id"), text(df, "entita_id")
+    prod = entita.where(relazione == "produzione")
+    g.rel("INCLUDES_PRODUCTION", "Season_fondazione", stagione, "Production_fondazione", prod)
+    g.rel("IS_PART_OF", "Production_fondazione", prod, "Season_fondazione", stagione)
+    g.rel("INCLUDES_PERFORMANCE", "Season_fondazione", stagione, "Performance_fondazione",
+          entita.where(relazione == "recita"))
+
+
+def character_aliases(g):
+    """
+    Negli script i personaggi delle recite fanno MERGE per nome: se un personaggio
+    con QID (dalle opere Regio) ha già quel nome, è lo stesso nodo.
+    """
+    con_qid = pd.concat([f for f in g.nodes["Character"]], ignore_index=True)
+    con_qid = con_qid[~con_qid["id"].str.startswith("nome:") & con_qid["name"].notna()]
+    primo = con_qid.drop_duplicates("name")
+    g.alias("Character", dict(zip("nome:" + primo["name"], primo["id"])))
+
+
+def import_command(opzioni, database, out_dir):
+    """Comando neo4j-admin con percorsi relativi alla cartella di output."""
+    args = ["neo4j-admin", "database", "import", "full", database, "--overwrite-destination",
+            f"--array-delimiter={ARRAY_DELIMITER}", "--multiline-fields=true"]
+    for flag, nome, path, _ in opzioni:
+        args.append(f"{flag}={nome}={Path(path).relative_to(out_dir)}")
+    return " ".join(shlex.quote(a) for a in args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera i CSV per neo4j-admin database import.")
+    parser.add_argument("--out", default=OUTPUT_DIR, help="Cartella di output")
+    parser.add_argument("--database", default=DATABASE, help="Database di destinazione dell'import")
+    parser.add_argument("--source", choices=["regio", "fondazione", "all"], default="all")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    g = BulkGraph()
+    if args.source in ("regio", "all"):
+        print("Regio: lettura tabelle...")
+        build_regio(g, script_files(SCRIPT_REGIO))
+    if args.source in ("fondazione", "all"):
+        print("Fondazione: lettura tabelle...")
+        build_fondazione(g, script_files(SCRIPT_FONDAZIONE))
+    if g.nodes["Character"]:
+        character_aliases(g)
+
+    out_dir = Path(args.out)
+    opzioni = g.write(out_dir)
+    comando = import_command(opzioni, args.database, out_dir)
+    (out_dir / IMPORT_SCRIPT).write_text(f"#!/bin/sh\ncd \"$(dirname \"$0\")\"\n{comando}\n", encoding="utf-8")
+
+    for flag, nome, path, n in opzioni:
+        print(f"  {'nodi' if flag == '--nodes' else 'relazioni'} {nome:<22} {n:>9}  {Path(path).name}")
+    n_nodi = sum(n for f, *_, n in opzioni if f == "--nodes")
+    n_rel = sum(n for f, *_, n in opzioni if f == "--relationships")
+    print(f"✅ {n_nodi} nodi e {n_rel} relazioni in {out_dir} ({time.perf_counter() - t0:.1f}s)")
+    print(f"ℹ️  Import (database fermo): sh {out_dir / IMPORT_SCRIPT}")
+    print("ℹ️  Poi, a database avviato: python property_graph/schema.py (vincoli e indici)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+from neo4j import GraphDatabase
+from dotenv import load_dotenv
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+import argparse
+import ast
+import os
+import re
+import sys
+import time
+import traceback
+
+# ================================================================
+# LOADER LOCALE DEL PROPERTY GRAPH
+# ================================================================
+# 1_cypher_regio.py e 2_cypher_fondazione.py fanno leggere al server i CSV
+# pubblicati su GitHub con LOAD CSV. Questo loader usa le STESSE query, ma
+# sostituisce "LOAD CSV ... AS row" con "UNWIND $rows AS row" e invia le righe
+# da qui, lette dalle tabelle locali (parquet tipizzato se presente, altrimenti
+# CSV: vedi normalization/common_io.py). Niente download lato server e niente
+# ".0" reintrodotti dalla conversione in float.
+#
+# I blocchi di uno step partono in parallelo su --workers sessioni dello stesso
+# driver (un pool di connessioni): ogni blocco è una execute_write, che ritenta
+# da sola i deadlock tra sessioni. Gli step restano in sequenza, perché ognuno
+# collega i nodi creati dai precedenti.
+#
+# Con --preaggregate le query degli script non si usano: il CSV delle recite è
+# un prodotto cartesiano (recita x interprete x esecutore ...), e ogni riga
+# rifaceva il MERGE della stessa Performance, Production, Person e delle stesse
+# relazioni CONDUCTED / PARTICIPATED_IN. Qui le tabelle passano dal modello di
+# bulk_import.py, che accorpa nodi e relazioni per tipo: ogni entità e ogni
+# relazione viaggia e prende i lock una volta sola (prima tutti i nodi, poi le
+# relazioni tra nodi già presenti). Ogni chiave compare in un solo blocco,
+# quindi anche i personaggi per nome possono andare in parallelo.
+#
+#   python property_graph/local_loader.py regio
+#   python property_graph/local_loader.py fondazione --batch-size 2000 --workers 8
+#   python property_graph/local_loader.py regio --preaggregate
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "normalization"))
+from common_io import read_source
+from schema import apply_schema
+import bulk_import
+import pandas as pd
+
+dotenv_path = "/Users/elenabinotti/Documents/scuola/unibo/LM-43 DHDK/promemoria group/env.env"
+load_dotenv(dotenv_path=dotenv_path)
+
+user = os.getenv("ID")
+password = os.getenv("SECRET_KEY")
+uri_db = "bolt://archiuidev.promemoriagroup.com:7687"
+
+BATCH_SIZE = 1000
+# Sessioni concorrenti (e connessioni nel pool del driver)
+WORKERS = 4
+
+HERE = Path(__file__).resolve().parent
+
+# Script di origine e step nell'ordine del loro main (vincoli e indici: schema.py).
+# "serial": step che fanno MERGE su chiavi senza vincolo di unicità (Character per
+# nome, vedi schema.py): due sessioni in parallelo creerebbero lo stesso nodo due volte.
+SOURCES = {
+    "regio": {
+        "script": "1_cypher_regio.py",
+        "steps": [
+            ("cypher_import_persone", "1. Importazione Nodi Person"),
+            ("cypher_import_opere_complete", "2. Importazione Works"),
+            ("cypher_import_stagioni", "3. Importazione Seasons"),
+            ("cypher_import_produzioni_recite", "4. Importazione Productions"),
+            ("cypher_import_dettagli_performance", "5. Importazione Performances"),
+            ("cypher_import_direttori_recite", "5.1 Direttori Performances"),
+            ("cypher_import_interpreti_recite", "5.2 Interpreti Performances"),
+            ("cypher_import_esecutori_recite", "5.3 Esecutori Performances"),
+        ],
+        "serial": {"cypher_import_interpreti_recite"},
+    },
+    "fondazione": {
+        "script": "2_cypher_fondazione.py",
+        "steps": [
+            ("cypher_import_persone", "1. Persone (Arricchimento Wikidata)"),
+            ("cypher_import_opere", "2. Opere (Works)"),
+            ("cypher_import_produzioni", "3. Produzioni (Productions)"),
+            ("cypher_link_produzioni_opere", "3.1 Link Produzioni->Opere"),
+            ("cypher_link_produzioni_persone", "3.2 Link Produzioni->Persone"),
+            ("cypher_import_recite", "4. Recite (Performances)"),
+            ("cypher_import_direttori_recite", "4.1 Direttori Recite"),
+            ("cypher_import_esecutori_recite", "4.2 Esecutori Recite"),
+            ("cypher_import_interpreti_recite", "4.3 Interpreti e Personaggi Recite"),
+            ("cypher_link_produzioni_recite", "4.5 Link Produzioni->Recite"),
+            ("cypher_import_stagioni", "5. Stagioni (Seasons)"),
+            ("cypher_link_stagioni_produzioni", "5.1 Link Stagioni->Produzioni"),
+            ("cypher_link_stagioni_recite", "5.2 Link Stagioni->Recite"),
+        ],
+        "serial": {"cypher_import_interpreti_recite"},
+    },
+}
+
+RE_LOAD_CSV = re.compile(
+    r"LOAD CSV WITH HEADERS FROM '(?P<url>[^']+)' AS row\s*(?:FIELDTERMINATOR '(?P<sep>[^']*)')?",
+    re.IGNORECASE,
+)
+
+
+def load_definitions(script):
+    """
+    Legge dallo script le costanti FILE_*, le query cypher_* e clean_db
+    senza eseguirlo (gli script si collegano a Neo4j appena importati).
+    """
+    tree = ast.parse((HERE / script).read_text(encoding="utf-8"))
+    ns = {}
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name == "clean_db":
+            exec(compile(ast.Module([node], type_ignores=[]), script, "exec"), ns)
+        elif isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            name = node.targets[0].id
+            if name.startswith(("FILE_", "cypher_")):
+                ns[name] = eval(compile(ast.Expression(node.value), script, "eval"), ns)
+    return ns
+
+
+def to_unwind(query):
+    """(query con UNWIND $rows, URL del CSV, separatore) a partire dalla query LOAD CSV."""
+    m = RE_LOAD_CSV.search(query)
+    if not m:
+        raise ValueError("Query senza LOAD CSV WITH HEADERS")
+    unwind = query[:m.start()] + "UNWIND $rows AS row" + query[m.end():]
+    return unwind, m.group("url"), m.group("sep") or ","
+
+
+def table_rows(url, sep):
+    """
+    Tabella con le righe come le vedrebbe LOAD CSV: tutti i valori testuali, celle
+    vuote -> null. Le intestazioni vengono ripulite dagli spazi come nel resto della pipeline.
+    """
+    df = read_source(url, sep=sep, na=True)
+    df.columns = df.columns.str.strip()
+    return df.astype(object).where(df.notna() & (df != ""), None)
+
+
+def batches(df, batch_size):
+    """(prima riga, lista di dict) per blocco: i dict si creano solo quando il blocco parte."""
+    for i in range(0, len(df), batch_size):
+        yield i, df.iloc[i:i + batch_size].to_dict("records")
+
+
+def write_batch(driver, query, batch):
+    """Un blocco in una transazione, su una sessione propria presa dal pool."""
+    with driver.session() as session:
+        record = session.execute_write(lambda tx: tx.run(query, rows=batch).single())
+    return record.value() if record else None
+
+
+def run_batches(driver, query, df, batch_size, workers, step_name):
+    """
+    Esegue la query sui blocchi di righe, fino a workers transazioni in volo.
+    Restituisce le righe scritte (0 se lo step si è interrotto per un errore).
+    """
+    print(f"\n--- Inizio: {step_name} ({len(df)} righe, {workers} sessioni) ---")
+    t0 = time.perf_counter()
+    risultati = {}
+    errore = None
+    in_volo = {}
+    blocchi = batches(df, batch_size)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            # Al massimo 2 blocchi per sessione già pronti: la memoria resta limitata
+            while errore is None and len(in_volo) < 2 * workers:
+                blocco = next(blocchi, None)
+                if blocco is None:
+                    break
+                i, batch = blocco
+                in_volo[pool.submit(write_batch, driver, query, batch)] = (i, len(batch))
+            if not in_volo:
+                break
+            finiti, _ = wait(in_volo, return_when=FIRST_COMPLETED)
+            for fut in finiti:
+                i, n = in_volo.pop(fut)
+                try:
+                    risultati[i] = fut.result()
+                except Exception as e:
+                    # I blocchi già in volo finiscono, non se ne lanciano altri
+                    if errore is None:
+                        errore = f"righe {i}-{i + n - 1}: {e}"
+
+    if errore:
+        print(f"ERRORE CRITICO in {step_name} ({errore})")
+        print(">>> Il processo continua con lo step successivo...")
+        return 0
+    durata = time.perf_counter() - t0
+    print(f"SUCCESSO: {step_name} completato in {durata:.1f}s ({len(df) / max(durata, 1e-9):.0f} righe/s).")
+    valori = [risultati[i] for i in sorted(risultati)]
+    print(f"Risultati per blocco: {valori[:5]}{' ...' if len(valori) > 5 else ''}")
+    return len(df)
+
+
+# === MODALITÀ PRE-AGGREGATA ===
+
+# Costruzione del grafo accorpato per sorgente (vedi bulk_import.py)
+BUILDERS = {
+    "regio": bulk_import.build_regio,
+    "fondazione": bulk_import.build_fondazione,
+}
+
+
+def merge_keys(g, space, ids):
+    """
+    Proprietà del MERGE per ogni ID dello spazio e valore da cercare. I personaggi
+    hanno due chiavi: wikidata_qid, oppure il nome per quelli senza QID ("nome:...").
+    """
+    if space != "Character":
+        return pd.Series(g.id_props[space], index=ids.index), ids
+    per_nome = ids.str.startswith("nome:")
+    return per_nome.map({True: "name", False: "wikidata_qid"}), ids.where(~per_nome, ids.str[len("nome:"):])
+
+
+def property_maps(df):
+    """
+    Una mappa di proprietà per riga, senza i valori mancanti (SET n += {x: null}
+    cancellerebbe la proprietà). Le colonne string[] diventano liste, come SPLIT.
+    """
+    df = df.astype(object)
+    for c, tipo in bulk_import.PROPERTY_TYPES.items():
+        if c in df.columns and tipo == "string[]":
+            df[c] = df[c].map(lambda v: v.split(bulk_import.ARRAY_DELIMITER) if isinstance(v, str) else None)
+    return [{k: v for k, v in r.items() if v is not None and v is not pd.NA and v == v}
+            for r in df.to_dict("records")]
+
+
+def node_batches(g, space, df):
+    """(query, righe) per ogni chiave di MERGE dello spazio."""
+    chiavi, valori = merge_keys(g, space, df["id"])
+    righe = pd.DataFrame({"id": valori, "props": property_maps(df.drop(columns="id"))}, index=df.index)
+    for chiave, idx in chiavi.groupby(chiavi).groups.items():
+        query = (f"UNWIND $rows AS row\n"
+                 f"MERGE (n:{g.labels[space]} {{{chiave}: row.id}})\n"
+                 f"ON CREATE SET n += row.props\n"
+                 f"RETURN count(*)")
+        yield query, righe.loc[idx]
+
+
+def rel_batches(g, key, df):
+    """(query, righe) per ogni combinazione di chiavi degli estremi."""
+    rel_type, start_space, end_space = key
+    start_key, start = merge_keys(g, start_space, df["start"])
+    end_key, end = merge_keys(g, end_space, df["end"])
+    props = df.columns[2:]
+    righe = pd.DataFrame({"start": start, "end": end}, index=df.index)
+    if len(props):
+        righe["props"] = property_maps(df[props])
+    coppie = start_key + "|" + end_key
+    for coppia, idx in coppie.groupby(coppie).groups.items():
+        sk, ek = coppia.split("|")
+        query = (f"UNWIND $rows AS row\n"
+                 f"MATCH (a:{g.labels[start_space]} {{{sk}: row.start}})\n"
+                 f"MATCH (b:{g.labels[end_space]} {{{ek}: row.end}})\n"
+                 f"MERGE (a)-[r:{rel_type}]->(b)\n"
+                 + ("SET r += row.props\n" if len(props) else "")
+                 + "RETURN count(r)")
+        yield query, righe.loc[idx]
+
+
+def load_preaggregated(driver, source, batch_size, workers):
+    """Nodi distinti, poi relazioni distinte: restituisce le righe scritte."""
+    print(f"\n--- Accorpamento {source}: lettura tabelle e modello di bulk_import.py ---")
+    g = bulk_import.BulkGraph()
+    BUILDERS[source](g, bulk_import.script_files(SOURCES[source]["script"]))
+    if g.nodes["Character"]:
+        bulk_import.character_aliases(g)
+
+    totale = raccolte = 0
+    for kind, key, df in g.tables():
+        raccolte += g.raw_rows(kind, key)
+        if kind == "node":
+            nome = f"Nodi {g.labels[key]} ({key})"
+            parti = node_batches(g, key, df)
+        else:
+            nome = f"Relazioni {key[0]} ({key[1]} -> {key[2]})"
+            parti = rel_batches(g, key, df)
+        print(f"\nℹ️  {nome}: {g.raw_rows(kind, key)} righe raccolte -> {len(df)} distinte")
+        for query, righe in parti:
+            totale += run_batches(driver, query, righe, batch_size, workers, nome)
+    print(f"\nℹ️  Accorpamento: {raccolte} righe raccolte, {totale} scritte una volta sola.")
+    return totale
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carica il property graph dalle tabelle locali.")
+    parser.add_argument("source", choices=sorted(SOURCES))
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Righe per transazione")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Sessioni concorrenti per step")
+    parser.add_argument("--clean", action="store_true", help="Svuota il database prima (clean_db dello script, se c'è)")
+    parser.add_argument("--preaggregate", action="store_true",
+                        help="Accorpa nodi e relazioni per tipo prima di inviarli (modello di bulk_import.py)")
+    args = parser.parse_args()
+
+    conf = SOURCES[args.source]
+    ns = load_definitions(conf["script"])
+
+    workers = max(1, args.workers)
+    driver = None
+    try:
+        driver = GraphDatabase.driver(uri_db, auth=(user, password), max_connection_pool_size=workers + 1)
+        driver.verify_connectivity()
+        print(f"Connesso a {uri_db}")
+
+        if args.clean and "clean_db" in ns:
+            ns["clean_db"](driver)
+        apply_schema(driver)
+
+        t0 = time.perf_counter()
+        totale = 0
+        if args.preaggregate:
+            totale = load_preaggregated(driver, args.source, max(1, args.batch_size), workers)
+        else:
+            for query_name, step_name in conf["steps"]:
+                query, url, sep = to_unwind(ns[query_name])
+                df = table_rows(url, sep)
+                sessioni = 1 if query_name in conf["serial"] else workers
+                totale += run_batches(driver, query, df, max(1, args.batch_size), sessioni, step_name)
+
+        durata = time.perf_counter() - t0
+        print(f"\n>>> IMPORTAZIONE {args.source.upper()} DA TABELLE LOCALI COMPLETATA: "
+              f"{totale} righe in {durata:.1f}s ({totale / max(durata, 1e-9):.0f} righe/s, lettura compresa).")
+    except Exception as e:
+        print(f"\n!!! ERRORE GENERALE: {e}")
+        traceback.print_exc()
+    finally:
+        if driver:
+            driver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import argparse
+import os
+import sys
+
+# ================================================================
+# SCHEMA DEL PROPERTY GRAPH: VINCOLI E INDICI IN UN SOLO POSTO
+# ================================================================
+# create_constraints (1_cypher_regio.py) e create_constraints_fondazione
+# (2_cypher_fondazione.py) coprivano solo gli internal_id_*: i MERGE su
+# Character {name} / {wikidata_qid}, le fusioni per wikidata_qid di
+# 5_node_merge.py, l'indice vettoriale letto da 6_merge_vector.py e le ricerche
+# del sito giravano senza indice, cioè con una scansione dell'etichetta per riga.
+# In più i vincoli venivano usati subito dopo il CREATE, mentre l'indice che li
+# sostiene era ancora in popolamento, e ogni errore veniva ignorato in silenzio.
+#
+# Qui c'è l'elenco completo (etichetta, proprietà, chi la usa). apply_schema lo
+# applica con IF NOT EXISTS (idempotente: rilanciarlo non cambia nulla), segnala
+# i CREATE falliti (es. duplicati che impediscono un vincolo) e aspetta con
+# db.awaitIndexes che tutti gli indici siano ONLINE prima di restituire.
+#
+#   python property_graph/schema.py            # applica e aspetta
+#   python property_graph/schema.py --print    # mostra solo le istruzioni
+
+# Tempo massimo di attesa per il popolamento degli indici (secondi)
+AWAIT_TIMEOUT = 600
+
+# Vincoli di unicità: (nome, etichetta, proprietà). I nomi già usati dagli script
+# restano gli stessi, così su un database esistente il CREATE non duplica nulla.
+CONSTRAINTS = [
+    # Chiavi dei MERGE dei loader (1_cypher_regio.py, 2_cypher_fondazione.py, local_loader.py)
+    ("person_id_regio_unique", "Person", "internal_id_regio"),
+    ("person_internal_id_fond_unique", "Person", "internal_id_fondazione"),
+    ("work_id_regio_unique", "Work", "internal_id_regio"),
+    ("work_internal_id_fondazione_unique", "Work", "internal_id_fondazione"),
+    ("season_id_regio_unique", "Season", "internal_id_regio"),
+    ("season_internal_id_fondazione_unique", "Season", "internal_id_fondazione"),
+    ("production_id_regio_unique", "Production", "internal_id_regio"),
+    ("production_internal_id_fondazione_unique", "Production", "internal_id_fondazione"),
+    ("performance_id_regio_unique", "Performance", "internal_id_regio"),
+    ("performance_internal_id_fondazione_unique", "Performance", "internal_id_fondazione"),
+    ("ensemble_id_regio_unique", "Ensemble", "internal_id_regio"),
+    ("ensemble_internal_id_fondazione_unique", "Ensemble", "internal_id_fondazione"),
+    ("organizer_id_regio_unique", "Organizer", "internal_id_regio"),
+    ("organizer_id_fondazione_unique", "Organizer", "internal_id_fondazione"),
+    ("building_id_regio_unique", "Building", "internal_id_regio"),
+    ("building_id_fondazione_unique", "Building", "internal_id_fondazione"),
+    # Personaggi delle opere Regio: MERGE per QID
+    ("character_wikidata_qid_unique", "Character", "wikidata_qid"),
+    # Nodi ID: MERGE dei loader e ingresso di entity.html
+    ("id_code_unique", "ID", "code"),
+]
+
+# Indici non univoci: (nome, tipo, etichetta, proprietà)
+INDEXES = [
+    # MERGE (:Character {name}) delle recite: più personaggi con QID diversi possono avere lo stesso nome
+    ("character_name", "RANGE", "Character", "name"),
+    # Raggruppamenti per QID di 5_node_merge.py (prima della fusione non sono unici)
+    ("person_wikidata_qid", "RANGE", "Person", "wikidata_qid"),
+    ("work_wikidata_qid", "RANGE", "Work", "wikidata_qid"),
+    ("building_wikidata_qid", "RANGE", "Building", "wikidata_qid"),
+    # Ricerche del sito: entity.html (nome, titolo), timeline.html (date STARTS WITH $year)
+    ("person_name", "RANGE", "Person", "name"),
+    ("work_title", "RANGE", "Work", "title"),
+    ("performance_date", "RANGE", "Performance", "date"),
+    # queries.html: name CONTAINS '...'
+    ("person_name_text", "TEXT", "Person", "name"),
+]
+
+# Indici vettoriali: (nome, etichetta, proprietà, dimensioni, similarità).
+# person_embeddings è quello interrogato da 6_merge_vector.py; 384 = all-MiniLM-L6-v2
+VECTOR_INDEXES = [
+    ("person_embeddings", "Person", "embedding", 384, "cosine"),
+]
+
+
+def schema_statements():
+    """Istruzioni CREATE ... IF NOT EXISTS per tutto lo schema, nell'ordine di applicazione."""
+    out = []
+    for name, label, prop in CONSTRAINTS:
+        out.append((name, f"CREATE CONSTRAINT {name} IF NOT EXISTS FOR (n:{label}) REQUIRE n.{prop} IS UNIQUE"))
+    for name, kind, label, prop in INDEXES:
+        out.append((name, f"CREATE {kind} INDEX {name} IF NOT EXISTS FOR (n:{label}) ON (n.{prop})"))
+    for name, label, prop, dims, similarity in VECTOR_INDEXES:
+        out.append((name, f"CREATE VECTOR INDEX {name} IF NOT EXISTS FOR (n:{label}) ON (n.{prop}) "
+                          f"OPTIONS {{indexConfig: {{`vector.dimensions`: {dims}, "
+                          f"`vector.similarity_function`: '{similarity}'}}}}"))
+    return out
+
+
+def apply_schema(driver, timeout=AWAIT_TIMEOUT):
+    """
+    Crea vincoli e indici mancanti e aspetta che siano tutti ONLINE.
+    Restituisce i nomi di quelli che non lo sono (creazione fallita o indice FAILED).
+    """
+    print("\n--- SCHEMA: vincoli e indici ---")
+    falliti = []
+    with driver.session() as session:
+        for name, statement in schema_statements():
+            try:
+                session.run(statement).consume()
+            except Exception as e:
+                print(f"⚠️  {name}: {e}")
+                falliti.append(name)
+
+        try:
+            session.run("CALL db.awaitIndexes($timeout)", timeout=timeout).consume()
+        except Exception as e:
+            print(f"⚠️  Indici non pronti dopo {timeout}s: {e}")
+
+        non_online = [
+            (r["name"], r["state"], r["populationPercent"])
+            for r in session.run("SHOW INDEXES YIELD name, state, populationPercent WHERE state <> 'ONLINE' "
+                                 "RETURN name, state, populationPercent")
+        ]
+    for name, state, perc in non_online:
+        print(f"⚠️  Indice {name}: {state} ({perc:.0f}%)")
+        falliti.append(name)
+
+    n = len(schema_statements())
+    if falliti:
+        print(f"⚠️  Schema applicato con problemi: {len(falliti)} su {n} ({', '.join(sorted(set(falliti)))})")
+    else:
+        print(f"✅ Schema pronto: {len(CONSTRAINTS)} vincoli, {len(INDEXES) + len(VECTOR_INDEXES)} indici, tutti ONLINE.")
+    return sorted(set(falliti))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Applica vincoli e indici del property graph.")
+    parser.add_argument("--print", action="store_true", help="Mostra le istruzioni senza collegarsi")
+    parser.add_argument("--timeout", type=int, default=AWAIT_TIMEOUT, help="Attesa massima per gli indici (s)")
+    args = parser.parse_args()
+
+    if args.print:
+        for _, statement in schema_statements():
+            print(statement + ";")
+        return
+
+    from neo4j import GraphDatabase
+    from dotenv import load_dotenv
+
+    dotenv_path = "/Users/elenabinotti/Documents/scuola/unibo/LM-43 DHDK/promemoria group/env.env"
+    load_dotenv(dotenv_path=dotenv_path)
+    uri_db = "bolt://archiuidev.promemoriagroup.com:7687"
+
+    driver = GraphDatabase.driver(uri_db, auth=(os.getenv("ID"), os.getenv("SECRET_KEY")))
+    try:
+        driver.verify_connectivity()
+        falliti = apply_schema(driver, timeout=args.timeout)
+    finally:
+        driver.close()
+    sys.exit(1 if falliti else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+import argparse
+import ast
+import csv
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent / "normalization"))
+from common_cache import manifest_fresh
+
+# ================================================================
+# PIPELINE: GRAFO DELLE FASI E ESECUZIONE PARALLELA
+# ================================================================
+# Gli script (normalization/*, semantic_graph/1_..4_, property_graph/1_..6_)
+# si lanciavano a mano, uno dopo l'altro. Qui ogni fase dichiara i file che
+# legge e scrive: una fase parte appena sono finite quelle che producono i suoi
+# input, quindi le catene Regio e Fondazione (che non condividono nulla)
+# girano in parallelo. Ogni fase è un processo separato lanciato dalla cartella
+# corrente (la root del repo, come a mano); per ognuna si registrano tempo e picco di memoria.
+#
+#   python run_pipeline.py                     # normalizzazione (Regio || Fondazione)
+#   python run_pipeline.py --group all         # anche grafo RDF e property graph (serve Neo4j)
+#   python run_pipeline.py --only regio_recita regio_riconciliazione
+#   python run_pipeline.py --dry-run           # mostra solo il piano
+#   python run_pipeline.py --force             # passa --force alle fasi con cache (common_cache.py)
+
+ROOT = Path(__file__).resolve().parent
+REPORT_DIR = Path(".cache/pipeline")
+REPORT_FILE = REPORT_DIR / "timings.csv"
+LOG_DIR = REPORT_DIR / "logs"
+
+# Fasi in parallelo (le due catene principali)
+JOBS = 2
+
+GROUPS = ("normalization", "semantic", "property")
+# "in cache": fase saltata da manifest_fresh senza avviare lo script
+ESITI_OK = ("ok", "in cache")
+REPORT_COLUMNS = ["fase", "gruppo", "ramo", "esito", "inizio_s", "durata_s", "picco_mb", "log"]
+
+
+@dataclass
+class Stage:
+    """
+    Una fase della pipeline.
+    inputs/outputs: percorsi relativi alla root del repo oppure nomi di costanti dello
+    script (es. "INPUT"), letti dal sorgente senza eseguirlo.
+    after: dipendenze esplicite quando non passano da un file (es. stato di Neo4j).
+    lock: fasi con lo stesso lock non girano mai insieme (es. stesso database).
+    """
+    name: str
+    script: str
+    group: str
+    branch: str
+    inputs: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+    after: list = field(default_factory=list)
+    lock: str = ""
+
+
+STAGES = [
+    # === NORMALIZZAZIONE REGIO ===
+    Stage("regio_recita", "normalization/regio_recita.py", "normalization", "regio",
+          ["INPUT"], ["OUTPUT_MAIN", "OUTPUT_INTERPRETI", "OUTPUT_CURATORI", "OUTPUT_ESECUTORI",
+                      "OUTPUT_EDGES", "OUTPUT_FINAL"]),
+    Stage("regio_persone_dedup", "normalization/regio_persone_dedup.py", "normalization", "regio",
+          ["INPUT_FILE"], ["OUTPUT_FILE", "CONFLICTS_FILE"]),
+    Stage("regio_riconciliazione", "normalization/regio_riocnciliazione_id_interpreti_recita.py",
+          "normalization", "regio", ["INPUT_RECITE", "INPUT_PERSONE"], ["OUTPUT_FINAL", "OUTPUT_AUDIT"]),
+    Stage("regio_qid_luoghi", "normalization/regio_qid_luoghi.py", "normalization", "regio",
+          ["FILE_PRINCIPALE", "FILE_EDGES", "dataset/regio/recite/recite-regio-luoghi-csv.csv",
+           "dataset/fondazione/Recite/recite-fondazione_luoghi_qid.csv"],
+          ["OUTPUT_FILE", "OUTPUT_WIDE", "UNMATCHED_FILE"], lock="gazetteer"),
+    Stage("regio_luoghi", "normalization/regio_luoghi.py", "normalization", "regio",
+          ["INPUT_FILE"], ["OUTPUT_FILE"]),
+    Stage("regio_produzioni", "normalization/regio_produzioni.py", "normalization", "regio",
+          ["dataset/regio/produzioni/20251103_export_produzioni_regio.csv"],
+          ["dataset/regio/_regio_produzioni.csv", "dataset/regio/_regio_produzioni_base.csv",
+           "dataset/regio/_regio_produzioni_crediti.csv"]),
+    Stage("regio_opere", "normalization/regio_opere.py", "normalization", "regio",
+          ["CSV_INPUT_PATH"], ["CSV_OUTPUT_PATH"]),
+    Stage("regio_persons", "normalization/regio_persons.py", "normalization", "regio",
+          ["input_file"], ["output_file"]),
+
+    # === NORMALIZZAZIONE FONDAZIONE ===
+    Stage("fondazione_recite", "normalization/fondazione_recite.py", "normalization", "fondazione",
+          ["INPUT"], ["OUTPUT_MAIN", "OUTPUT_INTERPRETI", "OUTPUT_CURATORI", "OUTPUT_ESECUTORI",
+                      "OUTPUT_EDGES", "OUTPUT_FINAL"]),
+    Stage("fondazione_riconciliazione", "normalization/fondazione_riocnciliazione_id_interpreti_recita.py",
+          "normalization", "fondazione", ["INPUT_RECITE", "INPUT_PERSONE"], ["OUTPUT_FINAL", "OUTPUT_AUDIT"]),
+    Stage("fondazione_qid_luoghi", "normalization/fondazione_qid_luoghi_fondazione.py", "normalization",
+          "fondazione", ["FILE_PRINCIPALE", "FILE_EDGES", "dataset/regio/recite/recite-regio-luoghi-csv.csv",
+                         "dataset/fondazione/Recite/recite-fondazione_luoghi_qid.csv"],
+          ["OUTPUT_FILE", "OUTPUT_WIDE", "UNMATCHED_FILE"], lock="gazetteer"),
+    Stage("fondazione_luoghi", "normalization/fondazione_luoghi.py", "normalization", "fondazione",
+          ["INPUT_FILE"], ["OUTPUT_FILE"]),
+    Stage("fondazione_produzioni", "normalization/fondazione_produzioni.py", "normalization", "fondazione",
+          ["INPUT"], ["OUTPUT", "OUTPUT_LINKS"]),
+    Stage("fondazione_stagioni", "normalization/fondazione_stagioni.py", "normalization", "fondazione",
+          ["INPUT_CSV"], ["OUTPUT_CSV", "OUTPUT_LINKS"]),
+    Stage("fondazione_pulizia_virgolette", "normalization/fondazione_pulizia_produzioni_virgolette.py",
+          "normalization", "fondazione", ["INPUT_FILE"], ["OUTPUT_FILE", "QUARANTINE_FILE"]),
+
+    # === GRAFO RDF (leggono i CSV pubblicati su GitHub) ===
+    Stage("rdf_regio", "semantic_graph/1_regio.py", "semantic", "regio", [], ["OUTPUT_TTL"]),
+    Stage("rdf_fondazione", "semantic_graph/2_fondazione.py", "semantic", "fondazione", [], ["OUTPUT_TTL"]),
+    Stage("rdf_regio_upload", "semantic_graph/3_regio_neosemantics_upload.py", "semantic", "regio",
+          after=["rdf_regio"], lock="neo4j"),
+    Stage("rdf_fondazione_upload", "semantic_graph/4_fondazione_neosemantics_upload.py", "semantic", "fondazione",
+          after=["rdf_fondazione"], lock="neo4j"),
+
+    # === PROPERTY GRAPH (stesso database: una fase alla volta) ===
+    Stage("pg_regio", "property_graph/1_cypher_regio.py", "property", "regio", lock="neo4j"),
+    Stage("pg_fondazione", "property_graph/2_cypher_fondazione.py", "property", "fondazione", lock="neo4j"),
+    Stage("pg_vector_opere", "property_graph/3_vector_opere.py", "property", "merge",
+          after=["pg_regio", "pg_fondazione"], lock="neo4j"),
+    Stage("pg_vector_persone", "property_graph/4_vector_persone.py", "property", "merge",
+          after=["pg_regio", "pg_fondazione"], lock="neo4j"),
+    Stage("pg_node_merge", "property_graph/5_node_merge.py", "property", "merge",
+          after=["pg_regio", "pg_fondazione"], lock="neo4j"),
+    Stage("pg_merge_vector", "property_graph/6_merge_vector.py", "property", "merge",
+          after=["pg_vector_persone", "pg_node_merge"], lock="neo4j"),
+]
+
+
+# === RISOLUZIONE DI INPUT E OUTPUT ===
+
+def script_constants(script):
+    """Assegnazioni a stringa (o Path("...")) al livello del modulo, lette con ast senza eseguire lo script."""
+    tree = ast.parse((ROOT / script).read_text(encoding="utf-8"))
+    costanti = {}
+    for node in tree.body:
+        if not isinstance(node, ast.Assign) or len(node.targets) != 1 or not isinstance(node.targets[0], ast.Name):
+            continue
+        value = node.value
+        if isinstance(value, ast.Call) and getattr(value.func, "id", "") == "Path" and value.args:
+            value = value.args[0]
+        if isinstance(value, ast.Constant) and isinstance(value.value, str):
+            costanti[node.targets[0].id] = value.value
+    return costanti
+
+
+def resolve_paths(stage):
+    """Sostituisce i nomi di costanti con i percorsi scritti nello script."""
+    costanti = script_constants(stage.script)
+
+    def resolve(items):
+        return [costanti.get(x, x) for x in items]
+
+    stage.inputs = resolve(stage.inputs)
+    stage.outputs = resolve(stage.outputs)
+
+
+def path_key(path):
+    # Gli script mescolano "Recite/" e "recite/": sul Mac dove girano è la stessa cartella
+    return os.path.normcase(os.path.normpath(path)).casefold()
+
+
+def build_graph(stages):
+    """Dipendenze di ogni fase: chi produce i suoi input + le dipendenze esplicite (after)."""
+    producers = {}
+    for s in stages:
+        for out in s.outputs:
+            producers[path_key(out)] = s.name
+    names = {s.name for s in stages}
+
+    deps = {}
+    for s in stages:
+        d = {producers[path_key(i)] for i in s.inputs if path_key(i) in producers}
+        d |= {a for a in s.after if a in names}
+        d.discard(s.name)
+        deps[s.name] = d
+    return deps
+
+
+def topo_levels(stages, deps):
+    """Livelli del grafo (fasi dello stesso livello possono girare insieme); errore se c'è un ciclo."""
+    rimaste = {s.name: set(deps[s.name]) for s in stages}
+    livelli = []
+    while rimaste:
+        pronte = sorted(n for n, d in rimaste.items() if not d)
+        if not pronte:
+            raise ValueError(f"Ciclo tra le fasi: {sorted(rimaste)}")
+        livelli.append(pronte)
+        for n in pronte:
+            del rimaste[n]
+        for d in rimaste.values():
+            d.difference_update(pronte)
+    return livelli
+
+
+# === ESECUZIONE DI UNA FASE ===
+
+def run_stage(stage, extra_args, t0):
+    """
+    Lancia lo script in un processo figlio dalla cartella corrente, con l'output su file di log.
+    Il picco di memoria (RSS) arriva da wait4, che lo misura per il solo processo figlio.
+    Le fasi con StageCache (manifest in .cache/<script>.json) il cui manifest è ancora
+    valido non vengono avviate: solo gli import di pandas costano secondi per fase.
+    """
+    inizio = time.perf_counter()
+    if "--force" not in extra_args and manifest_fresh(Path(stage.script).stem):
+        return {
+            "fase": stage.name, "gruppo": stage.group, "ramo": stage.branch, "esito": "in cache",
+            "inizio_s": round(inizio - t0, 2), "durata_s": round(time.perf_counter() - inizio, 2),
+            "picco_mb": "", "log": "",
+        }
+
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    log_path = LOG_DIR / f"{stage.name}.log"
+    picco_mb = ""
+
+    with open(log_path, "w", encoding="utf-8") as log:
+        proc = subprocess.Popen([sys.executable, str(ROOT / stage.script), *extra_args],
+                                stdout=log, stderr=subprocess.STDOUT)
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            # ru_maxrss è in KB su Linux e in byte su macOS
+            scala = 1024 * 1024 if sys.platform == "darwin" else 1024
+            picco_mb = round(usage.ru_maxrss / scala, 1)
+        else:
+            proc.wait()
+
+    return {
+        "fase": stage.name,
+        "gruppo": stage.group,
+        "ramo": stage.branch,
+        "esito": "ok" if proc.returncode == 0 else f"errore ({proc.returncode})",
+        "inizio_s": round(inizio - t0, 2),
+        "durata_s": round(time.perf_counter() - inizio, 2),
+        "picco_mb": picco_mb,
+        "log": str(log_path),
+    }
+
+
+def priorities(stages, deps, durate_note):
+    """
+    Priorità di ogni fase = durata della catena più lunga che parte da lei (tempi
+    dell'ultimo report, 1s se ignoti). Con slot limitati partono prima le fasi
+    sul percorso critico, così il totale si avvicina al ramo più lungo.
+    """
+    figli = {s.name: [n for n, d in deps.items() if s.name in d] for s in stages}
+    prio = {}
+    for livello in reversed(topo_levels(stages, deps)):
+        for n in livello:
+            prio[n] = durate_note.get(n, 1.0) + max((prio[f] for f in figli[n]), default=0)
+    return prio
+
+
+def run(stages, deps, jobs, extra_args, durate_note=None):
+    """
+    Esegue il grafo: appena una fase finisce partono quelle che dipendevano solo da lei.
+    Se una fase fallisce, le fasi a valle vengono saltate (le altre continuano).
+    """
+    by_name = {s.name: s for s in stages}
+    attese = {n: set(d) for n, d in deps.items()}
+    prio = priorities(stages, deps, durate_note or {})
+    risultati = {}
+    lock_occupati = set()
+    t0 = time.perf_counter()
+
+    def salta(nome, causa):
+        s = by_name[nome]
+        risultati[nome] = {"fase": nome, "gruppo": s.group, "ramo": s.branch,
+                           "esito": f"saltata ({causa})", "inizio_s": "", "durata_s": "", "picco_mb": "", "log": ""}
+        print(f"⏭️  {nome}: saltata, dipende da {causa}")
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        in_corso = {}
+        while attese or in_corso:
+            # Riempie gli slot liberi con le fasi pronte, prima quelle con la catena più lunga
+            pronte = sorted((n for n, d in attese.items() if not d), key=lambda n: (-prio[n], n))
+            for nome in pronte:
+                stage = by_name[nome]
+                if len(in_corso) >= max(1, jobs):
+                    break
+                if stage.lock and stage.lock in lock_occupati:
+                    continue
+                del attese[nome]
+                if stage.lock:
+                    lock_occupati.add(stage.lock)
+                print(f"▶️  {nome} [{stage.branch}]")
+                in_corso[pool.submit(run_stage, stage, extra_args, t0)] = nome
+            if not in_corso:
+                break
+
+            finite, _ = wait(in_corso, return_when=FIRST_COMPLETED)
+            for fut in finite:
+                nome = in_corso.pop(fut)
+                r = fut.result()
+                risultati[nome] = r
+                lock_occupati.discard(by_name[nome].lock)
+                if r["esito"] == "in cache":
+                    print(f"⏭️  {nome}: input, codice e output invariati, in cache")
+                else:
+                    print(f"{'✅' if r['esito'] == 'ok' else '❌'} {nome}: {r['esito']} in {r['durata_s']}s, "
+                          f"picco {r['picco_mb']} MB")
+
+                if r["esito"] in ESITI_OK:
+                    for d in attese.values():
+                        d.discard(nome)
+                    continue
+                # Salta a cascata tutto ciò che dipende (anche indirettamente) dalla fase fallita
+                coda = [nome]
+                while coda:
+                    fallita = coda.pop()
+                    for n in [n for n, d in attese.items() if fallita in d]:
+                        del attese[n]
+                        salta(n, fallita)
+                        coda.append(n)
+
+    totale = round(time.perf_counter() - t0, 2)
+    return [risultati[s.name] for s in stages if s.name in risultati], totale
+
+
+# === REPORT ===
+
+def critical_path(stages, deps, risultati):
+    """Catena di dipendenze con la durata complessiva più lunga (limite inferiore del tempo totale)."""
+    durata = {r["fase"]: r["durata_s"] or 0 for r in risultati}
+    migliore = {}
+    for livello in topo_levels(stages, deps):
+        for n in livello:
+            prima = max((migliore[d] for d in deps[n]), key=lambda x: x[0], default=(0, []))
+            migliore[n] = (prima[0] + durata.get(n, 0), prima[1] + [n])
+    return max(migliore.values(), key=lambda x: x[0], default=(0, []))
+
+
+def read_previous_timings(path=REPORT_FILE):
+    """Durate dell'ultima esecuzione riuscita di ogni fase (per le priorità; le fasi in cache non contano)."""
+    try:
+        with open(path, newline="", encoding="utf-8") as f:
+            return {r["fase"]: float(r["durata_s"]) for r in csv.DictReader(f) if r["esito"] == "ok"}
+    except (FileNotFoundError, KeyError, ValueError):
+        return {}
+
+
+def write_report(risultati, path=REPORT_FILE):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(risultati)
+
+
+def print_plan(stages, deps):
+    for i, livello in enumerate(topo_levels(stages, deps), 1):
+        print(f"Livello {i}:")
+        for n in livello:
+            d = ", ".join(sorted(deps[n])) or "-"
+            print(f"  - {n}  (dopo: {d})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Esegue le fasi della pipeline in ordine di dipendenza.")
+    parser.add_argument("--group", choices=GROUPS + ("all",), nargs="+", default=["normalization"],
+                        help="Gruppi di fasi da eseguire (default: normalization)")
+    parser.add_argument("--only", nargs="+", metavar="FASE",
+                        help="Solo queste fasi (le dipendenze fuori selezione si considerano già fatte)")
+    parser.add_argument("--jobs", type=int, default=JOBS, help="Fasi in parallelo")
+    parser.add_argument("--force", action="store_true", help="Passa --force alle fasi (ignora la cache)")
+    parser.add_argument("--dry-run", action="store_true", help="Mostra il piano senza eseguire nulla")
+    args = parser.parse_args()
+
+    gruppi = set(GROUPS) if "all" in args.group else set(args.group)
+    stages = [s for s in STAGES if s.group in gruppi]
+    if args.only:
+        sconosciute = set(args.only) - {s.name for s in STAGES}
+        if sconosciute:
+            parser.error(f"Fasi sconosciute: {', '.join(sorted(sconosciute))}")
+        stages = [s for s in STAGES if s.name in args.only]
+
+    for s in stages:
+        resolve_paths(s)
+    deps = build_graph(stages)
+
+    print_plan(stages, deps)
+    if args.dry_run:
+        return
+
+    extra = ["--force"] if args.force else []
+    print(f"\nAvvio di {len(stages)} fasi con {args.jobs} in parallelo...\n")
+    risultati, totale = run(stages, deps, args.jobs, extra, read_previous_timings())
+    write_report(risultati)
+
+    somma = sum(r["durata_s"] or 0 for r in risultati)
+    durata_critica, percorso = critical_path(stages, deps, risultati)
+    print("\n--- Tempi ---")
+    print(f"Totale: {totale}s (in sequenza sarebbero {round(somma, 2)}s)")
+    print(f"Percorso critico: {round(durata_critica, 2)}s -> {' > '.join(percorso)}")
+    print(f"Report: {REPORT_FILE}")
+
+    if any(r["esito"] not in ESITI_OK for r in risultati):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,21 @@ from rdflib.namespace import RDF, RDFS, XSD, OWL
 from pathlib import Path
 import unidecode
 import re
+import sys
 
 # ================================================================
 # 1. CONFIGURAZIONE
 # ================================================================
 
+# Modulo condiviso di pulizia ID (normalization/common_ids.py)
+sys.path.append(str(Path(__file__).resolve().parent.parent / "normalization"))
+from common_ids import clean_id as _clean_id_base
+from common_dates import iso_date
+# Tabelle lette dalla copia locale (parquet tipizzato o CSV) se presente, altrimenti da GitHub
+from common_io import read_source
+
 CSV_OPERE = "https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/regio/regio_opere_pulito_con_anno.csv"
-CSV_PERSONE = "https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/regio/regio_persone.csv"
+CSV_PERSONE = "https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/regio/regio_persone_dedup.csv"
 CSV_PRODUZIONI = "https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/regio/regio_produzioni.csv"
 CSV_STAGIONI = "https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/regio/regio_stagioni.csv"
 CSV_RECITE = "https://media.githubusercontent.com/media/elena2notti/theatreNet/refs/heads/main/regio/recite-regio-luoghi-qid2.csv"
@@ -28,37 +36,8 @@ CORAGO = Namespace("http://corago.unibo.it/sm/")
 # ================================================================
 
 def clean_id(value):
-    """Pulisce ID numerici - VERSIONE ROBUSTA CONTRO .0"""
-    if pd.isna(value) or value is None:
-        return None
-    
-    s = str(value).strip()
-    if not s or s.lower() in ["nan", "none", "null", "n/a"]:
-        return None
-    
-    # Rimuovi TUTTI i .0 finali (anche multipli)
-    original_s = s
-    while s.endswith('.0'):
-        s = s[:-2]
-    
-    # Se dopo la rimozione è vuoto, ritorna None
-    if not s:
-        return None
-    
-    # Se sembra un numero float, converti a int
-    if '.' in s:
-        try:
-            # Prova a parsare come float e poi converti a int se è intero
-            f = float(s)
-            if f.is_integer():
-                s = str(int(f))
-            else:
-                # Se non è intero, mantieni come stringa ma pulisci
-                s = s.rstrip('0').rstrip('.') if '.' in s else s
-        except ValueError:
-            pass
-    
-    return s
+    """Pulisce ID numerici (stessa regola della normalizzazione, vedi common_ids.py). None se vuoto."""
+    return _clean_id_base(value) or None
 
 def clean_uri(value):
     """Pulisce stringhe per URI - USES clean_id PER NUMERI"""
@@ -92,19 +71,10 @@ def literal(value):
     return Literal(v) if v and v.lower() not in ["nan", "none", "null"] else None
 
 def safe_date_literal(value):
-    if pd.isna(value) or value is None:
-        return None
-    val = str(value).strip().split(" ")[0].split("T")[0]
-    val = val.replace(".", "-").replace("/", "-")
-
-    if re.match(r"^\d{4}$", val):
-        val = f"{val}-01-01"
-    elif re.match(r"^\d{4}-\d{1,2}$", val):
-        val = f"{val}-01"
-
-    if re.match(r"^\d{4}-\d{2}-\d{2}$", val):
-        return Literal(val, datatype=XSD.date)
-    return None
+    # Stesse regole di prima, ma ogni testo di data viene interpretato una volta sola
+    # (vedi normalization/common_dates.py)
+    iso = iso_date(value)
+    return Literal(iso, datatype=XSD.date) if iso else None
 
 def wikidata_canonical(value):
     """Normalizza URI Wikidata - VERSIONE ROBUSTA"""
@@ -202,11 +172,13 @@ def add_sameas_if_wikidata(g, local_uri, qid_or_url):
 def add_viaf_sameas(g, local_uri, viaf_value):
     if local_uri is None or viaf_value is None or pd.isna(viaf_value):
         return
-    v = str(viaf_value).strip()
-    if not v or v.lower() in ["none", "nan", "null"]:
-        return
-    v = v.replace(".0", "")
-    g.add((local_uri, OWL.sameAs, URIRef(f"http://viaf.org/viaf/{v}")))
+    # Persone deduplicate: più VIAF nella stessa cella, separati da ";"
+    for v in str(viaf_value).split(";"):
+        v = v.strip()
+        if not v or v.lower() in ["none", "nan", "null"]:
+            continue
+        v = v.replace(".0", "")
+        g.add((local_uri, OWL.sameAs, URIRef(f"http://viaf.org/viaf/{v}")))
 
 def add_triple_with_inverse(g, s, p, o):
     if s is None or p is None or o is None:
@@ -426,7 +398,7 @@ g.bind("owl", OWL)
 # ================================================================
 
 print("1. Opere...")
-opere = pd.read_csv(CSV_OPERE)
+opere = read_source(CSV_OPERE)
 opere.columns = opere.columns.str.strip()
 
 for _, row in opere.iterrows():
@@ -488,7 +460,7 @@ for _, row in opere.iterrows():
 # ================================================================
 
 print("2. Persone...")
-persone = pd.read_csv(CSV_PERSONE)
+persone = read_source(CSV_PERSONE)
 persone.columns = persone.columns.str.strip()
 
 for _, row in persone.iterrows():
@@ -556,7 +528,7 @@ for _, row in persone.iterrows():
 # ================================================================
 
 print("3. Stagioni...")
-stagioni = pd.read_csv(CSV_STAGIONI)
+stagioni = read_source(CSV_STAGIONI)
 stagioni.columns = stagioni.columns.str.strip()
 
 for _, row in stagioni.iterrows():
@@ -603,7 +575,7 @@ for _, row in stagioni.iterrows():
 # ================================================================
 
 print("4. Produzioni...")
-prod_df = pd.read_csv(CSV_PRODUZIONI)
+prod_df = read_source(CSV_PRODUZIONI)
 prod_df.columns = prod_df.columns.str.strip()
 
 for _, row in prod_df.iterrows():
@@ -678,7 +650,7 @@ for _, row in prod_df.iterrows():
 # ================================================================
 
 print("5. Recite...")
-recite = pd.read_csv(CSV_RECITE)
+recite = read_source(CSV_RECITE, categories=True)  # ruoli, voci, luoghi e titoli come category
 recite.columns = recite.columns.str.strip()
 
 # Dizionario per tenere traccia dei personaggi già collegati alle opere
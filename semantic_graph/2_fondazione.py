@@ -4,11 +4,20 @@ from rdflib.namespace import RDF, RDFS, XSD, OWL
 from pathlib import Path
 import unidecode
 import re
+import sys
 import ast
 
+# Modulo condiviso di pulizia ID (normalization/common_ids.py)
+sys.path.append(str(Path(__file__).resolve().parent.parent / "normalization"))
+from common_ids import clean_id as _clean_id_base
+from common_dates import iso_date
+# Tabelle lette dalla copia locale (parquet tipizzato o CSV) se presente, altrimenti da GitHub
+from common_io import read_source
+
 CSV_OPERE = "https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/fondazione/fondazione-iteatri-opere-musicali-wiki-reconciled.csv"
 CSV_PERSONE = "https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/fondazione/persone.csv"
 CSV_STAGIONI = "https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/fondazione/stagioni.csv"
+CSV_STAGIONI_LINKS = "https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/fondazione/stagioni_links.csv"
 CSV_PRODUZIONI = "https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/fondazione/produzioni_clean.csv"
 CSV_RECITE = "https://raw.githubusercontent.com/elena2notti/theatreNet/refs/heads/main/fondazione/recite_fondazione_con_qid.csv"
 OUTPUT_TTL = Path("semantic_graph/upload_to_neo4j/fondazione.ttl")
@@ -19,36 +28,8 @@ FRBROO = Namespace("http://iflastandards.info/ns/fr/frbr/frbroo/")
 CORAGO = Namespace("http://corago.unibo.it/sm/")
 
 def clean_id(value):
-    """Pulisce ID numerici - VERSIONE ROBUSTA CONTRO .0"""
-    if pd.isna(value) or value is None:
-        return None
-    
-    s = str(value).strip()
-    if not s or s.lower() in ["nan", "none", "null", "n/a"]:
-        return None
-    
-    # Rimuovi TUTTI i .0 finali (anche multipli)
-    while s.endswith('.0'):
-        s = s[:-2]
-    
-    # Se dopo la rimozione è vuoto, ritorna None
-    if not s:
-        return None
-    
-    # Se sembra un numero float, converti a int
-    if '.' in s:
-        try:
-            # Prova a parsare come float e poi converti a int se è intero
-            f = float(s)
-            if f.is_integer():
-                s = str(int(f))
-            else:
-                # Se non è intero, mantieni come stringa ma pulisci
-                s = s.rstrip('0').rstrip('.') if '.' in s else s
-        except ValueError:
-            pass
-    
-    return s
+    """Pulisce ID numerici (stessa regola della normalizzazione, vedi common_ids.py). None se vuoto."""
+    return _clean_id_base(value) or None
 
 def clean_uri(value):
     """Pulisce stringhe per URI - USES clean_id PER NUMERI"""
@@ -82,19 +63,9 @@ def literal(value):
     return Literal(v) if v and v.lower() not in ["nan", "none", "null"] else None
 
 def safe_date_literal(value):
-    if pd.isna(value) or value is None:
-        return None
-    val = str(value).strip().split(" ")[0].split("T")[0]
-    val = val.replace(".", "-").replace("/", "-")
-
-    if re.match(r"^\d{4}$", val):
-        val = f"{val}-01-01"
-    elif re.match(r"^\d{4}-\d{1,2}$", val):
-        val = f"{val}-01"
-
-    if re.match(r"^\d{4}-\d{2}-\d{2}$", val):
-        return Literal(val, datatype=XSD.date)
-    return None
+    # Data ISO memoizzata per valore distinto (normalization/common_dates.py)
+    iso = iso_date(value)
+    return Literal(iso, datatype=XSD.date) if iso else None
 
 def wikidata_canonical(value):
     if value is None or pd.isna(value):
@@ -408,7 +379,7 @@ PERSON_INDEX = {}
 def load_people_index():
     global PERSON_INDEX
     try:
-        dfp = pd.read_csv(CSV_PERSONE)
+        dfp = read_source(CSV_PERSONE)
         dfp.columns = dfp.columns.str.strip()
         for _, r in dfp.iterrows():
             pid = clean_id(r.get("id"))
@@ -444,7 +415,7 @@ g.bind("owl", OWL)
 print("=== FONDAZIONE ITEATRI - GENERAZIONE GRAFO ===")
 
 print("1. Opere...")
-opere = pd.read_csv(CSV_OPERE)
+opere = read_source(CSV_OPERE)
 opere.columns = opere.columns.str.strip()
 
 for _, row in opere.iterrows():
@@ -501,7 +472,7 @@ for _, row in opere.iterrows():
 
 
 print("2. Stagioni...")
-stagioni = pd.read_csv(CSV_STAGIONI)
+stagioni = read_source(CSV_STAGIONI)
 stagioni.columns = stagioni.columns.str.strip()
 
 for _, row in stagioni.iterrows():
@@ -524,28 +495,21 @@ for _, row in stagioni.iterrows():
         if date_to:
             g.add((ts, CRM.P82b_end_of_the_end, date_to))
         add_triple_with_inverse(g, season_uri, CRM.P4_has_time_span, ts)
-    
-    # RELAZIONI: stagione -> produzioni
-    prod_ids = row.get("produzioni_collegate_id")
-    if prod_ids:
-        for pid in str(prod_ids).split(","):
-            pid_clean = clean_id(pid)
-            if pid_clean:
-                prod_uri = BASE[f"production_{pid_clean}"]
-                add_triple_with_inverse(g, season_uri, CRM.P9_consists_of, prod_uri)
-    
-    # RELAZIONI: stagione -> recite
-    perf_ids = row.get("manifestazioni_recite_concerti_collegati_id")
-    if perf_ids:
-        for rid in str(perf_ids).split(","):
-            rid_clean = clean_id(rid)
-            if rid_clean:
-                perf_uri = BASE[f"performance_{rid_clean}"]
-                add_triple_with_inverse(g, season_uri, CRM.P9_consists_of, perf_uri)
+
+# RELAZIONI: stagione -> produzioni / recite
+# Dalla tabella link (una riga per stagione/entità, ID già puliti in normalizzazione):
+# niente split delle stringhe "123, 456" riga per riga
+stagioni_links = read_source(CSV_STAGIONI_LINKS, na=False)
+stagioni_links = stagioni_links[stagioni_links["season_id"].isin(set(stagioni["id"].map(clean_id)))]
+PREFISSI_LINK = {"produzione": "production", "recita": "performance"}
+for rel, prefisso in PREFISSI_LINK.items():
+    parte = stagioni_links[(stagioni_links["relazione"] == rel) & (stagioni_links["entita_id"] != "")]
+    for sid, eid in zip(parte["season_id"], parte["entita_id"]):
+        add_triple_with_inverse(g, BASE[f"season_{sid}"], CRM.P9_consists_of, BASE[f"{prefisso}_{eid}"])
 
 
 print("3. Produzioni...")
-prod_df = pd.read_csv(CSV_PRODUZIONI, sep=";", encoding="utf-8", engine="python")
+prod_df = read_source(CSV_PRODUZIONI, sep=";")
 prod_df.columns = prod_df.columns.str.strip()
 
 for _, row in prod_df.iterrows():
@@ -637,7 +601,7 @@ for _, row in prod_df.iterrows():
 
 
 print("4. Recite...")
-recite = pd.read_csv(CSV_RECITE)
+recite = read_source(CSV_RECITE, categories=True)  # Colonne ripetitive della vista wide codificate (common_io.CATEGORY_COLUMNS)
 recite.columns = recite.columns.str.strip()
 
 # Dizionario per tenere traccia dei personaggi già collegati alle opere
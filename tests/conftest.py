@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+# Gli script importano i moduli fratelli direttamente (common_*.py, batch_import.py):
+# qui le loro cartelle vanno sul path come quando si lanciano dalla radice del repo.
+ROOT = Path(__file__).resolve().parent.parent
+for cartella in ("normalization", "property_graph"):
+    sys.path.insert(0, str(ROOT / cartella))
@@ -0,0 +1,66 @@
+import pytest
+
+import batch_import
+from batch_import import Checkpoint, to_batched
+
+QUERY = """
+LOAD CSV WITH HEADERS FROM 'https://example.org/main/regio/x.csv' AS row
+FIELDTERMINATOR ';'
+WITH row WHERE row.id IS NOT NULL
+MERGE (p:Person {internal_id_regio: row.id})
+RETURN count(p) AS totale;
+"""
+
+
+def test_to_batched_avvolge_il_corpo():
+    q = to_batched(QUERY, batch_rows=500)
+    assert q.startswith("\nLOAD CSV WITH HEADERS FROM 'https://example.org/main/regio/x.csv' AS row\n"
+                        "FIELDTERMINATOR ';'\nWITH row, linenumber() AS riga\nWHERE riga > $da_riga\n")
+    assert "CALL {\nWITH row\n\nWITH row WHERE row.id IS NOT NULL\nMERGE (p:Person" in q
+    assert "} IN TRANSACTIONS OF 500 ROWS\nON ERROR BREAK\nREPORT STATUS AS stato\n" in q
+    # Il RETURN originale sparisce: dentro CALL IN TRANSACTIONS non si restituisce nulla
+    assert "count(p)" not in q
+    assert q.endswith("RETURN riga, stato.transactionId AS tx, stato.committed AS committed, "
+                      "stato.errorMessage AS errore")
+
+
+def test_to_batched_senza_load_csv():
+    with pytest.raises(ValueError):
+        to_batched("MATCH (n) RETURN n")
+
+
+@pytest.fixture
+def checkpoint_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_import, "CHECKPOINT_DIR", tmp_path)
+    return tmp_path
+
+
+def test_checkpoint_ripresa(checkpoint_dir):
+    cp = Checkpoint("script")
+    assert cp.start("1. Persone", QUERY) == 0
+    cp.update("1. Persone", 3000)
+
+    # Con --resume si riparte dall'ultima riga committata, poi lo step completato si salta
+    cp = Checkpoint("script", resume=True)
+    assert cp.start("1. Persone", QUERY) == 3000
+    cp.done("1. Persone")
+    assert Checkpoint("script", resume=True).start("1. Persone", QUERY) is None
+
+
+def test_checkpoint_senza_resume_riparte_da_capo(checkpoint_dir):
+    cp = Checkpoint("script")
+    cp.start("1. Persone", QUERY)
+    cp.update("1. Persone", 3000)
+    assert Checkpoint("script").start("1. Persone", QUERY) == 0
+    # Il nuovo avvio azzera anche lo stato salvato
+    assert Checkpoint("script", resume=True).start("1. Persone", QUERY) == 0
+
+
+def test_checkpoint_query_cambiata_riparte(checkpoint_dir):
+    cp = Checkpoint("script")
+    cp.start("1. Persone", QUERY)
+    cp.update("1. Persone", 3000)
+    altra = QUERY.replace("x.csv", "y.csv")
+    assert Checkpoint("script", resume=True).start("1. Persone", altra) == 0
+    assert (checkpoint_dir / "script.json").exists()
+    assert not (checkpoint_dir / "script.tmp").exists()
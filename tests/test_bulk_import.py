@@ -0,0 +1,154 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import bulk_import
+from bulk_import import BulkGraph, build_fondazione, build_regio, character_aliases, import_command, script_files
+from common_edges import WIDE_BASE_COLUMNS, build_edges, wide_view
+
+# Recita 1 con direttore, orchestra e due interpreti; recita 2 senza direttore.
+# Nel file wide Regio la recita 2 ha id_recita vuoto (viene dal merge dei curatori)
+MAIN = pd.DataFrame({c: "" for c in WIDE_BASE_COLUMNS}, index=range(2)).assign(
+    id=["1", "2"], production_id=["10", "10"], titolo_breve=["Aida", "Norma"],
+)
+CURATORI = pd.DataFrame({"id_recita": ["1"], "curatore_nome": ["Muti"], "curatore_id": ["100"],
+                         "curatore_ruolo": ["Direttore"]})
+ESECUTORI = pd.DataFrame({"id_recita": ["1", "2"], "esecutore_nome": ["Orchestra"] * 2,
+                          "esecutore_id": ["200", "200"], "esecutore_ruolo": ["Orchestra"] * 2})
+INTERPRETI = pd.DataFrame({
+    "id_recita": ["1", "1", "2"], "personaggio": ["Aida", "Radamès", "Norma"],
+    "personaggio_voce": ["soprano", "tenore", "soprano"], "interprete": ["Tebaldi", "Bergonzi", "Callas"],
+    "interprete_id": ["300", "301", "302"], "ruolo": ["Interprete"] * 3,
+})
+
+
+def coppie(g, tipo):
+    tabelle = {key: df for kind, key, df in g.tables() if kind == "rel"}
+    return {tuple(r) for key, df in tabelle.items() if key[0] == tipo for r in df[["start", "end"]].to_numpy()}
+
+
+def nodi(g, space):
+    return set(g.node_table(space)["id"])
+
+
+def file_vuoti(tmp_path, script, **reali):
+    """Tutti i FILE_* dello script su CSV senza righe, tranne quelli passati."""
+    vuoto = tmp_path / "vuoto.csv"
+    vuoto.write_text("vuoto\n", encoding="utf-8")
+    files = {k: str(vuoto) for k in script_files(script)}
+    files.update({k: str(v) for k, v in reali.items()})
+    return files
+
+
+@pytest.fixture
+def wide():
+    return wide_view(MAIN, build_edges(CURATORI, ESECUTORI, INTERPRETI, ordine_recite=MAIN["id"]))
+
+
+def test_regio_recita_senza_direttore(tmp_path, wide):
+    assert wide.loc[wide["id"] == "2", "id_recita"].isna().all()
+    wide.to_csv(tmp_path / "recite.csv", index=False)
+    g = BulkGraph()
+    build_regio(g, file_vuoti(tmp_path, bulk_import.SCRIPT_REGIO, FILE_REGIO_RECITE=tmp_path / "recite.csv"))
+
+    assert nodi(g, "Performance_regio") == {"10_1", "10_2"}
+    assert coppie(g, "CONDUCTED") == {("100", "10_1")}
+    # Prima la catena WITH ... WHERE curatore_id scartava questi archi della recita 2
+    assert coppie(g, "PERFORMED_IN") == {("300", "10_1"), ("301", "10_1"), ("302", "10_2")}
+    assert coppie(g, "PARTICIPATED_IN") == {("200", "10_1"), ("200", "10_2")}
+    assert coppie(g, "APPEARED_IN") == {("nome:Aida", "10_1"), ("nome:Radamès", "10_1"), ("nome:Norma", "10_2")}
+
+
+def test_fondazione_recita_senza_direttore(tmp_path, wide):
+    wide.drop(columns=["id_recita", "id_recita_esecutore", "id_recita_interprete"]).to_csv(
+        tmp_path / "recite.csv", index=False)
+    (tmp_path / "produzioni.csv").write_text("id;dcTitle\n10;Aida\n", encoding="utf-8")
+    (tmp_path / "links.csv").write_text("production_id;relazione;entita_id;ruolo\n10;recita;1;\n10;recita;2;\n",
+                                        encoding="utf-8")
+    g = BulkGraph()
+    build_fondazione(g, file_vuoti(tmp_path, bulk_import.SCRIPT_FONDAZIONE,
+                                   FILE_FONDAZIONE_RECITE=tmp_path / "recite.csv",
+                                   FILE_FONDAZIONE_PRODUZIONI=tmp_path / "produzioni.csv",
+                                   FILE_FONDAZIONE_PRODUZIONI_LINKS=tmp_path / "links.csv"))
+
+    assert nodi(g, "Performance_fondazione") == {"1", "2"}
+    assert coppie(g, "CONDUCTED") == {("100", "1")}
+    assert coppie(g, "PERFORMED_IN") == {("300", "1"), ("301", "1"), ("302", "2")}
+    assert coppie(g, "PARTICIPATED_IN") == {("200", "1"), ("200", "2")}
+    # Il link produzione -> recita viene dalla tabella links, non dalle colonne delle recite
+    assert coppie(g, "HAS_PERFORMANCE") == {("10", "1"), ("10", "2")}
+
+
+def serie(*valori):
+    return pd.Series(list(valori), dtype=object)
+
+
+def grafo_piccolo():
+    """Una persona aggiunta due volte (prima come stub), un'opera, archi ripetuti e uno verso un nodo mancante."""
+    g = BulkGraph()
+    g.node("Person", "Person_regio", serie("1", "2"), "internal_id_regio",
+           name=serie(None, "Rossini"), viaf=serie(None, None), source="Regio")
+    g.node("Person", "Person_regio", serie("1"), "internal_id_regio",
+           name=serie("Verdi"), viaf=serie("111;222"), source="Regio")
+    g.node("Work", "Work_regio", serie("10"), "internal_id_regio", title=serie("Aida"), year=serie("1871.0"))
+    g.node("Character", "Character", serie("Q1", "nome:Radamès"), name=serie("Aida", "Radamès"))
+    g.rel("HAS_COMPOSER", "Work_regio", serie("10", "10", "10"), "Person_regio", serie("1", "1", "99"),
+          role=serie("prima", "ultima", "orfano"))
+    g.id_node("regio_", serie("1"), "Regio", "Person_regio", serie("1"))
+    return g
+
+
+def leggi(path):
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def test_write_intestazioni_e_accorpamento(tmp_path):
+    opzioni = grafo_piccolo().write(tmp_path)
+    conteggi = {(flag, nome, Path(path).name): n for flag, nome, path, n in opzioni}
+    assert conteggi == {
+        ("--nodes", "Person", "Person_regio.csv"): 2,
+        ("--nodes", "Work", "Work_regio.csv"): 1,
+        ("--nodes", "Character", "Character.csv"): 2,
+        ("--nodes", "ID", "ID.csv"): 1,
+        ("--relationships", "HAS_COMPOSER", "HAS_COMPOSER__Work_regio__Person_regio.csv"): 1,
+        ("--relationships", "IS_ID_OF", "IS_ID_OF__ID__Person_regio.csv"): 1,
+    }
+
+    persone = leggi(tmp_path / "nodes" / "Person_regio.csv")
+    assert list(persone.columns) == ["internal_id_regio:ID(Person_regio)", "name", "viaf:string[]", "source"]
+    # Un nodo per ID, con il primo valore non vuoto di ogni proprietà
+    assert persone.values.tolist() == [["1", "Verdi", "111;222", "Regio"], ["2", "Rossini", "", "Regio"]]
+
+    opere = leggi(tmp_path / "nodes" / "Work_regio.csv")
+    assert list(opere.columns) == ["internal_id_regio:ID(Work_regio)", "title", "year:int"]
+    assert opere["year:int"].tolist() == ["1871"]
+    # I personaggi non hanno una proprietà identificativa: l'ID serve solo all'import
+    assert leggi(tmp_path / "nodes" / "Character.csv").columns[0] == ":ID(Character)"
+    assert leggi(tmp_path / "nodes" / "ID.csv").values.tolist() == [["regio_1", "Regio"]]
+    assert leggi(tmp_path / "nodes" / "ID.csv").columns[0] == "code:ID(ID)"
+
+    archi = leggi(tmp_path / "relationships" / "HAS_COMPOSER__Work_regio__Person_regio.csv")
+    assert list(archi.columns) == [":START_ID(Work_regio)", ":END_ID(Person_regio)", "role"]
+    # Arco ripetuto: vince l'ultima riga, come SET riga per riga; l'arco verso 99 sparisce come con MATCH
+    assert archi.values.tolist() == [["10", "1", "ultima"]]
+
+
+def test_character_aliases():
+    g = grafo_piccolo()
+    g.node("Character", "Character", serie("nome:Aida"), name=serie("Aida"))
+    g.rel("APPEARED_IN", "Character", serie("nome:Aida", "nome:Radamès"), "Character", serie("Q1", "Q1"))
+    character_aliases(g)
+    # Il personaggio per nome con lo stesso nome di uno con QID diventa quel nodo
+    assert nodi(g, "Character") == {"Q1", "nome:Radamès"}
+    assert coppie(g, "APPEARED_IN") == {("Q1", "Q1"), ("nome:Radamès", "Q1")}
+
+
+def test_import_command(tmp_path):
+    opzioni = [("--nodes", "Person", tmp_path / "nodes" / "Person_regio.csv", 2),
+               ("--relationships", "IS_ID_OF", tmp_path / "relationships" / "IS_ID_OF__ID__Person regio.csv", 1)]
+    assert import_command(opzioni, "neo4j", tmp_path) == (
+        "neo4j-admin database import full neo4j --overwrite-destination '--array-delimiter=;' "
+        "--multiline-fields=true --nodes=Person=nodes/Person_regio.csv "
+        "'--relationships=IS_ID_OF=relationships/IS_ID_OF__ID__Person regio.csv'"
+    )
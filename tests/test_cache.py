@@ -0,0 +1,66 @@
+import os
+import sys
+
+import pytest
+
+from common_cache import StageCache, manifest_fresh
+
+
+@pytest.fixture
+def fase(tmp_path, monkeypatch):
+    """Script, input e output finti in una cartella vuota (il manifest va in ./.cache)."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", ["fase.py"])
+    monkeypatch.delenv("THEATRENET_TABLE_FORMAT", raising=False)
+    (tmp_path / "fase.py").write_text("OUTPUT_FORMAT = 'csv'\n", encoding="utf-8")
+    (tmp_path / "input.csv").write_text("id\n1\n", encoding="utf-8")
+
+    def esegui():
+        stage = StageCache(tmp_path / "fase.py", inputs=["input.csv", "mappa.csv"], outputs=["output.csv"],
+                           force=False)
+        if not stage.fresh():
+            (tmp_path / "output.csv").write_text("id\n1\n", encoding="utf-8")
+            stage.save()
+        return stage
+
+    esegui()
+    return tmp_path, esegui
+
+
+def sposta_mtime(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def test_manifest_fresh_dopo_esecuzione(fase):
+    assert manifest_fresh("fase")
+    assert not manifest_fresh("altra_fase")
+    # run_pipeline.py lancia le fasi senza argomenti: un manifest scritto con --input diverso non vale
+    assert not manifest_fresh("fase", argv=["--input", "altro.csv"])
+
+
+@pytest.mark.parametrize("cambio", ["input", "script", "output", "mappa", "env"])
+def test_manifest_fresh_invalidato(fase, monkeypatch, cambio):
+    cartella, _ = fase
+    if cambio == "input":
+        (cartella / "input.csv").write_text("id\n1\n2\n", encoding="utf-8")
+    elif cambio == "script":
+        (cartella / "fase.py").write_text("OUTPUT_FORMAT = 'parquet'\n", encoding="utf-8")
+    elif cambio == "output":
+        (cartella / "output.csv").unlink()
+    elif cambio == "mappa":
+        # Input assente all'ultima esecuzione che ora esiste
+        (cartella / "mappa.csv").write_text("id\n", encoding="utf-8")
+    else:
+        monkeypatch.setenv("THEATRENET_TABLE_FORMAT", "csv")
+    assert not manifest_fresh("fase")
+
+
+def test_file_toccato_ma_identico(fase):
+    cartella, esegui = fase
+    sposta_mtime(cartella / "input.csv")
+    # Il controllo rapido guarda solo dimensione e mtime: decide lo script con l'hash...
+    assert not manifest_fresh("fase")
+    assert esegui().previous["key"] == esegui().key
+    # ...che aggiorna il manifest, così il rerun successivo si ferma prima
+    assert manifest_fresh("fase")
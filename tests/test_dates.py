@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from common_dates import iso_date, iso_dates, year_from_datetext, years_from_datetext
+
+
+@pytest.mark.parametrize("valore, atteso", [
+    ("1971-04-12", "1971-04-12"),
+    ("1971", "1971-01-01"),
+    ("1971-04", "1971-04-01"),
+    ("1971/04/12", "1971-04-12"),
+    ("12.04.1971", None),
+    ("1971-04-12 20:30:00", "1971-04-12"),
+    ("1971-04-12T20:30:00", "1971-04-12"),
+    ("1971/4", None),
+    ("senza data", None),
+    ("", None),
+    (None, None),
+    (np.nan, None),
+    (pd.NA, None),
+])
+def test_iso_date(valore, atteso):
+    assert iso_date(valore) == atteso
+
+
+def test_iso_date_da_timestamp():
+    assert iso_date(pd.Timestamp("1830-12-31 18:00")) == "1830-12-31"
+
+
+def test_iso_dates_per_colonna():
+    s = pd.Series(["1971", None, "1971", "xx"], index=[5, 6, 7, 8])
+    out = iso_dates(s)
+    assert out.index.tolist() == [5, 6, 7, 8]
+    assert out.tolist() == ["1971-01-01", None, "1971-01-01", None]
+
+
+@pytest.mark.parametrize("valore, atteso", [
+    ("01-01-1830 - 31-12-1830", "1830"),
+    ("01-01-1830 - 31-12-1831", "1831"),
+    ("1830", None),
+    ("", None),
+    (None, None),
+])
+def test_year_from_datetext(valore, atteso):
+    assert year_from_datetext(valore) == atteso
+    assert years_from_datetext(pd.Series([valore])).tolist() == [atteso]
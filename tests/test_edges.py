@@ -0,0 +1,91 @@
+import pandas as pd
+import pytest
+
+from common_edges import EDGE_COLUMNS, WIDE_BASE_COLUMNS, build_edges, long_from_wide, wide_view, write_wide_view
+
+# Cinque recite: tutti i figli, nessun figlio, solo interpreti, solo un direttore, tutti i figli
+MAIN = pd.DataFrame({c: "" for c in WIDE_BASE_COLUMNS}, index=range(5)).assign(
+    id=["1", "2", "3", "4", "5"],
+    titolo_breve=["Aida", "Norma", "Tosca", "Otello", "Nabucco"],
+    production_id=["10", "10", "11", "12", "12"],
+    entity=["Q1", "", "Q3", "Q4", "Q5"],
+)
+CURATORI = pd.DataFrame({
+    "id_recita": ["1", "1", "4", "5"],
+    "curatore_nome": ["Abbado", "Muti", "Muti", "Gatti"],
+    "curatore_id": ["100", "101", "101", "102"],
+    "curatore_ruolo": ["Direttore", "Maestro del coro", "Direttore", "Direttore"],
+})
+ESECUTORI = pd.DataFrame({
+    "id_recita": ["1", "5", "5"],
+    "esecutore_nome": ["Orchestra", "Orchestra", "Coro"],
+    "esecutore_id": ["200", "200", "201"],
+    "esecutore_ruolo": ["Orchestra", "Orchestra", "Coro"],
+})
+INTERPRETI = pd.DataFrame({
+    "id_recita": ["1", "1", "3", "5", "5", "5"],
+    "personaggio": ["Aida", "Radamès", "Tosca", "Nabucco", "Abigaille", "Zaccaria"],
+    "personaggio_voce": ["soprano", "tenore", "soprano", "baritono", "soprano", "basso"],
+    "interprete": ["Tebaldi", "Bergonzi", "Callas", "Bruson", "Dimitrova", "Ghiaurov"],
+    "interprete_id": ["300", "301", "302", "303", "304", "305"],
+    "ruolo": ["Interprete"] * 6,
+})
+
+
+def storico(keep_recita_ids=True, extra=()):
+    """Il merge cartesiano che i due script facevano prima del formato lungo."""
+    out = (
+        MAIN[WIDE_BASE_COLUMNS + list(extra)]
+        .merge(CURATORI, left_on="id", right_on="id_recita", how="left")
+        .merge(ESECUTORI, left_on="id", right_on="id_recita", how="left", suffixes=("", "_esecutore"))
+        .merge(INTERPRETI, left_on="id", right_on="id_recita", how="left", suffixes=("", "_interprete"))
+    )
+    if not keep_recita_ids:
+        out = out.drop(columns=["id_recita", "id_recita_esecutore", "id_recita_interprete"])
+    out = out[[c for c in out.columns if c not in extra] + list(extra)]
+    return out.fillna("")
+
+
+def orfano(id_recita):
+    return pd.DataFrame([[id_recita, "interprete", "999", "Sconosciuto", "Interprete", "Ombra", ""]],
+                        columns=EDGE_COLUMNS)
+
+
+@pytest.fixture
+def edges():
+    return build_edges(CURATORI, ESECUTORI, INTERPRETI, ordine_recite=MAIN["id"])
+
+
+def test_edge_list_una_riga_per_figlio(edges):
+    assert len(edges) == len(CURATORI) + len(ESECUTORI) + len(INTERPRETI)
+    assert edges["id_recita"].tolist() == sorted(edges["id_recita"], key=int)
+
+
+def test_wide_view_uguale_al_merge_storico(edges):
+    pd.testing.assert_frame_equal(wide_view(MAIN, edges).fillna(""), storico())
+    pd.testing.assert_frame_equal(wide_view(MAIN, edges, keep_recita_ids=False).fillna(""),
+                                  storico(keep_recita_ids=False))
+
+
+@pytest.mark.parametrize("chunksize", [1, 2, 3, 100])
+def test_write_wide_view_a_blocchi_con_orfani(tmp_path, edges, chunksize):
+    # Orfani all'inizio, in mezzo (anche a fine blocco) e in fondo all'edge list
+    con_orfani = pd.concat([orfano("0"), edges.iloc[:5], orfano("7"), orfano("8"),
+                            edges.iloc[5:9], orfano("9"), edges.iloc[9:], orfano("99")], ignore_index=True)
+    main_path, edges_path, out_path = tmp_path / "main.csv", tmp_path / "edges.csv", tmp_path / "wide.csv"
+    MAIN.to_csv(main_path, index=False)
+    con_orfani.to_csv(edges_path, index=False)
+
+    righe = write_wide_view(main_path, edges_path, out_path, chunksize=chunksize, extra_columns=["entity"])
+    letto = pd.read_csv(out_path, dtype=str, keep_default_na=False)
+    atteso = storico(extra=["entity"])
+    assert righe == len(atteso)
+    pd.testing.assert_frame_equal(letto, atteso)
+
+
+def test_long_from_wide_inverso_della_vista(edges):
+    # Il file wide pubblicato ripete ogni persona per il prodotto cartesiano: tornando al
+    # formato lungo resta una riga per arco, anche per la recita senza figli
+    main, archi = long_from_wide(storico(extra=["entity"]))
+    pd.testing.assert_frame_equal(main, MAIN[WIDE_BASE_COLUMNS + ["entity"]])
+    pd.testing.assert_frame_equal(archi.fillna(""), edges.fillna(""))
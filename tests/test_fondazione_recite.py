@@ -0,0 +1,46 @@
+import json
+
+import pandas as pd
+
+from common_edges import build_edges, wide_view
+from fondazione_recite import fix_name_format, process_chunk
+
+
+def recita(id_, persone, enti):
+    return {
+        "id": id_, "dcTitle": "La traviata", "fullpath": f"/Recite/22-03-1980 La traviata ({id_})",
+        "from": "1980-03-22", "to": "1980-03-22", "datetext": "22-03-1980",
+        "Luoghi": json.dumps([{"nome": "Reggio Emilia", "Id": 33132, "relazione": "Luogo della rappresentazione"},
+                              {"nome": "Teatro Valli", "Id": "33139.0", "relazione": "Edificio della rappresentazione"}]),
+        "Persone": json.dumps(persone), "Enti": json.dumps(enti), "operemusicali_collegate": "",
+    }
+
+
+CHUNK = pd.DataFrame([
+    recita("41434.0", [
+        {"Identificativo": "12000.0", "Nome": "Rizzo, Leo", "Ruolo": "tenore", "Relazione": "interprete",
+         "Personaggio": "Alfredo"},
+        {"Identificativo": 11316, "Nome": "Bianchi, Gianni", "Ruolo": "", "Relazione": "regia", "Personaggio": ""},
+    ], [{"Identificativo": "33003", "Nome": "Coro", "Ruolo": "Coro"}]),
+    recita("41435", [], []),
+])
+
+
+def test_fix_name_format():
+    nomi = pd.Series(["Brown, Antonia", "Coro, del, Teatro", "Maria Callas", None], dtype=object)
+    assert fix_name_format(nomi).tolist() == ["Antonia Brown", "del, Teatro Coro", "Maria Callas", None]
+
+
+def test_process_chunk_id_puliti_e_vista_wide():
+    main, interpreti, curatori, esecutori, _ = process_chunk(CHUNK)
+    assert main["id"].tolist() == ["41434", "41435"]
+    assert main[["luogo_id", "edificio_id", "edificio_nome"]].iloc[0].tolist() == ["33132", "33139", "Teatro Valli"]
+    assert interpreti.iloc[0].tolist() == ["41434", "Alfredo", "tenore", "Leo Rizzo", "12000", "interprete"]
+    assert curatori.iloc[0].tolist() == ["41434", "Gianni Bianchi", "11316", "regia"]
+    assert esecutori.iloc[0].tolist() == ["41434", "Coro", "33003", "Coro"]
+
+    # Con "41434.0" nella recita e "41434" negli archi il merge della vista wide restava vuoto
+    edges = build_edges(curatori, esecutori, interpreti, ordine_recite=main["id"])
+    wide = wide_view(main, edges, keep_recita_ids=False)
+    assert wide[["id", "curatore_id", "esecutore_id", "interprete_id"]].fillna("").values.tolist() == [
+        ["41434", "11316", "33003", "12000"], ["41435", "", "", ""]]
@@ -0,0 +1,20 @@
+import pandas as pd
+
+from common_gazetteer import place_key
+
+
+def test_place_key_normalizza_accenti_maiuscole_e_spazi():
+    edifici = pd.Series(["Teatro  Valli ", "teatro valli", "Théâtre du Châtelet", "Teatro dell’Opera"])
+    luoghi = pd.Series(["Reggio Emilia", "REGGIO EMILIA", "Paris", "Roma"])
+    assert place_key(edifici, luoghi).tolist() == [
+        "teatro valli|reggio emilia",
+        "teatro valli|reggio emilia",
+        "theatre du chatelet|paris",
+        "teatro dell'opera|roma",
+    ]
+
+
+def test_place_key_mancanti():
+    edifici = pd.Series(["Teatro Regio", None, None])
+    luoghi = pd.Series([None, "Torino", None])
+    assert place_key(edifici, luoghi).tolist() == ["teatro regio|", "|torino", ""]
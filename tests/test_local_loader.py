@@ -0,0 +1,209 @@
+import sys
+import threading
+import types
+
+import pandas as pd
+import pytest
+
+# local_loader apre il driver solo in main(), ma importa neo4j e dotenv in testa:
+# qui bastano due moduli vuoti (nessun test parla con un database)
+sys.modules.setdefault("neo4j", types.SimpleNamespace(GraphDatabase=None))
+sys.modules.setdefault("dotenv", types.SimpleNamespace(load_dotenv=lambda **kw: None))
+
+import local_loader  # noqa: E402
+from bulk_import import BulkGraph  # noqa: E402
+from local_loader import (SOURCES, batches, load_definitions, load_preaggregated, merge_keys,  # noqa: E402
+                          node_batches, property_maps, rel_batches, run_batches, table_rows, to_unwind)
+
+
+class FakeDriver:
+    """Driver finto: ogni execute_write registra il blocco e restituisce le righe ricevute."""
+
+    def __init__(self, errore_su=None):
+        self.scritti = []
+        self.errore_su = errore_su
+        self.lock = threading.Lock()
+
+    def session(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_write(self, fn):
+        return fn(self)
+
+    def run(self, query, rows):
+        if self.errore_su is not None and any(r.get("id") == self.errore_su for r in rows):
+            raise RuntimeError("deadlock")
+        with self.lock:
+            self.scritti.append((query, rows))
+        return types.SimpleNamespace(single=lambda: types.SimpleNamespace(value=lambda: len(rows)))
+
+
+@pytest.mark.parametrize("source", sorted(SOURCES))
+def test_step_degli_script(source):
+    """Ogni step dichiarato esiste nello script e legge uno dei suoi FILE_*."""
+    conf = SOURCES[source]
+    ns = load_definitions(conf["script"])
+    files = {v for k, v in ns.items() if k.startswith("FILE_")}
+    for query_name, _ in conf["steps"]:
+        query, url, sep = to_unwind(ns[query_name])
+        assert "UNWIND $rows AS row" in query and "LOAD CSV" not in query.upper()
+        assert url in files
+        assert sep in {",", ";"}
+
+
+def test_to_unwind():
+    query = ("LOAD CSV WITH HEADERS FROM 'https://example.org/main/regio/x.csv' AS row\n"
+             "FIELDTERMINATOR ';'\nMERGE (p:Person {internal_id_regio: row.id})")
+    unwind, url, sep = to_unwind(query)
+    assert unwind == "UNWIND $rows AS row\nMERGE (p:Person {internal_id_regio: row.id})"
+    assert (url, sep) == ("https://example.org/main/regio/x.csv", ";")
+    # Senza FIELDTERMINATOR LOAD CSV usa la virgola
+    assert to_unwind("LOAD CSV WITH HEADERS FROM 'a.csv' AS row RETURN row")[1:] == ("a.csv", ",")
+    with pytest.raises(ValueError):
+        to_unwind("MATCH (n) RETURN n")
+
+
+def test_table_rows_come_load_csv(tmp_path):
+    path = tmp_path / "persone.csv"
+    path.write_text(" id ;nome;viaf\n007;Maria Callas;\n8;;12.0\n", encoding="utf-8")
+    df = table_rows(str(path), ";")
+    assert list(df.columns) == ["id", "nome", "viaf"]
+    # Tutto testo (niente 7 o 12.0 -> 12) e celle vuote -> null come in LOAD CSV
+    assert df.to_dict("records") == [
+        {"id": "007", "nome": "Maria Callas", "viaf": None},
+        {"id": "8", "nome": None, "viaf": "12.0"},
+    ]
+
+
+def test_table_rows_dalla_copia_locale(tmp_path, monkeypatch):
+    """Lo step 1 Regio legge regio/ sotto la root del repo invece di scaricare l'URL."""
+    import common_io
+    monkeypatch.setattr(common_io, "REPO_ROOT", tmp_path)
+    monkeypatch.setattr(common_io, "TABLE_FORMAT", "csv")
+    monkeypatch.setattr(common_io.pd, "read_csv", fallisce_se_url(common_io.pd.read_csv))
+    (tmp_path / "regio").mkdir()
+    (tmp_path / "regio" / "regio_persone_dedup.csv").write_text("person_id,full_name\n1,Maria Callas\n",
+                                                                encoding="utf-8")
+    ns = load_definitions(SOURCES["regio"]["script"])
+    _, url, sep = to_unwind(ns["cypher_import_persone"])
+    assert url.startswith("https://")
+    assert table_rows(url, sep).to_dict("records") == [{"person_id": "1", "full_name": "Maria Callas"}]
+
+
+def fallisce_se_url(read_csv):
+    def leggi(path, *args, **kwargs):
+        assert not str(path).startswith("http"), f"download da {path}"
+        return read_csv(path, *args, **kwargs)
+    return leggi
+
+
+def test_batches():
+    df = pd.DataFrame({"id": [str(i) for i in range(5)]})
+    blocchi = list(batches(df, 2))
+    assert [i for i, _ in blocchi] == [0, 2, 4]
+    assert [b for _, b in blocchi][-1] == [{"id": "4"}]
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_run_batches_scrive_ogni_riga_una_volta(workers, capsys):
+    df = pd.DataFrame({"id": [str(i) for i in range(10)]})
+    driver = FakeDriver()
+    assert run_batches(driver, "Q", df, 3, workers, "prova") == 10
+    righe = sorted(int(r["id"]) for _, rows in driver.scritti for r in rows)
+    assert righe == list(range(10))
+    assert sorted(len(rows) for _, rows in driver.scritti) == [1, 3, 3, 3]
+    assert "righe/s" in capsys.readouterr().out
+
+
+def test_run_batches_errore(capsys):
+    df = pd.DataFrame({"id": [str(i) for i in range(10)]})
+    # Un blocco che fallisce ferma lo step: 0 righe e il loader passa allo step successivo
+    assert run_batches(FakeDriver(errore_su="4"), "Q", df, 3, 1, "prova") == 0
+    out = capsys.readouterr().out
+    assert "ERRORE CRITICO in prova (righe 3-5: deadlock)" in out
+
+
+def test_sorgenti_serial():
+    # I MERGE dei personaggi per nome (senza vincolo) non vanno in parallelo
+    for conf in local_loader.SOURCES.values():
+        assert conf["serial"] <= {name for name, _ in conf["steps"]}
+
+
+# === MODALITÀ PRE-AGGREGATA ===
+
+def serie(*valori):
+    return pd.Series(list(valori), dtype=object)
+
+
+def recite_cartesiane(g, files):
+    """Come il file wide: la stessa recita e lo stesso direttore ripetuti per ogni interprete."""
+    g.node("Performance", "Performance_regio", serie("10_1", "10_1", "10_1"), "internal_id_regio",
+           date=serie("1900-01-01", "1900-01-01", "1900-01-01"))
+    g.node("Person", "Person_regio", serie("100", "300", "301"), "internal_id_regio",
+           name=serie("Muti", "Tebaldi", "Bergonzi"), viaf=serie("1;2", None, None))
+    g.node("Character", "Character", serie("Q1", "nome:Radamès"), name=serie("Aida", "Radamès"))
+    g.rel("CONDUCTED", "Person_regio", serie("100", "100", "100"), "Performance_regio", serie("10_1", "10_1", "10_1"))
+    g.rel("APPEARED_IN", "Character", serie("Q1", "nome:Radamès"), "Performance_regio", serie("10_1", "10_1"),
+          role=serie("Interprete", None))
+
+
+def test_merge_keys_personaggi():
+    g = BulkGraph()
+    recite_cartesiane(g, {})
+    chiavi, valori = merge_keys(g, "Character", serie("Q1", "nome:Radamès"))
+    assert chiavi.tolist() == ["wikidata_qid", "name"]
+    assert valori.tolist() == ["Q1", "Radamès"]
+    chiavi, valori = merge_keys(g, "Person_regio", serie("100"))
+    assert (chiavi.tolist(), valori.tolist()) == (["internal_id_regio"], ["100"])
+
+
+def test_property_maps():
+    df = pd.DataFrame({"name": ["Muti", None], "viaf": ["1;2", None], "year": pd.array([1871, None], dtype="Int64")})
+    # Niente chiavi per i valori mancanti (SET += null cancellerebbe la proprietà); viaf come SPLIT
+    assert property_maps(df) == [{"name": "Muti", "viaf": ["1", "2"], "year": 1871}, {}]
+
+
+def test_node_e_rel_batches_una_riga_per_entita():
+    g = BulkGraph()
+    recite_cartesiane(g, {})
+    tabelle = {(kind, key): df for kind, key, df in g.tables()}
+
+    (query, righe), = node_batches(g, "Performance_regio", tabelle["node", "Performance_regio"])
+    assert query.splitlines()[1] == "MERGE (n:Performance {internal_id_regio: row.id})"
+    assert righe.to_dict("records") == [{"id": "10_1", "props": {"date": "1900-01-01"}}]
+
+    personaggi = dict(node_batches(g, "Character", tabelle["node", "Character"]))
+    assert {q.splitlines()[1]: r["id"].tolist() for q, r in personaggi.items()} == {
+        "MERGE (n:Character {name: row.id})": ["Radamès"],
+        "MERGE (n:Character {wikidata_qid: row.id})": ["Q1"],
+    }
+
+    (query, righe), = rel_batches(g, ("CONDUCTED", "Person_regio", "Performance_regio"),
+                                  tabelle["rel", ("CONDUCTED", "Person_regio", "Performance_regio")])
+    assert "MERGE (a)-[r:CONDUCTED]->(b)" in query and "SET r" not in query
+    assert righe.to_dict("records") == [{"start": "100", "end": "10_1"}]
+
+    archi = dict(rel_batches(g, ("APPEARED_IN", "Character", "Performance_regio"),
+                             tabelle["rel", ("APPEARED_IN", "Character", "Performance_regio")]))
+    assert sorted(q.splitlines()[1] for q in archi) == ["MATCH (a:Character {name: row.start})",
+                                                       "MATCH (a:Character {wikidata_qid: row.start})"]
+    assert all("SET r += row.props" in q for q in archi)
+    assert sorted(r for righe in archi.values() for r in righe["props"].map(str)) == ["{'role': 'Interprete'}", "{}"]
+
+
+def test_load_preaggregated_scrive_ogni_entita_una_volta(monkeypatch, capsys):
+    monkeypatch.setitem(local_loader.BUILDERS, "regio", recite_cartesiane)
+    driver = FakeDriver()
+    assert load_preaggregated(driver, "regio", 1000, 2) == 9
+    scritti = [(q.splitlines()[1], r.get("id") or (r["start"], r["end"])) for q, rows in driver.scritti for r in rows]
+    assert len(scritti) == len(set(scritti)) == 9
+    # Prima tutti i nodi, poi le relazioni tra nodi già presenti
+    tipi = ["MERGE" if q.startswith("MERGE") else "MATCH" for q, _ in scritti]
+    assert tipi == sorted(tipi, key=lambda t: t != "MERGE")
+    assert "13 righe raccolte, 9 scritte una volta sola" in capsys.readouterr().out
@@ -0,0 +1,56 @@
+import csv
+
+from fondazione_pulizia_produzioni_virgolette import QuoteRepair, repair_file
+
+
+def test_record_corretto_invariato():
+    automa = QuoteRepair()
+    assert automa.feed('1;"Tosca; atto ""primo""";;\n') == ["1", 'Tosca; atto "primo"', "", ""]
+    assert automa.repairs == 0
+
+
+def test_virgolette_in_campo_non_quotato():
+    automa = QuoteRepair()
+    assert automa.feed('1;[{"Id": 2}];x\n') == ["1", '[{"Id": 2}]', "x"]
+    assert automa.repairs == 2
+
+
+def test_virgolette_non_raddoppiate_in_campo_quotato():
+    automa = QuoteRepair()
+    assert automa.feed('1;"[{"Id": 2}]";x\n') == ["1", '[{"Id": 2}]', "x"]
+    assert automa.repairs > 0
+
+
+def test_campo_su_piu_righe():
+    automa = QuoteRepair()
+    assert automa.feed('1;"prima riga\n') is None
+    assert automa.open
+    assert automa.feed('seconda riga";x\n') == ["1", "prima riga\nseconda riga", "x"]
+    assert not automa.open
+
+
+def test_ultima_riga_senza_terminatore():
+    assert QuoteRepair().feed("1;a;b") == ["1", "a", "b"]
+
+
+def test_repair_file_quarantena(tmp_path):
+    sorgente = tmp_path / "export.csv"
+    sorgente.write_text(
+        'id;titolo;note\n'
+        '1;"Aida";ok\n'
+        '2;"Norma;mai chiusa\n'
+        '3;[{"Id": 4}];x\n',
+        encoding="utf-8",
+    )
+    pulito, quarantena = tmp_path / "pulito.csv", tmp_path / "quarantena.csv"
+    stats = repair_file(str(sorgente), str(pulito), str(quarantena))
+
+    with open(pulito, encoding="utf-8", newline="") as f:
+        righe = list(csv.reader(f, delimiter=";"))
+    assert righe == [["id", "titolo", "note"], ["1", "Aida", "ok"], ["3", '[{"Id": 4}]', "x"]]
+    assert stats["quarantena"] == 1 and stats["riparati"] == 1
+
+    with open(quarantena, encoding="utf-8", newline="") as f:
+        scartati = list(csv.DictReader(f))
+    assert [(r["riga_inizio"], r["riga_fine"]) for r in scartati] == [("3", "3")]
+    assert scartati[0]["testo"] == '2;"Norma;mai chiusa\n'
@@ -0,0 +1,68 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import common_io
+from bulk_import import SCRIPT_REGIO, script_files
+
+pytest.importorskip("pyarrow")
+
+# URL vero dello script Cypher: la mappatura URL -> regio/ -> dataset/ è quella del repo
+URL = script_files(SCRIPT_REGIO)["FILE_REGIO_PERSONE"]
+PUBBLICATO = "regio/regio_persone_dedup.csv"
+PERSONE = pd.DataFrame({"person_id": ["1", "2"], "full_name": ["Maria Callas", "Renata Tebaldi"]})
+
+
+@pytest.fixture
+def letti(monkeypatch):
+    """Percorsi passati a read_table: dicono se read_source ha letto dataset/ o la copia pubblicata."""
+    percorsi = []
+    read_table = common_io.read_table
+    monkeypatch.setattr(common_io, "read_table", lambda path, **kw: percorsi.append(path) or read_table(path, **kw))
+    return percorsi
+
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    monkeypatch.setattr(common_io, "REPO_ROOT", tmp_path)
+    monkeypatch.setattr(common_io, "TABLE_FORMAT", "both")
+    origine = tmp_path / common_io.PUBLISHED[PUBBLICATO]
+    origine.parent.mkdir(parents=True)
+    common_io.write_table(PERSONE, origine)
+    (tmp_path / "regio").mkdir()
+    return tmp_path
+
+
+def test_url_pubblicato_mappato_su_dataset():
+    assert common_io.local_mirror(URL) == common_io.REPO_ROOT / PUBBLICATO
+
+
+def test_copia_pubblicata_usa_il_parquet_di_dataset(root, letti):
+    shutil.copy2(root / common_io.PUBLISHED[PUBBLICATO], root / PUBBLICATO)
+    assert common_io.read_source(URL).to_dict("list") == PERSONE.to_dict("list")
+    assert letti == [root / common_io.PUBLISHED[PUBBLICATO]]
+
+
+def test_puntatore_lfs_usa_il_parquet_di_dataset(root, letti):
+    (root / PUBBLICATO).write_text("version https://git-lfs.github.com/spec/v1\noid sha256:0\n")
+    assert common_io.read_source(URL).to_dict("list") == PERSONE.to_dict("list")
+    assert letti == [root / common_io.PUBLISHED[PUBBLICATO]]
+
+
+def test_csv_pubblicato_diverso_resta_il_csv(root, letti):
+    altro = PERSONE.assign(full_name=["Maria Callas", "Renata Scotto e altri"])
+    altro.to_csv(root / PUBBLICATO, index=False)
+    assert common_io.read_source(URL).to_dict("list") == altro.to_dict("list")
+    assert letti == [root / PUBBLICATO]
+
+
+def test_parquet_vecchio_resta_il_csv(root, letti):
+    origine = root / common_io.PUBLISHED[PUBBLICATO]
+    shutil.copy2(origine, root / PUBBLICATO)
+    # Il CSV in dataset/ è stato riscritto dopo il parquet (es. fase lanciata con formato csv)
+    st = common_io.parquet_path(origine).stat()
+    os.utime(origine, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert common_io.read_source(URL).to_dict("list") == PERSONE.to_dict("list")
+    assert letti == [root / PUBBLICATO]
@@ -0,0 +1,137 @@
+import pandas as pd
+import pytest
+
+from common_fuzzy import TrigramIndex, token_score
+from common_reconciliation import FUZZY_APPLY, FUZZY_AUDIT, build_id_map, name_key_series, reconcile, reconcile_edges
+
+MASTER = pd.DataFrame({
+    "nome": ["Giovanni Rossi", "Carlo Bergonzi", "Maria Grazia Rossi", "Madau Diaz, Antonello", "Renata Tebaldi"],
+    "id": ["101", "102", "103", "104.0", "105"],
+})
+
+
+@pytest.fixture
+def id_map():
+    mappa, ambigue = build_id_map(MASTER["nome"], MASTER["id"])
+    assert ambigue == 0
+    return mappa
+
+
+def test_name_key_normalizza_accenti_virgola_e_trattini():
+    chiavi = name_key_series(pd.Series(["Madau Diaz, Antonello", "Antonello  Madau-Diaz", "Renée FLEMING", None]))
+    assert chiavi.tolist() == ["antonello madau diaz", "antonello madau diaz", "renee fleming", ""]
+
+
+def test_build_id_map_pulisce_gli_id(id_map):
+    assert id_map["antonello madau diaz"] == "104"
+
+
+@pytest.mark.parametrize("nome", ["giovanna rossi", "carla bergonzi", "maria grazia rosso", "renato tebaldi"])
+def test_varianti_di_genere_non_combaciano(id_map, nome):
+    assert TrigramIndex(id_map).match(nome) is None
+
+
+@pytest.mark.parametrize("a, b", [
+    ("giovanna rossi", "giovanni rossi"),
+    ("carla bergonzi", "carlo bergonzi"),
+    ("maria grazia rosso", "maria grazia rossi"),
+])
+def test_token_score_scarta_ultima_lettera(a, b):
+    assert token_score(a, b) == 0.0
+
+
+def test_variante_di_grafia_accettata(id_map):
+    assert TrigramIndex(id_map).match("antonello madau diazz")[0] == "104"
+
+
+def test_numero_di_parole_diverso():
+    assert token_score("maria rossi", "maria grazia rossi") == 0.0
+
+
+def test_match_esatto_sostituisce_id():
+    df = pd.DataFrame({"interprete": ["Rossi, Giovanni"], "interprete_id": ["999"]})
+    mappa, _ = build_id_map(MASTER["nome"], MASTER["id"])
+    df, audit, conteggi = reconcile(df, mappa, {"interprete": ("interprete", "interprete_id")})
+    assert df["interprete_id"].tolist() == ["101"]
+    assert conteggi["interprete"]["exact"] == 1
+    assert audit["metodo"].tolist() == ["exact"]
+
+
+def test_fuzzy_non_sovrascrive_id_validi(id_map):
+    # "Antonello Madau Diazz" con l'ID di Renata Tebaldi: ID valido nel master, resta com'è
+    df = pd.DataFrame({"interprete": ["Antonello Madau Diazz", "Antonello Madau Diazz"],
+                       "interprete_id": ["105", ""]})
+    df, audit, _ = reconcile(df, id_map, {"interprete": ("interprete", "interprete_id")},
+                             TrigramIndex(id_map), fuzzy_mode=FUZZY_APPLY)
+    assert df["interprete_id"].tolist() == ["105", "104"]
+    assert audit["id_vecchio"].tolist() == [""]
+
+
+def test_fuzzy_audit_non_cambia_gli_id(id_map):
+    df = pd.DataFrame({"interprete": ["Antonello Madau Diazz"], "interprete_id": ["77"]})
+    df, audit, conteggi = reconcile(df, id_map, {"interprete": ("interprete", "interprete_id")},
+                                    TrigramIndex(id_map), fuzzy_mode=FUZZY_AUDIT)
+    assert df["interprete_id"].tolist() == ["77"]
+    assert conteggi["interprete"] == {"exact": 0, "fuzzy": 0, "fuzzy_proposto": 1}
+    assert audit[["id_vecchio", "id_nuovo", "metodo"]].values.tolist() == [["77", "104", "fuzzy_proposto"]]
+
+
+def test_nomi_diversi_con_id_vuoto_restano_vuoti(id_map):
+    df = pd.DataFrame({"interprete": ["Giovanna Rossi", "Carla Bergonzi"], "interprete_id": ["", ""]})
+    df, audit, _ = reconcile(df, id_map, {"interprete": ("interprete", "interprete_id")},
+                             TrigramIndex(id_map), fuzzy_mode=FUZZY_APPLY)
+    assert df["interprete_id"].tolist() == ["", ""]
+    assert audit.empty
+
+
+def test_name_key_series_mantiene_indice_e_duplicati():
+    nomi = pd.Series(["Bergonzi, Carlo", None, "Carlo Bergonzi", "Bergonzi, Carlo"], index=[10, 11, 12, 13])
+    chiavi = name_key_series(nomi)
+    assert chiavi.index.tolist() == [10, 11, 12, 13]
+    assert chiavi.tolist() == ["carlo bergonzi", "", "carlo bergonzi", "carlo bergonzi"]
+
+
+def test_match_cifre_diverse_non_combaciano():
+    indice = TrigramIndex({"cantante 1": "1", "cantante 14": "14"})
+    assert indice.match("cantante 14") == ("14", 1.0, "cantante 14")
+    assert indice.match("cantante 141") is None
+
+
+def test_match_ambiguo_scartato():
+    # Due persone diverse alla stessa distanza dal nome cercato: nessuna delle due
+    indice = TrigramIndex({"mario rossetti": "1", "mario rossotti": "2"})
+    assert indice.match("mario rossatti") is None
+    # Con lo stesso ID il distacco non conta
+    assert TrigramIndex({"mario rossetti": "1", "mario rossotti": "1"}).match("mario rossatti")[0] == "1"
+
+
+def test_match_sotto_soglia(id_map):
+    assert TrigramIndex(id_map).match("renata scotto") is None
+    assert TrigramIndex(id_map).match("") is None
+
+
+def test_reconcile_edges_solo_relazioni_indicate(id_map):
+    edges = pd.DataFrame({
+        "id_recita": ["1", "1", "1"],
+        "relazione": ["curatore", "esecutore", "interprete"],
+        "entita_nome": ["Carlo Bergonzi", "Carlo Bergonzi", "Rossi, Giovanni"],
+        "entita_id": ["5", "5", "6"],
+    })
+    edges, audit, conteggi = reconcile_edges(edges, id_map, ["interprete", "curatore"])
+    assert edges["entita_id"].tolist() == ["102", "5", "101"]
+    assert conteggi["curatore"]["exact"] == 1 and conteggi["interprete"]["exact"] == 1
+    assert len(audit) == 2
+
+
+def test_fuzzy_applicato_di_default_sopra_soglia(id_map):
+    df = pd.DataFrame({"interprete": ["Antonello Madau Diazz"], "interprete_id": [""]})
+    campi = {"interprete": ("interprete", "interprete_id")}
+    out, audit, conteggi = reconcile(df.copy(), id_map, campi, TrigramIndex(id_map), 0.85)
+    assert out["interprete_id"].tolist() == ["104"]
+    assert conteggi["interprete"]["fuzzy"] == 1
+    assert audit["metodo"].tolist() == ["fuzzy"]
+
+    # Soglia più alta del punteggio ("diaz"/"diazz" = 0.89): nessun match
+    out, audit, _ = reconcile(df.copy(), id_map, campi, TrigramIndex(id_map), 0.95)
+    assert out["interprete_id"].tolist() == [""]
+    assert audit.empty